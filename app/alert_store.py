@@ -0,0 +1,154 @@
+# app/alert_store.py
+"""
+Persisted Super/Admin alerts.
+
+refresh_alerts() runs the quality_engine alert rules over the entries written since
+its watermark in tool_entry_changes (every entry again when risk_config.json rules
+change) and over the gages when gages.json or the rules change, or when GageScheduler
+says a gage has crossed into Due Soon/Overdue. Results are upserted
+into the alerts table by alert_key, so an alert seen again keeps its first_seen and
+acknowledgement. Notifications only has to query the table.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from .config import RISK_CONFIG_FILE
+from .db import (
+    acknowledge_alert,
+    fetch_tool_entries_by_ids,
+    get_meta,
+    list_alerts,
+    list_changed_tool_entries,
+    log_audit,
+    set_meta,
+    sync_alerts,
+)
+from .gage_schedule import GAGES_FINGERPRINT_KEY, GageScheduler, due_soon_days, gage_statuses, sync_gages
+from .quality_engine import NOTIFICATION_COLUMNS, entry_alerts, gage_alerts
+from .storage import _DB_TO_FRAME_COLUMNS, load_json
+
+ALERTS_SEQ_KEY = "alerts_entry_seq"
+ALERTS_RULES_KEY = "alerts_rules_fingerprint"
+ALERTS_GAGE_KEY = "alerts_gage_fingerprint"
+ALERTS_GAGE_NEXT_KEY = "alerts_gage_next_event"
+ALERT_BATCH_SIZE = 5000
+
+SEVERITY_ORDER = ("Low", "Medium", "High", "Critical")
+
+_FRAME_TO_DB_COLUMNS = {frame: col for col, frame in _DB_TO_FRAME_COLUMNS.items()}
+# Columns tool_entries doesn't have (Defect_Code) read as blank.
+_ENTRY_COLUMNS = [
+    _FRAME_TO_DB_COLUMNS[c] for c in ("Date",) + NOTIFICATION_COLUMNS if c in _FRAME_TO_DB_COLUMNS
+]
+
+
+def _fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _keyed(alerts: List[Dict[str, Any]], months: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """Adds alert_key/related_key/entry_id/entry_month to generated alerts."""
+    out = []
+    for a in alerts:
+        related = a.get("related") or {}
+        related_key = "|".join(f"{k}={v}" for k, v in sorted(related.items()))
+        entry_id = related.get("entry_id")
+        out.append({
+            **a,
+            "alert_key": f"{a['type']}:{related_key}",
+            "related_key": related_key,
+            "entry_id": entry_id,
+            "entry_month": (months or {}).get(entry_id, ""),
+        })
+    return out
+
+
+def publish_alerts(alerts: List[Dict[str, Any]], alert_type: str) -> None:
+    """Replaces every active alert of alert_type with alerts (non-entry alerts such as stock)."""
+    sync_alerts(_keyed(alerts), alert_type=alert_type)
+
+
+def _entries_frame(entry_ids: List[str]) -> pd.DataFrame:
+    rows = fetch_tool_entries_by_ids(entry_ids, _ENTRY_COLUMNS)
+    return pd.DataFrame(rows, columns=_ENTRY_COLUMNS).rename(columns=_DB_TO_FRAME_COLUMNS)
+
+
+def refresh_alerts(batch_size: int = ALERT_BATCH_SIZE) -> int:
+    """Brings the alerts table up to date; returns how many entries were re-evaluated."""
+    risk_cfg = load_json(RISK_CONFIG_FILE, {}) or {}
+    rules = risk_cfg.get("rules", {}) or {}
+
+    sync_gages()
+    today = datetime.now().date()
+    gage_fp = _fingerprint({"gages": get_meta(GAGES_FINGERPRINT_KEY), "rules": rules})
+    next_event = get_meta(ALERTS_GAGE_NEXT_KEY) or ""
+    if get_meta(ALERTS_GAGE_KEY) != gage_fp or (next_event and today.isoformat() >= next_event):
+        statuses = gage_statuses(today, risk_cfg)
+        gages = list(statuses.values())
+        scheduler = GageScheduler.from_gages(gages, today, due_soon_days(risk_cfg))
+        upcoming = scheduler.next_event_date()
+        sync_alerts(
+            _keyed(gage_alerts({"gages": gages}, risk_cfg, statuses)),
+            alert_type="Calibration",
+            meta={ALERTS_GAGE_KEY: gage_fp, ALERTS_GAGE_NEXT_KEY: upcoming.isoformat() if upcoming else ""},
+        )
+
+    rules_fp = _fingerprint(rules)
+    rules_changed = get_meta(ALERTS_RULES_KEY) != rules_fp
+    # New thresholds can change any entry's alerts, so start over from the first write.
+    after = 0 if rules_changed else int(get_meta(ALERTS_SEQ_KEY) or 0)
+    processed = 0
+    while True:
+        changed = list_changed_tool_entries(after, batch_size)
+        if not changed:
+            break
+        ids = [entry_id for entry_id, _ in changed]
+        after = changed[-1][1]
+        df = _entries_frame(ids)
+        months = dict(zip(df["ID"].astype(str), df["Date"].astype(str).str[:7]))
+        alerts = entry_alerts(df, rules) if not df.empty else []
+        sync_alerts(
+            _keyed(alerts, months),
+            entry_ids=ids,
+            meta={ALERTS_SEQ_KEY: str(after), ALERTS_RULES_KEY: rules_fp},
+        )
+        processed += len(ids)
+    if rules_changed and not processed:
+        set_meta(ALERTS_RULES_KEY, rules_fp)
+    return processed
+
+
+def severities_at_least(min_severity: str) -> List[str]:
+    if min_severity not in SEVERITY_ORDER:
+        return list(SEVERITY_ORDER)
+    return list(SEVERITY_ORDER[SEVERITY_ORDER.index(min_severity):])
+
+
+def load_alerts(
+    *,
+    month: Optional[str] = None,
+    min_severity: str = "Low",
+    include_acknowledged: bool = True,
+) -> List[Dict[str, Any]]:
+    """Refreshes from new writes, then returns active alerts, most severe first."""
+    refresh_alerts()
+    alerts = list_alerts(
+        month=month,
+        severities=severities_at_least(min_severity),
+        include_acknowledged=include_acknowledged,
+    )
+    alerts.sort(key=lambda a: SEVERITY_ORDER.index(a["severity"]) if a["severity"] in SEVERITY_ORDER else 0, reverse=True)
+    return alerts
+
+
+def acknowledge(alert_id: int, username: str) -> bool:
+    ok = acknowledge_alert(alert_id, username)
+    if ok:
+        log_audit(username, f"Acknowledged alert {alert_id}")
+    return ok
@@ -12,13 +12,14 @@ from .config import (
     USERS_FILE, REASONS_FILE, PARTS_FILE, TOOL_CONFIG_FILE,
     DEFECT_CODES_FILE, ANDON_REASONS_FILE, COST_CONFIG_FILE, RISK_CONFIG_FILE,
     REPEAT_RULES_FILE, LPA_CHECKLIST_FILE, GAGES_FILE, GAGE_VERIFICATION_Q_FILE,
-    NCRS_FILE, ACTIONS_FILE,
+    NCRS_FILE, ACTIONS_FILE, INVENTORY_CONFIG_FILE, OEE_CONFIG_FILE, SPC_CONFIG_FILE, EWMA_CONFIG_FILE,
     alerts_file_for_month, month_excel_path, gage_verification_log_path,
     COLUMNS,
     DEFAULT_USERS, DEFAULT_REASONS, DEFAULT_PARTS, DEFAULT_TOOL_CONFIG,
     DEFAULT_DEFECT_CODES, DEFAULT_ANDON_REASONS, DEFAULT_COST_CONFIG, DEFAULT_RISK_CONFIG,
     DEFAULT_REPEAT_RULES, DEFAULT_LPA_CHECKLIST, DEFAULT_GAGES, DEFAULT_GAGE_VERIFICATION_Q,
-    DEFAULT_NCRS, DEFAULT_ACTIONS, DEFAULT_LINES, DEFAULT_DOWNTIME_CODES, DEFAULT_LINE_TOOL_MAP
+    DEFAULT_NCRS, DEFAULT_ACTIONS, DEFAULT_LINES, DEFAULT_DOWNTIME_CODES, DEFAULT_LINE_TOOL_MAP,
+    DEFAULT_INVENTORY_CONFIG, DEFAULT_OEE_CONFIG, DEFAULT_SPC_CONFIG, DEFAULT_EWMA_CONFIG,
 )
 
 from .db import (
@@ -33,6 +34,14 @@ from .db import (
     set_tool_lines,
 )
 from .migrate_to_sqlite import run_migration
+from .copq import backfill_copq
+from .repeat_tracker import get_repeat_tracker
+from .gage_schedule import sync_gages
+from .tool_life_model import refresh_tool_life_model
+from .inventory_forecast import refresh_inventory_forecast
+from .oee import refresh_oee_rollup
+from .spc import refresh_spc
+from .ewma import refresh_ewma
 
 
 # ----------------------------
@@ -66,6 +75,10 @@ def _ensure_json_files() -> None:
     _write_json_if_missing(COST_CONFIG_FILE, DEFAULT_COST_CONFIG)
     _write_json_if_missing(RISK_CONFIG_FILE, DEFAULT_RISK_CONFIG)
     _write_json_if_missing(REPEAT_RULES_FILE, DEFAULT_REPEAT_RULES)
+    _write_json_if_missing(INVENTORY_CONFIG_FILE, DEFAULT_INVENTORY_CONFIG)
+    _write_json_if_missing(OEE_CONFIG_FILE, DEFAULT_OEE_CONFIG)
+    _write_json_if_missing(SPC_CONFIG_FILE, DEFAULT_SPC_CONFIG)
+    _write_json_if_missing(EWMA_CONFIG_FILE, DEFAULT_EWMA_CONFIG)
     _write_json_if_missing(LPA_CHECKLIST_FILE, DEFAULT_LPA_CHECKLIST)
     _write_json_if_missing(GAGES_FILE, DEFAULT_GAGES)
     _write_json_if_missing(GAGE_VERIFICATION_Q_FILE, DEFAULT_GAGE_VERIFICATION_Q)
@@ -196,10 +209,26 @@ def ensure_app_initialized() -> None:
         bootstrap_defaults_if_needed()
         set_meta("bootstrap_defaults_done", "1")
     _seed_default_tools()
+    # Recompute stored COPQ if cost_config.json or part scrap costs changed
+    backfill_copq()
+    # Seed the repeat-offender counters so the first save is scored immediately
+    get_repeat_tracker()
+    # Fit tool-life predictions for entries written since the last run
+    refresh_tool_life_model()
 
     # Legacy files still used elsewhere in the app (for now)
     _ensure_json_files()
     _ensure_default_users()
+    # Mirror gages.json into SQLite so calibration due dates are indexed
+    sync_gages()
+    # Roll stock-out projections forward to today
+    refresh_inventory_forecast()
+    # Roll OEE up for shift reports written since the last run
+    refresh_oee_rollup()
+    # Extend control limits and rule checks over entries written since the last run
+    refresh_spc()
+    # Carry downtime / defect EWMAs over entries written since the last run
+    refresh_ewma()
 
     # Ensure month Excel exists and matches schema
     now = datetime.now()
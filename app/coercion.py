@@ -0,0 +1,149 @@
+# app/coercion.py
+"""
+Column-at-a-time versions of the storage.safe_int / safe_float converters.
+
+Each function gives the same answer per cell as its scalar counterpart, but does the
+bulk of the work with pd.to_numeric / .str accessors. Cells the fast path can't parse
+go through the scalar converter, so odd inputs ("1_000", "nan", True) keep exactly
+the old behavior.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .dates import DATE_FORMATS
+from .storage import safe_float, safe_int
+
+# Format that parsed the previous value; dates in one column nearly always share it.
+_last_date_format: Optional[str] = None
+
+
+def parse_date(value: Any) -> Optional[datetime]:
+    """Parses the date formats entries are saved with; None when nothing matches."""
+    global _last_date_format
+    if not value:
+        return None
+    s = str(value).strip()
+    if not s:
+        return None
+    # The formats can't match the same string, so trying the last hit first
+    # doesn't change which one wins.
+    if _last_date_format:
+        try:
+            return datetime.strptime(s, _last_date_format)
+        except Exception:
+            pass
+    for fmt in DATE_FORMATS:
+        if fmt == _last_date_format:
+            continue
+        try:
+            parsed = datetime.strptime(s, fmt)
+        except Exception:
+            continue
+        _last_date_format = fmt
+        return parsed
+    return None
+
+
+def _as_series(values: Any) -> pd.Series:
+    if isinstance(values, pd.Series):
+        return values
+    return pd.Series(values)
+
+
+def _to_float_values(s: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    Returns (parsed floats, needs_scalar mask).
+    Blank/None/NaN cells come back NaN with needs_scalar False; cells the fast path
+    could not read come back NaN with needs_scalar True.
+    """
+    if pd.api.types.is_bool_dtype(s.dtype):
+        # str(True) isn't a number, so the scalar converters fall back to default.
+        return pd.Series(np.nan, index=s.index, dtype="float64"), pd.Series(False, index=s.index)
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        return s.astype("float64"), pd.Series(False, index=s.index)
+
+    missing = s.isna()
+    text = s.astype(str).str.strip()
+    blank = missing | text.eq("")
+    parsed = pd.to_numeric(text.where(~blank), errors="coerce").astype("float64")
+    needs_scalar = parsed.isna() & ~blank
+    return parsed, needs_scalar
+
+
+def _coerce(s: pd.Series, default: Any, scalar: Callable[[Any, Any], Any]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parses s to floats. Returns (values, scalar_values) where scalar_values holds the
+    scalar converter's answer for cells the fast path couldn't read (None elsewhere).
+    Text columns repeat a small set of values (quantities, minutes), so only the
+    distinct values are parsed and the result is spread back over the rows.
+    """
+    if pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype):
+        parsed, needs_scalar = _to_float_values(s)
+        return parsed.to_numpy(), np.full(len(s), None, dtype=object)
+
+    # Factorize the text rather than the objects so True/1 or False/-0.0 stay apart;
+    # past the missing-value check the scalar converters only look at str(val).
+    codes, uniques = pd.factorize(s.astype(str), use_na_sentinel=True)
+    codes[s.isna().to_numpy()] = -1
+    parsed, needs_scalar = _to_float_values(pd.Series(uniques, dtype=object))
+    fallback = np.full(len(uniques), None, dtype=object)
+    for i in np.flatnonzero(needs_scalar.to_numpy()):
+        fallback[i] = scalar(uniques[i], default)
+
+    take = np.where(codes < 0, 0, codes)
+    values = np.append(parsed.to_numpy(), np.nan)[np.where(codes < 0, len(uniques), take)]
+    scalar_values = np.append(fallback, None)[np.where(codes < 0, len(uniques), take)]
+    return values, scalar_values
+
+
+def to_float_series(values: Any, default: float = 0.0) -> pd.Series:
+    """Vectorized safe_float: float64 Series, default where a cell isn't a number."""
+    s = _as_series(values)
+    parsed, scalar_values = _coerce(s, default, safe_float)
+    out = np.where(np.isnan(parsed), default, parsed)
+    fixed = scalar_values != None  # noqa: E711
+    out[fixed] = scalar_values[fixed].astype("float64")
+    return pd.Series(out, index=s.index, dtype="float64")
+
+
+def to_int_series(values: Any, default: int = 0) -> pd.Series:
+    """Vectorized safe_int: int64 Series, truncating toward zero like int(float(x))."""
+    s = _as_series(values)
+    parsed, scalar_values = _coerce(s, default, safe_int)
+    finite = np.isfinite(parsed)
+    out = np.full(len(s), default, dtype="int64")
+    out[finite] = np.trunc(parsed[finite]).astype("int64")
+    fixed = scalar_values != None  # noqa: E711
+    out[fixed] = scalar_values[fixed].astype("int64")
+    return pd.Series(out, index=s.index, dtype="int64")
+
+
+def to_flag_series(values: Any, true_values: Iterable[str] = ("yes",)) -> pd.Series:
+    """
+    Boolean Series, True where str(x or "").strip().lower() is one of true_values
+    (the Yes/No columns: Defects_Present, Andon_Flag, Sort_Done, ...).
+    """
+    s = _as_series(values)
+    text = s.where(s.notna(), "").astype(str).str.strip().str.lower()
+    return text.isin([str(v).lower() for v in true_values])
+
+
+def to_date_series(values: Any) -> pd.Series:
+    """
+    Vectorized parse_date: datetime64 Series, NaT where a cell isn't a date.
+    Each distinct value is parsed once, so a column of repeated dates costs a
+    handful of strptime calls rather than one per row.
+    """
+    s = _as_series(values)
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    lookup = pd.to_datetime(pd.Series([parse_date(v) for v in uniques], dtype="object"))
+    if lookup.empty:
+        return pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    out = lookup.to_numpy()[np.where(codes < 0, 0, codes)]
+    out[codes < 0] = np.datetime64("NaT")
+    return pd.Series(out, index=s.index)
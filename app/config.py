@@ -48,12 +48,19 @@ ANDON_REASONS_FILE = str(Path(DATA_DIR) / "andon_reasons.json")
 COST_CONFIG_FILE = str(Path(DATA_DIR) / "cost_config.json")
 RISK_CONFIG_FILE = str(Path(DATA_DIR) / "risk_config.json")
 REPEAT_RULES_FILE = str(Path(DATA_DIR) / "repeat_rules.json")
+INVENTORY_CONFIG_FILE = str(Path(DATA_DIR) / "inventory_config.json")
+OEE_CONFIG_FILE = str(Path(DATA_DIR) / "oee_config.json")
+SPC_CONFIG_FILE = str(Path(DATA_DIR) / "spc_config.json")
+EWMA_CONFIG_FILE = str(Path(DATA_DIR) / "ewma_config.json")
 LPA_CHECKLIST_FILE = str(Path(DATA_DIR) / "lpa_checklist.json")
 
 GAGES_FILE = str(Path(DATA_DIR) / "gages.json")
 GAGE_VERIFICATION_Q_FILE = str(Path(DATA_DIR) / "gage_verification_questions.json")
 DB_PATH = str(Path(DATA_DIR) / "toollife.db")
 
+# Columnar snapshots of closed months (safe to delete; rebuilt on demand)
+CACHE_DIR = str(Path(DATA_DIR) / "cache")
+
 APP_INFO = AppInfo(
     version=APP_VERSION,
     data_dir=DATA_DIR,
@@ -228,6 +235,58 @@ DEFAULT_REPEAT_RULES = {
     }
 }
 
+DEFAULT_INVENTORY_CONFIG = {
+    # Consumption rate = tool changes over the last window_days (each change uses one tool)
+    "window_days": 28,
+    # Days from placing an order to stock on the shelf
+    "default_lead_time_days": 14,
+    "lead_time_days_by_tool": {
+        # "60": 21
+    },
+    # Extra days of stock kept above lead-time demand
+    "safety_days": 7,
+    # Days of consumption an order should cover beyond the reorder point
+    "review_days": 14
+}
+
+DEFAULT_OEE_CONFIG = {
+    # Planned production minutes per shift (breaks already taken out)
+    "shift_minutes": 480,
+    "shift_minutes_by_shift": {
+        # "3rd": 450
+    }
+}
+
+DEFAULT_SPC_CONFIG = {
+    # Limits settle on each series' first baseline_points observations
+    "baseline_points": 25,
+    # No rule is checked before a series has this many points
+    "min_points": 8,
+    # Western Electric rules to check: 1 beyond 3 sigma, 2 of 3 beyond 2 sigma,
+    # 4 of 5 beyond 1 sigma, 8 in a row on one side of center
+    "rules": [1, 2, 3, 4],
+    # Which side of center counts for each series: "low", "high" or "both"
+    "watch": {"tool_life": "low", "downtime": "high"},
+    # A violation keeps its alert up this many days
+    "alert_days": 7
+}
+
+DEFAULT_EWMA_CONFIG = {
+    # Weight of the newest observation in the running mean and variance (0-1)
+    "alpha": 0.1,
+    # An observation this many sigma above the running mean is an anomaly
+    "k_sigma": 3.0,
+    # No anomaly is raised before a series has this many observations
+    "warmup_points": 10,
+    # Sigma never counts as less than this, so a series of zeros can still flag
+    "min_sigma": {"downtime": 1.0, "defects": 1.0},
+    # Which series to keep: downtime / defects per machine, line and tool
+    "metrics": ["downtime", "defects"],
+    "scopes": ["machine", "line", "tool"],
+    # An anomaly keeps its alert up this many days
+    "alert_days": 3
+}
+
 DEFAULT_LPA_CHECKLIST = []
 
 DEFAULT_GAGES = {"gages": []}
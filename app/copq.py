@@ -0,0 +1,135 @@
+# app/copq.py
+"""
+Keeps tool_entries.copq_est filled in.
+
+COPQ is computed when entries are written (save_df, new tool changes and shift
+reports) from cost_config.json downtime rates and part_costs scrap costs. When
+either changes, backfill_copq() recomputes stored history in chunks.
+
+COPQ_Est is derived, never typed in: no screen edits it, and every save and backfill
+overwrites it from the current costs. A value stored before COPQ was computed on
+write (imported or hand-entered) is replaced by the first backfill, so every
+dashboard totals the same costing.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+from .config import COST_CONFIG_FILE
+from . import db
+from .db import connect, get_meta, get_scrap_costs_simple, part_costs_stamp, set_meta
+from .quality_engine import compute_copq_frame
+from .storage import load_json
+
+COST_FINGERPRINT_KEY = "copq_cost_fingerprint"
+BACKFILL_CHUNK_SIZE = 2000
+
+# (key, cost_cfg, scrap_costs) from the last load_cost_inputs()
+_cost_inputs: Optional[Tuple[Any, Dict[str, Any], Dict[str, float]]] = None
+
+
+def load_cost_inputs() -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Returns (cost_cfg, scrap_costs by part number). Both are kept until
+    cost_config.json's stat or db.part_costs_stamp() moves, so a save doesn't
+    re-read them.
+    """
+    global _cost_inputs
+    try:
+        st = os.stat(COST_CONFIG_FILE)
+        file_key: Tuple[Any, ...] = (COST_CONFIG_FILE, st.st_mtime_ns, st.st_size)
+    except OSError:
+        file_key = (COST_CONFIG_FILE,)
+    key = (file_key, db.DB_PATH, part_costs_stamp())
+    if _cost_inputs is None or _cost_inputs[0] != key:
+        _cost_inputs = (key, load_json(COST_CONFIG_FILE, {}) or {}, get_scrap_costs_simple())
+    return _cost_inputs[1], _cost_inputs[2]
+
+
+def cost_fingerprint(cost_cfg: Dict[str, Any], scrap_costs: Dict[str, float]) -> str:
+    payload = json.dumps({"cost_cfg": cost_cfg, "scrap_costs": scrap_costs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def apply_copq(
+    df: pd.DataFrame,
+    cost_cfg: Optional[Dict[str, Any]] = None,
+    scrap_costs: Optional[Dict[str, float]] = None,
+) -> pd.DataFrame:
+    """Returns df with COPQ_Est recomputed for every row."""
+    if cost_cfg is None or scrap_costs is None:
+        loaded_cfg, loaded_scrap = load_cost_inputs()
+        cost_cfg = loaded_cfg if cost_cfg is None else cost_cfg
+        scrap_costs = loaded_scrap if scrap_costs is None else scrap_costs
+    if df.empty:
+        return df
+    df = df.copy()
+    df["COPQ_Est"] = compute_copq_frame(df, cost_cfg, scrap_costs)["COPQ_Est"]
+    return df
+
+
+def copq_for_entry(entry: Dict[str, Any]) -> float:
+    """COPQ for one entry dict (Line/Part_Number/Downtime_Mins/Defect_Qty keys)."""
+    return float(apply_copq(pd.DataFrame([entry]))["COPQ_Est"].iloc[0])
+
+
+def backfill_copq(
+    *,
+    part_number: Optional[str] = None,
+    force: bool = False,
+    chunk_size: int = BACKFILL_CHUNK_SIZE,
+) -> int:
+    """
+    Recomputes stored copq_est, chunk_size rows per transaction, and returns how many
+    rows changed. A full run is skipped when costs match the last one unless force
+    is set; part_number limits the run to that part (after its scrap cost changes).
+    Every stored value is replaced, including one that was imported or typed in.
+    """
+    cost_cfg, scrap_costs = load_cost_inputs()
+    fingerprint = cost_fingerprint(cost_cfg, scrap_costs)
+    if part_number is None and not force and get_meta(COST_FINGERPRINT_KEY) == fingerprint:
+        return 0
+
+    where = "rowid > ?"
+    params: Tuple[Any, ...] = ()
+    if part_number is not None:
+        where += " AND part_number = ?"
+        params = (part_number,)
+
+    changed = 0
+    last_rowid = 0
+    while True:
+        with connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT rowid, line, part_number, downtime_mins, defect_qty, copq_est
+                FROM tool_entries
+                WHERE {where}
+                ORDER BY rowid
+                LIMIT ?
+                """,
+                (last_rowid, *params, chunk_size),
+            ).fetchall()
+            if not rows:
+                break
+            chunk = pd.DataFrame(
+                [tuple(r) for r in rows],
+                columns=["rowid", "Line", "Part_Number", "Downtime_Mins", "Defect_Qty", "copq_est"],
+            )
+            chunk["COPQ_Est"] = compute_copq_frame(chunk, cost_cfg, scrap_costs)["COPQ_Est"]
+            stale = chunk[(chunk["COPQ_Est"] - pd.to_numeric(chunk["copq_est"], errors="coerce")).abs().fillna(1.0) > 1e-9]
+            conn.executemany(
+                "UPDATE tool_entries SET copq_est=? WHERE rowid=?",
+                list(zip(stale["COPQ_Est"].tolist(), stale["rowid"].tolist())),
+            )
+            changed += len(stale)
+            last_rowid = int(chunk["rowid"].iloc[-1])
+
+    if part_number is None:
+        set_meta(COST_FINGERPRINT_KEY, fingerprint)
+    return changed
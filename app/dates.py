@@ -0,0 +1,102 @@
+# app/dates.py
+"""
+Canonical date/time text for tool_entries.
+
+Entries are stored as ISO-8601 text: date "YYYY-MM-DD", time "HH:MM:SS" and
+sign-off/NCR timestamps "YYYY-MM-DD HH:MM:SS", plus an integer ts (the entry's
+date and time as seconds since the epoch, wall-clock read as UTC so every station
+computes the same number). The canonical_* helpers accept the legacy formats old
+Excel imports left behind; once data is canonical, screens parse with
+parse_iso_dates, which never has to guess a format.
+"""
+from __future__ import annotations
+
+import calendar
+from datetime import datetime
+from typing import Any, Optional
+
+import pandas as pd
+
+ISO_DATE = "%Y-%m-%d"
+ISO_TIME = "%H:%M:%S"
+ISO_DATETIME = f"{ISO_DATE} {ISO_TIME}"
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%Y-%m-%d %H:%M:%S")
+# Extra shapes seen in legacy imports; only the canonicalizers accept them.
+LEGACY_DATETIME_FORMATS = DATE_FORMATS + (
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%d %H:%M",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%y",
+)
+TIME_FORMATS = ("%H:%M:%S", "%H:%M", "%H:%M:%S.%f", "%I:%M:%S %p", "%I:%M %p")
+
+
+def _strptime_any(text: str, formats: tuple) -> Optional[datetime]:
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _text(value: Any) -> str:
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    return str(value).strip()
+
+
+def parse_any_datetime(value: Any) -> Optional[datetime]:
+    """Reads a date or date-time in any accepted legacy format; None when nothing matches."""
+    if isinstance(value, datetime):
+        return value
+    text = _text(value)
+    if not text:
+        return None
+    return _strptime_any(text, LEGACY_DATETIME_FORMATS)
+
+
+def canonical_date(value: Any) -> Optional[str]:
+    """'YYYY-MM-DD' for any accepted date, '' for blank, None when unreadable."""
+    if not _text(value):
+        return ""
+    parsed = parse_any_datetime(value)
+    return parsed.strftime(ISO_DATE) if parsed else None
+
+
+def canonical_time(value: Any) -> Optional[str]:
+    """'HH:MM:SS' for a clock time (or the time part of a date-time), '' for blank, None when unreadable."""
+    text = _text(value)
+    if not text:
+        return ""
+    parsed = _strptime_any(text.upper(), TIME_FORMATS)
+    if parsed is None and (" " in text or "T" in text):
+        parsed = parse_any_datetime(text)
+    return parsed.strftime(ISO_TIME) if parsed else None
+
+
+def canonical_datetime(value: Any) -> Optional[str]:
+    """'YYYY-MM-DD HH:MM:SS' for any accepted date-time, '' for blank, None when unreadable."""
+    if not _text(value):
+        return ""
+    parsed = parse_any_datetime(value)
+    return parsed.strftime(ISO_DATETIME) if parsed else None
+
+
+def entry_ts(date_text: str, time_text: str = "") -> Optional[int]:
+    """Epoch seconds for canonical date/time text; None without a date."""
+    if not date_text:
+        return None
+    stamp = datetime.strptime(f"{date_text} {time_text or '00:00:00'}", ISO_DATETIME)
+    return calendar.timegm(stamp.timetuple())
+
+
+def parse_iso_dates(values: Any) -> Any:
+    """
+    Fixed-format parse of canonical Date text: datetime64 values, NaT where blank or
+    invalid. Like pd.to_datetime, a scalar (df.get("Date", "")) gives a scalar back.
+    """
+    return pd.to_datetime(values, format=ISO_DATE, errors="coerce")
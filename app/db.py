@@ -1,12 +1,17 @@
 # app/db.py
 from __future__ import annotations
 
+import hashlib
+import os
 import sqlite3
+import threading
+from collections import namedtuple
 from contextlib import contextmanager
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from .config import DB_PATH
+from .dates import canonical_date, canonical_datetime, canonical_time, entry_ts
 
 
 @contextmanager
@@ -196,7 +201,8 @@ def init_db() -> None:
         action_status TEXT NOT NULL DEFAULT '',
         action_due_date TEXT NOT NULL DEFAULT '',
         gage_used TEXT NOT NULL DEFAULT '',
-        copq_est REAL NOT NULL DEFAULT 0.0
+        copq_est REAL NOT NULL DEFAULT 0.0,
+        ts INTEGER
     );
 
     CREATE TABLE IF NOT EXISTS production_goals (
@@ -362,11 +368,15 @@ def init_db() -> None:
             "delete_reason": "TEXT NOT NULL DEFAULT ''",
             "created_by": "TEXT NOT NULL DEFAULT ''",
             "updated_by": "TEXT NOT NULL DEFAULT ''",
+            "change_cost": "REAL NOT NULL DEFAULT 0.0",
         })
         _ensure_columns(conn, "tool_entries", {
+            "cell": "TEXT NOT NULL DEFAULT ''",
             "tool_life": "REAL NOT NULL DEFAULT 0.0",
             "production_qty": "REAL NOT NULL DEFAULT 0.0",
+            "ts": "INTEGER",
         })
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_entries_ts ON tool_entries(ts)")
         _ensure_columns(conn, "parts", {
             "deleted_at": "TEXT NOT NULL DEFAULT ''",
             "deleted_by": "TEXT NOT NULL DEFAULT ''",
@@ -423,6 +433,22 @@ def init_db() -> None:
             "created_by": "TEXT NOT NULL DEFAULT ''",
             "is_active": "INTEGER NOT NULL DEFAULT 1",
         })
+        _ensure_change_tracking(conn)
+        _migrate_entry_datetimes(conn)
+        _ensure_health_issues(conn)
+        _ensure_repeat_flags(conn)
+        _ensure_alerts(conn)
+        _ensure_gages(conn)
+        _ensure_tool_life_model(conn)
+        _ensure_tool_stock_forecast(conn)
+        _ensure_stock_movements(conn)
+        _seed_stock_ledger(conn)
+        _ensure_oee_rollup(conn)
+        _ensure_spc_state(conn)
+        _ensure_tool_costs(conn)
+        _ensure_tool_cost_history(conn)
+        _ensure_downtime_indexes(conn)
+        _ensure_ewma_state(conn)
 
 
 
@@ -569,6 +595,782 @@ def _migrate_machine_documents(conn: sqlite3.Connection) -> None:
     conn.execute("INSERT OR REPLACE INTO meta(key,value) VALUES('machine_docs_migrated','1')")
 
 
+# tool_entries date/time columns and the canonicalizer each one is stored through.
+_ENTRY_DATETIME_FIELDS = {
+    "date": canonical_date,
+    "time": canonical_time,
+    "quality_time": canonical_datetime,
+    "leader_time": canonical_datetime,
+    "ncr_close_date": canonical_date,
+    "action_due_date": canonical_date,
+}
+
+
+def _migrate_entry_datetimes(conn: sqlite3.Connection) -> None:
+    """
+    One-time rewrite of legacy date/time text in tool_entries to ISO-8601, filling ts.
+    Values no format matches are left as they were (with ts NULL) for a person to fix.
+    """
+    migrated = conn.execute("SELECT value FROM meta WHERE key='entry_datetimes_migrated'").fetchone()
+    if migrated and migrated["value"] == "1":
+        return
+    fields = list(_ENTRY_DATETIME_FIELDS)
+    rows = conn.execute(f"SELECT id, {', '.join(fields)}, ts FROM tool_entries").fetchall()
+    # Legacy columns repeat a small set of values, so each distinct one is parsed once.
+    seen: Dict[Tuple[str, str], Optional[str]] = {}
+    updates = []
+    for row in rows:
+        record = {}
+        for field, canonical in _ENTRY_DATETIME_FIELDS.items():
+            key = (field, row[field])
+            if key not in seen:
+                seen[key] = canonical(row[field])
+            record[field] = seen[key] if seen[key] is not None else row[field]
+        readable = seen[("date", row["date"])] and seen[("time", row["time"])] is not None
+        record["ts"] = entry_ts(record["date"], record["time"]) if readable else None
+        if any(record[f] != row[f] for f in fields) or record["ts"] != row["ts"]:
+            updates.append([record[f] for f in fields] + [record["ts"], row["id"]])
+    conn.executemany(
+        f"UPDATE tool_entries SET {', '.join(f'{f}=?' for f in fields)}, ts=? WHERE id=?",
+        updates,
+    )
+    conn.execute("INSERT OR REPLACE INTO meta(key,value) VALUES('entry_datetimes_migrated','1')")
+
+
+
+def _ensure_change_tracking(conn: sqlite3.Connection) -> None:
+    """
+    Keep meta.tool_entries_version in step with every write to tool_entries.
+    Triggers catch writes from every station sharing the DB file, not just this process.
+    """
+    conn.execute("INSERT OR IGNORE INTO meta(key,value) VALUES('tool_entries_version','0')")
+    # Tells this database apart from any other sharing the cache folder.
+    conn.execute("INSERT OR IGNORE INTO meta(key,value) VALUES('database_id', lower(hex(randomblob(16))))")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tool_entries_version_{event.lower()}
+            AFTER {event} ON tool_entries
+            BEGIN
+                UPDATE meta
+                SET value = CAST(value AS INTEGER) + 1
+                WHERE key = 'tool_entries_version';
+            END
+            """
+        )
+
+    # Per-month versions let closed-month snapshots be validated without reading rows.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tool_entry_months (
+            month TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO tool_entry_months(month, version)
+        SELECT DISTINCT substr(date,1,7), 1 FROM tool_entries WHERE date != ''
+        """
+    )
+    # No INSERT OR IGNORE here: inside a trigger the outer statement's conflict
+    # handling wins, so an upsert into tool_entries would fail on an existing month.
+    bump_month = """
+                INSERT INTO tool_entry_months(month, version)
+                SELECT substr({row}.date,1,7), 0
+                WHERE NOT EXISTS (SELECT 1 FROM tool_entry_months WHERE month = substr({row}.date,1,7));
+                UPDATE tool_entry_months SET version = version + 1 WHERE month = substr({row}.date,1,7);
+    """
+    for event, rows in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",))):
+        body = "".join(bump_month.format(row=row) for row in rows)
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_tool_entry_months_{event.lower()}")
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_tool_entry_months_{event.lower()}
+            AFTER {event} ON tool_entries
+            BEGIN
+                {body}
+            END
+            """
+        )
+
+
+def _ensure_health_issues(conn: sqlite3.Connection) -> None:
+    """
+    health_issues holds the last health-check result per entry and rule.
+    tool_entry_changes logs which entries were written since, in write order, so a
+    health run only re-checks those; seq never repeats (AUTOINCREMENT).
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS health_issues (
+            entry_id TEXT NOT NULL,
+            rule TEXT NOT NULL,
+            detail TEXT NOT NULL DEFAULT '',
+            severity TEXT NOT NULL,
+            category TEXT NOT NULL,
+            issue TEXT NOT NULL,
+            suggestion TEXT NOT NULL DEFAULT '',
+            entry_month TEXT NOT NULL DEFAULT '',
+            checked_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (entry_id, rule, detail),
+            FOREIGN KEY(entry_id) REFERENCES tool_entries(id) ON DELETE CASCADE ON UPDATE CASCADE
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_health_issues_month ON health_issues(entry_month)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_health_issues_rule ON health_issues(rule)")
+
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='tool_entry_changes'"
+    ).fetchone()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tool_entry_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_id TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    if not exists:
+        # Existing entries have never been checked.
+        conn.execute("INSERT INTO tool_entry_changes(entry_id) SELECT id FROM tool_entries ORDER BY rowid")
+
+    # Delete-then-insert rather than an upsert, for the same reason as the month triggers.
+    log_change = """
+                DELETE FROM tool_entry_changes WHERE entry_id IN (OLD.id, NEW.id);
+                INSERT INTO tool_entry_changes(entry_id) VALUES(NEW.id);
+    """
+    for event, body in (
+        ("INSERT", log_change.replace("OLD.id, ", "")),
+        ("UPDATE", log_change),
+        ("DELETE", "DELETE FROM tool_entry_changes WHERE entry_id = OLD.id;"),
+    ):
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tool_entry_changes_{event.lower()}
+            AFTER {event} ON tool_entries
+            BEGIN
+                {body}
+            END
+            """
+        )
+
+
+def _ensure_repeat_flags(conn: sqlite3.Connection) -> None:
+    """repeat_flags holds the RepeatTracker verdict per entry; it goes away with the entry."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS repeat_flags (
+            entry_id TEXT PRIMARY KEY,
+            repeat_flag TEXT NOT NULL DEFAULT 'None',
+            repeat_score INTEGER NOT NULL DEFAULT 0,
+            repeat_reason TEXT NOT NULL DEFAULT '',
+            scored_at TEXT NOT NULL DEFAULT (datetime('now')),
+            FOREIGN KEY(entry_id) REFERENCES tool_entries(id) ON DELETE CASCADE ON UPDATE CASCADE
+        )
+        """
+    )
+
+
+def _ensure_alerts(conn: sqlite3.Connection) -> None:
+    """
+    alerts holds one row per alert_key ("<type>:<related key>"), so re-generating an
+    alert updates it in place and keeps its acknowledgement. Entry alerts go away with
+    their entry; gage alerts have no entry_id.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            alert_key TEXT NOT NULL UNIQUE,
+            type TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            title TEXT NOT NULL DEFAULT '',
+            details TEXT NOT NULL DEFAULT '',
+            related_key TEXT NOT NULL DEFAULT '',
+            entry_id TEXT,
+            entry_month TEXT NOT NULL DEFAULT '',
+            is_active INTEGER NOT NULL DEFAULT 1,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            ack_by TEXT NOT NULL DEFAULT '',
+            ack_at TEXT NOT NULL DEFAULT '',
+            FOREIGN KEY(entry_id) REFERENCES tool_entries(id) ON DELETE CASCADE ON UPDATE CASCADE
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_active_month ON alerts(is_active, entry_month)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_entry ON alerts(entry_id)")
+
+
+def _ensure_gages(conn: sqlite3.Connection) -> None:
+    """
+    gages mirrors gages.json with next_due_date worked out once per change, so due
+    and overdue gages come from an index instead of re-parsing every record.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS gages (
+            gage_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL DEFAULT '',
+            type TEXT NOT NULL DEFAULT '',
+            line TEXT NOT NULL DEFAULT '',
+            criticality TEXT NOT NULL DEFAULT 'Medium',
+            notes TEXT NOT NULL DEFAULT '',
+            calibration_frequency_days INTEGER NOT NULL DEFAULT 0,
+            last_calibration_date TEXT NOT NULL DEFAULT '',
+            next_due_date TEXT NOT NULL DEFAULT '',
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_gages_next_due ON gages(next_due_date)")
+
+
+def _ensure_tool_life_model(conn: sqlite3.Connection) -> None:
+    """
+    tool_life_model holds the fitted life and prediction per (tool_num, machine,
+    part_number). New and edited entries reach the model through tool_entry_changes;
+    edits and deletes also mark the key the old row belonged to stale, since the
+    change log only names the row as it is now.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tool_life_model (
+            tool_num TEXT NOT NULL,
+            machine TEXT NOT NULL DEFAULT '',
+            part_number TEXT NOT NULL DEFAULT '',
+            method TEXT NOT NULL DEFAULT '',
+            samples INTEGER NOT NULL DEFAULT 0,
+            mean_life REAL,
+            p10_life REAL,
+            p50_life REAL,
+            p90_life REAL,
+            weibull_shape REAL,
+            weibull_scale REAL,
+            installed_entry_id TEXT NOT NULL DEFAULT '',
+            installed_ts INTEGER,
+            produced_since REAL NOT NULL DEFAULT 0.0,
+            expected_remaining REAL,
+            predicted_change_ts INTEGER,
+            stale INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (tool_num, machine, part_number)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_life_model_stale ON tool_life_model(stale)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tool_entries_machine_part_ts ON tool_entries(machine, part_number, ts)"
+    )
+    # A production row (no tool_num) feeds every tool on its machine/part.
+    mark_stale = """
+                UPDATE tool_life_model SET stale = 1
+                WHERE machine = OLD.machine AND part_number = OLD.part_number
+                  AND (OLD.tool_num = '' OR tool_num = OLD.tool_num);
+    """
+    when = {
+        "UPDATE": _entry_changed("machine", "part_number", "tool_num", "ts", "tool_life", "production_qty", "id"),
+        "DELETE": "",
+    }
+    for event in ("UPDATE", "DELETE"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_tool_life_model_stale_{event.lower()}")
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_tool_life_model_stale_{event.lower()}
+            AFTER {event} ON tool_entries {when[event]}
+            BEGIN
+                {mark_stale}
+            END
+            """
+        )
+
+
+def _ensure_tool_stock_forecast(conn: sqlite3.Connection) -> None:
+    """Materialized consumption rates and reorder points (see inventory_forecast)."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tool_stock_forecast (
+            tool_num TEXT PRIMARY KEY,
+            stock_qty INTEGER NOT NULL DEFAULT 0,
+            window_days INTEGER NOT NULL DEFAULT 0,
+            window_changes INTEGER NOT NULL DEFAULT 0,
+            rate_per_day REAL NOT NULL DEFAULT 0.0,
+            peak_rate_per_day REAL NOT NULL DEFAULT 0.0,
+            lead_time_days INTEGER NOT NULL DEFAULT 0,
+            days_of_stock REAL,
+            stockout_date TEXT NOT NULL DEFAULT '',
+            reorder_point INTEGER NOT NULL DEFAULT 0,
+            order_up_to INTEGER NOT NULL DEFAULT 0,
+            suggested_order_qty INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT '',
+            computed_for TEXT NOT NULL DEFAULT '',
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tool_line_consumption (
+            tool_num TEXT NOT NULL,
+            line TEXT NOT NULL DEFAULT '',
+            window_changes INTEGER NOT NULL DEFAULT 0,
+            rate_per_day REAL NOT NULL DEFAULT 0.0,
+            last_change_date TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (tool_num, line)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_entries_tool_date ON tool_entries(tool_num, date)")
+
+
+def _ensure_oee_rollup(conn: sqlite3.Connection) -> None:
+    """
+    OEE components per (date, shift, line, machine), see oee.py. Like tool_life_model,
+    new rows arrive through tool_entry_changes and triggers mark the group of an
+    edited or deleted row stale.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS oee_rollup (
+            date TEXT NOT NULL,
+            shift TEXT NOT NULL DEFAULT '',
+            line TEXT NOT NULL DEFAULT '',
+            machine TEXT NOT NULL DEFAULT '',
+            reports INTEGER NOT NULL DEFAULT 0,
+            planned_minutes REAL NOT NULL DEFAULT 0.0,
+            downtime_minutes REAL NOT NULL DEFAULT 0.0,
+            run_minutes REAL NOT NULL DEFAULT 0.0,
+            ideal_minutes REAL,
+            produced REAL NOT NULL DEFAULT 0.0,
+            defects REAL NOT NULL DEFAULT 0.0,
+            good REAL NOT NULL DEFAULT 0.0,
+            availability REAL,
+            performance REAL,
+            quality REAL,
+            oee REAL,
+            stale INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (date, shift, line, machine)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_oee_rollup_line_date ON oee_rollup(line, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_oee_rollup_stale ON oee_rollup(stale)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_entries_date_shift ON tool_entries(date, shift)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_shift_downtime_tool_entry ON shift_downtime_entries(tool_entry_id)"
+    )
+    when = {
+        "UPDATE": _entry_changed(
+            "date", "shift", "line", "cell", "machine", "part_number", "reason", "production_qty", "defect_qty",
+            "downtime_mins",
+        ),
+        "DELETE": "",
+    }
+    for event in ("UPDATE", "DELETE"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_oee_rollup_stale_{event.lower()}")
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_oee_rollup_stale_{event.lower()}
+            AFTER {event} ON tool_entries {when[event]}
+            BEGIN
+                UPDATE oee_rollup SET stale = 1
+                WHERE date = OLD.date AND shift = OLD.shift AND line = OLD.line AND machine = OLD.machine;
+            END
+            """
+        )
+    # A shift report's downtime breakdown can be replaced without touching the report.
+    for event, row in (("INSERT", "NEW"), ("DELETE", "OLD")):
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_oee_rollup_downtime_{event.lower()}
+            AFTER {event} ON shift_downtime_entries
+            BEGIN
+                UPDATE oee_rollup SET stale = 1
+                WHERE (date, shift, line, machine) IN (
+                    SELECT date, shift, line, machine FROM tool_entries WHERE id = {row}.tool_entry_id
+                );
+            END
+            """
+        )
+
+
+def _ensure_stock_movements(conn: sqlite3.Connection) -> None:
+    """
+    Stock ledger: every change to tools.stock_qty is one signed movement, written in
+    the same transaction as the balance update. stock_snapshots checkpoints each
+    tool's balance every STOCK_SNAPSHOT_INTERVAL movements for point-in-time reads.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tool_num TEXT NOT NULL,
+            kind TEXT NOT NULL CHECK (kind IN ('change', 'receipt', 'adjustment')),
+            qty INTEGER NOT NULL,
+            balance_after INTEGER NOT NULL,
+            entry_id TEXT NOT NULL DEFAULT '',
+            username TEXT NOT NULL DEFAULT '',
+            note TEXT NOT NULL DEFAULT '',
+            ts INTEGER NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_tool_id ON stock_movements(tool_num, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_tool_ts ON stock_movements(tool_num, ts)")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stock_snapshots (
+            tool_num TEXT NOT NULL,
+            movement_id INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            balance INTEGER NOT NULL,
+            PRIMARY KEY (tool_num, movement_id)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_snapshots_tool_ts ON stock_snapshots(tool_num, ts)")
+
+
+def _seed_stock_ledger(conn: sqlite3.Connection) -> None:
+    """Once per database: stock that predates the ledger becomes one opening movement per tool."""
+    seeded = conn.execute("SELECT value FROM meta WHERE key='stock_ledger_seeded'").fetchone()
+    if seeded and seeded["value"] == "1":
+        return
+    conn.execute(
+        """
+        INSERT INTO stock_movements(tool_num, kind, qty, balance_after, username, note, ts)
+        SELECT tool_num, 'adjustment', stock_qty, stock_qty, 'system', 'Opening balance', ?
+        FROM tools
+        WHERE stock_qty <> 0
+          AND tool_num NOT IN (SELECT DISTINCT tool_num FROM stock_movements)
+        """,
+        (_now_ts(),),
+    )
+    conn.execute("INSERT OR REPLACE INTO meta(key,value) VALUES('stock_ledger_seeded','1')")
+
+
+# What one change of a tool costs: its inserts' (count x price) / life / sides, or
+# the tool's unit_cost when it has no inserts. A blank or zero sides_per_insert counts
+# as one side, as replace_tool_inserts saves it. Correlated on the tools row.
+_TOOL_CHANGE_COST_SQL = """
+    CASE WHEN EXISTS (SELECT 1 FROM tool_inserts ti WHERE ti.tool_id = tools.id)
+         THEN COALESCE((
+             SELECT SUM(
+                 (ti.insert_count * ti.price_per_insert) / ti.tool_life
+                 / MAX(COALESCE(NULLIF(ti.sides_per_insert, 0), 1), 1)
+             )
+             FROM tool_inserts ti
+             WHERE ti.tool_id = tools.id AND ti.tool_life > 0
+         ), 0.0)
+         ELSE tools.unit_cost
+    END
+"""
+# Bumped when _TOOL_CHANGE_COST_SQL changes, so cached change costs are recomputed once.
+_TOOL_CHANGE_COST_VERSION = "2"
+
+
+def _ensure_tool_costs(conn: sqlite3.Connection) -> None:
+    """
+    tools.change_cost caches each tool's change cost; triggers on tool_inserts and
+    tools.unit_cost keep it current, so apply_tool_change stores it with the entry.
+    tool_cost_rollup sums tool-change cost, changes and production per (date, line,
+    part_number), kept in step with tool_entries by triggers in the writing transaction.
+    """
+    set_cost = f"UPDATE tools SET change_cost = ({_TOOL_CHANGE_COST_SQL})"
+    for event, where in (
+        ("INSERT", "id = NEW.tool_id"),
+        ("DELETE", "id = OLD.tool_id"),
+        ("UPDATE", "id IN (OLD.tool_id, NEW.tool_id)"),
+    ):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_tool_change_cost_inserts_{event.lower()}")
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_tool_change_cost_inserts_{event.lower()}
+            AFTER {event} ON tool_inserts
+            BEGIN
+                {set_cost} WHERE {where};
+            END
+            """
+        )
+    for event in ("INSERT", "UPDATE OF unit_cost"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_tool_change_cost_{event.split()[0].lower()}")
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_tool_change_cost_{event.split()[0].lower()}
+            AFTER {event} ON tools
+            BEGIN
+                {set_cost} WHERE id = NEW.id;
+            END
+            """
+        )
+
+    done = conn.execute("SELECT value FROM meta WHERE key='tool_change_costs_seeded'").fetchone()
+    if not done or done["value"] != _TOOL_CHANGE_COST_VERSION:
+        # Saved entries keep the cost they were saved with; reprice_tool_changes
+        # re-prices them on request.
+        conn.execute(set_cost)
+        conn.execute(
+            "INSERT OR REPLACE INTO meta(key,value) VALUES('tool_change_costs_seeded', ?)",
+            (_TOOL_CHANGE_COST_VERSION,),
+        )
+
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='tool_cost_rollup'"
+    ).fetchone()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tool_cost_rollup (
+            date TEXT NOT NULL,
+            line TEXT NOT NULL DEFAULT '',
+            part_number TEXT NOT NULL DEFAULT '',
+            tool_changes INTEGER NOT NULL DEFAULT 0,
+            tool_cost REAL NOT NULL DEFAULT 0.0,
+            produced REAL NOT NULL DEFAULT 0.0,
+            PRIMARY KEY (date, line, part_number)
+        )
+        """
+    )
+    if not exists:
+        conn.execute(
+            """
+            INSERT INTO tool_cost_rollup(date, line, part_number, tool_changes, tool_cost, produced)
+            SELECT date, line, part_number,
+                   SUM(tool_num <> ''),
+                   SUM(CASE WHEN tool_num <> '' THEN cost ELSE 0.0 END),
+                   SUM(production_qty)
+            FROM tool_entries
+            GROUP BY date, line, part_number
+            """
+        )
+    # Adds (sign 1) or takes back (sign -1) one entry's share of its group.
+    def apply(row: str, sign: int) -> str:
+        return f"""
+                INSERT INTO tool_cost_rollup(date, line, part_number, tool_changes, tool_cost, produced)
+                VALUES(
+                    {row}.date, {row}.line, {row}.part_number,
+                    {sign} * ({row}.tool_num <> ''),
+                    {sign} * (CASE WHEN {row}.tool_num <> '' THEN {row}.cost ELSE 0.0 END),
+                    {sign} * {row}.production_qty
+                )
+                ON CONFLICT(date, line, part_number) DO UPDATE SET
+                    tool_changes = tool_changes + excluded.tool_changes,
+                    tool_cost = tool_cost + excluded.tool_cost,
+                    produced = produced + excluded.produced;
+        """
+    for event, body in (
+        ("INSERT", apply("NEW", 1)),
+        ("DELETE", apply("OLD", -1)),
+        ("UPDATE", apply("OLD", -1) + apply("NEW", 1)),
+    ):
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_tool_cost_rollup_{event.lower()}
+            AFTER {event} ON tool_entries
+            BEGIN
+                {body}
+            END
+            """
+        )
+
+
+# Epoch seconds of the local wall clock, the same scale as dates.entry_ts / _now_ts.
+_NOW_TS_SQL = "CAST(strftime('%s', 'now', 'localtime') AS INTEGER)"
+
+
+def _ensure_tool_cost_history(conn: sqlite3.Connection) -> None:
+    """
+    Effective-dated tool change costs: one row per price a tool's change_cost had,
+    valid from valid_from up to (not including) valid_to, NULL for the one in effect.
+    A trigger on tools.change_cost closes the open row and opens the next, so every
+    path that changes inserts or unit_cost is recorded. Several changes in the same
+    second keep only the last; a change back to the price just closed reopens it.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='tool_cost_history'"
+    ).fetchone()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tool_cost_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tool_id INTEGER NOT NULL,
+            change_cost REAL NOT NULL DEFAULT 0.0,
+            valid_from INTEGER NOT NULL,
+            valid_to INTEGER,
+            FOREIGN KEY(tool_id) REFERENCES tools(id) ON DELETE CASCADE
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tool_cost_history_tool_from ON tool_cost_history(tool_id, valid_from)"
+    )
+    if not exists:
+        # Prices from before history was kept apply back to the start of time.
+        conn.execute(
+            "INSERT INTO tool_cost_history(tool_id, change_cost, valid_from) SELECT id, change_cost, 0 FROM tools"
+        )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tool_cost_history_update
+        AFTER UPDATE OF change_cost ON tools
+        WHEN OLD.change_cost IS NOT NEW.change_cost
+        BEGIN
+            DELETE FROM tool_cost_history
+            WHERE tool_id = NEW.id AND valid_to IS NULL AND valid_from = {_NOW_TS_SQL};
+            UPDATE tool_cost_history SET valid_to = {_NOW_TS_SQL}
+            WHERE tool_id = NEW.id AND valid_to IS NULL;
+            UPDATE tool_cost_history SET valid_to = NULL
+            WHERE tool_id = NEW.id AND valid_to = {_NOW_TS_SQL} AND change_cost = NEW.change_cost;
+            INSERT INTO tool_cost_history(tool_id, change_cost, valid_from)
+            SELECT NEW.id, NEW.change_cost, {_NOW_TS_SQL}
+            WHERE NOT EXISTS (SELECT 1 FROM tool_cost_history WHERE tool_id = NEW.id AND valid_to IS NULL);
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tool_cost_history_insert
+        AFTER INSERT ON tools
+        BEGIN
+            INSERT INTO tool_cost_history(tool_id, change_cost, valid_from)
+            SELECT id, change_cost, {_NOW_TS_SQL} FROM tools
+            WHERE id = NEW.id
+              AND NOT EXISTS (SELECT 1 FROM tool_cost_history WHERE tool_id = NEW.id AND valid_to IS NULL);
+        END
+        """
+    )
+
+
+def _ensure_downtime_indexes(conn: sqlite3.Connection) -> None:
+    """
+    downtime_totals / downtime_pareto reach shift_downtime_entries from the dated
+    shift reports (by tool_entry_id) or, filtered on one code, from the code side.
+    """
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_shift_downtime_tool_entry ON shift_downtime_entries(tool_entry_id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_shift_downtime_code_entry ON shift_downtime_entries(downtime_code, tool_entry_id)"
+    )
+
+
+def _ensure_spc_state(conn: sqlite3.Connection) -> None:
+    """
+    Control-chart state per series (see spc.py): the baseline sums the limits come
+    from, the latest points for the run rules, and the last violation. As with
+    tool_life_model, an edited or deleted entry marks the series of its old row stale.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS spc_state (
+            series TEXT NOT NULL,
+            tool_num TEXT NOT NULL DEFAULT '',
+            machine TEXT NOT NULL DEFAULT '',
+            points INTEGER NOT NULL DEFAULT 0,
+            baseline_sum REAL NOT NULL DEFAULT 0.0,
+            baseline_mr_sum REAL NOT NULL DEFAULT 0.0,
+            center REAL,
+            sigma REAL,
+            ucl REAL,
+            lcl REAL,
+            mr_ucl REAL,
+            last_value REAL,
+            last_ts INTEGER,
+            last_entry_id TEXT NOT NULL DEFAULT '',
+            tail TEXT NOT NULL DEFAULT '[]',
+            last_rules TEXT NOT NULL DEFAULT '',
+            violation_ts INTEGER,
+            violation_entry_id TEXT NOT NULL DEFAULT '',
+            violation_value REAL,
+            violation_rules TEXT NOT NULL DEFAULT '',
+            stale INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (series, tool_num, machine)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_spc_state_stale ON spc_state(stale)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_entries_tool_machine_ts ON tool_entries(tool_num, machine, ts)")
+    # Only an edit to a column a chart reads makes its series stale.
+    when = {"UPDATE": _entry_changed("ts", "tool_life", "downtime_mins", "machine", "tool_num", "reason", "id"),
+            "DELETE": ""}
+    for event in ("UPDATE", "DELETE"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_spc_state_stale_{event.lower()}")
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_spc_state_stale_{event.lower()}
+            AFTER {event} ON tool_entries {when[event]}
+            BEGIN
+                UPDATE spc_state SET stale = 1
+                WHERE machine = OLD.machine
+                  AND ((series = 'tool_life' AND tool_num = OLD.tool_num) OR series = 'downtime');
+            END
+            """
+        )
+
+
+def _ensure_ewma_state(conn: sqlite3.Connection) -> None:
+    """
+    Exponentially weighted mean and variance per series (see ewma.py): a metric
+    (downtime or defects) on one machine, line or tool, with its last point and last
+    anomaly. As with spc_state, an edited or deleted entry marks the series of its
+    old row stale.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ewma_state (
+            metric TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            points INTEGER NOT NULL DEFAULT 0,
+            mean REAL NOT NULL DEFAULT 0.0,
+            var REAL NOT NULL DEFAULT 0.0,
+            last_value REAL,
+            last_ts INTEGER,
+            last_entry_id TEXT NOT NULL DEFAULT '',
+            last_z REAL,
+            anomaly_ts INTEGER,
+            anomaly_entry_id TEXT NOT NULL DEFAULT '',
+            anomaly_value REAL,
+            anomaly_mean REAL,
+            anomaly_sigma REAL,
+            anomaly_z REAL,
+            stale INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (metric, scope, key)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ewma_state_stale ON ewma_state(stale)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_entries_line_ts ON tool_entries(line, ts)")
+    when = {
+        "UPDATE": _entry_changed("machine", "line", "tool_num", "ts", "downtime_mins", "defect_qty", "reason", "id"),
+        "DELETE": "",
+    }
+    for event in ("UPDATE", "DELETE"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_ewma_state_stale_{event.lower()}")
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_ewma_state_stale_{event.lower()}
+            AFTER {event} ON tool_entries {when[event]}
+            BEGIN
+                UPDATE ewma_state SET stale = 1
+                WHERE (scope = 'machine' AND key = OLD.machine)
+                   OR (scope = 'line' AND key = OLD.line)
+                   OR (scope = 'tool' AND key = OLD.tool_num);
+            END
+            """
+        )
+
+
+def _entry_changed(*columns: str) -> str:
+    """WHEN clause for an UPDATE trigger on tool_entries: any of columns changed."""
+    return "WHEN " + " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in columns)
+
 
 def _ensure_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]) -> None:
     existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
@@ -599,6 +1401,38 @@ def set_meta(key: str, value: str) -> None:
         )
 
 
+_version_lock = threading.Lock()
+_version_conn: Optional[sqlite3.Connection] = None
+_version_conn_path = ""
+_seen_data_version: Optional[int] = None
+_entries_version = 0
+
+
+def tool_entries_version() -> int:
+    """
+    Returns a counter that changes whenever tool_entries is written.
+
+    A long-lived connection watches PRAGMA data_version, which only moves when some
+    other connection commits; the trigger-maintained meta counter is re-read only then.
+    """
+    global _version_conn, _version_conn_path, _seen_data_version, _entries_version
+    with _version_lock:
+        if _version_conn is None or _version_conn_path != DB_PATH:
+            if _version_conn is not None:
+                _version_conn.close()
+            _version_conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+            _version_conn_path = DB_PATH
+            _seen_data_version = None
+        data_version = _version_conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != _seen_data_version:
+            row = _version_conn.execute(
+                "SELECT value FROM meta WHERE key='tool_entries_version'"
+            ).fetchone()
+            _entries_version = int(row[0]) if row else 0
+            _seen_data_version = data_version
+        return _entries_version
+
+
 def list_audit_logs(limit: int = 500) -> List[Dict[str, Any]]:
     with connect() as conn:
         rows = conn.execute(
@@ -995,22 +1829,25 @@ def upsert_tool_inventory(
     *,
     name: str = "",
     unit_cost: float = 0.0,
-    stock_qty: int = 0,
+    stock_qty: Optional[int] = None,
     inserts_per_tool: int = 1,
     created_by: str = "",
     updated_by: str = "",
 ) -> None:
+    """
+    Creates or updates a tool. Stock is only touched when stock_qty is given, and then
+    through the ledger like any other count (see update_tool_stock).
+    """
     with connect() as conn:
         conn.execute(
             """
             INSERT INTO tools(
                 tool_num, name, unit_cost, stock_qty, inserts_per_tool, is_active, created_by, updated_by
             )
-            VALUES(?, ?, ?, ?, ?, 1, ?, ?)
+            VALUES(?, ?, ?, 0, ?, 1, ?, ?)
             ON CONFLICT(tool_num) DO UPDATE SET
               name=excluded.name,
               unit_cost=excluded.unit_cost,
-              stock_qty=excluded.stock_qty,
               inserts_per_tool=excluded.inserts_per_tool,
               updated_at=datetime('now'),
               updated_by=excluded.updated_by
@@ -1019,12 +1856,13 @@ def upsert_tool_inventory(
                 tool_num,
                 name,
                 float(unit_cost),
-                int(stock_qty),
                 int(inserts_per_tool),
                 created_by or "",
                 updated_by or "",
             ),
         )
+        if stock_qty is not None:
+            _set_stock(conn, tool_num, int(stock_qty), username=updated_by or created_by, note="Stock count")
 
 
 def get_tool(tool_num: str) -> Optional[Dict[str, Any]]:
@@ -1037,11 +1875,163 @@ def get_tool(tool_num: str) -> Optional[Dict[str, Any]]:
 
 
 def update_tool_stock(tool_num: str, stock_qty: int, updated_by: str = "") -> None:
+    """Sets an absolute balance (a stock count), recorded as an adjustment for the difference."""
     with connect() as conn:
-        conn.execute(
-            "UPDATE tools SET stock_qty=?, updated_at=datetime('now'), updated_by=? WHERE tool_num=?",
-            (int(stock_qty), updated_by or "", tool_num),
+        _set_stock(conn, tool_num, int(stock_qty), username=updated_by, note="Stock count")
+
+
+STOCK_MOVEMENT_KINDS = ("change", "receipt", "adjustment")
+STOCK_SNAPSHOT_INTERVAL = 50
+
+
+def _now_ts() -> int:
+    now = datetime.now()
+    return entry_ts(now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"))
+
+
+def _snapshot_if_due(conn: sqlite3.Connection, tool_num: str) -> None:
+    last = conn.execute(
+        "SELECT COALESCE(MAX(movement_id), 0) AS id FROM stock_snapshots WHERE tool_num=?",
+        (tool_num,),
+    ).fetchone()["id"]
+    pending = conn.execute(
+        "SELECT COUNT(*) AS n FROM stock_movements WHERE tool_num=? AND id > ?",
+        (tool_num, last),
+    ).fetchone()["n"]
+    if pending < STOCK_SNAPSHOT_INTERVAL:
+        return
+    conn.execute(
+        """
+        INSERT INTO stock_snapshots(tool_num, movement_id, ts, balance)
+        SELECT tool_num, id, ts, balance_after FROM stock_movements
+        WHERE tool_num=? ORDER BY id DESC LIMIT 1
+        """,
+        (tool_num,),
+    )
+
+
+def _move_stock(
+    conn: sqlite3.Connection,
+    tool_num: str,
+    kind: str,
+    qty: int,
+    *,
+    entry_id: str = "",
+    username: str = "",
+    note: str = "",
+    floor: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Adds qty to the tool's stock in one UPDATE and logs the movement. With floor set,
+    a movement that would take the balance below it is not applied. Returns the new
+    balance, or None when nothing moved (unknown tool, or floor reached).
+    """
+    if kind not in STOCK_MOVEMENT_KINDS:
+        raise ValueError(f"Unknown stock movement kind: {kind}")
+    qty = int(qty)
+    if qty == 0:
+        return None
+    row = conn.execute(
+        """
+        UPDATE tools SET stock_qty = stock_qty + ?, updated_at=datetime('now'), updated_by=?
+        WHERE tool_num=? AND (? IS NULL OR stock_qty + ? >= ?)
+        RETURNING stock_qty
+        """,
+        (qty, username or "", tool_num, floor, qty, floor),
+    ).fetchone()
+    if row is None:
+        return None
+    conn.execute(
+        """
+        INSERT INTO stock_movements(tool_num, kind, qty, balance_after, entry_id, username, note, ts)
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (tool_num, kind, qty, row["stock_qty"], entry_id or "", username or "", note or "", _now_ts()),
+    )
+    _snapshot_if_due(conn, tool_num)
+    return int(row["stock_qty"])
+
+
+def _set_stock(conn: sqlite3.Connection, tool_num: str, stock_qty: int, *, username: str = "", note: str = "") -> None:
+    # Logging first takes the write lock, so the difference is computed against the
+    # balance the UPDATE then replaces.
+    cur = conn.execute(
+        """
+        INSERT INTO stock_movements(tool_num, kind, qty, balance_after, username, note, ts)
+        SELECT tool_num, 'adjustment', ? - stock_qty, ?, ?, ?, ?
+        FROM tools WHERE tool_num=? AND stock_qty <> ?
+        """,
+        (stock_qty, stock_qty, username or "", note or "", _now_ts(), tool_num, stock_qty),
+    )
+    if not cur.rowcount:
+        return
+    conn.execute(
+        "UPDATE tools SET stock_qty=?, updated_at=datetime('now'), updated_by=? WHERE tool_num=?",
+        (stock_qty, username or "", tool_num),
+    )
+    _snapshot_if_due(conn, tool_num)
+
+
+def record_stock_movement(
+    tool_num: str,
+    kind: str,
+    qty: int,
+    *,
+    entry_id: str = "",
+    username: str = "",
+    note: str = "",
+) -> Optional[int]:
+    """Receipts (+qty) and relative adjustments; returns the new balance."""
+    with connect() as conn:
+        return _move_stock(conn, tool_num, kind, qty, entry_id=entry_id, username=username, note=note)
+
+
+def list_stock_movements(tool_num: str, limit: int = 200) -> List[Dict[str, Any]]:
+    with connect() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, tool_num, kind, qty, balance_after, entry_id, username, note, ts, created_at
+            FROM stock_movements WHERE tool_num=?
+            ORDER BY id DESC LIMIT ?
+            """,
+            (tool_num, int(limit)),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+_STOCK_AT_SQL = """
+    WITH snap AS (
+        SELECT s.tool_num, s.movement_id, s.balance
+        FROM stock_snapshots s
+        WHERE s.movement_id = (
+            SELECT s2.movement_id FROM stock_snapshots s2
+            WHERE s2.tool_num = s.tool_num AND s2.ts <= :ts
+            ORDER BY s2.ts DESC, s2.movement_id DESC LIMIT 1
         )
+    )
+    SELECT t.tool_num,
+           COALESCE(snap.balance, 0) + COALESCE((
+               SELECT SUM(m.qty) FROM stock_movements m
+               WHERE m.tool_num = t.tool_num
+                 AND m.id > COALESCE(snap.movement_id, 0)
+                 AND m.ts <= :ts
+           ), 0) AS balance
+    FROM tools t
+    LEFT JOIN snap ON snap.tool_num = t.tool_num
+"""
+
+
+def stock_balance_at(tool_num: str, ts: int) -> int:
+    """A tool's balance as of ts (epoch seconds, see dates.entry_ts): last snapshot plus later movements."""
+    with connect() as conn:
+        row = conn.execute(_STOCK_AT_SQL + " WHERE t.tool_num = :tool_num", {"ts": int(ts), "tool_num": tool_num}).fetchone()
+        return int(row["balance"]) if row else 0
+
+
+def stock_balances_at(ts: int) -> Dict[str, int]:
+    with connect() as conn:
+        rows = conn.execute(_STOCK_AT_SQL, {"ts": int(ts)}).fetchall()
+        return {r["tool_num"]: int(r["balance"]) for r in rows}
 
 
 def deactivate_tool(tool_num: str, deleted_by: str = "", delete_reason: str = "") -> None:
@@ -1293,6 +2283,15 @@ def get_scrap_costs_simple():
         return {r["part_number"]: float(r["scrap_cost"]) for r in rows}
 
 
+def part_costs_stamp() -> Tuple[int, str, float]:
+    """(rows, latest updated_at, cost total) of part_costs: moves whenever a scrap cost is set."""
+    with connect() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(updated_at), ''), TOTAL(scrap_cost) FROM part_costs"
+        ).fetchone()
+        return int(row[0]), str(row[1]), float(row[2])
+
+
 def list_downtime_codes(active_only: bool = True) -> List[Dict[str, Any]]:
     with connect() as conn:
         if active_only:
@@ -1343,52 +2342,118 @@ def replace_shift_downtime_entries(entry_id: str, entries: List[Dict[str, Any]])
         return
     with connect() as conn:
         conn.execute("DELETE FROM shift_downtime_entries WHERE tool_entry_id=?", (entry_id,))
-        for entry in entries:
-            conn.execute(
-                """
-                INSERT INTO shift_downtime_entries(
-                    tool_entry_id,
-                    downtime_code,
-                    downtime_minutes,
-                    downtime_occurrences,
-                    downtime_comments
-                ) VALUES(?, ?, ?, ?, ?)
-                """,
-                (
-                    entry_id,
-                    entry.get("code", ""),
-                    float(entry.get("minutes", 0.0) or 0.0),
-                    int(entry.get("occurrences", 0) or 0),
-                    entry.get("comments", ""),
-                ),
-            )
-
-
-def replace_shift_downtime_entries(entry_id: str, entries: List[Dict[str, Any]]) -> None:
-    entry_id = str(entry_id or "").strip()
-    if not entry_id:
-        return
-    with connect() as conn:
-        conn.execute("DELETE FROM shift_downtime_entries WHERE tool_entry_id=?", (entry_id,))
-        for entry in entries:
-            conn.execute(
-                """
-                INSERT INTO shift_downtime_entries(
-                    tool_entry_id,
-                    downtime_code,
-                    downtime_minutes,
-                    downtime_occurrences,
-                    downtime_comments
-                ) VALUES(?, ?, ?, ?, ?)
-                """,
-                (
-                    entry_id,
-                    entry.get("code", ""),
-                    float(entry.get("minutes", 0.0) or 0.0),
-                    int(entry.get("occurrences", 0) or 0),
-                    entry.get("comments", ""),
-                ),
-            )
+        _insert_shift_downtime(conn, entry_id, entries)
+
+
+# Columns downtime can be split by: the code, and the shift report it was logged on.
+_DOWNTIME_DIMENSIONS = {
+    "code": "sd.downtime_code",
+    "line": "te.line",
+    "machine": "te.machine",
+    "shift": "te.shift",
+    "day": "te.date",
+}
+
+
+def _downtime_source(
+    start: str,
+    end: str,
+    filters: Dict[str, Optional[str]],
+) -> Tuple[str, List[Any]]:
+    """FROM/WHERE over shift reports between ISO dates start and end and their downtime rows."""
+    sql = """
+        FROM tool_entries te
+        JOIN shift_downtime_entries sd ON sd.tool_entry_id = te.id
+        WHERE te.date BETWEEN ? AND ?
+    """
+    params: List[Any] = [start, end]
+    for dim, value in filters.items():
+        if value:
+            sql += f" AND {_DOWNTIME_DIMENSIONS[dim]} = ?"
+            params.append(value)
+    return sql, params
+
+
+def _downtime_columns(by: Sequence[str]) -> List[str]:
+    unknown = [d for d in by if d not in _DOWNTIME_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown downtime dimension: {', '.join(unknown)}")
+    return list(dict.fromkeys(by))
+
+
+def downtime_totals(
+    start: str,
+    end: str,
+    *,
+    by: Sequence[str] = ("code",),
+    line: Optional[str] = None,
+    machine: Optional[str] = None,
+    shift: Optional[str] = None,
+    code: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Shift-report downtime between ISO dates start and end, summed per the `by`
+    dimensions (code, line, machine, shift, day): minutes, occurrences, events
+    (downtime rows) and reports (shift reports they came from).
+    """
+    dims = _downtime_columns(by)
+    source, params = _downtime_source(start, end, {"line": line, "machine": machine, "shift": shift, "code": code})
+    select_cols = "".join(f"{_DOWNTIME_DIMENSIONS[d]} AS {d}, " for d in dims)
+    sql = f"""
+        SELECT {select_cols}
+               SUM(sd.downtime_minutes) AS minutes,
+               SUM(sd.downtime_occurrences) AS occurrences,
+               COUNT(*) AS events,
+               COUNT(DISTINCT te.id) AS reports
+        {source}
+    """
+    if dims:
+        order = ", ".join(dims)
+        sql += f" GROUP BY {order} ORDER BY {order}"
+    with connect() as conn:
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def downtime_pareto(
+    start: str,
+    end: str,
+    *,
+    by: str = "code",
+    limit: Optional[int] = None,
+    line: Optional[str] = None,
+    machine: Optional[str] = None,
+    shift: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Downtime minutes per `by` dimension, largest first, with each one's rank, share of
+    all minutes (pct) and running share (cum_pct). Shares are of the whole filtered
+    range even when limit cuts the list short.
+    """
+    (dim,) = _downtime_columns((by,))
+    source, params = _downtime_source(start, end, {"line": line, "machine": machine, "shift": shift})
+    sql = f"""
+        WITH grouped AS (
+            SELECT {_DOWNTIME_DIMENSIONS[dim]} AS {dim},
+                   SUM(sd.downtime_minutes) AS minutes,
+                   SUM(sd.downtime_occurrences) AS occurrences,
+                   COUNT(*) AS events
+            {source}
+            GROUP BY 1
+            HAVING SUM(sd.downtime_minutes) > 0
+        )
+        SELECT {dim}, minutes, occurrences, events,
+               ROW_NUMBER() OVER ranked AS rank,
+               100.0 * minutes / SUM(minutes) OVER () AS pct,
+               100.0 * SUM(minutes) OVER (ranked ROWS UNBOUNDED PRECEDING) / SUM(minutes) OVER () AS cum_pct
+        FROM grouped
+        WINDOW ranked AS (ORDER BY minutes DESC, {dim})
+        ORDER BY rank
+    """
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    with connect() as conn:
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
 
 
 def upsert_operator_entry(entry: Dict[str, Any]) -> None:
@@ -1543,6 +2608,43 @@ def list_screen_permissions(username: Optional[str] = None) -> List[Dict[str, An
         return [dict(r) for r in rows]
 
 
+def list_entry_month_versions() -> Dict[str, int]:
+    with connect() as conn:
+        rows = conn.execute("SELECT month, version FROM tool_entry_months").fetchall()
+        return {r["month"]: int(r["version"]) for r in rows}
+
+
+def database_identity() -> Tuple[str, str]:
+    """The database in use as (absolute path, database_id from meta)."""
+    with connect() as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key='database_id'").fetchone()
+    return os.path.abspath(DB_PATH), row["value"] if row else ""
+
+
+def entry_month_fingerprint(month: str) -> Optional[Dict[str, Any]]:
+    """
+    Row count, highest rowid and a digest of every (id, last write seq) of a month's
+    entries, or None when it has none. Any insert, edit or delete changes it.
+    """
+    with connect() as conn:
+        rows = conn.execute(
+            """
+            SELECT te.rowid AS rid, te.id, COALESCE(c.seq, 0) AS seq
+            FROM tool_entries te
+            LEFT JOIN tool_entry_changes c ON c.entry_id = te.id
+            WHERE te.date >= ? AND te.date < ? AND substr(te.date,1,7) = ?
+            ORDER BY te.rowid
+            """,
+            (month, month + "~", month),
+        ).fetchall()
+    if not rows:
+        return None
+    digest = hashlib.sha256()
+    for r in rows:
+        digest.update(f"{r['id']}\x1f{r['seq']}\x1e".encode("utf-8"))
+    return {"rows": len(rows), "max_rowid": max(r["rid"] for r in rows), "digest": digest.hexdigest()}
+
+
 def list_entry_months() -> List[str]:
     with connect() as conn:
         rows = conn.execute(
@@ -1551,14 +2653,45 @@ def list_entry_months() -> List[str]:
         return [r["month"] for r in rows if r["month"]]
 
 
-def _normalize_tool_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+def _canonical_entry_datetimes(entry_id: str, entry: Dict[str, Any], strict: bool = True) -> Dict[str, Any]:
+    """
+    ISO-8601 text for the entry's date/time columns plus ts. With strict, Date and
+    Time must be readable; the free-typed sign-off/NCR/action fields are kept as typed
+    when not. Without it an unreadable Date/Time is kept as typed too and ts is None,
+    as the migration leaves legacy rows, so re-saving such a row does not fail.
+    """
+    frame_keys = {
+        "date": "Date",
+        "time": "Time",
+        "quality_time": "Quality_Time",
+        "leader_time": "Leader_Time",
+        "ncr_close_date": "NCR_Close_Date",
+        "action_due_date": "Action_Due_Date",
+    }
+    out = {}
+    unreadable = set()
+    for field, canonical in _ENTRY_DATETIME_FIELDS.items():
+        raw = entry.get(frame_keys[field], "")
+        value = canonical(raw)
+        if value is None:
+            if strict and field in ("date", "time"):
+                raise ValueError(f"Tool entry {entry_id} has an unreadable {frame_keys[field]}: {raw!r}")
+            unreadable.add(field)
+            value = str(raw).strip()
+        out[field] = value
+    out["ts"] = None if unreadable & {"date", "time"} else entry_ts(out["date"], out["time"])
+    return out
+
+
+def _normalize_tool_entry(entry: Dict[str, Any], strict: bool = True) -> Dict[str, Any]:
     if not entry.get("ID") and not entry.get("id"):
         raise ValueError("Entry must include ID")
     entry_id = str(entry.get("ID") or entry.get("id"))
+    stamps = _canonical_entry_datetimes(entry_id, entry, strict)
     return {
         "id": entry_id,
-        "date": entry.get("Date", ""),
-        "time": entry.get("Time", ""),
+        "date": stamps["date"],
+        "time": stamps["time"],
         "shift": entry.get("Shift", ""),
         "line": entry.get("Line", ""),
         "cell": entry.get("Cell", ""),
@@ -1577,45 +2710,77 @@ def _normalize_tool_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
         "defect_reason": entry.get("Defect_Reason", ""),
         "quality_verified": entry.get("Quality_Verified", ""),
         "quality_user": entry.get("Quality_User", ""),
-        "quality_time": entry.get("Quality_Time", ""),
+        "quality_time": stamps["quality_time"],
         "leader_sign": entry.get("Leader_Sign", ""),
         "leader_user": entry.get("Leader_User", ""),
-        "leader_time": entry.get("Leader_Time", ""),
+        "leader_time": stamps["leader_time"],
         "serial_numbers": entry.get("Serial_Numbers", ""),
         "andon_flag": entry.get("Andon_Flag", ""),
         "customer_risk": entry.get("Customer_Risk", ""),
         "qc_status": entry.get("QC_Status", ""),
         "ncr_id": entry.get("NCR_ID", ""),
         "ncr_status": entry.get("NCR_Status", ""),
-        "ncr_close_date": entry.get("NCR_Close_Date", ""),
+        "ncr_close_date": stamps["ncr_close_date"],
         "action_status": entry.get("Action_Status", ""),
-        "action_due_date": entry.get("Action_Due_Date", ""),
+        "action_due_date": stamps["action_due_date"],
         "gage_used": entry.get("Gage_Used", ""),
         "copq_est": float(entry.get("COPQ_Est", 0.0) or 0.0),
+        "ts": stamps["ts"],
     }
 
 
-def _upsert_tool_entry(conn: sqlite3.Connection, record: Dict[str, Any]) -> None:
-    entry_id = record["id"]
-    existing = conn.execute(
-        "SELECT id FROM tool_entries WHERE id=?",
-        (entry_id,),
-    ).fetchone()
-    if existing:
-        sets = ", ".join([f"{k}=?" for k in record.keys() if k != "id"])
-        params = [record[k] for k in record.keys() if k != "id"] + [entry_id]
-        conn.execute(f"UPDATE tool_entries SET {sets} WHERE id=?", params)
-    else:
-        columns = ", ".join(record.keys())
-        placeholders = ", ".join(["?"] * len(record))
+def _insert_tool_entry(conn: sqlite3.Connection, record: Dict[str, Any]) -> None:
+    columns = ", ".join(record.keys())
+    placeholders = ", ".join(["?"] * len(record))
+    try:
         conn.execute(
             f"INSERT INTO tool_entries ({columns}) VALUES ({placeholders})",
             list(record.values()),
         )
+    except sqlite3.IntegrityError as exc:
+        raise ValueError(f"Tool entry {record['id']} already exists") from exc
 
 
-def upsert_tool_entry(entry: Dict[str, Any]) -> None:
+def _update_tool_entry(conn: sqlite3.Connection, record: Dict[str, Any]) -> bool:
+    sets = ", ".join([f"{k}=?" for k in record.keys() if k != "id"])
+    params = [record[k] for k in record.keys() if k != "id"] + [record["id"]]
+    cur = conn.execute(f"UPDATE tool_entries SET {sets} WHERE id=?", params)
+    return cur.rowcount > 0
+
+
+def _upsert_tool_entry(conn: sqlite3.Connection, record: Dict[str, Any]) -> None:
+    columns = ", ".join(record.keys())
+    placeholders = ", ".join(["?"] * len(record))
+    sets = ", ".join([f"{k}=excluded.{k}" for k in record.keys() if k != "id"])
+    # An unchanged row is left alone, so re-saving a month fires no triggers.
+    changed = " OR ".join([f"tool_entries.{k} IS NOT excluded.{k}" for k in record.keys() if k != "id"])
+    conn.execute(
+        f"INSERT INTO tool_entries ({columns}) VALUES ({placeholders}) "
+        f"ON CONFLICT(id) DO UPDATE SET {sets} WHERE {changed}",
+        list(record.values()),
+    )
+
+
+def insert_tool_entry(entry: Dict[str, Any]) -> None:
+    """New entries only; raises ValueError if the ID is already taken."""
     record = _normalize_tool_entry(entry)
+    with connect() as conn:
+        _insert_tool_entry(conn, record)
+
+
+def update_tool_entry(entry: Dict[str, Any]) -> bool:
+    """Edits an existing entry. Returns False when no entry has that ID."""
+    record = _normalize_tool_entry(entry, strict=False)
+    with connect() as conn:
+        return _update_tool_entry(conn, record)
+
+
+def upsert_tool_entry(entry: Dict[str, Any]) -> None:
+    """
+    Saves an entry whether or not it exists yet, as save_df does for a whole month.
+    Unreadable Date/Time text is kept rather than rejected (see _canonical_entry_datetimes).
+    """
+    record = _normalize_tool_entry(entry, strict=False)
     with connect() as conn:
         _upsert_tool_entry(conn, record)
 
@@ -1624,44 +2789,69 @@ def apply_tool_change(
     entry: Dict[str, Any],
     *,
     tool_num: str,
-    new_stock_qty: Optional[int],
+    consume_stock: bool = True,
     updated_by: str = "",
+) -> Tuple[float, Optional[int]]:
+    """
+    Saves a tool change priced at the tool's change cost in effect at the entry's
+    date and time, and takes the new tool out of stock, in one transaction. Returns (cost, new balance); the balance is None
+    when nothing was taken (out of stock, or consume_stock off).
+    """
+    record = _normalize_tool_entry(entry)
+    with connect() as conn:
+        record["cost"] = _tool_cost_at(conn, tool_num, record["ts"])
+        _insert_tool_entry(conn, record)
+        if not consume_stock:
+            return record["cost"], None
+        balance = _move_stock(
+            conn, tool_num, "change", -1, entry_id=record["id"], username=updated_by, floor=0,
+        )
+        return record["cost"], balance
+
+
+def insert_tool_entry_with_downtime(
+    entry: Dict[str, Any],
+    downtime_entries: List[Dict[str, Any]],
 ) -> None:
     record = _normalize_tool_entry(entry)
     with connect() as conn:
-        if new_stock_qty is not None:
-            conn.execute(
-                "UPDATE tools SET stock_qty=?, updated_at=datetime('now'), updated_by=? WHERE tool_num=?",
-                (int(new_stock_qty), updated_by or "", tool_num),
-            )
-        _upsert_tool_entry(conn, record)
+        _insert_tool_entry(conn, record)
+        _insert_shift_downtime(conn, record["id"], downtime_entries)
 
 
 def upsert_tool_entry_with_downtime(
     entry: Dict[str, Any],
     downtime_entries: List[Dict[str, Any]],
 ) -> None:
-    record = _normalize_tool_entry(entry)
+    record = _normalize_tool_entry(entry, strict=False)
     with connect() as conn:
         _upsert_tool_entry(conn, record)
         conn.execute("DELETE FROM shift_downtime_entries WHERE tool_entry_id=?", (record["id"],))
-        for d in downtime_entries:
-            conn.execute(
-                """
-                INSERT INTO shift_downtime_entries(
-                    tool_entry_id, downtime_code, downtime_minutes,
-                    downtime_occurrences, downtime_comments
-                )
-                VALUES(?,?,?,?,?)
-                """,
-                (
-                    record["id"],
-                    d.get("code", ""),
-                    float(d.get("minutes", 0.0) or 0.0),
-                    int(d.get("occurrences", 0) or 0),
-                    d.get("comments", "") or "",
-                ),
+        _insert_shift_downtime(conn, record["id"], downtime_entries)
+
+
+def _insert_shift_downtime(
+    conn: sqlite3.Connection, entry_id: str, downtime_entries: List[Dict[str, Any]]
+) -> None:
+    conn.executemany(
+        """
+        INSERT INTO shift_downtime_entries(
+            tool_entry_id, downtime_code, downtime_minutes,
+            downtime_occurrences, downtime_comments
+        )
+        VALUES(?,?,?,?,?)
+        """,
+        [
+            (
+                entry_id,
+                d.get("code", ""),
+                float(d.get("minutes", 0.0) or 0.0),
+                int(d.get("occurrences", 0) or 0),
+                d.get("comments", "") or "",
             )
+            for d in downtime_entries
+        ],
+    )
 
 
 def fetch_tool_entries(month: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -1678,6 +2868,1074 @@ def fetch_tool_entries(month: Optional[str] = None) -> List[Dict[str, Any]]:
         return [dict(r) for r in rows]
 
 
+def fetch_tool_entry(entry_id: str) -> Optional[Dict[str, Any]]:
+    with connect() as conn:
+        row = conn.execute("SELECT * FROM tool_entries WHERE id=?", (entry_id,)).fetchone()
+        return dict(row) if row else None
+
+
+_entry_row_types: Dict[Tuple[str, ...], type] = {}
+
+
+def _entry_row_type(columns: Tuple[str, ...]) -> type:
+    row_type = _entry_row_types.get(columns)
+    if row_type is None:
+        row_type = namedtuple("ToolEntryRow", columns)
+        _entry_row_types[columns] = row_type
+    return row_type
+
+
+def iter_tool_entries(
+    month: Optional[str] = None,
+    *,
+    reason: Optional[str] = None,
+    since: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+    batch_size: int = 500,
+) -> Iterator[Any]:
+    """
+    Streams tool entries (newest first) as namedtuples, batch_size rows at a time.
+    columns limits the row to those tool_entries columns (attribute access: row.line);
+    since keeps entries dated on or after that YYYY-MM-DD date.
+    Unlike fetch_tool_entries, memory stays flat however many rows match.
+    """
+    with connect() as conn:
+        known = [r["name"] for r in conn.execute("PRAGMA table_info(tool_entries)").fetchall()]
+        if columns is None:
+            selected = tuple(known)
+        else:
+            selected = tuple(columns)
+            unknown = [c for c in selected if c not in known]
+            if unknown:
+                raise ValueError(f"Unknown tool_entries column(s): {', '.join(unknown)}")
+
+        where = []
+        params: List[Any] = []
+        if month:
+            where.append("substr(date,1,7)=?")
+            params.append(month)
+        if reason is not None:
+            where.append("trim(reason)=?")
+            params.append(reason)
+        if since:
+            where.append("date >= ?")
+            params.append(since)
+        sql = f"SELECT {', '.join(selected)} FROM tool_entries"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY date DESC, time DESC"
+
+        row_type = _entry_row_type(selected)
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(sql, params)
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                yield row_type._make(row)
+
+
+def list_changed_tool_entries(after_seq: int, limit: int = 5000) -> List[Tuple[str, int]]:
+    """(entry_id, seq) for entries written after after_seq, oldest write first."""
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT entry_id, seq FROM tool_entry_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (after_seq, limit),
+        ).fetchall()
+        return [(r["entry_id"], int(r["seq"])) for r in rows]
+
+
+def latest_tool_entry_change_seq() -> int:
+    """The seq of the newest write in tool_entry_changes; 0 when there is none."""
+    with connect() as conn:
+        return int(conn.execute("SELECT COALESCE(MAX(seq), 0) AS seq FROM tool_entry_changes").fetchone()["seq"])
+
+
+def fetch_tool_entries_by_ids(entry_ids: Sequence[str], columns: Sequence[str]) -> List[Dict[str, Any]]:
+    """The given columns of each listed entry; ids that no longer exist are skipped."""
+    out: List[Dict[str, Any]] = []
+    ids = list(entry_ids)
+    with connect() as conn:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM tool_entries WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            out.extend(dict(r) for r in rows)
+    return out
+
+
+def replace_health_issues(
+    issues: Iterable[Dict[str, Any]],
+    *,
+    entry_ids: Optional[Sequence[str]] = None,
+    rules: Optional[Sequence[str]] = None,
+    meta: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Swaps stored health issues for a fresh result in one transaction.
+    The old issues dropped are those of entry_ids (all entries when None) for rules
+    (all rules when None). meta keys are written in the same transaction, so a
+    watermark never gets ahead of the issues it covers.
+    """
+    with connect() as conn:
+        rule_sql = ""
+        rule_params: List[Any] = []
+        if rules is not None:
+            rule_sql = f" AND rule IN ({', '.join('?' * len(rules))})"
+            rule_params = list(rules)
+        if entry_ids is None:
+            conn.execute(f"DELETE FROM health_issues WHERE 1=1{rule_sql}", rule_params)
+        else:
+            ids = list(entry_ids)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                conn.execute(
+                    f"DELETE FROM health_issues WHERE entry_id IN ({', '.join('?' * len(chunk))}){rule_sql}",
+                    chunk + rule_params,
+                )
+        conn.executemany(
+            """
+            INSERT INTO health_issues(entry_id, rule, detail, severity, category, issue, suggestion, entry_month)
+            SELECT ?, ?, ?, ?, ?, ?, ?, ?
+            WHERE EXISTS (SELECT 1 FROM tool_entries WHERE id = ?)
+            """,
+            [
+                (
+                    i["entry_id"], i["rule"], i.get("detail", ""), i["severity"], i["category"],
+                    i["issue"], i.get("suggestion", ""), i.get("entry_month", ""), i["entry_id"],
+                )
+                for i in issues
+            ],
+        )
+        for key, value in (meta or {}).items():
+            conn.execute(
+                "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (key, value),
+            )
+
+
+def list_health_issues(month: Optional[str] = None) -> List[Dict[str, Any]]:
+    with connect() as conn:
+        sql = """
+            SELECT entry_id, rule, detail, severity, category, issue, suggestion, entry_month, checked_at
+            FROM health_issues
+        """
+        params: List[Any] = []
+        if month:
+            sql += " WHERE entry_month = ?"
+            params.append(month)
+        sql += " ORDER BY entry_month DESC, entry_id DESC"
+        rows = conn.execute(sql, params).fetchall()
+        return [dict(r) for r in rows]
+
+
+def save_repeat_flag(entry_id: str, flag: str, score: int, reason: str) -> None:
+    save_repeat_flags([(entry_id, flag, score, reason)])
+
+
+def save_repeat_flags(flags: Iterable[Tuple[str, str, int, str]]) -> None:
+    """Stores (entry_id, flag, score, reason) rows, replacing each entry's earlier flag."""
+    with connect() as conn:
+        conn.executemany(
+            """
+            INSERT INTO repeat_flags(entry_id, repeat_flag, repeat_score, repeat_reason, scored_at)
+            VALUES(?, ?, ?, ?, datetime('now'))
+            ON CONFLICT(entry_id) DO UPDATE SET
+                repeat_flag=excluded.repeat_flag,
+                repeat_score=excluded.repeat_score,
+                repeat_reason=excluded.repeat_reason,
+                scored_at=excluded.scored_at
+            """,
+            [(entry_id, flag, int(score), reason or "") for entry_id, flag, score, reason in flags],
+        )
+
+
+def list_repeat_flags(since: Optional[str] = None, flagged_only: bool = True) -> List[Dict[str, Any]]:
+    """Stored repeat flags joined to their entries, newest first."""
+    with connect() as conn:
+        sql = """
+            SELECT e.id, e.date, e.time, e.line, e.machine, e.part_number, e.tool_num,
+                   f.repeat_flag, f.repeat_score, f.repeat_reason, f.scored_at
+            FROM repeat_flags f
+            JOIN tool_entries e ON e.id = f.entry_id
+        """
+        where = []
+        params: List[Any] = []
+        if since:
+            where.append("e.date >= ?")
+            params.append(since)
+        if flagged_only:
+            where.append("f.repeat_flag != 'None'")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY e.date DESC, e.time DESC"
+        rows = conn.execute(sql, params).fetchall()
+        return [dict(r) for r in rows]
+
+
+def sync_alerts(
+    alerts: Iterable[Dict[str, Any]],
+    *,
+    entry_ids: Optional[Sequence[str]] = None,
+    alert_type: Optional[str] = None,
+    meta: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Upserts freshly generated alerts and retires the ones that weren't regenerated.
+    The scope that was regenerated is entry_ids (alerts of those entries) or
+    alert_type (every alert of that type). An alert whose severity changes, or that
+    comes back after being retired, needs acknowledging again. meta keys are written
+    in the same transaction.
+    """
+    now = _now_timestamp()
+    alerts = list(alerts)
+    keys = [a["alert_key"] for a in alerts]
+    with connect() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _alert_keys(alert_key TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM _alert_keys")
+        conn.executemany("INSERT OR IGNORE INTO _alert_keys(alert_key) VALUES(?)", [(k,) for k in keys])
+        retire = "UPDATE alerts SET is_active=0 WHERE is_active=1 AND alert_key NOT IN (SELECT alert_key FROM _alert_keys)"
+        if entry_ids is not None:
+            ids = list(entry_ids)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                conn.execute(f"{retire} AND entry_id IN ({', '.join('?' * len(chunk))})", chunk)
+        if alert_type is not None:
+            conn.execute(f"{retire} AND type=?", (alert_type,))
+
+        conn.executemany(
+            """
+            INSERT INTO alerts(
+                alert_key, type, severity, title, details, related_key, entry_id, entry_month,
+                is_active, first_seen, last_seen
+            )
+            SELECT ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?
+            WHERE ? IS NULL OR EXISTS (SELECT 1 FROM tool_entries WHERE id = ?)
+            ON CONFLICT(alert_key) DO UPDATE SET
+                ack_by = CASE WHEN alerts.severity != excluded.severity OR alerts.is_active = 0
+                              THEN '' ELSE alerts.ack_by END,
+                ack_at = CASE WHEN alerts.severity != excluded.severity OR alerts.is_active = 0
+                              THEN '' ELSE alerts.ack_at END,
+                severity = excluded.severity,
+                title = excluded.title,
+                details = excluded.details,
+                entry_month = excluded.entry_month,
+                is_active = 1,
+                last_seen = excluded.last_seen
+            """,
+            [
+                (
+                    a["alert_key"], a["type"], a["severity"], a.get("title", ""), a.get("details", ""),
+                    a.get("related_key", ""), a.get("entry_id"), a.get("entry_month", ""), now, now,
+                    a.get("entry_id"), a.get("entry_id"),
+                )
+                for a in alerts
+            ],
+        )
+        for key, value in (meta or {}).items():
+            conn.execute(
+                "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (key, value),
+            )
+
+
+def tool_consumption_by_line(
+    since: str,
+    until: str,
+    tool_nums: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Tool changes per (tool_num, line) dated since..until (YYYY-MM-DD, inclusive):
+    window_changes, last_change_date, and peak_week_changes, the most changes of that
+    tool (all lines) in any 7 consecutive days of the window.
+    """
+    tool_sql = ""
+    params: List[Any] = [since, until]
+    if tool_nums is not None:
+        tools = list(tool_nums)
+        if not tools:
+            return []
+        tool_sql = f" AND tool_num IN ({', '.join('?' * len(tools))})"
+        params.extend(tools)
+    with connect() as conn:
+        rows = conn.execute(
+            f"""
+            WITH daily AS (
+                SELECT tool_num, line, date, COUNT(*) AS changes
+                FROM tool_entries
+                WHERE tool_num != '' AND date BETWEEN ? AND ?{tool_sql}
+                GROUP BY tool_num, line, date
+            ),
+            tool_daily AS (
+                SELECT tool_num, date, SUM(changes) AS changes FROM daily GROUP BY tool_num, date
+            ),
+            rolling AS (
+                SELECT tool_num,
+                       SUM(changes) OVER (
+                           PARTITION BY tool_num ORDER BY julianday(date)
+                           RANGE BETWEEN 6 PRECEDING AND CURRENT ROW
+                       ) AS week_changes
+                FROM tool_daily
+            ),
+            peaks AS (
+                SELECT tool_num, MAX(week_changes) AS peak_week_changes FROM rolling GROUP BY tool_num
+            )
+            SELECT d.tool_num, d.line, SUM(d.changes) AS window_changes,
+                   MAX(d.date) AS last_change_date, p.peak_week_changes
+            FROM daily d JOIN peaks p ON p.tool_num = d.tool_num
+            GROUP BY d.tool_num, d.line
+            ORDER BY d.tool_num, d.line
+            """,
+            params,
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+_TOOL_FORECAST_FIELDS = (
+    "tool_num", "stock_qty", "window_days", "window_changes", "rate_per_day", "peak_rate_per_day",
+    "lead_time_days", "days_of_stock", "stockout_date", "reorder_point", "order_up_to",
+    "suggested_order_qty", "status", "computed_for",
+)
+_TOOL_LINE_FIELDS = ("tool_num", "line", "window_changes", "rate_per_day", "last_change_date")
+
+
+def replace_tool_forecasts(
+    forecasts: Iterable[Dict[str, Any]],
+    line_rates: Iterable[Dict[str, Any]],
+    *,
+    tool_nums: Optional[Sequence[str]] = None,
+    meta: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Swaps the stored forecasts and per-line rates of tool_nums (every tool when None)
+    for the given ones in one transaction; meta is written in the same transaction.
+    """
+    with connect() as conn:
+        if tool_nums is None:
+            conn.execute("DELETE FROM tool_stock_forecast")
+            conn.execute("DELETE FROM tool_line_consumption")
+        else:
+            keys = [(t,) for t in tool_nums]
+            conn.executemany("DELETE FROM tool_stock_forecast WHERE tool_num=?", keys)
+            conn.executemany("DELETE FROM tool_line_consumption WHERE tool_num=?", keys)
+        conn.executemany(
+            f"""
+            INSERT INTO tool_stock_forecast({', '.join(_TOOL_FORECAST_FIELDS)}, updated_at)
+            VALUES({', '.join('?' * len(_TOOL_FORECAST_FIELDS))}, datetime('now'))
+            """,
+            [tuple(f.get(k) for k in _TOOL_FORECAST_FIELDS) for f in forecasts],
+        )
+        conn.executemany(
+            f"""
+            INSERT INTO tool_line_consumption({', '.join(_TOOL_LINE_FIELDS)})
+            VALUES({', '.join('?' * len(_TOOL_LINE_FIELDS))})
+            """,
+            [tuple(r.get(k) for k in _TOOL_LINE_FIELDS) for r in line_rates],
+        )
+        for key, value in (meta or {}).items():
+            conn.execute(
+                "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (key, value),
+            )
+
+
+def list_tool_forecasts() -> List[Dict[str, Any]]:
+    """Stored forecasts by tool_num, each with its per-line rates under "lines"."""
+    with connect() as conn:
+        rows = conn.execute(
+            f"SELECT {', '.join(_TOOL_FORECAST_FIELDS)}, updated_at FROM tool_stock_forecast ORDER BY tool_num"
+        ).fetchall()
+        lines = conn.execute(
+            f"SELECT {', '.join(_TOOL_LINE_FIELDS)} FROM tool_line_consumption ORDER BY tool_num, line"
+        ).fetchall()
+    by_tool: Dict[str, List[Dict[str, Any]]] = {}
+    for r in lines:
+        by_tool.setdefault(r["tool_num"], []).append(dict(r))
+    return [{**dict(r), "lines": by_tool.get(r["tool_num"], [])} for r in rows]
+
+
+def get_tool_forecast(tool_num: str) -> Optional[Dict[str, Any]]:
+    with connect() as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(_TOOL_FORECAST_FIELDS)}, updated_at FROM tool_stock_forecast WHERE tool_num=?",
+            (tool_num,),
+        ).fetchone()
+        return dict(row) if row else None
+
+
+_TOOL_LIFE_MODEL_FIELDS = (
+    "tool_num", "machine", "part_number", "method", "samples", "mean_life", "p10_life", "p50_life",
+    "p90_life", "weibull_shape", "weibull_scale", "installed_entry_id", "installed_ts",
+    "produced_since", "expected_remaining", "predicted_change_ts",
+)
+
+
+def list_tool_life_keys(machine: str, part_number: str) -> List[str]:
+    """Tool numbers that have been changed on this machine/part."""
+    with connect() as conn:
+        rows = conn.execute(
+            """
+            SELECT DISTINCT tool_num FROM tool_entries
+            WHERE machine=? AND part_number=? AND tool_num != ''
+            """,
+            (machine, part_number),
+        ).fetchall()
+        return [r["tool_num"] for r in rows]
+
+
+def list_stale_tool_life_keys() -> List[Tuple[str, str, str]]:
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT tool_num, machine, part_number FROM tool_life_model WHERE stale = 1"
+        ).fetchall()
+        return [(r["tool_num"], r["machine"], r["part_number"]) for r in rows]
+
+
+def list_tool_change_history(
+    tool_num: str,
+    machine: str,
+    part_number: str,
+    limit: int = 200,
+) -> List[Dict[str, Any]]:
+    """The latest limit changes of one tool on one machine/part, newest first: id, ts, tool_life."""
+    with connect() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, ts, tool_life FROM tool_entries
+            WHERE machine=? AND part_number=? AND tool_num=? AND ts IS NOT NULL
+            ORDER BY ts DESC, id DESC
+            LIMIT ?
+            """,
+            (machine, part_number, tool_num, int(limit)),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def production_since(machine: str, part_number: str, since_ts: int) -> Tuple[float, Optional[int]]:
+    """(parts reported, latest report ts) from production rows on machine/part after since_ts."""
+    with connect() as conn:
+        row = conn.execute(
+            """
+            SELECT COALESCE(SUM(production_qty), 0.0) AS qty, MAX(ts) AS last_ts FROM tool_entries
+            WHERE machine=? AND part_number=? AND ts > ? AND tool_num = '' AND production_qty > 0
+            """,
+            (machine, part_number, int(since_ts)),
+        ).fetchone()
+        return float(row["qty"]), row["last_ts"]
+
+
+def replace_tool_life_model(
+    rows: Iterable[Dict[str, Any]],
+    *,
+    keys: Optional[Sequence[Tuple[str, str, str]]] = None,
+    meta: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Swaps the model rows of keys (every key when None) for rows in one transaction;
+    a key with no new row (its changes were deleted) drops out. meta is written in
+    the same transaction.
+    """
+    with connect() as conn:
+        if keys is None:
+            conn.execute("DELETE FROM tool_life_model")
+        else:
+            conn.executemany(
+                "DELETE FROM tool_life_model WHERE tool_num=? AND machine=? AND part_number=?",
+                list(keys),
+            )
+        conn.executemany(
+            f"""
+            INSERT INTO tool_life_model({', '.join(_TOOL_LIFE_MODEL_FIELDS)}, stale, updated_at)
+            VALUES({', '.join('?' * len(_TOOL_LIFE_MODEL_FIELDS))}, 0, datetime('now'))
+            """,
+            [tuple(r.get(f) for f in _TOOL_LIFE_MODEL_FIELDS) for r in rows],
+        )
+        for key, value in (meta or {}).items():
+            conn.execute(
+                "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (key, value),
+            )
+
+
+def list_tool_life_model(machine: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Model rows, the soonest predicted change first (rows without a prediction last)."""
+    with connect() as conn:
+        sql = f"SELECT {', '.join(_TOOL_LIFE_MODEL_FIELDS)}, updated_at FROM tool_life_model"
+        params: List[Any] = []
+        if machine:
+            sql += " WHERE machine=?"
+            params.append(machine)
+        sql += " ORDER BY predicted_change_ts IS NULL, predicted_change_ts, machine, tool_num"
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def get_tool_life_model(tool_num: str, machine: str, part_number: str) -> Optional[Dict[str, Any]]:
+    with connect() as conn:
+        row = conn.execute(
+            f"""
+            SELECT {', '.join(_TOOL_LIFE_MODEL_FIELDS)}, updated_at FROM tool_life_model
+            WHERE tool_num=? AND machine=? AND part_number=?
+            """,
+            (tool_num, machine, part_number),
+        ).fetchone()
+        return dict(row) if row else None
+
+
+_OEE_ROLLUP_FIELDS = (
+    "date", "shift", "line", "machine", "reports", "planned_minutes", "downtime_minutes", "run_minutes",
+    "ideal_minutes", "produced", "defects", "good", "availability", "performance", "quality", "oee",
+)
+
+
+def oee_source_rows(dates: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """
+    The entries OEE is computed from, on the given dates (all when None). downtime is
+    the sum of an entry's shift_downtime_entries, or its downtime_mins without any.
+    """
+    sql = """
+        SELECT te.date, te.shift, te.line, te.cell, te.machine, te.part_number, te.reason,
+               te.production_qty, te.defect_qty,
+               COALESCE(
+                   (SELECT SUM(sd.downtime_minutes) FROM shift_downtime_entries sd WHERE sd.tool_entry_id = te.id),
+                   te.downtime_mins
+               ) AS downtime
+        FROM tool_entries te
+    """
+    with connect() as conn:
+        if dates is None:
+            return [dict(r) for r in conn.execute(sql).fetchall()]
+        out: List[Dict[str, Any]] = []
+        ids = sorted(set(dates))
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(sql + f" WHERE te.date IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+            out.extend(dict(r) for r in rows)
+        return out
+
+
+def list_stale_oee_keys() -> List[Tuple[str, str, str, str]]:
+    with connect() as conn:
+        rows = conn.execute("SELECT date, shift, line, machine FROM oee_rollup WHERE stale = 1").fetchall()
+        return [(r["date"], r["shift"], r["line"], r["machine"]) for r in rows]
+
+
+def replace_oee_rollup(
+    rows: Iterable[Dict[str, Any]],
+    *,
+    dates: Optional[Sequence[str]] = None,
+    meta: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Swaps the rollup rows of dates (every date when None) for rows in one transaction,
+    writing meta alongside.
+    """
+    with connect() as conn:
+        if dates is None:
+            conn.execute("DELETE FROM oee_rollup")
+        else:
+            conn.executemany("DELETE FROM oee_rollup WHERE date=?", [(d,) for d in dates])
+        conn.executemany(
+            f"""
+            INSERT INTO oee_rollup({', '.join(_OEE_ROLLUP_FIELDS)}, stale, updated_at)
+            VALUES({', '.join('?' * len(_OEE_ROLLUP_FIELDS))}, 0, datetime('now'))
+            """,
+            [tuple(r.get(f) for f in _OEE_ROLLUP_FIELDS) for r in rows],
+        )
+        for key, value in (meta or {}).items():
+            conn.execute(
+                "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (key, value),
+            )
+
+
+def list_oee_rollup(
+    start: str,
+    end: str,
+    *,
+    line: Optional[str] = None,
+    machine: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Rollup rows dated start..end (ISO dates, inclusive), newest first."""
+    sql = f"SELECT {', '.join(_OEE_ROLLUP_FIELDS)} FROM oee_rollup WHERE date BETWEEN ? AND ?"
+    params: List[Any] = [start, end]
+    if line:
+        sql += " AND line=?"
+        params.append(line)
+    if machine:
+        sql += " AND machine=?"
+        params.append(machine)
+    sql += " ORDER BY date DESC, shift, line, machine"
+    with connect() as conn:
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def oee_totals(
+    start: str,
+    end: str,
+    *,
+    period: str = "month",
+    by: Sequence[str] = ("line",),
+    line: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Summed rollup minutes and counts per period ('day' or 'month') and the `by`
+    columns (any of shift, line, machine); oee.oee_trend turns them into ratios.
+    performance_run_minutes only counts groups that had a production goal.
+    """
+    if period not in ("day", "month"):
+        raise ValueError(f"Unknown OEE period: {period}")
+    group_cols = [c for c in by if c in ("shift", "line", "machine")]
+    period_sql = "date" if period == "day" else "substr(date, 1, 7)"
+    select_cols = "".join(f"{c}, " for c in group_cols)
+    sql = f"""
+        SELECT {period_sql} AS period, {select_cols}
+               SUM(reports) AS reports,
+               SUM(planned_minutes) AS planned_minutes,
+               SUM(downtime_minutes) AS downtime_minutes,
+               SUM(run_minutes) AS run_minutes,
+               SUM(ideal_minutes) AS ideal_minutes,
+               SUM(CASE WHEN ideal_minutes IS NOT NULL THEN run_minutes END) AS performance_run_minutes,
+               SUM(produced) AS produced,
+               SUM(defects) AS defects,
+               SUM(good) AS good
+        FROM oee_rollup
+        WHERE date BETWEEN ? AND ?
+    """
+    params: List[Any] = [start, end]
+    if line:
+        sql += " AND line=?"
+        params.append(line)
+    sql += f" GROUP BY {', '.join(['period'] + group_cols)} ORDER BY {', '.join(['period'] + group_cols)}"
+    with connect() as conn:
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def tool_cost_totals(
+    start: str,
+    end: str,
+    *,
+    period: str = "month",
+    by: Sequence[str] = ("line",),
+    line: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Tool changes, their cost, parts produced and tool cost per piece, per period
+    ('day' or 'month') and the `by` columns (line and/or part_number), from
+    tool_cost_rollup between ISO dates start and end.
+    """
+    if period not in ("day", "month"):
+        raise ValueError(f"Unknown cost period: {period}")
+    group_cols = [c for c in by if c in ("line", "part_number")]
+    period_sql = "date" if period == "day" else "substr(date, 1, 7)"
+    select_cols = "".join(f"{c}, " for c in group_cols)
+    sql = f"""
+        SELECT {period_sql} AS period, {select_cols}
+               SUM(tool_changes) AS tool_changes,
+               SUM(tool_cost) AS tool_cost,
+               SUM(produced) AS produced,
+               CASE WHEN SUM(produced) > 0 THEN SUM(tool_cost) / SUM(produced) END AS cost_per_piece
+        FROM tool_cost_rollup
+        WHERE date BETWEEN ? AND ?
+    """
+    params: List[Any] = [start, end]
+    if line:
+        sql += " AND line=?"
+        params.append(line)
+    order = ", ".join(["period"] + group_cols)
+    sql += f" GROUP BY {order} HAVING SUM(tool_changes) > 0 OR SUM(produced) > 0 ORDER BY {order}"
+    with connect() as conn:
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+# The change cost in effect for tools row t at :ts: the latest price that started at
+# or before it, else the tool's first price (changes dated before it was set up),
+# else the cached change_cost. Each branch is one seek on (tool_id, valid_from).
+_TOOL_COST_AT_SQL = """
+    COALESCE(
+        (SELECT h.change_cost FROM tool_cost_history h
+         WHERE h.tool_id = t.id AND h.valid_from <= :ts
+         ORDER BY h.valid_from DESC, h.id DESC LIMIT 1),
+        (SELECT h.change_cost FROM tool_cost_history h
+         WHERE h.tool_id = t.id
+         ORDER BY h.valid_from, h.id LIMIT 1),
+        t.change_cost
+    )
+"""
+
+
+def tool_cost_at(tool_num: str, ts: Optional[int]) -> float:
+    """A tool's change cost as of ts (epoch seconds, see dates.entry_ts); now when ts is None."""
+    with connect() as conn:
+        return _tool_cost_at(conn, tool_num, ts)
+
+
+def _tool_cost_at(conn: sqlite3.Connection, tool_num: str, ts: Optional[int]) -> float:
+    row = conn.execute(
+        f"SELECT {_TOOL_COST_AT_SQL} AS cost FROM tools t WHERE t.tool_num = :tool_num",
+        {"ts": _now_ts() if ts is None else int(ts), "tool_num": tool_num},
+    ).fetchone()
+    return float(row["cost"]) if row else 0.0
+
+
+def list_tool_cost_history(tool_nums: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Price rows (tool_num, change_cost, valid_from, valid_to), oldest first per tool."""
+    sql = """
+        SELECT t.tool_num, h.change_cost, h.valid_from, h.valid_to
+        FROM tool_cost_history h
+        JOIN tools t ON t.id = h.tool_id
+    """
+    params: List[Any] = []
+    if tool_nums is not None:
+        sql += f" WHERE t.tool_num IN ({','.join('?' * len(tool_nums))})"
+        params = list(tool_nums)
+    with connect() as conn:
+        rows = conn.execute(sql + " ORDER BY t.tool_num, h.valid_from, h.id", params).fetchall()
+        return [dict(r) for r in rows]
+
+
+def reprice_tool_changes(start: Optional[str] = None, end: Optional[str] = None) -> int:
+    """
+    Re-prices saved tool changes (optionally between ISO dates start and end) at the
+    change cost in effect when each was made, overwriting the stored cost. One UPDATE
+    with an indexed lookup per row; tool_cost_rollup follows through its triggers.
+    Returns the number of entries whose cost changed.
+    """
+    where, params = ["e.tool_num <> ''", "e.ts IS NOT NULL"], []
+    if start:
+        where.append("e.date >= ?")
+        params.append(start)
+    if end:
+        where.append("e.date <= ?")
+        params.append(end)
+    cost_at = _TOOL_COST_AT_SQL.replace(":ts", "e.ts")
+    with connect() as conn:
+        cur = conn.execute(
+            f"""
+            UPDATE tool_entries AS e
+            SET cost = p.cost
+            FROM (
+                SELECT e.id, {cost_at} AS cost
+                FROM tool_entries e
+                JOIN tools t ON t.tool_num = e.tool_num
+                WHERE {' AND '.join(where)}
+            ) AS p
+            WHERE e.id = p.id AND e.cost IS NOT p.cost
+            """,
+            params,
+        )
+        return cur.rowcount
+
+
+_SPC_STATE_FIELDS = (
+    "series", "tool_num", "machine", "points", "baseline_sum", "baseline_mr_sum", "center", "sigma", "ucl",
+    "lcl", "mr_ucl", "last_value", "last_ts", "last_entry_id", "tail", "last_rules", "violation_ts",
+    "violation_entry_id", "violation_value", "violation_rules",
+)
+# One observation per row: the life a changed tool got (tool_life series, per tool
+# on a machine) and each non-shift-report downtime on a machine (downtime series).
+_SPC_POINTS_SQL = """
+    SELECT * FROM (
+        SELECT 'tool_life' AS series, tool_num, machine, id, ts, tool_life AS value FROM tool_entries
+        WHERE tool_num <> '' AND tool_life > 0 AND ts IS NOT NULL
+        UNION ALL
+        SELECT 'downtime' AS series, '' AS tool_num, machine, id, ts, downtime_mins AS value FROM tool_entries
+        WHERE reason <> 'Shift Production' AND downtime_mins > 0 AND ts IS NOT NULL
+    )
+"""
+
+
+def spc_points(
+    *,
+    keys: Optional[Sequence[Tuple[str, str, str]]] = None,
+    entry_ids: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Control-chart observations (series, tool_num, machine, id, ts, value) of the given
+    series keys or entries (everything when neither), oldest first within a series.
+    """
+    order = " ORDER BY series, tool_num, machine, ts, id"
+    with connect() as conn:
+        if keys is None and entry_ids is None:
+            return [dict(r) for r in conn.execute(_SPC_POINTS_SQL + order).fetchall()]
+        if entry_ids is not None:
+            where, slot, params = "id IN ({})", "?", [(i,) for i in entry_ids]
+        else:
+            where, slot, params = "(series, tool_num, machine) IN (VALUES {})", "(?, ?, ?)", [tuple(k) for k in keys]
+        out: List[Dict[str, Any]] = []
+        for start in range(0, len(params), 300):
+            chunk = params[start:start + 300]
+            rows = conn.execute(
+                _SPC_POINTS_SQL + " WHERE " + where.format(", ".join(slot for _ in chunk)),
+                [v for p in chunk for v in p],
+            ).fetchall()
+            out.extend(dict(r) for r in rows)
+        out.sort(key=lambda r: (r["series"], r["tool_num"], r["machine"], r["ts"], r["id"]))
+        return out
+
+
+def list_spc_state(
+    *,
+    keys: Optional[Sequence[Tuple[str, str, str]]] = None,
+    series: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Stored control-chart state of keys (series, tool_num, machine), of one series, or of all."""
+    sql = f"SELECT {', '.join(_SPC_STATE_FIELDS)}, stale FROM spc_state"
+    with connect() as conn:
+        if keys is None:
+            params: List[Any] = []
+            if series:
+                sql += " WHERE series=?"
+                params.append(series)
+            return [dict(r) for r in conn.execute(sql + " ORDER BY series, machine, tool_num", params).fetchall()]
+        out: List[Dict[str, Any]] = []
+        keys = list(keys)
+        for start in range(0, len(keys), 300):
+            chunk = keys[start:start + 300]
+            rows = conn.execute(
+                sql + f" WHERE (series, tool_num, machine) IN (VALUES {', '.join('(?, ?, ?)' for _ in chunk)})",
+                [v for k in chunk for v in k],
+            ).fetchall()
+            out.extend(dict(r) for r in rows)
+        return out
+
+
+def list_stale_spc_keys() -> List[Tuple[str, str, str]]:
+    with connect() as conn:
+        rows = conn.execute("SELECT series, tool_num, machine FROM spc_state WHERE stale = 1").fetchall()
+        return [(r["series"], r["tool_num"], r["machine"]) for r in rows]
+
+
+def replace_spc_state(
+    rows: Iterable[Dict[str, Any]],
+    *,
+    keys: Optional[Sequence[Tuple[str, str, str]]] = None,
+    meta: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Swaps the state of keys (every series when None) for rows in one transaction; a
+    key with no new row (all its points were deleted) drops out. meta is written in
+    the same transaction.
+    """
+    with connect() as conn:
+        if keys is None:
+            conn.execute("DELETE FROM spc_state")
+        else:
+            conn.executemany("DELETE FROM spc_state WHERE series=? AND tool_num=? AND machine=?", list(keys))
+        conn.executemany(
+            f"""
+            INSERT INTO spc_state({', '.join(_SPC_STATE_FIELDS)}, stale, updated_at)
+            VALUES({', '.join('?' * len(_SPC_STATE_FIELDS))}, 0, datetime('now'))
+            """,
+            [tuple(r.get(f) for f in _SPC_STATE_FIELDS) for r in rows],
+        )
+        for key, value in (meta or {}).items():
+            conn.execute(
+                "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (key, value),
+            )
+
+
+_EWMA_STATE_FIELDS = (
+    "metric", "scope", "key", "points", "mean", "var", "last_value", "last_ts", "last_entry_id", "last_z",
+    "anomaly_ts", "anomaly_entry_id", "anomaly_value", "anomaly_mean", "anomaly_sigma", "anomaly_z",
+)
+# Scope of an EWMA series -> the tool_entries column that names it.
+EWMA_SCOPE_COLUMNS = {"machine": "machine", "line": "line", "tool": "tool_num"}
+# One observation per entry and metric: the downtime of every entry outside shift
+# reports (a shift report's downtime is a shift total) and every entry's defect quantity.
+_EWMA_POINTS_SQL = """
+    SELECT * FROM (
+        SELECT 'downtime' AS metric, id, ts, machine, line, tool_num, downtime_mins AS value FROM tool_entries
+        WHERE reason <> 'Shift Production' AND ts IS NOT NULL
+        UNION ALL
+        SELECT 'defects' AS metric, id, ts, machine, line, tool_num, defect_qty AS value FROM tool_entries
+        WHERE ts IS NOT NULL
+    )
+"""
+
+
+def ewma_points(
+    *,
+    keys: Optional[Sequence[Tuple[str, str, str]]] = None,
+    entry_ids: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    EWMA observations (metric, id, ts, machine, line, tool_num, value) of the entries
+    given, or of every entry in the given series keys (metric, scope, key), or of all
+    entries when neither; oldest first.
+    """
+    order = " ORDER BY ts, id, metric"
+    with connect() as conn:
+        if keys is None and entry_ids is None:
+            return [dict(r) for r in conn.execute(_EWMA_POINTS_SQL + order).fetchall()]
+        groups: Dict[Tuple[str, str], List[str]] = {}
+        if entry_ids is not None:
+            groups[("", "id")] = list(entry_ids)
+        else:
+            for metric, scope, key in keys:
+                groups.setdefault((metric, EWMA_SCOPE_COLUMNS[scope]), []).append(key)
+        out: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for (metric, column), values in groups.items():
+            for start in range(0, len(values), 500):
+                chunk = values[start:start + 500]
+                sql = _EWMA_POINTS_SQL + f" WHERE {column} IN ({', '.join('?' * len(chunk))})"
+                params: List[Any] = list(chunk)
+                if metric:
+                    sql += " AND metric = ?"
+                    params.append(metric)
+                for r in conn.execute(sql, params).fetchall():
+                    out[(r["metric"], r["id"])] = dict(r)
+        return sorted(out.values(), key=lambda r: (r["ts"], r["id"], r["metric"]))
+
+
+def list_ewma_state(
+    *,
+    keys: Optional[Sequence[Tuple[str, str, str]]] = None,
+    metric: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Stored EWMA state of keys (metric, scope, key), of one metric, or of all."""
+    sql = f"SELECT {', '.join(_EWMA_STATE_FIELDS)}, stale FROM ewma_state"
+    with connect() as conn:
+        if keys is None:
+            params: List[Any] = []
+            if metric:
+                sql += " WHERE metric=?"
+                params.append(metric)
+            return [dict(r) for r in conn.execute(sql + " ORDER BY metric, scope, key", params).fetchall()]
+        out: List[Dict[str, Any]] = []
+        keys = list(keys)
+        for start in range(0, len(keys), 300):
+            chunk = keys[start:start + 300]
+            rows = conn.execute(
+                sql + f" WHERE (metric, scope, key) IN (VALUES {', '.join('(?, ?, ?)' for _ in chunk)})",
+                [v for k in chunk for v in k],
+            ).fetchall()
+            out.extend(dict(r) for r in rows)
+        return out
+
+
+def list_stale_ewma_keys() -> List[Tuple[str, str, str]]:
+    with connect() as conn:
+        rows = conn.execute("SELECT metric, scope, key FROM ewma_state WHERE stale = 1").fetchall()
+        return [(r["metric"], r["scope"], r["key"]) for r in rows]
+
+
+def replace_ewma_state(
+    rows: Iterable[Dict[str, Any]],
+    *,
+    keys: Optional[Sequence[Tuple[str, str, str]]] = None,
+    meta: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Swaps the state of keys (every series when None) for rows in one transaction; a
+    key with no new row drops out. meta is written in the same transaction.
+    """
+    with connect() as conn:
+        if keys is None:
+            conn.execute("DELETE FROM ewma_state")
+        else:
+            conn.executemany("DELETE FROM ewma_state WHERE metric=? AND scope=? AND key=?", list(keys))
+        conn.executemany(
+            f"""
+            INSERT INTO ewma_state({', '.join(_EWMA_STATE_FIELDS)}, stale, updated_at)
+            VALUES({', '.join('?' * len(_EWMA_STATE_FIELDS))}, 0, datetime('now'))
+            """,
+            [tuple(r.get(f) for f in _EWMA_STATE_FIELDS) for r in rows],
+        )
+        for key, value in (meta or {}).items():
+            conn.execute(
+                "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (key, value),
+            )
+
+
+def list_alerts(
+    *,
+    month: Optional[str] = None,
+    severities: Optional[Sequence[str]] = None,
+    include_acknowledged: bool = True,
+) -> List[Dict[str, Any]]:
+    """Active alerts; month keeps gage alerts plus entry alerts from that month."""
+    with connect() as conn:
+        sql = """
+            SELECT id, alert_key, type, severity, title, details, related_key, entry_id, entry_month,
+                   first_seen, last_seen, ack_by, ack_at
+            FROM alerts
+            WHERE is_active = 1
+        """
+        params: List[Any] = []
+        if month:
+            sql += " AND (entry_id IS NULL OR entry_month = ?)"
+            params.append(month)
+        if severities is not None:
+            sql += f" AND severity IN ({', '.join('?' * len(severities))})"
+            params.extend(severities)
+        if not include_acknowledged:
+            sql += " AND ack_by = ''"
+        sql += " ORDER BY last_seen DESC, id DESC"
+        rows = conn.execute(sql, params).fetchall()
+        return [dict(r) for r in rows]
+
+
+def acknowledge_alert(alert_id: int, username: str) -> bool:
+    with connect() as conn:
+        cur = conn.execute(
+            "UPDATE alerts SET ack_by=?, ack_at=? WHERE id=?",
+            (username or "", _now_timestamp(), alert_id),
+        )
+        return cur.rowcount > 0
+
+
+_GAGE_FIELDS = (
+    "gage_id", "name", "type", "line", "criticality", "notes",
+    "calibration_frequency_days", "last_calibration_date", "next_due_date",
+)
+
+
+def replace_gages(gages: Iterable[Dict[str, Any]]) -> None:
+    """Makes the gages table match the given gages (keyed by gage_id)."""
+    rows = [tuple(g.get(f, "") for f in _GAGE_FIELDS) for g in gages]
+    with connect() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _gage_ids(gage_id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM _gage_ids")
+        conn.executemany("INSERT OR IGNORE INTO _gage_ids(gage_id) VALUES(?)", [(r[0],) for r in rows])
+        conn.execute("DELETE FROM gages WHERE gage_id NOT IN (SELECT gage_id FROM _gage_ids)")
+        conn.executemany(
+            f"""
+            INSERT INTO gages({', '.join(_GAGE_FIELDS)}, updated_at)
+            VALUES({', '.join('?' * len(_GAGE_FIELDS))}, datetime('now'))
+            ON CONFLICT(gage_id) DO UPDATE SET
+                {', '.join(f'{f}=excluded.{f}' for f in _GAGE_FIELDS[1:])},
+                updated_at=excluded.updated_at
+            """,
+            rows,
+        )
+
+
+def list_gages() -> List[Dict[str, Any]]:
+    with connect() as conn:
+        rows = conn.execute(f"SELECT {', '.join(_GAGE_FIELDS)} FROM gages ORDER BY gage_id").fetchall()
+        return [dict(r) for r in rows]
+
+
+def list_gages_due_by(due_by: str) -> List[Dict[str, Any]]:
+    """Gages whose next_due_date (YYYY-MM-DD) is on or before due_by, soonest first."""
+    with connect() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {', '.join(_GAGE_FIELDS)} FROM gages
+            WHERE next_due_date > '' AND next_due_date <= ?
+            ORDER BY next_due_date
+            """,
+            (due_by,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
 def upsert_action(action: Dict[str, Any]) -> Dict[str, Any]:
     action_id = action.get("action_id")
     if not action_id:
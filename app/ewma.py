@@ -0,0 +1,264 @@
+# app/ewma.py
+"""
+Early warning on downtime and defects: exponentially weighted moving averages.
+
+Every entry is one observation per metric:
+- downtime: the minutes of each entry outside shift reports
+  (a shift report's downtime is a shift total, not one event)
+- defects: each entry's defect quantity
+and counts toward a series per machine, per line and per tool it names.
+
+A series keeps only its exponentially weighted mean and variance (weight alpha on
+the newest point), so a new entry costs O(1) per series however long the history.
+Before a point is folded in it is scored against the running figures,
+z = (x - mean) / max(sigma, min_sigma); once a series has warmup_points, a point
+more than k_sigma above its mean is an anomaly. Only the high side counts: less
+downtime or fewer defects is never a problem.
+
+ewma_state keeps, per series, the running figures, its last point and its last
+anomaly. refresh_ewma() carries the series touched since its watermark on
+tool_entry_changes forward from that state alone; a series with an edited or
+deleted row, or a new point older than its last, is replayed from history.
+Series with an anomaly within alert_days raise "EWMA" alerts.
+"""
+from __future__ import annotations
+
+import calendar
+import hashlib
+import json
+import math
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .alert_store import publish_alerts
+from .config import DEFAULT_EWMA_CONFIG, EWMA_CONFIG_FILE
+from .db import (
+    EWMA_SCOPE_COLUMNS,
+    ewma_points,
+    get_meta,
+    list_changed_tool_entries,
+    list_ewma_state,
+    list_stale_ewma_keys,
+    replace_ewma_state,
+    set_meta,
+)
+from .storage import load_json, safe_float, safe_int
+from .tool_life_model import format_ts
+
+EWMA_SEQ_KEY = "ewma_seq"
+EWMA_STAMP_KEY = "ewma_stamp"
+EWMA_ALERT_DAY_KEY = "ewma_alert_day"
+EWMA_BATCH_SIZE = 5000
+ALERT_TYPE = "EWMA"
+
+METRIC_TITLES = {"downtime": "Downtime", "defects": "Defects"}
+SCOPE_TITLES = {"machine": "Machine", "line": "Line", "tool": "Tool"}
+
+Key = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class EwmaSettings:
+    alpha: float = 0.1
+    k_sigma: float = 3.0
+    warmup_points: int = 10
+    min_sigma: Dict[str, float] = field(default_factory=lambda: {"downtime": 1.0, "defects": 1.0})
+    metrics: Tuple[str, ...] = ("downtime", "defects")
+    scopes: Tuple[str, ...] = ("machine", "line", "tool")
+    alert_days: int = 3
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> "EwmaSettings":
+        cfg = cfg or {}
+        alpha = safe_float(cfg.get("alpha", 0.1), 0.1)
+        min_sigma = cfg.get("min_sigma", {}) or {}
+        return cls(
+            alpha=alpha if 0 < alpha <= 1 else 0.1,
+            k_sigma=max(safe_float(cfg.get("k_sigma", 3.0), 3.0), 0.0),
+            warmup_points=max(safe_int(cfg.get("warmup_points", 10), 10), 2),
+            min_sigma={str(k): max(safe_float(v, 0.0), 0.0) for k, v in min_sigma.items()},
+            metrics=tuple(m for m in METRIC_TITLES if m in (cfg.get("metrics") or list(METRIC_TITLES))),
+            scopes=tuple(s for s in SCOPE_TITLES if s in (cfg.get("scopes") or list(SCOPE_TITLES))),
+            alert_days=max(safe_int(cfg.get("alert_days", 3), 3), 0),
+        )
+
+
+def load_ewma_settings() -> EwmaSettings:
+    return EwmaSettings.from_config(load_json(EWMA_CONFIG_FILE, DEFAULT_EWMA_CONFIG))
+
+
+def series_keys(point: Mapping[str, Any], settings: EwmaSettings) -> List[Key]:
+    """The series (metric, scope, key) an ewma_points row counts toward."""
+    metric = str(point["metric"])
+    if metric not in settings.metrics:
+        return []
+    keys = []
+    for scope in settings.scopes:
+        key = str(point.get(EWMA_SCOPE_COLUMNS[scope]) or "")
+        if key:
+            keys.append((metric, scope, key))
+    return keys
+
+
+def update_state(state: Dict[str, Any], point: Mapping[str, Any], settings: EwmaSettings) -> Optional[float]:
+    """
+    Scores point against state's running mean and sigma, then folds it in; O(1).
+    Returns the point's z (None for a series' first point). state is updated in place.
+    """
+    x = safe_float(point["value"], 0.0)
+    n = int(state.get("points") or 0)
+    mean, var = float(state.get("mean") or 0.0), float(state.get("var") or 0.0)
+    z: Optional[float] = None
+    if n == 0:
+        mean, var = x, 0.0
+    else:
+        sigma = max(math.sqrt(var), settings.min_sigma.get(state["metric"], 0.0))
+        if sigma > 0:
+            z = (x - mean) / sigma
+        if n >= settings.warmup_points and z is not None and z > settings.k_sigma:
+            state.update({
+                "anomaly_ts": point["ts"],
+                "anomaly_entry_id": str(point["id"]),
+                "anomaly_value": x,
+                "anomaly_mean": mean,
+                "anomaly_sigma": sigma,
+                "anomaly_z": z,
+            })
+        diff = x - mean
+        incr = settings.alpha * diff
+        mean += incr
+        var = (1 - settings.alpha) * (var + diff * incr)
+    state.update({
+        "points": n + 1,
+        "mean": mean,
+        "var": var,
+        "last_value": x,
+        "last_ts": point["ts"],
+        "last_entry_id": str(point["id"]),
+        "last_z": z,
+    })
+    return z
+
+
+def _blank_state(key: Key) -> Dict[str, Any]:
+    return {
+        "metric": key[0], "scope": key[1], "key": key[2], "points": 0, "mean": 0.0, "var": 0.0,
+        "anomaly_ts": None, "anomaly_entry_id": "", "anomaly_value": None, "anomaly_mean": None,
+        "anomaly_sigma": None, "anomaly_z": None,
+    }
+
+
+def evaluate_points(
+    points: Iterable[Mapping[str, Any]],
+    states: Mapping[Key, Mapping[str, Any]],
+    settings: EwmaSettings,
+    *,
+    keys: Optional[Set[Key]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    The new ewma_state row of every series points (db.ewma_points rows, oldest first)
+    count toward, carried on from states[key] where there is one. keys limits the
+    series kept.
+    """
+    work: Dict[Key, Dict[str, Any]] = {}
+    for p in points:
+        for key in series_keys(p, settings):
+            if keys is not None and key not in keys:
+                continue
+            state = work.get(key)
+            if state is None:
+                state = work[key] = {**_blank_state(key), **dict(states.get(key) or {})}
+            update_state(state, p, settings)
+    return list(work.values())
+
+
+def ewma_alerts(states: Iterable[Mapping[str, Any]], settings: EwmaSettings, now: datetime) -> List[Dict[str, Any]]:
+    """A series with an anomaly in the last alert_days: High at twice k_sigma or more, else Medium."""
+    since = calendar.timegm(now.timetuple()) - settings.alert_days * 86400
+    alerts = []
+    for s in states:
+        if s.get("anomaly_ts") is None or int(s["anomaly_ts"]) < since:
+            continue
+        z = float(s["anomaly_z"] or 0.0)
+        unit = " min" if s["metric"] == "downtime" else ""
+        details = (
+            f"{SCOPE_TITLES.get(s['scope'], s['scope'])} {s['key']}: {float(s['anomaly_value'] or 0.0):g}{unit} "
+            f"at {format_ts(s['anomaly_ts'])}, {z:.1f} sigma above its running mean "
+            f"{float(s['anomaly_mean'] or 0.0):.1f} (sigma {float(s['anomaly_sigma'] or 0.0):.1f})"
+        )
+        alerts.append({
+            "severity": "High" if z >= 2 * settings.k_sigma else "Medium",
+            "type": ALERT_TYPE,
+            "title": f"{METRIC_TITLES.get(s['metric'], s['metric'])} Anomaly",
+            "details": details,
+            "related": {"metric": s["metric"], "scope": s["scope"], "key": s["key"]},
+        })
+    return alerts
+
+
+def _stamp(cfg: Dict[str, Any]) -> str:
+    payload = json.dumps(cfg, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _key(row: Mapping[str, Any]) -> Key:
+    return (str(row["metric"]), str(row["scope"]), str(row["key"]))
+
+
+def refresh_ewma(batch_size: int = EWMA_BATCH_SIZE, now: Optional[datetime] = None) -> int:
+    """
+    Brings ewma_state up to date with the entries written since the last run (every
+    series again when ewma_config.json changed) and re-raises EWMA alerts. Returns how
+    many series were updated.
+    """
+    now = now or datetime.now()
+    cfg = load_json(EWMA_CONFIG_FILE, DEFAULT_EWMA_CONFIG) or {}
+    settings = EwmaSettings.from_config(cfg)
+    stamp = _stamp(cfg)
+    stored_seq = get_meta(EWMA_SEQ_KEY) or "0"
+    full = get_meta(EWMA_STAMP_KEY) != stamp
+
+    after = int(stored_seq)
+    changed_ids: List[str] = []
+    while True:
+        changed = list_changed_tool_entries(after, batch_size)
+        if not changed:
+            break
+        after = changed[-1][1]
+        if not full:
+            changed_ids.extend(entry_id for entry_id, _ in changed)
+    meta = {EWMA_SEQ_KEY: str(after), EWMA_STAMP_KEY: stamp}
+
+    if full:
+        rows = evaluate_points(ewma_points(), {}, settings)
+        replace_ewma_state(rows, keys=None, meta=meta)
+        updated = len(rows)
+    else:
+        replay: Set[Key] = set(list_stale_ewma_keys())
+        new_points = ewma_points(entry_ids=changed_ids) if changed_ids else []
+        touched = {k for p in new_points for k in series_keys(p, settings)}
+        states = {_key(s): s for s in list_ewma_state(keys=sorted(touched - replay))}
+        for p in new_points:
+            for key in series_keys(p, settings):
+                state = states.get(key)
+                # A point dated before the series' last has to be replayed in order.
+                if state and (p["ts"], str(p["id"])) <= (state["last_ts"], state["last_entry_id"]):
+                    replay.add(key)
+        if not replay and not touched and str(after) == stored_seq:
+            if get_meta(EWMA_ALERT_DAY_KEY) != now.date().isoformat():
+                _publish(settings, now)
+            return 0
+        rows = evaluate_points(new_points, states, settings, keys=touched - replay)
+        if replay:
+            rows += evaluate_points(ewma_points(keys=sorted(replay)), {}, settings, keys=replay)
+        keys = sorted(replay | touched)
+        replace_ewma_state(rows, keys=keys, meta=meta)
+        updated = len(keys)
+    _publish(settings, now)
+    return updated
+
+
+def _publish(settings: EwmaSettings, now: datetime) -> None:
+    publish_alerts(ewma_alerts(list_ewma_state(), settings, now), ALERT_TYPE)
+    set_meta(EWMA_ALERT_DAY_KEY, now.date().isoformat())
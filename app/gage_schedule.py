@@ -0,0 +1,176 @@
+# app/gage_schedule.py
+"""
+Calibration due dates for gages, kept in SQLite.
+
+gages.json is still where gages are maintained; sync_gages() mirrors it into the gages
+table and works out next_due_date (last calibration + frequency) only for gages whose
+calibration data changed. Due-soon/overdue lookups are then a range scan on the indexed
+next_due_date, and GageScheduler says when the next gage will cross a threshold.
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .coercion import parse_date
+from .config import GAGES_FILE, RISK_CONFIG_FILE
+from . import db
+from .db import get_meta, list_gages, list_gages_due_by, replace_gages, set_meta
+from .storage import load_json, safe_int
+
+GAGES_FINGERPRINT_KEY = "gages_json_fingerprint"
+
+# (db path, gages.json path, mtime_ns, size) last synced by this process
+_synced_stat: Optional[Tuple[str, str, int, int]] = None
+
+
+def due_soon_days(risk_cfg: Optional[Dict[str, Any]] = None) -> int:
+    if risk_cfg is None:
+        risk_cfg = load_json(RISK_CONFIG_FILE, {}) or {}
+    rules = (risk_cfg or {}).get("rules", {}) or {}
+    return safe_int((rules.get("gage_calibration_escalation", {}) or {}).get("due_soon_days", 14), 14)
+
+
+def _next_due(last_calibration_date: str, frequency_days: int) -> str:
+    last = parse_date(last_calibration_date)
+    if not last or frequency_days <= 0:
+        return ""
+    return (last + timedelta(days=frequency_days)).strftime("%Y-%m-%d")
+
+
+def sync_gages(store: Optional[Dict[str, Any]] = None, force: bool = False) -> bool:
+    """
+    Mirrors gages.json (or store) into the gages table; returns True if anything was
+    rewritten. An unchanged file is skipped on its stat, then on its content hash.
+    """
+    global _synced_stat
+    if store is None:
+        try:
+            st = os.stat(GAGES_FILE)
+            stat_key = (db.DB_PATH, GAGES_FILE, st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat_key = None
+        if not force and stat_key is not None and stat_key == _synced_stat:
+            return False
+        store = load_json(GAGES_FILE, {"gages": []}) or {}
+    else:
+        stat_key = None
+
+    gages = [g for g in (store.get("gages", []) or []) if g.get("gage_id")]
+    fingerprint = hashlib.sha256(json.dumps(gages, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    if not force and get_meta(GAGES_FINGERPRINT_KEY) == fingerprint:
+        _synced_stat = stat_key
+        return False
+
+    known = {g["gage_id"]: g for g in list_gages()}
+    rows = []
+    for g in gages:
+        gid = str(g.get("gage_id"))
+        last = str(g.get("last_calibration_date", "") or "").strip()
+        freq = safe_int(g.get("calibration_frequency_days", 0), 0)
+        old = known.get(gid)
+        if old and old["last_calibration_date"] == last and old["calibration_frequency_days"] == freq:
+            next_due = old["next_due_date"]
+        else:
+            next_due = _next_due(last, freq)
+        rows.append({
+            "gage_id": gid,
+            "name": str(g.get("name", "") or ""),
+            "type": str(g.get("type", "") or ""),
+            "line": str(g.get("line", "") or ""),
+            "criticality": str(g.get("criticality", "Medium") or "Medium"),
+            "notes": str(g.get("notes", "") or ""),
+            "calibration_frequency_days": freq,
+            "last_calibration_date": last,
+            "next_due_date": next_due,
+        })
+    replace_gages(rows)
+    set_meta(GAGES_FINGERPRINT_KEY, fingerprint)
+    _synced_stat = stat_key
+    return True
+
+
+def gage_status(next_due_date: str, today: date, soon_days: int) -> Tuple[str, Optional[int]]:
+    """(status, days_until_due) from a stored next_due_date, as gage_due_status reports them."""
+    if not next_due_date:
+        return "Unknown", None
+    days_until = (date.fromisoformat(next_due_date) - today).days
+    if days_until < 0:
+        return "Overdue", days_until
+    if days_until <= soon_days:
+        return "Due Soon", days_until
+    return "OK", days_until
+
+
+def _with_status(row: Dict[str, Any], today: date, soon_days: int) -> Dict[str, Any]:
+    status, days_until = gage_status(row["next_due_date"], today, soon_days)
+    return {**row, "status": status, "days_until_due": days_until}
+
+
+def gages_due(
+    today: Optional[date] = None,
+    risk_cfg: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Overdue and due-soon gages, soonest first, each with status and days_until_due."""
+    sync_gages()
+    today = today or datetime.now().date()
+    soon_days = due_soon_days(risk_cfg)
+    due_by = (today + timedelta(days=soon_days)).strftime("%Y-%m-%d")
+    return [_with_status(row, today, soon_days) for row in list_gages_due_by(due_by)]
+
+
+def gage_statuses(
+    today: Optional[date] = None,
+    risk_cfg: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Every gage by gage_id, with status and days_until_due from its stored due date."""
+    sync_gages()
+    today = today or datetime.now().date()
+    soon_days = due_soon_days(risk_cfg)
+    return {row["gage_id"]: _with_status(row, today, soon_days) for row in list_gages()}
+
+
+class GageScheduler:
+    """
+    Min-heap of the date each gage next changes status (OK -> Due Soon -> Overdue).
+    poll(today) pops the crossings that have happened, so callers only redo
+    calibration work on days something actually moved.
+    """
+
+    def __init__(self, soon_days: int) -> None:
+        self.soon_days = soon_days
+        self._heap: List[Tuple[date, str, str]] = []
+
+    def _push_next(self, gage_id: str, next_due_date: str, today: date) -> None:
+        status, _ = gage_status(next_due_date, today, self.soon_days)
+        if status == "OK":
+            due = date.fromisoformat(next_due_date)
+            heapq.heappush(self._heap, (due - timedelta(days=self.soon_days), gage_id, "Due Soon"))
+        elif status == "Due Soon":
+            due = date.fromisoformat(next_due_date)
+            heapq.heappush(self._heap, (due + timedelta(days=1), gage_id, "Overdue"))
+
+    @classmethod
+    def from_gages(cls, gages: List[Dict[str, Any]], today: date, soon_days: int) -> "GageScheduler":
+        scheduler = cls(soon_days)
+        for g in gages:
+            scheduler._push_next(g["gage_id"], g["next_due_date"], today)
+        return scheduler
+
+    def next_event_date(self) -> Optional[date]:
+        return self._heap[0][0] if self._heap else None
+
+    def poll(self, today: date) -> List[Dict[str, Any]]:
+        """Crossings on or before today, oldest first: {gage_id, status, on}."""
+        events = []
+        while self._heap and self._heap[0][0] <= today:
+            on, gage_id, status = heapq.heappop(self._heap)
+            events.append({"gage_id": gage_id, "status": status, "on": on})
+            if status == "Due Soon":
+                due = on + timedelta(days=self.soon_days)
+                heapq.heappush(self._heap, (due + timedelta(days=1), gage_id, "Overdue"))
+        return events
@@ -0,0 +1,294 @@
+# app/health_engine.py
+"""
+Data health checks for tool_entries.
+
+Each check is a vectorized rule registered with @health_rule: it gets a frame of
+entries plus a HealthContext and returns the issue rows it found. run_health_checks()
+stores the results in health_issues and, between runs, only re-checks entries that
+tool_entry_changes says were written. Rules marked time_dependent (overdue actions,
+gage calibration) are re-run over all entries when the date or gage/risk config moves.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .coercion import to_date_series, to_int_series
+from .config import RISK_CONFIG_FILE
+from .db import (
+    fetch_tool_entries_by_ids,
+    get_meta,
+    iter_tool_entries,
+    list_changed_tool_entries,
+    replace_health_issues,
+)
+from .gage_schedule import gage_statuses
+from .storage import _DB_TO_FRAME_COLUMNS, load_json
+
+HEALTH_SEQ_KEY = "health_check_seq"
+HEALTH_CONTEXT_KEY = "health_check_context"
+CHECK_BATCH_SIZE = 5000
+
+REQUIRED_FIELDS = ("Line", "Machine", "Tool_Num", "Reason", "Part_Number")
+ISSUE_COLUMNS = ["entry_id", "rule", "detail", "severity", "category", "issue", "suggestion", "entry_month"]
+
+_FRAME_TO_DB_COLUMNS = {frame: col for col, frame in _DB_TO_FRAME_COLUMNS.items()}
+
+
+@dataclass(frozen=True)
+class HealthContext:
+    """Inputs the rules need besides the entries themselves."""
+    today: date
+    gage_status: Dict[str, Dict[str, str]]
+
+    @classmethod
+    def load(cls, today: Optional[date] = None) -> "HealthContext":
+        today = today or datetime.now().date()
+        risk_cfg = load_json(RISK_CONFIG_FILE, {}) or {}
+        gage_status = {
+            gid: {"status": g["status"], "next_due": g["next_due_date"], "criticality": g["criticality"]}
+            for gid, g in gage_statuses(today, risk_cfg).items()
+        }
+        return cls(today=today, gage_status=gage_status)
+
+    def fingerprint(self) -> str:
+        payload = json.dumps(
+            {"today": self.today.isoformat(), "gages": self.gage_status},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class HealthRule:
+    name: str
+    columns: Tuple[str, ...]
+    check: Callable[[pd.DataFrame, HealthContext], List[pd.DataFrame]]
+    time_dependent: bool = False
+
+
+HEALTH_RULES: Dict[str, HealthRule] = {}
+
+
+def health_rule(name: str, columns: Sequence[str], *, time_dependent: bool = False):
+    """Registers a rule; rules run in registration order."""
+    def register(fn):
+        HEALTH_RULES[name] = HealthRule(name, tuple(columns), fn, time_dependent)
+        return fn
+    return register
+
+
+def _text(df: pd.DataFrame, col: str) -> pd.Series:
+    """str(value or "").strip() for a whole column; a missing column reads as blank."""
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    s = df[col]
+    return s.where(s.notna(), "").astype(str).str.strip()
+
+
+def _found(
+    df: pd.DataFrame,
+    mask: pd.Series,
+    rule: str,
+    severity: Any,
+    category: str,
+    issue: Any,
+    suggestion: str,
+    detail: str = "",
+) -> pd.DataFrame:
+    """Issue rows for the entries where mask is set; severity/issue may be per-row Series."""
+    mask = mask.to_numpy(dtype=bool)
+
+    def pick(value: Any) -> Any:
+        return value.to_numpy()[mask] if isinstance(value, pd.Series) else value
+
+    return pd.DataFrame({
+        "position": np.flatnonzero(mask),
+        "entry_id": _text(df, "ID").to_numpy()[mask],
+        "rule": rule,
+        "detail": detail,
+        "severity": pick(severity),
+        "category": category,
+        "issue": pick(issue),
+        "suggestion": suggestion,
+        "entry_month": _text(df, "Date").str[:7].to_numpy()[mask],
+    })
+
+
+@health_rule("missing_field", REQUIRED_FIELDS)
+def _missing_fields(df: pd.DataFrame, ctx: HealthContext) -> List[pd.DataFrame]:
+    return [
+        _found(df, _text(df, col).eq(""), "missing_field", "High", "Missing Field",
+               f"Missing required field: {col}",
+               f"Fill {col} before saving/closing.", detail=col)
+        for col in REQUIRED_FIELDS
+    ]
+
+
+@health_rule("defects_qty", ("Defects_Present", "Defect_Qty"))
+def _defects_qty(df: pd.DataFrame, ctx: HealthContext) -> List[pd.DataFrame]:
+    present = _text(df, "Defects_Present").str.lower()
+    qty = to_int_series(df["Defect_Qty"], 0) if "Defect_Qty" in df.columns else pd.Series(0, index=df.index)
+    return [
+        _found(df, present.eq("yes") & qty.le(0), "defects_qty", "High", "Defects Logic",
+               "Defects_Present=Yes but Defect_Qty is 0/blank",
+               "Enter a valid defect quantity (or set Defects_Present=No).", detail="yes_without_qty"),
+        _found(df, present.eq("no") & qty.gt(0), "defects_qty", "Medium", "Defects Logic",
+               "Defects_Present=No but Defect_Qty > 0",
+               "Set Defects_Present=Yes or set Defect_Qty to 0.", detail="no_with_qty"),
+    ]
+
+
+@health_rule("defect_code", ("Defects_Present", "Defect_Code"))
+def _defect_code(df: pd.DataFrame, ctx: HealthContext) -> List[pd.DataFrame]:
+    mask = _text(df, "Defects_Present").str.lower().eq("yes") & _text(df, "Defect_Code").eq("")
+    return [
+        _found(df, mask, "defect_code", "High", "Defect Classification",
+               "Defects present but Defect_Code is blank",
+               "Select a Defect_Code for Pareto and NCR tracking."),
+    ]
+
+
+@health_rule("qc_workflow", ("QC_Status", "Quality_User", "Quality_Time"))
+def _qc_workflow(df: pd.DataFrame, ctx: HealthContext) -> List[pd.DataFrame]:
+    qc_status = _text(df, "QC_Status")
+    unsigned = _text(df, "Quality_User").eq("") | _text(df, "Quality_Time").eq("")
+    return [
+        _found(df, qc_status.isin(["Verified", "Closed"]) & unsigned, "qc_workflow", "Medium", "QC Workflow",
+               "QC_Status=" + qc_status + " but missing Quality_User/Quality_Time",
+               "Set Quality_User and Quality_Time when verifying."),
+    ]
+
+
+@health_rule("ncr_close", ("NCR_ID", "NCR_Status", "NCR_Close_Date"))
+def _ncr_close(df: pd.DataFrame, ctx: HealthContext) -> List[pd.DataFrame]:
+    mask = _text(df, "NCR_ID").ne("") & _text(df, "NCR_Status").eq("Closed") & _text(df, "NCR_Close_Date").eq("")
+    return [
+        _found(df, mask, "ncr_close", "High", "NCR",
+               "NCR_Status=Closed but NCR_Close_Date is blank",
+               "Enter NCR_Close_Date or reopen the NCR."),
+    ]
+
+
+def overdue_actions(df: pd.DataFrame, today: date) -> pd.Series:
+    """Rows whose action is still open (Open/Overdue) and was due before today."""
+    open_action = _text(df, "Action_Status").isin(["Open", "Overdue"])
+    due = to_date_series(_text(df, "Action_Due_Date"))
+    # A due date before today's midnight falls on an earlier day, time of day or not.
+    return open_action & (due < pd.Timestamp(today))
+
+
+@health_rule("action_overdue", ("Action_Status", "Action_Due_Date"), time_dependent=True)
+def _action_overdue(df: pd.DataFrame, ctx: HealthContext) -> List[pd.DataFrame]:
+    mask = overdue_actions(df, ctx.today)
+    due = to_date_series(_text(df, "Action_Due_Date"))
+    return [
+        _found(df, mask, "action_overdue", "High", "Actions",
+               "Action is overdue (due " + due.dt.strftime("%Y-%m-%d").fillna("") + ")",
+               "Complete the action or update the due date/owner."),
+    ]
+
+
+@health_rule("gage_calibration", ("Gage_Used",), time_dependent=True)
+def _gage_calibration(df: pd.DataFrame, ctx: HealthContext) -> List[pd.DataFrame]:
+    gage = _text(df, "Gage_Used")
+    used = gage.ne("")
+    known = gage.isin(list(ctx.gage_status))
+    status = gage.map({gid: gs["status"] for gid, gs in ctx.gage_status.items()}).fillna("")
+    crit = gage.map({gid: gs["criticality"] for gid, gs in ctx.gage_status.items()}).fillna("")
+    next_due = gage.map({gid: gs["next_due"] for gid, gs in ctx.gage_status.items()}).fillna("")
+    overdue = used & status.eq("Overdue")
+    detail = " (criticality=" + crit + ", due " + next_due + ")"
+    return [
+        _found(df, overdue, "gage_calibration",
+               pd.Series(np.where(crit.isin(["High", "Critical"]), "Critical", "High"), index=df.index),
+               "Gage Calibration",
+               "Gage " + gage + " is Overdue" + detail,
+               "Stop using this gage until calibrated (or correct last calibration date).", detail="overdue"),
+        _found(df, used & status.eq("Due Soon"), "gage_calibration", "Medium", "Gage Calibration",
+               "Gage " + gage + " is Due Soon" + detail,
+               "Plan calibration before due date to avoid escalation.", detail="due_soon"),
+        _found(df, used & ~known, "gage_calibration", "Medium", "Gage Calibration",
+               "Gage_Used=" + gage + " not found in gages.json",
+               "Add gage in Gages & Calibration Manager or correct the gage ID.", detail="unknown"),
+    ]
+
+
+def evaluate_frame(
+    df: pd.DataFrame,
+    ctx: Optional[HealthContext] = None,
+    rules: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Runs rules (all registered rules when None) over df and returns one row per issue
+    (ISSUE_COLUMNS), ordered by entry position and then rule order.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    ctx = ctx or HealthContext.load()
+    selected = [HEALTH_RULES[name] for name in rules] if rules is not None else list(HEALTH_RULES.values())
+    parts = [part for rule in selected for part in rule.check(df, ctx) if not part.empty]
+    if not parts:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    found = pd.concat(parts, ignore_index=True)
+    found = found.sort_values("position", kind="stable")
+    return found[ISSUE_COLUMNS].reset_index(drop=True)
+
+
+def _db_columns(rules: Sequence[HealthRule]) -> List[str]:
+    wanted = ["ID", "Date"] + [c for rule in rules for c in rule.columns]
+    cols: List[str] = []
+    for frame_col in wanted:
+        col = _FRAME_TO_DB_COLUMNS.get(frame_col)
+        # Columns tool_entries doesn't have (Defect_Code) read as blank.
+        if col and col not in cols:
+            cols.append(col)
+    return cols
+
+
+def _entries_frame(rows: List[Dict[str, Any]], columns: Sequence[str]) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=list(columns))
+    return df.rename(columns=_DB_TO_FRAME_COLUMNS)
+
+
+def run_health_checks(batch_size: int = CHECK_BATCH_SIZE, ctx: Optional[HealthContext] = None) -> int:
+    """
+    Brings health_issues up to date and returns how many entries were re-checked.
+    Entries written since the last run are re-checked in batches, each committed with
+    its watermark. Time-dependent rules re-run over every entry first when the context
+    fingerprint (today's date, gage statuses) differs from the last run's.
+    """
+    ctx = ctx or HealthContext.load()
+    fingerprint = ctx.fingerprint()
+    if get_meta(HEALTH_CONTEXT_KEY) != fingerprint:
+        timed = [rule for rule in HEALTH_RULES.values() if rule.time_dependent]
+        cols = _db_columns(timed)
+        df = _entries_frame([tuple(r) for r in iter_tool_entries(columns=cols)], cols)
+        issues = evaluate_frame(df, ctx, [rule.name for rule in timed])
+        replace_health_issues(
+            issues.to_dict("records"),
+            rules=[rule.name for rule in timed],
+            meta={HEALTH_CONTEXT_KEY: fingerprint},
+        )
+
+    cols = _db_columns(list(HEALTH_RULES.values()))
+    after = int(get_meta(HEALTH_SEQ_KEY) or 0)
+    checked = 0
+    while True:
+        changed = list_changed_tool_entries(after, batch_size)
+        if not changed:
+            break
+        ids = [entry_id for entry_id, _ in changed]
+        after = changed[-1][1]
+        df = _entries_frame(fetch_tool_entries_by_ids(ids, cols), cols)
+        issues = evaluate_frame(df, ctx)
+        replace_health_issues(issues.to_dict("records"), entry_ids=ids, meta={HEALTH_SEQ_KEY: str(after)})
+        checked += len(ids)
+    return checked
@@ -0,0 +1,174 @@
+# app/inventory_forecast.py
+"""
+Tool stock forecasting and reorder points.
+
+Every tool change takes one tool out of stock, so a tool's consumption rate is its
+changes over inventory_config.json's window_days, summed over lines by a windowed SQL
+aggregate (db.tool_consumption_by_line), which also gives the busiest 7 days in the
+window. From the rate, stock and lead time each tool gets a projected stock-out date,
+a reorder point (lead-time demand at the busier of the two rates, plus safety_days),
+and an order-up-to level that adds review_days.
+
+Results are materialized in tool_stock_forecast. A tool change refreshes only that
+tool; everything is recomputed when the date or the config changes. Tools at or
+below their reorder point raise "Inventory" alerts before they run out.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from .alert_store import publish_alerts
+from .config import DEFAULT_INVENTORY_CONFIG, INVENTORY_CONFIG_FILE
+from .db import get_meta, list_tool_forecasts, list_tools_simple, replace_tool_forecasts, tool_consumption_by_line
+from .storage import load_json, safe_int
+
+FORECAST_STAMP_KEY = "inventory_forecast_stamp"
+ALERT_TYPE = "Inventory"
+
+
+@dataclass(frozen=True)
+class InventoryRules:
+    window_days: int = 28
+    default_lead_time_days: int = 14
+    safety_days: int = 7
+    review_days: int = 14
+    lead_time_days_by_tool: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> "InventoryRules":
+        cfg = cfg or {}
+        by_tool = cfg.get("lead_time_days_by_tool", {}) or {}
+        return cls(
+            window_days=max(safe_int(cfg.get("window_days", 28), 28), 1),
+            default_lead_time_days=max(safe_int(cfg.get("default_lead_time_days", 14), 14), 0),
+            safety_days=max(safe_int(cfg.get("safety_days", 7), 7), 0),
+            review_days=max(safe_int(cfg.get("review_days", 14), 14), 0),
+            lead_time_days_by_tool={str(k): max(safe_int(v, 0), 0) for k, v in by_tool.items()},
+        )
+
+    def lead_time_days(self, tool_num: str) -> int:
+        return self.lead_time_days_by_tool.get(str(tool_num), self.default_lead_time_days)
+
+
+def forecast_tool(
+    tool: Dict[str, Any],
+    line_rows: List[Dict[str, Any]],
+    rules: InventoryRules,
+    today: date,
+) -> Dict[str, Any]:
+    """The tool_stock_forecast row for one tool, from its per-line consumption rows."""
+    tool_num = str(tool["tool_num"])
+    stock = safe_int(tool.get("stock_qty", 0), 0)
+    changes = sum(int(r["window_changes"]) for r in line_rows)
+    rate = changes / rules.window_days
+    peak_rate = max((int(r["peak_week_changes"] or 0) for r in line_rows), default=0) / 7.0
+    lead = rules.lead_time_days(tool_num)
+
+    reorder_point = math.ceil(max(rate, peak_rate) * lead + rate * rules.safety_days)
+    order_up_to = reorder_point + math.ceil(rate * rules.review_days)
+    days_of_stock = max(stock, 0) / rate if rate > 0 else None
+    stockout = (today + timedelta(days=math.floor(days_of_stock))).isoformat() if days_of_stock is not None else ""
+
+    if stock <= 0:
+        status = "Out"
+    elif rate <= 0:
+        status = "No Usage"
+    elif stock <= reorder_point:
+        status = "Reorder"
+    else:
+        status = "OK"
+    return {
+        "tool_num": tool_num,
+        "stock_qty": stock,
+        "window_days": rules.window_days,
+        "window_changes": changes,
+        "rate_per_day": rate,
+        "peak_rate_per_day": peak_rate,
+        "lead_time_days": lead,
+        "days_of_stock": days_of_stock,
+        "stockout_date": stockout,
+        "reorder_point": reorder_point,
+        "order_up_to": order_up_to,
+        "suggested_order_qty": max(order_up_to - stock, 0) if status in ("Out", "Reorder") else 0,
+        "status": status,
+        "computed_for": today.isoformat(),
+    }
+
+
+def stock_alerts(forecasts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Out of stock is Critical, a stock-out inside the lead time High, below reorder point
+    Medium. Tools nobody has changed in the window don't alert, stocked or not.
+    """
+    alerts = []
+    for f in forecasts:
+        if f["rate_per_day"] <= 0:
+            continue
+        if f["status"] == "Out":
+            severity, title = "Critical", "Tool Out of Stock"
+        elif f["status"] != "Reorder":
+            continue
+        elif f["days_of_stock"] is not None and f["days_of_stock"] < f["lead_time_days"]:
+            severity, title = "High", "Tool Stock-Out Before Resupply"
+        else:
+            severity, title = "Medium", "Tool Below Reorder Point"
+        details = f"Tool {f['tool_num']}: stock {f['stock_qty']}, reorder point {f['reorder_point']}"
+        if f["stockout_date"]:
+            details += f", runs out ~{f['stockout_date']}"
+        if f["suggested_order_qty"]:
+            details += f"; order {f['suggested_order_qty']}"
+        alerts.append({
+            "severity": severity,
+            "type": ALERT_TYPE,
+            "title": title,
+            "details": details,
+            "related": {"tool_num": f["tool_num"]},
+        })
+    return alerts
+
+
+def _stamp(cfg: Dict[str, Any], today: date) -> str:
+    payload = json.dumps({"cfg": cfg, "today": today.isoformat()}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def refresh_inventory_forecast(tool_nums: Optional[Sequence[str]] = None, today: Optional[date] = None) -> int:
+    """
+    Recomputes the forecasts of tool_nums (all tools when None, or when the date or
+    config moved since the stored ones), then re-raises stock alerts. Returns how many
+    tools were recomputed.
+    """
+    today = today or datetime.now().date()
+    cfg = load_json(INVENTORY_CONFIG_FILE, DEFAULT_INVENTORY_CONFIG) or {}
+    rules = InventoryRules.from_config(cfg)
+    stamp = _stamp(cfg, today)
+    full = tool_nums is None or get_meta(FORECAST_STAMP_KEY) != stamp
+
+    tools = list_tools_simple()
+    if not full:
+        wanted = {str(t) for t in tool_nums}
+        tools = [t for t in tools if str(t["tool_num"]) in wanted]
+    since = (today - timedelta(days=rules.window_days - 1)).isoformat()
+    consumption = tool_consumption_by_line(since, today.isoformat(), None if full else [t["tool_num"] for t in tools])
+
+    by_tool: Dict[str, List[Dict[str, Any]]] = {}
+    for row in consumption:
+        by_tool.setdefault(str(row["tool_num"]), []).append(row)
+    forecasts = [forecast_tool(t, by_tool.get(str(t["tool_num"]), []), rules, today) for t in tools]
+    line_rates = [
+        {**row, "rate_per_day": row["window_changes"] / rules.window_days}
+        for t in tools for row in by_tool.get(str(t["tool_num"]), [])
+    ]
+    replace_tool_forecasts(
+        forecasts,
+        line_rates,
+        tool_nums=None if full else [str(t) for t in tool_nums],
+        meta={FORECAST_STAMP_KEY: stamp},
+    )
+    publish_alerts(stock_alerts(list_tool_forecasts()), ALERT_TYPE)
+    return len(forecasts)
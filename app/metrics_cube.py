@@ -0,0 +1,329 @@
+# app/metrics_cube.py
+"""
+Shared aggregate of tool entries for the Pareto and summary screens.
+
+Entries are collapsed once into cells: one per distinct (machine, part_number,
+tool_num, defect_code, day, has_defect), each dimension stored as integer codes
+and the measures (entries, defect_qty, downtime_mins, copq_est, andon, high_risk,
+open_actions) as NumPy sums. Slicing is a boolean mask over the cells and a
+roll-up is a bincount over the codes of the requested dimensions, so a screen
+asks for any grouping of any window without touching the raw rows again.
+One-dimension roll-ups over a day range (the Pareto lists) read running totals
+per (label, day) instead, built on first use, so they cost a subtraction.
+A text dimension the source never fills (tool_entries has no Defect_Code) is
+kept as one blank label but listed in blank_dimensions, and top_n over it is empty.
+
+get_metrics_cube() keeps built cubes until the database path or
+db.tool_entries_version() moves, the same rule the storage frame cache uses.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .coercion import to_flag_series, to_float_series, to_int_series
+from .dates import parse_iso_dates
+from .db import tool_entries_version
+from . import db as _db
+from .storage import get_df_range
+
+DIMENSIONS = ("machine", "part_number", "tool_num", "defect_code", "day", "has_defect")
+MEASURES = ("entries", "defect_qty", "downtime_mins", "copq_est", "andon", "high_risk", "open_actions")
+
+# Frame column behind each text dimension
+_DIMENSION_COLUMNS = {
+    "machine": "Machine",
+    "part_number": "Part_Number",
+    "tool_num": "Tool_Num",
+    "defect_code": "Defect_Code",
+}
+SOURCE_COLUMNS = (
+    "Date", "Machine", "Part_Number", "Tool_Num", "Defect_Code", "Defects_Present", "Defect_Qty",
+    "Downtime_Mins", "COPQ_Est", "Andon_Flag", "Customer_Risk", "Action_Status",
+)
+
+_EPOCH = date(1970, 1, 1)
+# Upper bound on a one-dimension running-total array (floats) before roll-ups fall
+# back to summing cells.
+_MARGINAL_MAX_CELLS = 4_000_000
+
+
+def day_number(d: date) -> int:
+    """Days since 1970-01-01, the cube's day code."""
+    return (d - _EPOCH).days
+
+
+def day_label(n: int) -> str:
+    return (_EPOCH + timedelta(days=int(n))).isoformat()
+
+
+def day_bounds(start: datetime, end: datetime) -> Tuple[int, int]:
+    """
+    The days whose midnight falls in start..end, the rows a date-only filter
+    `start <= Date <= end` keeps.
+    """
+    first = start.date() if start.time() == datetime.min.time() else start.date() + timedelta(days=1)
+    return day_number(first), day_number(end.date())
+
+
+class MetricsCube:
+    def __init__(
+        self,
+        codes: Mapping[str, np.ndarray],
+        labels: Mapping[str, np.ndarray],
+        measures: Mapping[str, np.ndarray],
+        rows: int = 0,
+        blank_dimensions: Sequence[str] = (),
+    ):
+        self.codes = dict(codes)
+        self.labels = dict(labels)
+        self.measures = dict(measures)
+        self.rows = rows
+        self.blank_dimensions = frozenset(blank_dimensions)
+        self._marginals: Dict[str, Optional[np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.measures["entries"])
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "MetricsCube":
+        """Builds the cube from an entries frame; rows without a readable Date are left out."""
+        df = df.reindex(columns=list(SOURCE_COLUMNS), fill_value="")
+        dt = parse_iso_dates(df["Date"])
+        keep = dt.notna().to_numpy()
+        df, dt = df.loc[keep], dt[keep]
+
+        row_codes: Dict[str, np.ndarray] = {}
+        labels: Dict[str, np.ndarray] = {}
+        for dim, col in _DIMENSION_COLUMNS.items():
+            codes, uniques = pd.factorize(df[col].fillna("").astype(str).str.strip(), sort=True)
+            row_codes[dim] = codes.astype("int64")
+            labels[dim] = np.asarray(uniques, dtype=object)
+        blank = [dim for dim in _DIMENSION_COLUMNS if not any(labels[dim])]
+        days = dt.to_numpy().astype("datetime64[D]").astype("int64")
+        day0 = int(days.min()) if len(days) else 0
+        row_codes["day"] = days - day0
+        labels["day"] = np.arange(day0, day0 + (int(days.max()) - day0 + 1 if len(days) else 0))
+        row_codes["has_defect"] = to_flag_series(df["Defects_Present"]).to_numpy().astype("int64")
+        labels["has_defect"] = np.array([False, True], dtype=object)
+
+        row_measures = {
+            "entries": np.ones(len(df), dtype="float64"),
+            "defect_qty": to_int_series(df["Defect_Qty"], 0).to_numpy().astype("float64"),
+            "downtime_mins": to_float_series(df["Downtime_Mins"], 0.0).to_numpy(),
+            "copq_est": to_float_series(df["COPQ_Est"], 0.0).to_numpy(),
+            "andon": to_flag_series(df["Andon_Flag"]).to_numpy().astype("float64"),
+            "high_risk": df["Customer_Risk"].isin(["High", "Critical"]).to_numpy().astype("float64"),
+            "open_actions": df["Action_Status"].isin(["Open", "Overdue"]).to_numpy().astype("float64"),
+        }
+
+        cell_keys, inverse = _group(row_codes, DIMENSIONS, labels)
+        codes = {dim: cell_keys[i] for i, dim in enumerate(DIMENSIONS)}
+        measures = {m: np.bincount(inverse, weights=v, minlength=len(cell_keys[0])) for m, v in row_measures.items()}
+        return cls(codes, labels, measures, rows=len(df), blank_dimensions=blank)
+
+    # -------------------------
+    # Slicing
+    # -------------------------
+    def mask(
+        self,
+        *,
+        days: Optional[Tuple[Optional[int], Optional[int]]] = None,
+        defects_only: bool = False,
+        **equals: Any,
+    ) -> np.ndarray:
+        """
+        Cells inside days (first, last day numbers, inclusive; None for open ends),
+        with a defect when defects_only, and whose dimensions equal the given labels.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if days is not None:
+            lo, hi = self._day_slice(days)
+            keep &= (self.codes["day"] >= lo) & (self.codes["day"] < hi)
+        if defects_only:
+            keep &= self.codes["has_defect"] == 1
+        for dim, label in equals.items():
+            matches = np.flatnonzero(self.labels[dim] == label)
+            keep &= np.isin(self.codes[dim], matches)
+        return keep
+
+    def _day_slice(self, days: Optional[Tuple[Optional[int], Optional[int]]]) -> Tuple[int, int]:
+        """days as a [lo, hi) range of day codes."""
+        count = len(self.labels["day"])
+        if days is None or not count:
+            return 0, count
+        day0 = int(self.labels["day"][0])
+        first, last = days
+        lo = 0 if first is None else min(max(first - day0, 0), count)
+        hi = count if last is None else min(max(last - day0 + 1, 0), count)
+        return lo, max(lo, hi)
+
+    def _marginal(self, dim: str) -> Optional[np.ndarray]:
+        """
+        Running totals over days of every measure per (dim label, day, has_defect),
+        shape (measures, labels, days + 1, 2), so any day range of a one-dimension
+        roll-up is a single subtraction. Built on first use; None when too large.
+        """
+        if dim in self._marginals:
+            return self._marginals[dim]
+        k, d = len(self.labels[dim]), len(self.labels["day"])
+        size = len(self.measures) * k * (d + 1) * 2
+        marginal = None
+        if dim not in ("day", "has_defect") and size <= _MARGINAL_MAX_CELLS:
+            flat = (self.codes[dim] * d + self.codes["day"]) * 2 + self.codes["has_defect"]
+            dense = np.stack([
+                np.bincount(flat, weights=v, minlength=k * d * 2).reshape(k, d, 2) for v in self.measures.values()
+            ])
+            marginal = np.zeros((len(self.measures), k, d + 1, 2))
+            np.cumsum(dense, axis=2, out=marginal[:, :, 1:, :])
+        self._marginals[dim] = marginal
+        return marginal
+
+    def totals(self, *, mask: Optional[np.ndarray] = None, **where: Any) -> Dict[str, float]:
+        """Measure sums over a slice (the mask() arguments, or a mask)."""
+        if mask is None:
+            mask = self.mask(**where)
+        return {m: float(v[mask].sum()) for m, v in self.measures.items()}
+
+    def rollup(
+        self,
+        by: Sequence[str],
+        *,
+        mask: Optional[np.ndarray] = None,
+        days: Optional[Tuple[Optional[int], Optional[int]]] = None,
+        defects_only: bool = False,
+        **equals: Any,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Measure sums per distinct combination of the `by` dimensions within a slice
+        (the mask() arguments, or a mask): one label array per dimension (days as
+        'YYYY-MM-DD') and one array per measure.
+        """
+        by = list(by)
+        if mask is None and not equals and len(by) == 1:
+            marginal = self._marginal(by[0])
+            if marginal is not None:
+                lo, hi = self._day_slice(days)
+                sums = marginal[:, :, hi, :] - marginal[:, :, lo, :]
+                sums = sums[..., 1] if defects_only else sums.sum(axis=2)
+                present = np.flatnonzero(sums[0] > 0)
+                out = {by[0]: self.labels[by[0]][present]}
+                out.update({m: sums[i, present] for i, m in enumerate(self.measures)})
+                return out
+        if mask is None:
+            mask = self.mask(days=days, defects_only=defects_only, **equals)
+        sel = np.flatnonzero(mask)
+        if not len(sel):
+            return {**{d: np.array([], dtype=object) for d in by}, **{m: np.array([]) for m in self.measures}}
+        keys, inverse = _group({d: self.codes[d][sel] for d in by}, by, self.labels)
+        out = {}
+        for i, dim in enumerate(by):
+            labels = self.labels[dim][keys[i]]
+            out[dim] = np.array([day_label(v) for v in labels], dtype=object) if dim == "day" else labels
+        for m, values in self.measures.items():
+            out[m] = np.bincount(inverse, weights=values[sel], minlength=len(keys[0]))
+        return out
+
+    def top_n(
+        self,
+        by: Sequence[str],
+        n: int,
+        *,
+        score: Mapping[str, float],
+        then: Sequence[str] = (),
+        share_of: str = "defect_qty",
+        min_entries: int = 0,
+        **where: Any,
+    ) -> List[Dict[str, Any]]:
+        """
+        The n groups of a slice (see rollup) with the highest weighted sum of measures
+        (score), ties going to the larger `then` measures in order. Each row carries
+        its share of share_of across all groups (pct) and the running share down the
+        list (cum_pct). Empty when a `by` dimension is in blank_dimensions.
+        """
+        if self.blank_dimensions.intersection(by):
+            return []
+        groups = self.rollup(by, **where)
+        count = len(groups["entries"])
+        if not count:
+            return []
+        scores = np.zeros(count)
+        for m, w in score.items():
+            scores += groups[m] * float(w)
+        total_share = groups[share_of].sum()
+        keep = np.flatnonzero(groups["entries"] >= min_entries)
+        # lexsort sorts by its last key first: score, then each `then` measure in turn.
+        sort_keys = [-groups[m][keep] for m in reversed(list(then))] + [-scores[keep]]
+        order = keep[np.lexsort(sort_keys)][:n]
+        share = groups[share_of][order] / total_share * 100.0 if total_share > 0 else np.zeros(len(order))
+        out = []
+        for rank, (i, pct, cum_pct) in enumerate(zip(order, share, np.cumsum(share)), start=1):
+            row: Dict[str, Any] = {"rank": rank, "score": float(scores[i]), "pct": float(pct), "cum_pct": float(cum_pct)}
+            row.update({d: groups[d][i] for d in by})
+            row.update({m: float(groups[m][i]) for m in self.measures})
+            out.append(row)
+        return out
+
+
+def _group(
+    codes: Mapping[str, np.ndarray],
+    dims: Sequence[str],
+    labels: Mapping[str, np.ndarray],
+) -> Tuple[List[np.ndarray], np.ndarray]:
+    """(distinct code tuples as one array per dim, group index of each input row)."""
+    dims = list(dims)
+    n = len(codes[dims[0]]) if dims else 0
+    sizes = [max(len(labels[d]), 1) for d in dims]
+    if n == 0:
+        return [np.array([], dtype="int64") for _ in dims], np.array([], dtype="int64")
+    if float(np.prod([float(s) for s in sizes])) < 2 ** 62:
+        flat = np.ravel_multi_index([codes[d] for d in dims], sizes)
+        uniq, inverse = np.unique(flat, return_inverse=True)
+        return list(np.unravel_index(uniq, sizes)), inverse.ravel()
+    stacked = np.stack([codes[d] for d in dims], axis=1)
+    uniq, inverse = np.unique(stacked, axis=0, return_inverse=True)
+    return [uniq[:, i] for i in range(len(dims))], inverse.ravel()
+
+
+# -------------------------
+# Cache
+# -------------------------
+_CUBE_CACHE_MAX = 8
+_cube_cache: "OrderedDict[Tuple[str, str], MetricsCube]" = OrderedDict()
+_cube_cache_version: Optional[Tuple[str, int]] = None
+
+
+def clear_cube_cache() -> None:
+    global _cube_cache_version
+    _cube_cache.clear()
+    _cube_cache_version = None
+
+
+def get_metrics_cube(start_month: str, end_month: Optional[str] = None) -> MetricsCube:
+    """The cube of every entry from start_month to end_month (YYYY-MM, default this month)."""
+    global _cube_cache_version
+    end_month = end_month or datetime.now().strftime("%Y-%m")
+    version = (_db.DB_PATH, tool_entries_version())
+    if version != _cube_cache_version:
+        _cube_cache.clear()
+        _cube_cache_version = version
+    key = (start_month, end_month)
+    cube = _cube_cache.get(key)
+    if cube is None:
+        cube = MetricsCube.from_frame(get_df_range(start_month, end_month, columns=SOURCE_COLUMNS))
+        _cube_cache[key] = cube
+        if len(_cube_cache) > _CUBE_CACHE_MAX:
+            _cube_cache.popitem(last=False)
+    else:
+        _cube_cache.move_to_end(key)
+    return cube
+
+
+def cube_for_days(first: date, last: Optional[date] = None) -> MetricsCube:
+    """The cube covering the months of first..last (last defaults to today)."""
+    last = last or datetime.now().date()
+    return get_metrics_cube(first.strftime("%Y-%m"), max(first, last).strftime("%Y-%m"))
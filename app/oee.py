@@ -0,0 +1,229 @@
+# app/oee.py
+"""
+OEE (Availability x Performance x Quality) per (date, shift, line, machine).
+
+A group counts once it has a shift production report. Per group:
+- planned: the shift's minutes from oee_config.json (shift_minutes, or
+  shift_minutes_by_shift for that shift name)
+- availability: (planned - downtime) / planned, downtime summed over every entry
+  in the group (shift reports and tool changes, see db.oee_source_rows)
+- performance: ideal minutes / run minutes, where a report's ideal minutes are
+  its qty at the production goal's pace (goal per planned shift). Groups with a
+  report lacking a goal have no performance, and so no OEE.
+- quality: (produced - defect_qty of the group's entries) / produced
+
+refresh_oee_rollup() recomputes only the dates touched since its watermark on
+tool_entry_changes (plus dates of rows marked stale by edits and deletes), all
+of them in one pass of array arithmetic, and stores the groups in oee_rollup.
+Changing the config or a production goal recomputes everything.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set
+
+import numpy as np
+import pandas as pd
+
+from .config import DEFAULT_OEE_CONFIG, OEE_CONFIG_FILE
+from .db import (
+    fetch_tool_entries_by_ids,
+    get_meta,
+    list_changed_tool_entries,
+    list_production_goals,
+    list_stale_oee_keys,
+    oee_source_rows,
+    oee_totals,
+    replace_oee_rollup,
+)
+from .storage import load_json, safe_float
+
+OEE_SEQ_KEY = "oee_rollup_seq"
+OEE_STAMP_KEY = "oee_rollup_stamp"
+OEE_BATCH_SIZE = 5000
+SHIFT_REPORT_REASON = "Shift Production"
+
+GROUP_KEYS = ["date", "shift", "line", "machine"]
+
+
+@dataclass(frozen=True)
+class OeeRules:
+    shift_minutes_default: float = 480.0
+    shift_minutes_by_shift: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> "OeeRules":
+        cfg = cfg or {}
+        by_shift = cfg.get("shift_minutes_by_shift", {}) or {}
+        return cls(
+            shift_minutes_default=max(safe_float(cfg.get("shift_minutes", 480), 480.0), 0.0),
+            shift_minutes_by_shift={str(k): max(safe_float(v, 0.0), 0.0) for k, v in by_shift.items()},
+        )
+
+    def shift_minutes(self, shift: str) -> float:
+        return self.shift_minutes_by_shift.get(str(shift or ""), self.shift_minutes_default)
+
+
+def load_oee_rules() -> OeeRules:
+    return OeeRules.from_config(load_json(OEE_CONFIG_FILE, DEFAULT_OEE_CONFIG))
+
+
+def oee_components(
+    planned: np.ndarray,
+    run: np.ndarray,
+    ideal: np.ndarray,
+    performance_run: np.ndarray,
+    produced: np.ndarray,
+    good: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Availability, performance, quality and OEE arrays; NaN where undefined."""
+    planned, run, ideal, performance_run, produced, good = (
+        np.asarray(a, dtype="float64") for a in (planned, run, ideal, performance_run, produced, good)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        availability = np.where(planned > 0, run / planned, np.nan)
+        performance = np.where(performance_run > 0, ideal / performance_run, np.nan)
+        quality = np.where(produced > 0, good / produced, np.nan)
+    # Beating the goal's pace says the goal is soft, not that the machine ran over 100%.
+    oee = availability * np.minimum(performance, 1.0) * quality
+    return {"availability": availability, "performance": performance, "quality": quality, "oee": oee}
+
+
+def _goal_targets(frame: pd.DataFrame, goals: List[Dict[str, Any]]) -> pd.Series:
+    """Per-row production goal, as db.get_production_goal picks it: exact match, else the line's."""
+    if not goals:
+        return pd.Series(0.0, index=frame.index)
+    g = pd.DataFrame(goals)
+    g["target"] = pd.to_numeric(g["target"], errors="coerce").fillna(0.0)
+    exact = g.set_index(["line", "cell", "machine", "part_number"])["target"]
+    line_only = g[(g["cell"] == "") & (g["machine"] == "") & (g["part_number"] == "")].set_index("line")["target"]
+    keys = pd.MultiIndex.from_frame(frame[["line", "cell", "machine", "part_number"]])
+    target = pd.Series(exact.reindex(keys).to_numpy(), index=frame.index)
+    fallback = frame["line"].map(line_only)
+    return target.fillna(fallback).fillna(0.0)
+
+
+def compute_oee(
+    rows: Iterable[Mapping[str, Any]],
+    goals: List[Dict[str, Any]],
+    rules: OeeRules,
+) -> pd.DataFrame:
+    """One oee_rollup row per (date, shift, line, machine) that has a shift report."""
+    frame = pd.DataFrame(list(rows))
+    if frame.empty:
+        return pd.DataFrame(columns=GROUP_KEYS)
+    for col in ("date", "shift", "line", "cell", "machine", "part_number", "reason"):
+        frame[col] = frame[col].fillna("").astype(str)
+    for col in ("production_qty", "defect_qty", "downtime"):
+        frame[col] = pd.to_numeric(frame[col], errors="coerce").fillna(0.0)
+
+    is_report = (frame["reason"] == SHIFT_REPORT_REASON).to_numpy()
+    planned = frame["shift"].map(rules.shift_minutes).astype("float64").to_numpy()
+    target = _goal_targets(frame, goals).to_numpy()
+    qty = frame["production_qty"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ideal = np.where(is_report & (target > 0), qty * planned / target, 0.0)
+
+    work = pd.DataFrame({
+        **{k: frame[k] for k in GROUP_KEYS},
+        "reports": is_report.astype("int64"),
+        "untargeted": (is_report & (target <= 0)).astype("int64"),
+        "planned_minutes": np.where(is_report, planned, 0.0),
+        "downtime_minutes": frame["downtime"].to_numpy(),
+        "ideal_minutes": ideal,
+        "produced": np.where(is_report, qty, 0.0),
+        "defects": frame["defect_qty"].to_numpy(),
+    })
+    g = work.groupby(GROUP_KEYS, sort=True, as_index=False).agg(
+        reports=("reports", "sum"),
+        untargeted=("untargeted", "sum"),
+        planned_minutes=("planned_minutes", "max"),
+        downtime_minutes=("downtime_minutes", "sum"),
+        ideal_minutes=("ideal_minutes", "sum"),
+        produced=("produced", "sum"),
+        defects=("defects", "sum"),
+    )
+    g = g[g["reports"] > 0].reset_index(drop=True)
+
+    planned_g = g["planned_minutes"].to_numpy()
+    run = np.clip(planned_g - g["downtime_minutes"].to_numpy(), 0.0, planned_g)
+    ideal_g = np.where(g["untargeted"].to_numpy() > 0, np.nan, g["ideal_minutes"].to_numpy())
+    good = np.clip(g["produced"].to_numpy() - g["defects"].to_numpy(), 0.0, None)
+    g["run_minutes"] = run
+    g["ideal_minutes"] = ideal_g
+    g["good"] = good
+    parts = oee_components(planned_g, run, ideal_g, np.where(np.isnan(ideal_g), 0.0, run), g["produced"], good)
+    for name, values in parts.items():
+        g[name] = values
+    return g.drop(columns=["untargeted"])
+
+
+def _records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    if frame.empty:
+        return []
+    clean = frame.astype(object).where(frame.notna(), None)
+    return clean.to_dict("records")
+
+
+def _stamp(cfg: Dict[str, Any], goals: List[Dict[str, Any]]) -> str:
+    payload = json.dumps({"cfg": cfg, "goals": goals}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def refresh_oee_rollup(batch_size: int = OEE_BATCH_SIZE) -> int:
+    """Recomputes the dates touched since the last run; returns how many dates were rolled up."""
+    cfg = load_json(OEE_CONFIG_FILE, DEFAULT_OEE_CONFIG) or {}
+    rules = OeeRules.from_config(cfg)
+    goals = list_production_goals()
+    stamp = _stamp(cfg, goals)
+    stored_seq = get_meta(OEE_SEQ_KEY) or "0"
+    full = get_meta(OEE_STAMP_KEY) != stamp
+
+    after = int(stored_seq)
+    dates: Set[str] = {key[0] for key in list_stale_oee_keys()}
+    while True:
+        changed = list_changed_tool_entries(after, batch_size)
+        if not changed:
+            break
+        after = changed[-1][1]
+        if not full:
+            rows = fetch_tool_entries_by_ids([entry_id for entry_id, _ in changed], ["date"])
+            dates.update(str(r["date"] or "") for r in rows)
+    if not full and not dates and str(after) == stored_seq:
+        return 0
+
+    source = oee_source_rows(None if full else sorted(dates))
+    rollup = compute_oee(source, goals, rules)
+    meta = {OEE_SEQ_KEY: str(after), OEE_STAMP_KEY: stamp}
+    replace_oee_rollup(_records(rollup), dates=None if full else sorted(dates), meta=meta)
+    return rollup["date"].nunique() if full and not rollup.empty else len(dates)
+
+
+def oee_trend(
+    start: str,
+    end: str,
+    *,
+    period: str = "month",
+    by: Sequence[str] = ("line",),
+    line: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """OEE per period and `by` group between ISO dates start and end, from the rollup."""
+    totals = oee_totals(start, end, period=period, by=by, line=line)
+    if not totals:
+        return []
+    frame = pd.DataFrame(totals)
+    num = frame[["planned_minutes", "run_minutes", "ideal_minutes", "performance_run_minutes", "produced", "good"]]
+    num = num.apply(pd.to_numeric, errors="coerce")
+    parts = oee_components(
+        num["planned_minutes"].fillna(0.0),
+        num["run_minutes"].fillna(0.0),
+        num["ideal_minutes"],
+        num["performance_run_minutes"].fillna(0.0),
+        num["produced"].fillna(0.0),
+        num["good"].fillna(0.0),
+    )
+    for name, values in parts.items():
+        frame[name] = values
+    return _records(frame)
@@ -26,8 +26,8 @@ PERMISSIONS = {
 
 ROLE_SCREEN_DEFAULTS = {
     "Operator": {"Operator": "edit"},
-    "Tool Changer": {"Tool Changer": "edit", "Action Center": "view", "Audit Trail": "view"},
-    "Leader": {"Leader": "edit", "Action Center": "view", "Audit Trail": "view"},
+    "Tool Changer": {"Tool Changer": "edit", "Action Center": "view", "Audit Trail": "view", "Tool Life Board": "view"},
+    "Leader": {"Leader": "edit", "Action Center": "view", "Audit Trail": "view", "OEE Trends": "view"},
     "Quality": {"Quality": "edit", "Action Center": "view", "Audit Trail": "view"},
     "Admin": {"Admin": "edit", "Action Center": "edit", "Audit Trail": "view"},
     "Top (Super User)": {
@@ -43,6 +43,10 @@ ROLE_SCREEN_DEFAULTS = {
         "Health Check": "edit",
         "Shift Handoff": "edit",
         "Repeat Offenders": "edit",
+        "Tool Life Board": "view",
+        "OEE Trends": "view",
+        "Tool Costs": "view",
+        "Downtime Pareto": "view",
         "Top level": "edit",
         "Master Data": "edit",
         "Admin": "edit",
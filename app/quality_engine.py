@@ -5,9 +5,12 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from .storage import safe_int, safe_float
+from .coercion import parse_date, to_flag_series, to_float_series, to_int_series
+from .dates import parse_iso_dates
 from .config import current_month_iso
 
 
@@ -16,26 +19,21 @@ def _now() -> datetime:
 
 
 def _parse_date(d: str) -> Optional[datetime]:
-    if not d:
-        return None
-    s = str(d).strip()
-    if not s:
-        return None
-    for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%Y-%m-%d %H:%M:%S"):
-        try:
-            return datetime.strptime(s, fmt)
-        except Exception:
-            pass
-    return None
+    return parse_date(d)
 
 
 def _days_between(a: datetime, b: datetime) -> int:
     return (a.date() - b.date()).days
 
 
-def compute_copq_for_row(row: Dict[str, Any], cost_cfg: Dict[str, Any]) -> Tuple[float, float, float]:
+def compute_copq_for_row(
+    row: Dict[str, Any],
+    cost_cfg: Dict[str, Any],
+    scrap_costs: Optional[Dict[str, Any]] = None,
+) -> Tuple[float, float, float]:
     """
     Returns (downtime_cost_est, scrap_cost_est, copq_est).
+    scrap_costs (part_costs, by part number) wins over cost_cfg's scrap_cost_by_part.
     """
     line = str(row.get("Line", "") or "").strip()
     part = str(row.get("Part_Number", "") or "").strip()
@@ -46,7 +44,10 @@ def compute_copq_for_row(row: Dict[str, Any], cost_cfg: Dict[str, Any]) -> Tuple
     dt_rate = safe_float(cost_cfg.get("downtime_cost_per_min", {}).get(line, 0.0), 0.0)
     scrap_default = safe_float(cost_cfg.get("scrap_cost_default", 0.0), 0.0)
     scrap_by_part = cost_cfg.get("scrap_cost_by_part", {}) or {}
-    scrap_rate = safe_float(scrap_by_part.get(part, scrap_default), scrap_default)
+    if scrap_costs and part in scrap_costs:
+        scrap_rate = safe_float(scrap_costs[part], scrap_default)
+    else:
+        scrap_rate = safe_float(scrap_by_part.get(part, scrap_default), scrap_default)
 
     downtime_cost = downtime_mins * dt_rate
     scrap_cost = defect_qty * scrap_rate
@@ -54,6 +55,43 @@ def compute_copq_for_row(row: Dict[str, Any], cost_cfg: Dict[str, Any]) -> Tuple
     return downtime_cost, scrap_cost, copq
 
 
+def compute_copq_frame(
+    df: pd.DataFrame,
+    cost_cfg: Dict[str, Any],
+    scrap_costs: Optional[Dict[str, Any]] = None,
+) -> pd.DataFrame:
+    """
+    compute_copq_for_row for a whole frame. Returns Downtime_Cost_Est, Scrap_Cost_Est
+    and COPQ_Est columns on df's index.
+    """
+    def text(col: str) -> pd.Series:
+        if col not in df.columns:
+            return pd.Series("", index=df.index)
+        return df[col].where(df[col].notna(), "").astype(str).str.strip()
+
+    def number(col: str, convert) -> pd.Series:
+        if col not in df.columns:
+            return pd.Series(0, index=df.index)
+        return convert(df[col], 0)
+
+    cost_cfg = cost_cfg or {}
+    dt_rates = {k: safe_float(v, 0.0) for k, v in (cost_cfg.get("downtime_cost_per_min", {}) or {}).items()}
+    scrap_default = safe_float(cost_cfg.get("scrap_cost_default", 0.0), 0.0)
+    scrap_rates = {k: safe_float(v, scrap_default) for k, v in (cost_cfg.get("scrap_cost_by_part", {}) or {}).items()}
+    scrap_rates.update({k: safe_float(v, scrap_default) for k, v in (scrap_costs or {}).items()})
+
+    dt_rate = text("Line").map(dt_rates).fillna(0.0).astype(float)
+    scrap_rate = text("Part_Number").map(scrap_rates).fillna(scrap_default).astype(float)
+
+    downtime_cost = number("Downtime_Mins", to_float_series) * dt_rate
+    scrap_cost = number("Defect_Qty", to_int_series) * scrap_rate
+    return pd.DataFrame({
+        "Downtime_Cost_Est": downtime_cost,
+        "Scrap_Cost_Est": scrap_cost,
+        "COPQ_Est": downtime_cost + scrap_cost,
+    })
+
+
 def gage_due_status(gage: Dict[str, Any], risk_cfg: Dict[str, Any]) -> Dict[str, Any]:
     """
     Computes due dates + due status.
@@ -168,6 +206,185 @@ def assign_risk_severity(
     return current, reasons
 
 
+SEVERITY_LEVELS = ("Low", "Medium", "High", "Critical")
+_SEVERITY_RANK = {name: rank for rank, name in enumerate(SEVERITY_LEVELS)}
+
+
+def _bands(cfg: Dict[str, Any], keys: Tuple[str, str, str], levels: Tuple[str, str, str],
+           label: str, convert, missing) -> Tuple[Tuple[int, Any, str], ...]:
+    """(rank, threshold, reason) from the top band down, as assign_risk_severity checks them."""
+    return tuple(
+        (_SEVERITY_RANK[level], convert(cfg.get(key, missing), missing), f"{label} >= {cfg.get(key)}")
+        for key, level in zip(keys, levels)
+    )
+
+
+@dataclass(frozen=True)
+class RiskScorer:
+    """
+    risk_config.json compiled once into typed thresholds.
+    score_frame() gives the same Severity/Reasons as calling assign_risk_severity
+    per row, but scores whole columns at a time.
+    """
+    andon_always_critical: bool
+    customer_risk_map: Dict[str, str]
+    copq_bands: Tuple[Tuple[int, float, str], ...]
+    defect_qty_bands: Tuple[Tuple[int, int, str], ...]
+    repeat_bands: Tuple[Tuple[int, int, str], ...]
+
+    @classmethod
+    def from_config(cls, risk_cfg: Dict[str, Any]) -> "RiskScorer":
+        rules = (risk_cfg or {}).get("rules", {}) or {}
+        top = ("critical", "high", "medium")
+        levels = ("Critical", "High", "Medium")
+        return cls(
+            andon_always_critical=bool(rules.get("andon_always_critical", True)),
+            customer_risk_map=dict(rules.get("customer_risk_map", {}) or {}),
+            copq_bands=_bands(rules.get("copq_thresholds", {}) or {}, top, levels, "COPQ", safe_float, 1e18),
+            defect_qty_bands=_bands(rules.get("defect_qty_thresholds", {}) or {}, top, levels, "Defect qty", safe_int, 10**9),
+            repeat_bands=_bands(
+                rules.get("repeat_offender_escalation", {}) or {},
+                ("critical_score", "high_score", "watch_score"),
+                levels,
+                "Repeat score",
+                safe_int,
+                10**9,
+            ),
+        )
+
+    @staticmethod
+    def _banded(values: pd.Series, bands) -> Tuple[np.ndarray, np.ndarray]:
+        conds = [values.to_numpy() >= thr for _, thr, _ in bands]
+        ranks = np.select(conds, [rank for rank, _, _ in bands], -1)
+        reasons = np.select(conds, [why for _, _, why in bands], "")
+        return ranks, reasons
+
+    def score_frame(
+        self,
+        df: pd.DataFrame,
+        repeat_score: Any = None,
+        is_overdue_action: Any = False,
+        is_overdue_ncr: Any = False,
+        gage_overdue_severity: Any = None,
+    ) -> pd.DataFrame:
+        """
+        Returns a frame (same index as df) with Severity and Reasons ("; "-joined).
+        repeat_score defaults to df["Repeat_Score"] when present. The other arguments
+        take a scalar for every row or a Series aligned with df.
+        """
+        idx = df.index
+
+        def column(name: str, default: Any) -> pd.Series:
+            return df[name] if name in df.columns else pd.Series(default, index=idx)
+
+        def per_row(value: Any, default: Any) -> pd.Series:
+            if isinstance(value, pd.Series):
+                return value.reindex(idx)
+            return pd.Series(default if value is None else value, index=idx)
+
+        steps: List[Tuple[np.ndarray, np.ndarray]] = []
+
+        # Andon
+        andon = to_flag_series(column("Andon_Flag", "")).to_numpy() & self.andon_always_critical
+        steps.append((np.where(andon, _SEVERITY_RANK["Critical"], -1), np.where(andon, "Andon flagged", "")))
+
+        # Customer risk (if operator/QC set it)
+        cust = column("Customer_Risk", "").fillna("").astype(str).str.strip()
+        mapped = cust.map(self.customer_risk_map).fillna(cust)
+        cust_rank = mapped.map(_SEVERITY_RANK)
+        hit = (cust.ne("") & cust_rank.notna()).to_numpy()
+        steps.append((
+            np.where(hit, cust_rank.fillna(-1).astype(int).to_numpy(), -1),
+            np.where(hit, ("Customer risk = " + cust).to_numpy(dtype=object), ""),
+        ))
+
+        # COPQ, defect qty and repeat score bands
+        steps.append(self._banded(to_float_series(column("COPQ_Est", 0.0), 0.0), self.copq_bands))
+        steps.append(self._banded(to_int_series(column("Defect_Qty", 0), 0), self.defect_qty_bands))
+        if repeat_score is None:
+            repeat = to_int_series(column("Repeat_Score", 0), 0)
+        else:
+            repeat = per_row(repeat_score, 0)
+        steps.append(self._banded(repeat, self.repeat_bands))
+
+        # Overdue action/NCR
+        for flag, why in ((is_overdue_action, "Overdue action item"), (is_overdue_ncr, "NCR aging threshold exceeded")):
+            hit = per_row(flag, False).fillna(False).astype(bool).to_numpy()
+            steps.append((np.where(hit, _SEVERITY_RANK["High"], -1), np.where(hit, why, "")))
+
+        # Gage overdue severity (if computed elsewhere)
+        gage = per_row(gage_overdue_severity, "").fillna("").astype(str)
+        gage_rank = gage.map(_SEVERITY_RANK)
+        hit = gage_rank.notna().to_numpy()
+        steps.append((
+            np.where(hit, gage_rank.fillna(-1).astype(int).to_numpy(), -1),
+            np.where(hit, ("Gage calibration status triggers " + gage).to_numpy(dtype=object), ""),
+        ))
+
+        rank = np.zeros(len(idx), dtype=int)
+        reasons = pd.Series("", index=idx, dtype=object)
+        for step_rank, step_reason in steps:
+            rank = np.maximum(rank, step_rank)
+            step_reason = pd.Series(step_reason, index=idx, dtype=object)
+            sep = np.where(reasons.ne("") & step_reason.ne(""), "; ", "")
+            reasons = reasons + sep + step_reason
+
+        return pd.DataFrame(
+            {"Severity": np.array(SEVERITY_LEVELS, dtype=object)[rank], "Reasons": reasons},
+            index=idx,
+        )
+
+
+@dataclass(frozen=True)
+class RepeatRules:
+    """
+    repeat_rules.json as detect_repeat_offenders and the repeat tracker read it.
+    """
+    window_days: int
+    part_threshold: int
+    machine_threshold: int
+    part_weight: int
+    machine_weight: int
+    watch_min: int
+    repeat_min: int
+
+    @classmethod
+    def from_config(cls, repeat_rules: Dict[str, Any]) -> "RepeatRules":
+        repeat_rules = repeat_rules or {}
+        weights = repeat_rules.get("weights", {}) or {}
+        score_bands = repeat_rules.get("score_bands", {}) or {}
+        return cls(
+            window_days=safe_int(repeat_rules.get("window_days", 7), 7),
+            part_threshold=safe_int(repeat_rules.get("part_defect_repeat_threshold", 3), 3),
+            machine_threshold=safe_int(repeat_rules.get("machine_defect_repeat_threshold", 5), 5),
+            part_weight=safe_int(weights.get("part_defect_repeat", 40), 40),
+            machine_weight=safe_int(weights.get("machine_repeat", 25), 25),
+            watch_min=safe_int(score_bands.get("watch_min", 40), 40),
+            repeat_min=safe_int(score_bands.get("repeat_min", 80), 80),
+        )
+
+    def score(self, part_count: int, machine_count: int) -> Tuple[str, int, str]:
+        """
+        (Repeat_Flag, Repeat_Score, Repeat_Reason) for a defect entry, given its
+        Part+Defect and Machine counts over the window (0 when the key is blank).
+        """
+        reasons = []
+        score = 0
+        if part_count >= self.part_threshold:
+            score += self.part_weight
+            reasons.append(f"Part+Defect repeats ({part_count} in {self.window_days}d)")
+        if machine_count >= self.machine_threshold:
+            score += self.machine_weight
+            reasons.append(f"Machine repeat defects ({machine_count} in {self.window_days}d)")
+        if score >= self.repeat_min:
+            flag = "Repeat"
+        elif score >= self.watch_min:
+            flag = "Watch"
+        else:
+            flag = "None"
+        return flag, score, "; ".join(reasons)
+
+
 def detect_repeat_offenders(df: pd.DataFrame, repeat_rules: Dict[str, Any]) -> pd.DataFrame:
     """
     Adds Repeat_Flag / Repeat_Score / Repeat_Reason (best-effort).
@@ -176,95 +393,94 @@ def detect_repeat_offenders(df: pd.DataFrame, repeat_rules: Dict[str, Any]) -> p
     if df.empty:
         return df
 
-    window_days = safe_int(repeat_rules.get("window_days", 7), 7)
-    part_thr = safe_int(repeat_rules.get("part_defect_repeat_threshold", 3), 3)
-    mach_thr = safe_int(repeat_rules.get("machine_defect_repeat_threshold", 5), 5)
+    rules = RepeatRules.from_config(repeat_rules)
+    window_days = rules.window_days
+    part_thr, mach_thr = rules.part_threshold, rules.machine_threshold
+    w_part, w_mach = rules.part_weight, rules.machine_weight
+    watch_min, repeat_min = rules.watch_min, rules.repeat_min
 
-    weights = repeat_rules.get("weights", {}) or {}
-    w_part = safe_int(weights.get("part_defect_repeat", 40), 40)
-    w_mach = safe_int(weights.get("machine_repeat", 25), 25)
-
-    score_bands = repeat_rules.get("score_bands", {}) or {}
-    watch_min = safe_int(score_bands.get("watch_min", 40), 40)
-    repeat_min = safe_int(score_bands.get("repeat_min", 80), 80)
-
-    # Build a date column
     temp = df.copy()
+
+    def text(col: str) -> pd.Series:
+        # Row keys as the old row loop saw them: str(value or "").
+        if col not in temp.columns:
+            return pd.Series("", index=temp.index)
+        return temp[col].fillna("").astype(str)
+
+    def group_counts(mask: pd.Series, cols: List[str]) -> pd.DataFrame:
+        # groupby(...).size() over the rows in mask, keeping only text keys; a row's
+        # str key can never equal a non-text group value, so those never matched anyway.
+        if not all(c in temp.columns for c in cols):
+            return pd.DataFrame(columns=cols + ["cnt"])
+        sub = temp.loc[mask, cols]
+        for c in cols:
+            # str-dtype columns hold only text (NaN groups are dropped anyway)
+            if sub[c].dtype == object:
+                sub = sub[sub[c].map(type).eq(str)]
+        return sub.groupby(cols).size().reset_index(name="cnt")
+
+    # Recent rows with defects feed the counts
     if "Date" in temp.columns:
-        temp["_dt"] = pd.to_datetime(temp["Date"], errors="coerce")
+        dt = parse_iso_dates(temp["Date"])
     else:
-        temp["_dt"] = pd.NaT
-
+        dt = pd.Series(pd.NaT, index=temp.index)
     cutoff = pd.Timestamp(_now().date() - timedelta(days=window_days))
-    recent = temp[temp["_dt"].notna() & (temp["_dt"] >= cutoff)].copy()
-
-    # Base fields if missing
-    for col in ("Repeat_Flag", "Repeat_Score", "Repeat_Reason"):
-        if col not in temp.columns:
-            temp[col] = ""
-
-    # Count repeats by (Part_Number, Defect_Code) where defects present
-    recent_def = recent[recent.get("Defects_Present", "").astype(str).str.lower().eq("yes")].copy()
-    if not recent_def.empty:
-        part_counts = recent_def.groupby(["Part_Number", "Defect_Code"]).size().reset_index(name="cnt")
+    recent = dt.notna() & (dt >= cutoff)
+    if "Defects_Present" in temp.columns:
+        recent_def = recent & temp["Defects_Present"].astype(str).str.lower().eq("yes")
     else:
-        part_counts = pd.DataFrame(columns=["Part_Number", "Defect_Code", "cnt"])
+        recent_def = pd.Series(False, index=temp.index)
 
-    # Count repeats by Machine (defects)
-    if not recent_def.empty:
-        mach_counts = recent_def.groupby(["Machine"]).size().reset_index(name="cnt")
-    else:
-        mach_counts = pd.DataFrame(columns=["Machine", "cnt"])
+    part_counts = group_counts(recent_def, ["Part_Number", "Defect_Code"])
+    mach_counts = group_counts(recent_def, ["Machine"])
 
-    # Apply scoring row-by-row
-    reasons_out = []
-    scores_out = []
-    flags_out = []
+    part = text("Part_Number")
+    dcode = text("Defect_Code")
+    mach = text("Machine")
+    defects_yes = text("Defects_Present").str.lower().eq("yes")
 
-    for _, r in temp.iterrows():
-        score = 0
-        reasons = []
+    keys = pd.DataFrame({"Part_Number": part.to_numpy(), "Defect_Code": dcode.to_numpy()})
+    part_cnt = pd.Series(
+        keys.merge(part_counts, how="left", on=["Part_Number", "Defect_Code"])["cnt"].to_numpy(dtype=float),
+        index=temp.index,
+    )
+    mach_cnt = mach.map(mach_counts.set_index("Machine")["cnt"]).astype(float)
 
-        part = str(r.get("Part_Number", "") or "")
-        dcode = str(r.get("Defect_Code", "") or "")
-        mach = str(r.get("Machine", "") or "")
-        defects_yes = str(r.get("Defects_Present", "") or "").lower() == "yes"
-
-        if defects_yes and part and dcode:
-            match = part_counts[(part_counts["Part_Number"] == part) & (part_counts["Defect_Code"] == dcode)]
-            if not match.empty:
-                cnt = int(match.iloc[0]["cnt"])
-                if cnt >= part_thr:
-                    score += w_part
-                    reasons.append(f"Part+Defect repeats ({cnt} in {window_days}d)")
-
-        if defects_yes and mach:
-            mm = mach_counts[mach_counts["Machine"] == mach]
-            if not mm.empty:
-                cntm = int(mm.iloc[0]["cnt"])
-                if cntm >= mach_thr:
-                    score += w_mach
-                    reasons.append(f"Machine repeat defects ({cntm} in {window_days}d)")
-
-        if score >= repeat_min:
-            flag = "Repeat"
-        elif score >= watch_min:
-            flag = "Watch"
-        else:
-            flag = "None"
+    part_hit = defects_yes & part.ne("") & dcode.ne("") & (part_cnt >= part_thr)
+    mach_hit = defects_yes & mach.ne("") & (mach_cnt >= mach_thr)
 
-        scores_out.append(score)
-        flags_out.append(flag)
-        reasons_out.append("; ".join(reasons))
+    scores = part_hit.astype("int64") * w_part + mach_hit.astype("int64") * w_mach
+    flags = np.select([scores >= repeat_min, scores >= watch_min], ["Repeat", "Watch"], "None")
 
-    temp["Repeat_Score"] = scores_out
-    temp["Repeat_Flag"] = flags_out
-    temp["Repeat_Reason"] = reasons_out
+    part_reason = ("Part+Defect repeats (" + part_cnt.fillna(0).astype(int).astype(str) + f" in {window_days}d)").where(part_hit, "")
+    mach_reason = ("Machine repeat defects (" + mach_cnt.fillna(0).astype(int).astype(str) + f" in {window_days}d)").where(mach_hit, "")
+    reasons = part_reason + pd.Series(np.where(part_hit & mach_hit, "; ", ""), index=temp.index) + mach_reason
 
-    temp.drop(columns=["_dt"], inplace=True, errors="ignore")
+    # Base fields if missing
+    for col in ("Repeat_Flag", "Repeat_Score", "Repeat_Reason"):
+        if col not in temp.columns:
+            temp[col] = ""
+
+    temp["Repeat_Score"] = scores
+    temp["Repeat_Flag"] = flags
+    temp["Repeat_Reason"] = reasons
     return temp
 
 
+# Entry columns generate_notifications reads; screens can load just these.
+NOTIFICATION_COLUMNS = (
+    "ID",
+    "Line",
+    "Machine",
+    "Tool_Num",
+    "Part_Number",
+    "Defect_Code",
+    "Andon_Flag",
+    "Customer_Risk",
+    "COPQ_Est",
+)
+
+
 def generate_notifications(
     df: pd.DataFrame,
     gages_store: Dict[str, Any],
@@ -274,68 +490,38 @@ def generate_notifications(
     Generates a list of alerts (dicts) for Super/Admin.
     Does not persist ack here; UI can persist elsewhere.
     """
+    rules = (risk_cfg or {}).get("rules", {}) or {}
     alerts: List[Dict[str, Any]] = []
 
     # 1) High/Critical entries by Customer_Risk / Andon / COPQ
     if not df.empty:
-        temp = df.copy()
-        # ensure COPQ exists if possible
-        # (we won't compute here to avoid config dependency; UI can compute before)
-        for _, r in temp.iterrows():
-            sev = str(r.get("Customer_Risk", "") or "").strip()
-            andon = str(r.get("Andon_Flag", "") or "").strip().lower()
-            copq = safe_float(r.get("COPQ_Est", 0.0), 0.0)
-
-            if andon == "yes":
-                alerts.append({
-                    "severity": "Critical",
-                    "type": "Andon",
-                    "title": "Andon event",
-                    "details": f"{r.get('Line','')} {r.get('Machine','')} Tool {r.get('Tool_Num','')} Part {r.get('Part_Number','')}",
-                    "related": {"entry_id": str(r.get("ID",""))}
-                })
-                continue
-
-            if sev in ("High", "Critical"):
-                alerts.append({
-                    "severity": sev,
-                    "type": "Risk",
-                    "title": f"{sev} customer risk entry",
-                    "details": f"{r.get('Line','')} {r.get('Machine','')} Part {r.get('Part_Number','')} Defect {r.get('Defect_Code','')}",
-                    "related": {"entry_id": str(r.get("ID",""))}
-                })
-
-            # COPQ high/critical based on config
-            rules = (risk_cfg or {}).get("rules", {}) or {}
-            thr = rules.get("copq_thresholds", {}) or {}
-            if copq >= safe_float(thr.get("critical", 1e18), 1e18):
-                alerts.append({
-                    "severity": "Critical",
-                    "type": "COPQ",
-                    "title": "Critical COPQ event",
-                    "details": f"Entry {r.get('ID','')} COPQ ${copq:,.2f}",
-                    "related": {"entry_id": str(r.get("ID",""))}
-                })
-            elif copq >= safe_float(thr.get("high", 1e18), 1e18):
-                alerts.append({
-                    "severity": "High",
-                    "type": "COPQ",
-                    "title": "High COPQ event",
-                    "details": f"Entry {r.get('ID','')} COPQ ${copq:,.2f}",
-                    "related": {"entry_id": str(r.get("ID",""))}
-                })
+        alerts.extend(entry_alerts(df, rules))
 
     # 2) Gage calibration due/overdue
+    alerts.extend(gage_alerts(gages_store, risk_cfg))
+    return alerts
+
+
+def gage_alerts(
+    gages_store: Dict[str, Any],
+    risk_cfg: Dict[str, Any],
+    statuses: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Calibration alerts for gages that are Overdue or Due Soon.
+    statuses (gage_id -> gage_due_status-style dict) skips re-deriving due dates.
+    """
+    rules = (risk_cfg or {}).get("rules", {}) or {}
+    alerts: List[Dict[str, Any]] = []
+    gmap = (rules.get("gage_calibration_escalation", {}) or {}).get("overdue_criticality_map", {}) or {}
     gages = (gages_store or {}).get("gages", []) or []
     for g in gages:
-        ds = gage_due_status(g, risk_cfg)
+        ds = statuses[g.get("gage_id")] if statuses is not None else gage_due_status(g, risk_cfg)
         if ds["status"] in ("Overdue", "Due Soon"):
             crit = str(g.get("criticality", "Medium") or "Medium")
             severity = "High" if ds["status"] == "Overdue" else "Medium"
 
             # escalate overdue based on criticality map if provided
-            rules = (risk_cfg or {}).get("rules", {}) or {}
-            gmap = (rules.get("gage_calibration_escalation", {}) or {}).get("overdue_criticality_map", {}) or {}
             if ds["status"] == "Overdue":
                 severity = gmap.get(crit, "High")
 
@@ -350,27 +536,100 @@ def generate_notifications(
     return alerts
 
 
+def entry_alerts(df: pd.DataFrame, rules: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Andon, customer-risk and COPQ alerts, one mask per rule.
+    Alerts come back in row order; within a row Andon suppresses the others and
+    the risk alert comes before the COPQ one.
+    """
+    def text(col: str) -> pd.Series:
+        # str() per cell, as the f-strings saw them (astype(str) would keep NaN as NaN).
+        if col not in df.columns:
+            return pd.Series("", index=df.index, dtype=object)
+        return df[col].map(str).astype(object)
+
+    andon = to_flag_series(df["Andon_Flag"]).to_numpy() if "Andon_Flag" in df.columns else np.zeros(len(df), dtype=bool)
+    if "Customer_Risk" in df.columns:
+        sev = df["Customer_Risk"].where(df["Customer_Risk"].notna(), "").astype(str).str.strip()
+    else:
+        sev = pd.Series("", index=df.index)
+    copq = to_float_series(df["COPQ_Est"], 0.0) if "COPQ_Est" in df.columns else pd.Series(0.0, index=df.index)
+
+    thr = rules.get("copq_thresholds", {}) or {}
+    copq_critical = safe_float(thr.get("critical", 1e18), 1e18)
+    copq_high = safe_float(thr.get("high", 1e18), 1e18)
+
+    risk_mask = ~andon & sev.isin(["High", "Critical"]).to_numpy()
+    critical_mask = ~andon & (copq >= copq_critical).to_numpy()
+    high_mask = ~andon & ~critical_mask & (copq >= copq_high).to_numpy()
+
+    ids = text("ID").to_numpy()
+    where = text("Line") + " " + text("Machine")
+    positions = np.arange(len(df))
+    found: List[Tuple[int, int, Dict[str, Any]]] = []
+
+    andon_details = (where + " Tool " + text("Tool_Num") + " Part " + text("Part_Number")).to_numpy()
+    for i in positions[andon]:
+        found.append((i, 0, {
+            "severity": "Critical",
+            "type": "Andon",
+            "title": "Andon event",
+            "details": andon_details[i],
+            "related": {"entry_id": str(ids[i])}
+        }))
+
+    risk_details = (where + " Part " + text("Part_Number") + " Defect " + text("Defect_Code")).to_numpy()
+    sev_values = sev.to_numpy()
+    for i in positions[risk_mask]:
+        found.append((i, 0, {
+            "severity": sev_values[i],
+            "type": "Risk",
+            "title": f"{sev_values[i]} customer risk entry",
+            "details": risk_details[i],
+            "related": {"entry_id": str(ids[i])}
+        }))
+
+    copq_values = copq.to_numpy()
+    for mask, severity in ((critical_mask, "Critical"), (high_mask, "High")):
+        for i in positions[mask]:
+            found.append((i, 1, {
+                "severity": severity,
+                "type": "COPQ",
+                "title": f"{severity} COPQ event",
+                "details": f"Entry {ids[i]} COPQ ${copq_values[i]:,.2f}",
+                "related": {"entry_id": str(ids[i])}
+            }))
+
+    found.sort(key=lambda item: (item[0], item[1]))
+    return [alert for _, _, alert in found]
+
+
 def health_check(df: pd.DataFrame) -> List[Dict[str, Any]]:
     """
-    Returns a list of issues (dicts) for a future Health Check screen.
+    Returns a list of issues (dicts): required fields and defect logic, in row order.
+    The Health Check screen runs its fuller rule set through health_engine.
     """
     issues: List[Dict[str, Any]] = []
     if df.empty:
         return issues
 
-    for _, r in df.iterrows():
-        entry_id = str(r.get("ID",""))
-        # basic required
-        for col in ("Line", "Machine", "Tool_Num", "Reason"):
-            if not str(r.get(col,"") or "").strip():
-                issues.append({"severity":"High", "entry_id": entry_id, "issue": f"Missing {col}"})
-
-        # defects logic
-        defects = str(r.get("Defects_Present","") or "").strip().lower()
-        qty = safe_int(r.get("Defect_Qty", 0), 0)
-        if defects == "yes" and qty <= 0:
-            issues.append({"severity":"High", "entry_id": entry_id, "issue":"Defects=Yes but Defect_Qty<=0"})
-        if defects == "no" and qty > 0:
-            issues.append({"severity":"Medium", "entry_id": entry_id, "issue":"Defects=No but Defect_Qty>0"})
-
-    return issues
+    def text(col: str) -> pd.Series:
+        # Missing values count as blank (the row loop read NaN as the text "nan").
+        if col not in df.columns:
+            return pd.Series("", index=df.index)
+        return df[col].where(df[col].notna(), "").astype(str).str.strip()
+
+    ids = df["ID"].map(str).to_numpy() if "ID" in df.columns else np.full(len(df), "")
+    defects = text("Defects_Present").str.lower()
+    qty = to_int_series(df["Defect_Qty"], 0) if "Defect_Qty" in df.columns else pd.Series(0, index=df.index)
+
+    checks = [(text(col).eq(""), "High", f"Missing {col}") for col in ("Line", "Machine", "Tool_Num", "Reason")]
+    checks.append((defects.eq("yes") & qty.le(0), "High", "Defects=Yes but Defect_Qty<=0"))
+    checks.append((defects.eq("no") & qty.gt(0), "Medium", "Defects=No but Defect_Qty>0"))
+
+    found = []
+    for order, (mask, severity, issue) in enumerate(checks):
+        for i in np.flatnonzero(mask.to_numpy()):
+            found.append((i, order, {"severity": severity, "entry_id": ids[i], "issue": issue}))
+    found.sort(key=lambda item: (item[0], item[1]))
+    return [issue for _, _, issue in found]
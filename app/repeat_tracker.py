@@ -0,0 +1,214 @@
+# app/repeat_tracker.py
+"""
+Scores repeat offenders as entries are saved instead of when a screen opens.
+
+RepeatTracker keeps per-day counters for each (part, defect code), machine and tool
+over repeat_rules.json's window_days. Adding an entry is a few dict updates and
+expiring a day subtracts that day's counts once, so scoring costs the same however
+much history there is. The tracker is seeded from tool_entries on first use (and
+again when repeat_rules.json changes); the services record each new entry's flag in
+repeat_flags so screens can read it back. Entries written any other way (save_df,
+an edit, another station) are picked up from tool_entry_changes and re-scored the
+next time the tracker is used.
+"""
+from __future__ import annotations
+
+import heapq
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import db
+from .coercion import parse_date
+from .config import REPEAT_RULES_FILE
+from .quality_engine import RepeatRules
+from .storage import load_json
+
+Key = Tuple[str, ...]
+
+_SEED_COLUMNS = ("id", "date", "part_number", "machine", "tool_num", "defects_present")
+
+
+def _text(value: Any) -> str:
+    # Same keys detect_repeat_offenders groups on: str(value or "").
+    return str(value or "")
+
+
+class RepeatTracker:
+    def __init__(self, rules: RepeatRules, today: Optional[date] = None) -> None:
+        self.rules = rules
+        self._today = today
+        self._days: Dict[int, Counter] = {}
+        self._day_ids: Dict[int, Set[str]] = {}
+        self._day_heap: List[int] = []
+        self._totals: Counter = Counter()
+        # What each ID was counted as: its day and keys
+        self._counted: Dict[str, Tuple[int, Tuple[Key, ...]]] = {}
+
+    def _cutoff(self) -> int:
+        today = self._today or datetime.now().date()
+        return (today - timedelta(days=self.rules.window_days)).toordinal()
+
+    def expire(self) -> None:
+        """Drops day buckets that have slid out of the window."""
+        cutoff = self._cutoff()
+        while self._day_heap and self._day_heap[0] < cutoff:
+            day = heapq.heappop(self._day_heap)
+            for key, n in self._days.pop(day).items():
+                left = self._totals[key] - n
+                if left > 0:
+                    self._totals[key] = left
+                else:
+                    del self._totals[key]
+            for entry_id in self._day_ids.pop(day):
+                self._counted.pop(entry_id, None)
+
+    @staticmethod
+    def _keys(entry: Dict[str, Any]) -> List[Key]:
+        keys: List[Key] = [("tool", _text(entry.get("Tool_Num")))]
+        if _text(entry.get("Defects_Present")).lower() == "yes":
+            keys.append(("part", _text(entry.get("Part_Number")), _text(entry.get("Defect_Code"))))
+            keys.append(("machine", _text(entry.get("Machine"))))
+        return keys
+
+    def _uncount(self, entry_id: str) -> None:
+        day, keys = self._counted.pop(entry_id)
+        bucket = self._days[day]
+        for key in keys:
+            bucket[key] -= 1
+            if bucket[key] <= 0:
+                del bucket[key]
+            left = self._totals[key] - 1
+            if left > 0:
+                self._totals[key] = left
+            else:
+                del self._totals[key]
+        self._day_ids[day].discard(entry_id)
+
+    def _count(self, entry: Dict[str, Any]) -> None:
+        entry_id = _text(entry.get("ID"))
+        when = parse_date(entry.get("Date", ""))
+        day = when.date().toordinal() if when is not None else None
+        keys = tuple(self._keys(entry))
+        if entry_id in self._counted:
+            if self._counted[entry_id] == (day, keys):
+                return
+            # An edited entry replaces what it was counted as.
+            self._uncount(entry_id)
+        if day is None or day < self._cutoff():
+            return
+        bucket = self._days.get(day)
+        if bucket is None:
+            bucket = self._days[day] = Counter()
+            self._day_ids[day] = set()
+            heapq.heappush(self._day_heap, day)
+        for key in keys:
+            bucket[key] += 1
+            self._totals[key] += 1
+        if entry_id:
+            self._day_ids[day].add(entry_id)
+            self._counted[entry_id] = (day, keys)
+
+    def seed(self, entries: Iterable[Dict[str, Any]]) -> None:
+        for entry in entries:
+            self._count(entry)
+
+    def count(self, kind: str, *key: str) -> int:
+        """Entries in the window for ("tool", tool), ("machine", m) or ("part", part, code)."""
+        self.expire()
+        return self._totals.get((kind, *key), 0)
+
+    def add(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Counts entry (once per ID; an ID added again with another date or keys
+        replaces its earlier count) and returns its Repeat_Flag / Repeat_Score /
+        Repeat_Reason, scored the way detect_repeat_offenders scores it.
+        """
+        self.expire()
+        self._count(entry)
+        flag, score, reason = "None", 0, ""
+        if _text(entry.get("Defects_Present")).lower() == "yes":
+            part, code, machine = (_text(entry.get(c)) for c in ("Part_Number", "Defect_Code", "Machine"))
+            part_count = self._totals.get(("part", part, code), 0) if part and code else 0
+            machine_count = self._totals.get(("machine", machine), 0) if machine else 0
+            flag, score, reason = self.rules.score(part_count, machine_count)
+        return {"Repeat_Flag": flag, "Repeat_Score": score, "Repeat_Reason": reason}
+
+
+_tracker: Optional[RepeatTracker] = None
+_tracker_db = ""
+_tracker_seq = 0  # last tool_entry_changes seq the tracker has seen
+_tracker_lock = threading.Lock()
+CHANGES_BATCH_SIZE = 5000
+
+
+def _entry(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ID": row["id"],
+        "Date": row["date"],
+        "Part_Number": row["part_number"],
+        "Machine": row["machine"],
+        "Tool_Num": row["tool_num"],
+        "Defects_Present": row["defects_present"],
+    }
+
+
+def _seed_from_db(tracker: RepeatTracker) -> None:
+    since = date.fromordinal(tracker._cutoff()).isoformat()
+    tracker.seed(_entry(row._asdict()) for row in db.iter_tool_entries(since=since, columns=_SEED_COLUMNS))
+
+
+def _sync() -> Tuple[RepeatTracker, int]:
+    """
+    Rebuilds the tracker when the rules or DB changed, then re-scores every entry
+    written since it last looked. Returns the tracker and how many were re-scored.
+    """
+    global _tracker, _tracker_db, _tracker_seq
+    rules = RepeatRules.from_config(load_json(REPEAT_RULES_FILE, {}) or {})
+    scored: List[Tuple[str, str, int, str]] = []
+    with _tracker_lock:
+        if _tracker is None or _tracker.rules != rules or _tracker_db != db.DB_PATH:
+            # Read the log position first: a write racing the seed is replayed, not lost.
+            seq = db.latest_tool_entry_change_seq()
+            tracker = RepeatTracker(rules)
+            _seed_from_db(tracker)
+            _tracker, _tracker_db, _tracker_seq = tracker, db.DB_PATH, seq
+        tracker = _tracker
+        while True:
+            changed = db.list_changed_tool_entries(_tracker_seq, CHANGES_BATCH_SIZE)
+            if not changed:
+                break
+            _tracker_seq = changed[-1][1]
+            for row in db.fetch_tool_entries_by_ids([entry_id for entry_id, _ in changed], _SEED_COLUMNS):
+                result = tracker.add(_entry(row))
+                scored.append((row["id"], result["Repeat_Flag"], result["Repeat_Score"], result["Repeat_Reason"]))
+    if scored:
+        db.save_repeat_flags(scored)
+    return tracker, len(scored)
+
+
+def get_repeat_tracker() -> RepeatTracker:
+    """The process-wide tracker, rebuilt from the DB when the rules or DB change."""
+    return _sync()[0]
+
+
+def sync_repeat_flags() -> int:
+    """Re-scores entries written since the last save or sync (e.g. a Defects_Present edit); returns how many."""
+    return _sync()[1]
+
+
+def reset_repeat_tracker() -> None:
+    """Drops the tracker so the next use rebuilds it, e.g. after the database file was replaced."""
+    global _tracker
+    with _tracker_lock:
+        _tracker = None
+
+
+def record_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Scores a just-saved entry and stores its repeat flag."""
+    tracker = get_repeat_tracker()
+    with _tracker_lock:
+        result = tracker.add(entry)
+    db.save_repeat_flag(str(entry.get("ID")), result["Repeat_Flag"], result["Repeat_Score"], result["Repeat_Reason"])
+    return result
@@ -0,0 +1,2 @@
+# app/reports/__init__.py
+"""Reports that run headless as well as from their screens (python -m app.reports.<name>)."""
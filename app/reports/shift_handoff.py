@@ -0,0 +1,258 @@
+# app/reports/shift_handoff.py
+"""
+Shift handoff report: entry totals, top offenders and scrap cost over a date range.
+
+build_report() reads everything from a MetricsCube, so the numbers come from array
+roll-ups rather than per-group loops; the Shift Handoff screen and the command
+line share it. write_workbook() streams the report and its entries into an
+openpyxl write_only workbook, a row at a time.
+
+From the command line, one workbook per line, built in parallel:
+    python -m app.reports.shift_handoff --start 2024-06-03 --end 2024-06-03 [--line L1 --line L2]
+        [--out DIR] [--workers N]
+Without --line every line with entries in the range gets a workbook.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+from openpyxl import Workbook
+
+from ..config import DATA_DIR
+from ..dates import parse_iso_dates
+from ..db import get_scrap_costs_simple, init_db
+from ..metrics_cube import MetricsCube, day_bounds
+from ..storage import get_df_range
+
+# Weighted offender score: entries, defects, downtime and COPQ together
+OFFENDER_SCORE = {"entries": 1.0, "defect_qty": 2.0, "downtime_mins": 0.5, "copq_est": 0.01}
+OFFENDER_GROUPS = (("machine", "Machine"), ("part_number", "Part"), ("defect_code", "Defect"))
+TOP_OFFENDERS = 25
+OFFENDER_COLUMNS = ["rank", "group", "key", "count", "defect_qty", "downtime_mins", "copq_est"]
+# Ranges longer than this chart scrap per week instead of per day
+DAILY_SCRAP_MAX_DAYS = 31
+
+
+@dataclass
+class HandoffReport:
+    start: datetime
+    end: datetime
+    line: str
+    totals: Dict[str, float]
+    scrap_total: float
+    offenders: pd.DataFrame
+    scrap: pd.DataFrame
+    scrap_label: str
+
+    @property
+    def empty(self) -> bool:
+        return not self.totals.get("entries")
+
+    def summary_lines(self) -> List[str]:
+        """The summary as the screen shows it, one line per list item ('' for a gap)."""
+        t = self.totals
+        head = [f"Range: {self.start.strftime('%Y-%m-%d %H:%M')} → {self.end.strftime('%Y-%m-%d %H:%M')}"]
+        if self.line:
+            head.append(f"Line: {self.line}")
+        if self.empty:
+            return head + ["", "No entries in range."]
+        return head + [
+            "",
+            # Every row counts as a tool change entry
+            f"Tool change entries: {int(t['entries'])}",
+            f"Total downtime (mins): {t['downtime_mins']:.1f}",
+            f"Total defects (qty): {int(t['defect_qty'])}",
+            f"Andon events: {int(t['andon'])}",
+            f"High/Critical risk entries: {int(t['high_risk'])}",
+            f"Open/Overdue actions (rows): {int(t['open_actions'])}",
+            f"Total COPQ estimate: ${t['copq_est']:,.2f}",
+            "",
+            f"Total scrap cost: ${self.scrap_total:,.2f}",
+            "",
+            "Top offenders table below = combined score by count/defects/downtime/COPQ.",
+        ]
+
+
+def build_report(
+    cube: MetricsCube,
+    start: datetime,
+    end: datetime,
+    *,
+    line: str = "",
+    scrap_costs: Optional[Mapping[str, float]] = None,
+) -> HandoffReport:
+    """The handoff figures for the days start..end of cube (see metrics_cube.day_bounds)."""
+    scrap_costs = get_scrap_costs_simple() if scrap_costs is None else scrap_costs
+    days = day_bounds(start, end)
+    totals = cube.totals(days=days)
+
+    by_part = cube.rollup(["part_number"], days=days)
+    scrap_total = float(pd.Series(by_part["part_number"]).map(scrap_costs).fillna(0.0).to_numpy() @ by_part["defect_qty"])
+
+    rows = []
+    for dim, label in OFFENDER_GROUPS:
+        for r in cube.top_n([dim], TOP_OFFENDERS, score=OFFENDER_SCORE, days=days):
+            rows.append({
+                "group": label,
+                "key": f"{label}: {r[dim] or '(blank)'}",
+                "count": int(r["entries"]),
+                "defect_qty": int(r["defect_qty"]),
+                "downtime_mins": float(r["downtime_mins"]),
+                "copq_est": float(r["copq_est"]),
+                "_score": r["score"],
+            })
+    offenders = pd.DataFrame(rows, columns=OFFENDER_COLUMNS[1:] + ["_score"])
+    offenders = offenders.sort_values("_score", ascending=False, kind="stable").head(TOP_OFFENDERS)
+    offenders = offenders.reset_index(drop=True)
+    offenders.insert(0, "rank", offenders.index + 1)
+
+    scrap, scrap_label = _scrap_by_bucket(cube, days, start, end, scrap_costs)
+    return HandoffReport(start, end, line, totals, scrap_total, offenders, scrap, scrap_label)
+
+
+def _scrap_by_bucket(
+    cube: MetricsCube,
+    days: Tuple[int, int],
+    start: datetime,
+    end: datetime,
+    scrap_costs: Mapping[str, float],
+) -> Tuple[pd.DataFrame, str]:
+    """Scrap cost per day, or per week (Monday start) over longer ranges."""
+    by_day = cube.rollup(["day", "part_number"], days=days)
+    if (end.date() - start.date()).days + 1 > DAILY_SCRAP_MAX_DAYS:
+        label = "Week Starting"
+    else:
+        label = "Date"
+    if not len(by_day["day"]):
+        return pd.DataFrame({"bucket": pd.Series(dtype=str), "scrap_cost": pd.Series(dtype=float)}), label
+
+    cost = pd.Series(by_day["part_number"]).map(scrap_costs).fillna(0.0) * by_day["defect_qty"]
+    bucket = pd.Series(pd.to_datetime(by_day["day"]))
+    if label == "Week Starting":
+        bucket = bucket - pd.to_timedelta(bucket.dt.weekday, unit="D")
+    out = cost.groupby(bucket.dt.strftime("%Y-%m-%d").to_numpy()).sum()
+    return out.rename("scrap_cost").rename_axis("bucket").reset_index().sort_values("bucket", ignore_index=True), label
+
+
+def load_entries(start: datetime, end: datetime, line: Optional[str] = None) -> pd.DataFrame:
+    """Entries dated start..end (a date-only filter, as the report uses), optionally of one line."""
+    df = get_df_range(start.strftime("%Y-%m"), end.strftime("%Y-%m"))
+    dt = parse_iso_dates(df.get("Date", ""))
+    keep = dt.notna() & (dt >= pd.Timestamp(start)) & (dt <= pd.Timestamp(end))
+    if line:
+        keep &= df.get("Line", "") == line
+    return df.loc[keep].reset_index(drop=True)
+
+
+def _append_frame(ws, frame: pd.DataFrame) -> None:
+    ws.append([str(c) for c in frame.columns])
+    values = frame.astype(object).where(frame.notna(), None)
+    for row in values.itertuples(index=False, name=None):
+        ws.append(list(row))
+
+
+def write_workbook(report: HandoffReport, path: str, entries: Optional[pd.DataFrame] = None) -> str:
+    """Writes Summary, Top_Offenders, Scrap_Cost and (given entries) Filtered_Entries sheets."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Summary")
+    for text in report.summary_lines():
+        ws.append([text])
+    _append_frame(wb.create_sheet("Top_Offenders"), report.offenders[OFFENDER_COLUMNS])
+    _append_frame(wb.create_sheet("Scrap_Cost"), report.scrap.rename(columns={"bucket": report.scrap_label}))
+    if entries is not None:
+        _append_frame(wb.create_sheet("Filtered_Entries"), entries)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    wb.save(path)
+    return path
+
+
+def report_path(out_dir: str, start: datetime, end: datetime, line: str = "") -> str:
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", line).strip("_") if line else "all_lines"
+    return os.path.join(out_dir, f"shift_handoff_{slug}_{start:%Y_%m_%d}_{end:%Y_%m_%d}.xlsx")
+
+
+def _write_line_report(job: Tuple[str, pd.DataFrame, datetime, datetime, Dict[str, float], str]) -> str:
+    """One line's workbook; top level so a process pool can run it."""
+    line, entries, start, end, scrap_costs, path = job
+    report = build_report(MetricsCube.from_frame(entries), start, end, line=line, scrap_costs=scrap_costs)
+    return write_workbook(report, path, entries)
+
+
+def generate_reports(
+    start: datetime,
+    end: datetime,
+    *,
+    lines: Optional[Sequence[str]] = None,
+    out_dir: str = DATA_DIR,
+    workers: Optional[int] = None,
+) -> List[str]:
+    """
+    Writes one workbook per line (every line with entries in range when lines is
+    None) and returns their paths. Entries are read once here; each line's cube and
+    workbook are built in its own process.
+    """
+    entries = load_entries(start, end)
+    line_col = entries.get("Line", pd.Series("", index=entries.index)).fillna("").astype(str)
+    if lines is None:
+        lines = sorted(v for v in line_col.unique() if v)
+    scrap_costs = get_scrap_costs_simple()
+    jobs = [
+        (line, entries.loc[line_col == line].reset_index(drop=True), start, end, scrap_costs,
+         report_path(out_dir, start, end, line))
+        for line in lines
+    ]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return [_write_line_report(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_write_line_report, jobs))
+
+
+def _parse_day(text: str) -> datetime:
+    try:
+        return datetime.strptime(text.strip(), "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {text!r}")
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    today = datetime.now().strftime("%Y-%m-%d")
+    parser = argparse.ArgumentParser(
+        prog="python -m app.reports.shift_handoff",
+        description="Write shift handoff workbooks, one per line, without opening the app.",
+    )
+    parser.add_argument("--start", type=_parse_day, default=today, help="first day, YYYY-MM-DD (default today)")
+    parser.add_argument("--end", type=_parse_day, default=None, help="last day, YYYY-MM-DD (default --start)")
+    parser.add_argument("--line", action="append", dest="lines", help="line to report; repeat for several "
+                        "(default every line with entries)")
+    parser.add_argument("--out", default=DATA_DIR, help=f"output folder (default {DATA_DIR})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default one per CPU)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    start = args.start
+    last = args.end or start
+    if last < start:
+        parser.error("--end is before --start")
+    # The whole last day counts, as on the screen's custom range.
+    end = last.replace(hour=23, minute=59, second=59)
+
+    init_db()
+    paths = generate_reports(start, end, lines=args.lines, out_dir=args.out, workers=args.workers)
+    if not paths:
+        print("No entries in range.", file=sys.stderr)
+        return 1
+    for path in paths:
+        print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
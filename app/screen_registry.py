@@ -16,6 +16,10 @@ SCREEN_REGISTRY: Dict[str, Tuple[str, str]] = {
     "Health Check": ("app.ui_health_check", "HealthCheckUI"),
     "Shift Handoff": ("app.ui_shift_handoff", "ShiftHandoffUI"),
     "Repeat Offenders": ("app.ui_repeat_offenders", "RepeatOffendersUI"),
+    "Tool Life Board": ("app.ui_tool_life_board", "ToolLifeBoardUI"),
+    "OEE Trends": ("app.ui_oee", "OeeUI"),
+    "Tool Costs": ("app.ui_tool_cost", "ToolCostUI"),
+    "Downtime Pareto": ("app.ui_downtime", "DowntimeParetoUI"),
     "Top level": ("app.ui_top", "TopUI"),
     "Master Data": ("app.ui_master_data", "MasterDataUI"),
     "Admin": ("app.ui_admin", "AdminUI"),
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import logging
+import traceback
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Sequence, Tuple
 
 from ..audit import log_audit
 from ..exceptions import PermissionDenied
+from ..logging_config import log_with_user
 from ..permissions import can
 
+_logger = logging.getLogger("toollife")
+
 
 @dataclass(frozen=True)
 class Actor:
@@ -63,3 +68,18 @@ def audit(
     elif isinstance(details, str) and details:
         details_str = f" | {details}"
     log_audit(user, f"{status} {action}{details_str}")
+
+
+def after_save(actor: Actor, saved: str, hooks: Sequence[Tuple[str, Callable[[], Any]]]) -> None:
+    """
+    Updates what is derived from something just saved (saved names it for the log).
+    The save is already committed, so a failing hook is logged rather than failing
+    it, and the rest still run. The models catch up from tool_entry_changes on their
+    next run; the stock forecast is recomputed in full at the next start-up or day.
+    """
+    for name, hook in hooks:
+        try:
+            hook()
+        except Exception as exc:
+            stack = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+            log_with_user(_logger, logging.ERROR, f"{name} after saving {saved} failed\n{stack}", user=actor.username)
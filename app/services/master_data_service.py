@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import shutil
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from .common import Actor, audit, require_permission
+from .common import Actor, after_save, audit, require_permission
+from ..copq import backfill_copq
+from ..inventory_forecast import refresh_inventory_forecast
 from ..config import DB_PATH
 from ..db import (
     add_line,
@@ -25,6 +27,8 @@ from ..db import (
     list_tool_inserts,
     list_tools_for_line,
     list_tools_simple,
+    record_stock_movement,
+    reprice_tool_changes,
     replace_tool_inserts,
     set_scrap_cost,
     set_tool_lines,
@@ -183,6 +187,7 @@ def set_scrap_cost_service(part_number: str, cost: float, *, actor_user: Actor |
     actor = require_permission(actor_user, PERMISSION_KEY, "set_scrap_cost", "Master Data")
     try:
         set_scrap_cost(part_number, cost)
+        backfill_copq(part_number=part_number)
         audit(
             "scrap_cost.set",
             actor.username,
@@ -372,9 +377,9 @@ def upsert_tool_inventory_service(
     tool_num: str,
     name: str,
     unit_cost: float,
-    stock_qty: int,
     inserts_per_tool: int,
     actor_user: Actor | Dict[str, str] | None,
+    stock_qty: Optional[int] = None,
 ) -> None:
     actor = require_permission(actor_user, PERMISSION_KEY, "upsert_tool_inventory", "Master Data")
     try:
@@ -384,6 +389,7 @@ def upsert_tool_inventory_service(
             unit_cost=unit_cost,
             stock_qty=stock_qty,
             inserts_per_tool=inserts_per_tool,
+            updated_by=actor.username,
         )
         audit(
             "tool.upsert",
@@ -401,6 +407,69 @@ def upsert_tool_inventory_service(
         raise
 
 
+def adjust_tool_stock_service(
+    tool_num: str,
+    qty: int,
+    *,
+    kind: str = "adjustment",
+    note: str = "",
+    actor_user: Actor | Dict[str, str] | None,
+) -> Optional[int]:
+    """Adds qty (negative to remove) to a tool's stock as one ledger movement."""
+    actor = require_permission(actor_user, PERMISSION_KEY, "adjust_tool_stock", "Master Data")
+    try:
+        balance = record_stock_movement(tool_num, kind, qty, username=actor.username, note=note)
+        audit(
+            "tool.stock",
+            actor.username,
+            {"tool_num": tool_num, "kind": kind, "qty": qty, "balance": balance},
+            success=True,
+        )
+    except Exception as exc:
+        audit(
+            "tool.stock",
+            actor.username,
+            {"tool_num": tool_num, "kind": kind, "qty": qty, "error": str(exc)},
+            success=False,
+        )
+        raise
+    # Days of cover and the reorder point follow the new balance.
+    after_save(actor, f"stock of {tool_num}", (
+        ("Inventory forecast refresh", lambda: refresh_inventory_forecast([tool_num])),
+    ))
+    return balance
+
+
+def reprice_tool_changes_service(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    *,
+    actor_user: Actor | Dict[str, str] | None,
+) -> int:
+    """
+    Re-prices saved tool changes (optionally between ISO dates start and end) at the
+    change cost in effect when each was made. Returns how many entries changed.
+    """
+    actor = require_permission(actor_user, PERMISSION_KEY, "reprice_tool_changes", "Master Data")
+    try:
+        changed = reprice_tool_changes(start, end)
+        audit(
+            "tool_entry.reprice",
+            actor.username,
+            {"start": start, "end": end, "changed": changed},
+            success=True,
+        )
+        return changed
+    except Exception as exc:
+        audit(
+            "tool_entry.reprice",
+            actor.username,
+            {"start": start, "end": end, "error": str(exc)},
+            success=False,
+        )
+        raise
+
+
 def deactivate_tool_service(tool_num: str, *, deleted_by: str, actor_user: Actor | Dict[str, str] | None) -> None:
     actor = require_permission(actor_user, PERMISSION_KEY, "deactivate_tool", "Master Data")
     try:
@@ -3,7 +3,9 @@ from __future__ import annotations
 from typing import Any, Dict, List, Optional
 
 from .common import Actor, audit, require_permission
-from ..db import fetch_tool_entries, upsert_tool_entry
+from ..copq import copq_for_entry
+from ..exceptions import NotFoundError
+from ..db import fetch_tool_entries, fetch_tool_entry, insert_tool_entry, update_tool_entry
 
 
 PERMISSION_KEY = "manage_quality"
@@ -14,10 +16,7 @@ def list_quality_entries() -> List[Dict[str, Any]]:
 
 
 def get_quality_entry(entry_id: str) -> Optional[Dict[str, Any]]:
-    for row in fetch_tool_entries():
-        if row.get("id") == entry_id:
-            return row
-    return None
+    return fetch_tool_entry(entry_id)
 
 
 def update_quality_entry(
@@ -27,7 +26,9 @@ def update_quality_entry(
 ) -> None:
     actor = require_permission(actor_user, PERMISSION_KEY, "update_quality_entry", "Quality")
     try:
-        upsert_tool_entry(entry)
+        entry = {**entry, "COPQ_Est": copq_for_entry(entry)}
+        if not update_tool_entry(entry):
+            raise NotFoundError(f"Entry {entry.get('ID')} not found")
         audit(
             "quality.update",
             actor.username,
@@ -51,7 +52,8 @@ def create_quality_entry(
 ) -> None:
     actor = require_permission(actor_user, PERMISSION_KEY, "create_quality_entry", "Quality")
     try:
-        upsert_tool_entry(entry)
+        entry = {**entry, "COPQ_Est": copq_for_entry(entry)}
+        insert_tool_entry(entry)
         audit(
             "quality.create",
             actor.username,
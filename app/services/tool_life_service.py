@@ -1,14 +1,25 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
-
-from .common import Actor, audit, require_permission
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .common import Actor, after_save, audit, require_permission
+from ..copq import copq_for_entry
+from ..exceptions import NotFoundError
+from ..repeat_tracker import record_entry, sync_repeat_flags
+from ..tool_life_model import refresh_tool_life_model
+from ..inventory_forecast import refresh_inventory_forecast
+from ..oee import refresh_oee_rollup
+from ..spc import refresh_spc
+from ..ewma import refresh_ewma
 from .validation import validate_tool_change_entry
 from ..db import (
     apply_tool_change,
     fetch_tool_entries,
+    fetch_tool_entry,
     get_tool,
     get_production_goal,
+    insert_tool_entry_with_downtime,
+    iter_tool_entries,
     list_cells_for_line,
     list_downtime_codes,
     list_lines,
@@ -16,7 +27,7 @@ from ..db import (
     list_parts_for_line,
     list_tool_inserts,
     list_tools_for_line,
-    upsert_tool_entry_with_downtime,
+    update_tool_entry,
 )
 
 
@@ -55,44 +66,26 @@ def get_tool_inserts(tool_num: str) -> List[Dict[str, Any]]:
     return list_tool_inserts(tool_num)
 
 
-def _calculate_insert_cost(inserts: List[Dict[str, Any]]) -> float:
-    total = 0.0
-    for ins in inserts:
-        count = float(ins.get("insert_count", 0) or 0)
-        price = float(ins.get("price_per_insert", 0) or 0)
-        life = float(ins.get("tool_life", 0) or 0)
-        sides = float(ins.get("sides_per_insert", 1) or 1)
-        if life <= 0 or sides <= 0:
-            continue
-        total += ((count * price) / life) / sides
-    return total
-
-
 def create_tool_change_entry(
     entry: Dict[str, Any],
     *,
     tool_num: str,
-    new_stock_qty: Optional[int],
+    consume_stock: bool = True,
     actor_user: Actor | Dict[str, str] | None,
 ) -> float:
     actor = require_permission(actor_user, PERMISSION_KEY, "create_tool_change_entry", "Tool Changer")
     validate_tool_change_entry(entry)
 
     try:
-        inserts = list_tool_inserts(tool_num)
-        cost = _calculate_insert_cost(inserts)
-        info = get_tool(tool_num)
-        if info and not inserts:
-            cost = float(info.get("unit_cost", 0.0) or 0.0)
-
-        apply_tool_change(entry, tool_num=tool_num, new_stock_qty=new_stock_qty, updated_by=actor.username)
+        entry = {**entry, "COPQ_Est": copq_for_entry(entry)}
+        # The entry is saved priced at the tool's cached change cost (see db.apply_tool_change).
+        cost, _ = apply_tool_change(entry, tool_num=tool_num, consume_stock=consume_stock, updated_by=actor.username)
         audit(
             "tool_entry.create",
             actor.username,
             {"entry_id": entry.get("ID"), "tool_num": tool_num},
             success=True,
         )
-        return cost
     except Exception as exc:
         audit(
             "tool_entry.create",
@@ -101,6 +94,15 @@ def create_tool_change_entry(
             success=False,
         )
         raise
+    after_save(actor, f"entry {entry.get('ID')}", (
+        ("Repeat scoring", lambda: record_entry(entry)),
+        ("Tool-life model refresh", refresh_tool_life_model),
+        ("Inventory forecast refresh", lambda: refresh_inventory_forecast([tool_num])),
+        ("OEE rollup refresh", refresh_oee_rollup),
+        ("SPC refresh", refresh_spc),
+        ("EWMA refresh", refresh_ewma),
+    ))
+    return cost
 
 
 def create_shift_report(
@@ -112,7 +114,8 @@ def create_shift_report(
     actor = require_permission(actor_user, PERMISSION_KEY, "create_shift_report", "Operator")
     validate_tool_change_entry(entry)
     try:
-        upsert_tool_entry_with_downtime(entry, downtime_entries)
+        entry = {**entry, "COPQ_Est": copq_for_entry(entry)}
+        insert_tool_entry_with_downtime(entry, downtime_entries)
         audit(
             "shift_report.create",
             actor.username,
@@ -127,6 +130,12 @@ def create_shift_report(
             success=False,
         )
         raise
+    after_save(actor, f"entry {entry.get('ID')}", (
+        ("Repeat scoring", lambda: record_entry(entry)),
+        ("Tool-life model refresh", refresh_tool_life_model),
+        ("OEE rollup refresh", refresh_oee_rollup),
+        ("EWMA refresh", refresh_ewma),
+    ))
 
 
 def update_tool_change_entry(
@@ -135,8 +144,13 @@ def update_tool_change_entry(
     actor_user: Actor | Dict[str, str] | None,
 ) -> None:
     actor = require_permission(actor_user, PERMISSION_KEY, "update_tool_change_entry", "Tool Changer")
+    # An edit can move the entry to another tool; both tools' forecasts change.
+    previous = fetch_tool_entry(str(entry.get("ID"))) or {}
+    tool_nums = sorted({str(t) for t in (previous.get("tool_num"), entry.get("Tool_Num")) if t})
     try:
-        upsert_tool_entry_with_downtime(entry, [])
+        entry = {**entry, "COPQ_Est": copq_for_entry(entry)}
+        if not update_tool_entry(entry):
+            raise NotFoundError(f"Tool entry {entry.get('ID')} not found")
         audit(
             "tool_entry.update",
             actor.username,
@@ -151,17 +165,28 @@ def update_tool_change_entry(
             success=False,
         )
         raise
+    after_save(actor, f"entry {entry.get('ID')}", (
+        ("Repeat scoring", sync_repeat_flags),
+        ("Tool-life model refresh", refresh_tool_life_model),
+        ("Inventory forecast refresh", lambda: refresh_inventory_forecast(tool_nums)),
+        ("OEE rollup refresh", refresh_oee_rollup),
+        ("SPC refresh", refresh_spc),
+        ("EWMA refresh", refresh_ewma),
+    ))
 
 
 def list_tool_change_entries() -> List[Dict[str, Any]]:
     return fetch_tool_entries()
 
 
+def iter_tool_change_entries(
+    *, reason: Optional[str] = None, columns: Optional[Sequence[str]] = None
+) -> Iterator[Any]:
+    return iter_tool_entries(reason=reason, columns=columns)
+
+
 def get_tool_change_entry(entry_id: str) -> Optional[Dict[str, Any]]:
-    for row in fetch_tool_entries():
-        if row.get("id") == entry_id:
-            return row
-    return None
+    return fetch_tool_entry(entry_id)
 
 
 def get_production_goal_value(
@@ -0,0 +1,159 @@
+# app/snapshots.py
+"""
+Columnar snapshots of closed months of tool_entries.
+
+Past months almost never change, so each one is written once to data/cache/ as a
+Feather file (or .npz when pyarrow is not installed) next to a small JSON manifest.
+Snapshots live in a folder per database (its path plus the database_id in meta), and
+the manifest records the month's version from tool_entry_months, a fingerprint of its
+rows (count, highest rowid, digest of each id and its last write) and a checksum per
+column. A snapshot is only trusted while all of them still match, so another
+database, a restored backup or a damaged file never serves stale rows.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .config import CACHE_DIR
+from .db import database_identity, entry_month_fingerprint, list_entry_month_versions
+
+try:
+    import pyarrow  # noqa: F401
+    _HAS_ARROW = True
+except ImportError:
+    _HAS_ARROW = False
+
+SNAPSHOT_FORMAT = "feather" if _HAS_ARROW else "npz"
+
+
+def _db_dir(identity: tuple[str, str]) -> str:
+    key = hashlib.sha256("\n".join(identity).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, key)
+
+
+def _paths(month: str, identity: tuple[str, str]) -> tuple[str, str]:
+    stem = os.path.join(_db_dir(identity), f"tool_entries_{month.replace('-', '_')}")
+    return f"{stem}.{SNAPSHOT_FORMAT}", f"{stem}.json"
+
+
+def _column_checksum(series: pd.Series) -> str:
+    hashed = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    return hashlib.sha256(hashed.tobytes()).hexdigest()
+
+
+def _read_manifest(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _read_columns(path: str, columns: Sequence[str], dtypes: Dict[str, str]) -> pd.DataFrame:
+    if SNAPSHOT_FORMAT == "feather":
+        df = pd.read_feather(path, columns=list(columns))
+    else:
+        with np.load(path, allow_pickle=False) as npz:
+            df = pd.DataFrame({c: npz[c] for c in columns})
+    # Back to the dtypes the frame had when it was built from SQLite.
+    return df.astype({c: dtypes[c] for c in columns if c in dtypes})
+
+
+def _write(df: pd.DataFrame, month: str, version: int, fingerprint: Dict[str, Any], identity: tuple[str, str]) -> None:
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]) and pd.api.types.infer_dtype(df[col], skipna=False) not in (
+            "string", "empty"
+        ):
+            # Mixed values would come back as different types; leave this month to SQLite.
+            raise ValueError(f"column {col} does not store as one type")
+
+    data_path, manifest_path = _paths(month, identity)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+
+    out = df.reset_index(drop=True)
+    tmp = data_path + ".tmp"
+    if SNAPSHOT_FORMAT == "feather":
+        out.to_feather(tmp)
+    else:
+        with open(tmp, "wb") as f:
+            arrays = {
+                c: out[c].to_numpy() if pd.api.types.is_numeric_dtype(out[c]) else out[c].to_numpy(dtype=str)
+                for c in out.columns
+            }
+            np.savez(f, **arrays)
+    os.replace(tmp, data_path)
+
+    manifest = {
+        "db_path": identity[0],
+        "db_id": identity[1],
+        "month": month,
+        "version": version,
+        "fingerprint": fingerprint,
+        "rows": len(out),
+        "format": SNAPSHOT_FORMAT,
+        "dtypes": {c: str(out[c].dtype) for c in out.columns},
+        "columns": {c: _column_checksum(out[c]) for c in out.columns},
+    }
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+
+
+def clear_cache() -> None:
+    """Deletes every snapshot, e.g. after the database file was replaced."""
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+def read_month(
+    month: str,
+    build: Callable[[str], pd.DataFrame],
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Returns a closed month's entries, from its snapshot when that is still current.
+    Otherwise the month is rebuilt with build(month) and the snapshot rewritten.
+    Only pass months that are closed; the open month changes too often to snapshot.
+    """
+    version = list_entry_month_versions().get(month)
+    fingerprint = entry_month_fingerprint(month) if version is not None else None
+    if fingerprint is None:
+        df = build(month)
+        return df if columns is None else df.reindex(columns=list(columns), fill_value="")
+
+    identity = database_identity()
+    data_path, manifest_path = _paths(month, identity)
+    manifest = _read_manifest(manifest_path)
+    if (
+        manifest
+        and [manifest.get("db_path"), manifest.get("db_id")] == list(identity)
+        and manifest.get("version") == version
+        and manifest.get("fingerprint") == fingerprint
+        and manifest.get("format") == SNAPSHOT_FORMAT
+        and os.path.exists(data_path)
+    ):
+        stored = manifest.get("columns", {})
+        wanted = [c for c in (columns if columns is not None else stored) if c in stored]
+        try:
+            df = _read_columns(data_path, wanted, manifest.get("dtypes", {}))
+            if len(df) == manifest.get("rows") and all(
+                _column_checksum(df[c]) == stored[c] for c in wanted
+            ):
+                return df if columns is None else df.reindex(columns=list(columns), fill_value="")
+        except Exception:
+            pass
+
+    df = build(month)
+    try:
+        _write(df, month, version, fingerprint, identity)
+    except Exception:
+        # A snapshot is only an accelerator; never fail the load over it.
+        pass
+    return df if columns is None else df.reindex(columns=list(columns), fill_value="")
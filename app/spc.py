@@ -0,0 +1,349 @@
+# app/spc.py
+"""
+Statistical process control: individuals / moving-range (I-MR) charts over two kinds
+of series, each a run of single observations in time order:
+- tool_life: the life every change recorded for a tool on a machine
+- downtime: the minutes of every downtime on a machine outside shift reports
+  (a shift report's downtime is a shift total, not one event)
+
+A series' center line is the mean of its first baseline_points values and its sigma
+their average moving range / d2; limits are center +/- 3 sigma (the lower one never
+below zero) and move with each point until the baseline is full. Every point is put
+in a zone (whole sigmas from center, and the side) and checked against the Western
+Electric rules:
+  1. a point beyond 3 sigma
+  2. 2 of 3 in a row beyond 2 sigma on one side
+  3. 4 of 5 in a row beyond 1 sigma on one side
+  4. 8 in a row on one side of center
+counting only the side spc_config.json watches for that series (short tool life,
+long downtime).
+
+spc_state keeps, per series, the baseline sums, the last TAIL_POINTS values and zones
+and the last violation. refresh_spc() carries the series touched since its watermark
+on tool_entry_changes forward from that state alone; a series with an edited or
+deleted row, or a new point older than its last, is replayed from history.
+Both go through evaluate_points(), which runs every series in one pass of array
+arithmetic. Series that broke a rule within alert_days raise "SPC" alerts.
+"""
+from __future__ import annotations
+
+import calendar
+import hashlib
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .alert_store import publish_alerts
+from .config import DEFAULT_SPC_CONFIG, SPC_CONFIG_FILE
+from .db import (
+    get_meta,
+    list_changed_tool_entries,
+    list_spc_state,
+    list_stale_spc_keys,
+    replace_spc_state,
+    set_meta,
+    spc_points,
+)
+from .storage import load_json, safe_int
+from .tool_life_model import format_ts
+
+SPC_SEQ_KEY = "spc_seq"
+SPC_STAMP_KEY = "spc_stamp"
+SPC_ALERT_DAY_KEY = "spc_alert_day"
+SPC_BATCH_SIZE = 5000
+ALERT_TYPE = "SPC"
+
+SERIES_KEYS = ["series", "tool_num", "machine"]
+# The longest rule window (rule 4)
+TAIL_POINTS = 8
+# Moving-range constants for subgroups of two
+D2 = 1.128
+D4 = 3.267
+
+RULE_NAMES = {
+    1: "beyond 3 sigma",
+    2: "2 of 3 beyond 2 sigma",
+    3: "4 of 5 beyond 1 sigma",
+    4: "8 in a row on one side",
+}
+SERIES_TITLES = {"tool_life": "Tool Life", "downtime": "Downtime"}
+
+Key = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class SpcRules:
+    baseline_points: int = 25
+    min_points: int = 8
+    rules: Tuple[int, ...] = (1, 2, 3, 4)
+    watch: Dict[str, str] = field(default_factory=lambda: {"tool_life": "low", "downtime": "high"})
+    alert_days: int = 7
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> "SpcRules":
+        cfg = cfg or {}
+        rules = cfg.get("rules", [1, 2, 3, 4]) or []
+        watch = cfg.get("watch", {}) or {}
+        return cls(
+            baseline_points=max(safe_int(cfg.get("baseline_points", 25), 25), 2),
+            min_points=max(safe_int(cfg.get("min_points", 8), 8), 2),
+            rules=tuple(sorted({safe_int(r, 0) for r in rules} & set(RULE_NAMES))),
+            watch={str(k): str(v).lower() for k, v in watch.items()},
+            alert_days=max(safe_int(cfg.get("alert_days", 7), 7), 0),
+        )
+
+    def watches(self, series: str) -> Tuple[bool, bool]:
+        """(high side counts, low side counts) for a series."""
+        side = self.watch.get(series, "both")
+        return side in ("high", "both"), side in ("low", "both")
+
+
+def load_spc_rules() -> SpcRules:
+    return SpcRules.from_config(load_json(SPC_CONFIG_FILE, DEFAULT_SPC_CONFIG))
+
+
+def _group_cumsum(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Running sum of values restarting at each series (starts: first row of each row's series)."""
+    total = np.cumsum(values)
+    return total - (total - values)[starts]
+
+
+def _window_sum(flags: np.ndarray, starts: np.ndarray, width: int) -> np.ndarray:
+    """Per row, how many of the last `width` rows of its series, itself included, are set."""
+    prefix = np.concatenate(([0], np.cumsum(flags, dtype="int64")))
+    idx = np.arange(len(flags))
+    return prefix[idx + 1] - prefix[np.maximum(idx + 1 - width, starts)]
+
+
+def _none_if_nan(value: float) -> Optional[float]:
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def evaluate_points(
+    points: Iterable[Mapping[str, Any]],
+    states: Mapping[Key, Mapping[str, Any]],
+    rules: SpcRules,
+) -> List[Dict[str, Any]]:
+    """
+    The new spc_state row of every series in points (db.spc_points rows, oldest first
+    within a series), carried on from states[key] where there is one.
+    """
+    cols = SERIES_KEYS + ["id", "ts", "value"]
+    new = pd.DataFrame(list(points), columns=cols)
+    if new.empty:
+        return []
+    new["value"] = pd.to_numeric(new["value"], errors="coerce").fillna(0.0)
+    new["carried"] = False
+    new["zone"] = 0
+
+    carried = [
+        (*key, "", None, float(value), True, int(zone))
+        for key in new[SERIES_KEYS].drop_duplicates().itertuples(index=False, name=None)
+        for value, zone in json.loads((states.get(key) or {}).get("tail") or "[]")
+    ]
+    frame = pd.concat([pd.DataFrame(carried, columns=new.columns), new], ignore_index=True) if carried else new
+    # A stable sort keeps each series' carried tail ahead of its new points.
+    frame = frame.sort_values(SERIES_KEYS, kind="stable").reset_index(drop=True)
+
+    n = len(frame)
+    idx = np.arange(n)
+    keys = frame[SERIES_KEYS].to_numpy()
+    change = np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)]
+    first = np.flatnonzero(change)
+    last = np.r_[first[1:], n] - 1
+    gid = np.cumsum(change) - 1
+    starts = first[gid]
+    group_keys: List[Key] = [tuple(k) for k in keys[first]]
+    prior = [states.get(k) or {} for k in group_keys]
+
+    points0 = np.array([int(p.get("points") or 0) for p in prior])[gid]
+    bsum0 = np.array([float(p.get("baseline_sum") or 0.0) for p in prior])[gid]
+    bmr0 = np.array([float(p.get("baseline_mr_sum") or 0.0) for p in prior])[gid]
+
+    x = frame["value"].to_numpy(dtype="float64")
+    is_new = ~frame["carried"].to_numpy(dtype=bool)
+    pos = points0 + _group_cumsum(is_new.astype("int64"), starts) - 1
+    prev = np.r_[np.nan, x[:-1]]
+    prev[change] = np.nan
+    mr = np.abs(x - prev)
+
+    in_base = is_new & (pos < rules.baseline_points)
+    cum_bx = bsum0 + _group_cumsum(np.where(in_base, x, 0.0), starts)
+    cum_bmr = bmr0 + _group_cumsum(np.where(in_base & ~np.isnan(prev), mr, 0.0), starts)
+    n_base = np.clip(np.minimum(pos + 1, rules.baseline_points), 1, None)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        center = cum_bx / n_base
+        mr_bar = np.where(n_base > 1, cum_bmr / (n_base - 1), np.nan)
+        sigma = mr_bar / D2
+        z = (x - center) / sigma
+
+    evaluated = is_new & (pos + 1 >= rules.min_points) & (sigma > 0)
+    level = np.clip(np.floor(np.abs(np.nan_to_num(z))), 0, 3) + 1
+    zone = np.where(evaluated, np.sign(np.nan_to_num(z)) * level, frame["zone"].to_numpy(dtype="float64"))
+    zone = np.where(is_new & ~evaluated, 0, zone).astype("int64")
+
+    watch = {s: rules.watches(s) for s in frame["series"].unique()}
+    high = frame["series"].map(lambda s: watch[s][0]).to_numpy(dtype=bool)
+    low = frame["series"].map(lambda s: watch[s][1]).to_numpy(dtype=bool)
+
+    def run(up: np.ndarray, down: np.ndarray, width: int, need: int) -> np.ndarray:
+        up_hit = up & (_window_sum(up, starts, width) >= need)
+        down_hit = down & (_window_sum(down, starts, width) >= need)
+        return (up_hit & high) | (down_hit & low)
+
+    checks = {
+        1: lambda: run(zone >= 4, zone <= -4, 1, 1),
+        2: lambda: run(zone >= 3, zone <= -3, 3, 2),
+        3: lambda: run(zone >= 2, zone <= -2, 5, 4),
+        4: lambda: run(zone > 0, zone < 0, TAIL_POINTS, TAIL_POINTS),
+    }
+    broken = {r: evaluated & checks[r]() for r in rules.rules}
+    any_broken = np.zeros(n, dtype=bool)
+    for hits in broken.values():
+        any_broken |= hits
+    last_broken = np.maximum.reduceat(np.where(any_broken, idx, -1), first)
+
+    def rules_at(i: int) -> str:
+        return ",".join(str(r) for r, hits in broken.items() if hits[i])
+
+    ids = frame["id"].to_numpy()
+    ts = frame["ts"].to_numpy()
+    out = []
+    for g, key in enumerate(group_keys):
+        i = last[g]
+        s = sigma[i]
+        row: Dict[str, Any] = {
+            "series": key[0],
+            "tool_num": key[1],
+            "machine": key[2],
+            "points": int(pos[i] + 1),
+            "baseline_sum": float(cum_bx[i]),
+            "baseline_mr_sum": float(cum_bmr[i]),
+            "center": float(center[i]),
+            "sigma": _none_if_nan(s),
+            "ucl": _none_if_nan(center[i] + 3 * s),
+            "lcl": _none_if_nan(max(center[i] - 3 * s, 0.0)),
+            "mr_ucl": _none_if_nan(D4 * mr_bar[i]),
+            "last_value": float(x[i]),
+            "last_ts": int(ts[i]),
+            "last_entry_id": str(ids[i]),
+            "tail": json.dumps([[float(x[j]), int(zone[j])] for j in range(max(first[g], i - TAIL_POINTS + 1), i + 1)]),
+            "last_rules": rules_at(i),
+        }
+        v = last_broken[g]
+        if v >= 0:
+            row.update({
+                "violation_ts": int(ts[v]),
+                "violation_entry_id": str(ids[v]),
+                "violation_value": float(x[v]),
+                "violation_rules": rules_at(v),
+            })
+        else:
+            row.update({f: prior[g].get(f) for f in ("violation_ts", "violation_value")})
+            row.update({f: prior[g].get(f) or "" for f in ("violation_entry_id", "violation_rules")})
+        out.append(row)
+    return out
+
+
+def spc_alerts(states: Iterable[Mapping[str, Any]], rules: SpcRules, now: datetime) -> List[Dict[str, Any]]:
+    """
+    A series that broke a rule in the last alert_days: High for a point beyond 3 sigma,
+    Medium for 2 of 3 or 4 of 5, Low for a run on one side.
+    """
+    since = calendar.timegm(now.timetuple()) - rules.alert_days * 86400
+    alerts = []
+    for s in states:
+        if s.get("violation_ts") is None or int(s["violation_ts"]) < since or not s.get("violation_rules"):
+            continue
+        broken = [int(r) for r in str(s["violation_rules"]).split(",")]
+        if 1 in broken:
+            severity = "High"
+        elif 2 in broken or 3 in broken:
+            severity = "Medium"
+        else:
+            severity = "Low"
+        what = f"Tool {s['tool_num']} on {s['machine']}" if s["tool_num"] else f"Machine {s['machine']}"
+        side = "above" if float(s["violation_value"] or 0.0) > float(s["center"] or 0.0) else "below"
+        details = (
+            f"{what}: {float(s['violation_value'] or 0.0):g} at {format_ts(s['violation_ts'])}, {side} center "
+            f"{float(s['center'] or 0.0):.1f} (LCL {float(s['lcl'] or 0.0):.1f}, UCL {float(s['ucl'] or 0.0):.1f}); "
+            + "; ".join(RULE_NAMES[r] for r in broken)
+        )
+        alerts.append({
+            "severity": severity,
+            "type": ALERT_TYPE,
+            "title": f"{SERIES_TITLES.get(s['series'], s['series'])} Out of Control",
+            "details": details,
+            "related": {"series": s["series"], "tool_num": s["tool_num"], "machine": s["machine"]},
+        })
+    return alerts
+
+
+def _stamp(cfg: Dict[str, Any]) -> str:
+    payload = json.dumps(cfg, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _key(row: Mapping[str, Any]) -> Key:
+    return (str(row["series"]), str(row["tool_num"]), str(row["machine"]))
+
+
+def refresh_spc(batch_size: int = SPC_BATCH_SIZE, now: Optional[datetime] = None) -> int:
+    """
+    Brings spc_state up to date with the entries written since the last run (every
+    series again when spc_config.json changed) and re-raises SPC alerts. Returns how
+    many series were updated.
+    """
+    now = now or datetime.now()
+    cfg = load_json(SPC_CONFIG_FILE, DEFAULT_SPC_CONFIG) or {}
+    rules = SpcRules.from_config(cfg)
+    stamp = _stamp(cfg)
+    stored_seq = get_meta(SPC_SEQ_KEY) or "0"
+    full = get_meta(SPC_STAMP_KEY) != stamp
+
+    after = int(stored_seq)
+    changed_ids: List[str] = []
+    while True:
+        changed = list_changed_tool_entries(after, batch_size)
+        if not changed:
+            break
+        after = changed[-1][1]
+        if not full:
+            changed_ids.extend(entry_id for entry_id, _ in changed)
+    meta = {SPC_SEQ_KEY: str(after), SPC_STAMP_KEY: stamp}
+
+    if full:
+        rows = evaluate_points(spc_points(), {}, rules)
+        replace_spc_state(rows, keys=None, meta=meta)
+        updated = len(rows)
+    else:
+        replay: Set[Key] = set(list_stale_spc_keys())
+        new_points = spc_points(entry_ids=changed_ids) if changed_ids else []
+        states = {_key(s): s for s in list_spc_state(keys=sorted({_key(p) for p in new_points} - replay))}
+        for p in new_points:
+            state = states.get(_key(p))
+            # A point dated before the series' last has to be replayed in order.
+            if state and (p["ts"], str(p["id"])) <= (state["last_ts"], state["last_entry_id"]):
+                replay.add(_key(p))
+        append = [p for p in new_points if _key(p) not in replay]
+        if not replay and not append and str(after) == stored_seq:
+            if get_meta(SPC_ALERT_DAY_KEY) != now.date().isoformat():
+                _publish(rules, now)
+            return 0
+        rows = evaluate_points(append, states, rules)
+        if replay:
+            rows += evaluate_points(spc_points(keys=sorted(replay)), {}, rules)
+        touched = sorted(replay | {_key(p) for p in append})
+        replace_spc_state(rows, keys=touched, meta=meta)
+        updated = len(touched)
+    _publish(rules, now)
+    return updated
+
+
+def _publish(rules: SpcRules, now: datetime) -> None:
+    publish_alerts(spc_alerts(list_spc_state(), rules, now), ALERT_TYPE)
+    set_meta(SPC_ALERT_DAY_KEY, now.date().isoformat())
@@ -1,8 +1,12 @@
 # app/storage.py
 import os
 import json
+import hashlib
+import socket
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Any, Tuple, Optional
+from typing import Any, Callable, List, Optional, Sequence, Tuple
 
 import pandas as pd
 
@@ -10,7 +14,9 @@ from .config import (
     DATA_DIR,
     COLUMNS,
 )
-from .db import fetch_tool_entries, list_entry_months, upsert_tool_entry
+from .db import fetch_tool_entries, list_entry_months, tool_entries_version, upsert_tool_entry
+from . import db as _db
+from . import snapshots
 
 # -----------------------------
 # JSON helpers (safe writes)
@@ -107,57 +113,177 @@ def _normalize_month(value: Optional[str]) -> str:
     return datetime.now().strftime("%Y-%m")
 
 
-def get_df(filename: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+_DB_TO_FRAME_COLUMNS = {
+    "id": "ID",
+    "date": "Date",
+    "time": "Time",
+    "shift": "Shift",
+    "line": "Line",
+    "cell": "Cell",
+    "machine": "Machine",
+    "part_number": "Part_Number",
+    "tool_num": "Tool_Num",
+    "reason": "Reason",
+    "downtime_mins": "Downtime_Mins",
+    "production_qty": "Production_Qty",
+    "cost": "Cost",
+    "tool_life": "Tool_Life",
+    "tool_changer": "Tool_Changer",
+    "defects_present": "Defects_Present",
+    "defect_qty": "Defect_Qty",
+    "sort_done": "Sort_Done",
+    "defect_reason": "Defect_Reason",
+    "quality_verified": "Quality_Verified",
+    "quality_user": "Quality_User",
+    "quality_time": "Quality_Time",
+    "leader_sign": "Leader_Sign",
+    "leader_user": "Leader_User",
+    "leader_time": "Leader_Time",
+    "serial_numbers": "Serial_Numbers",
+    "andon_flag": "Andon_Flag",
+    "customer_risk": "Customer_Risk",
+    "qc_status": "QC_Status",
+    "ncr_id": "NCR_ID",
+    "ncr_status": "NCR_Status",
+    "ncr_close_date": "NCR_Close_Date",
+    "action_status": "Action_Status",
+    "action_due_date": "Action_Due_Date",
+    "gage_used": "Gage_Used",
+    "copq_est": "COPQ_Est",
+}
+
+
+# -----------------------------
+# Shared frame cache
+# -----------------------------
+# Every screen used to load and convert the same month on its own. Frames are now
+# cached per (month or range, column set) and dropped as soon as
+# db.tool_entries_version() moves or another database file is opened, so a repeat
+# load is one comparison.
+_FRAME_CACHE_MAX = 32
+_frame_cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+_frame_cache_version: Optional[Tuple[str, int]] = None
+
+
+def _copy_on_write() -> bool:
+    # pandas >= 3 is always copy-on-write, so a shallow copy already protects the cache.
+    # On pandas 2 it is a global opt-in (mode.copy_on_write) that changes how screens'
+    # in-place edits behave, so it is left to the app; without it every handout is a
+    # deep copy. A hit then still skips the SQLite read and conversion, not the copy.
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+
+def invalidate_df_cache() -> None:
+    global _frame_cache_version
+    _frame_cache.clear()
+    _frame_cache_version = None
+
+
+def _cached_frame(key: tuple, loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    global _frame_cache_version
+    version = (_db.DB_PATH, tool_entries_version())
+    if version != _frame_cache_version:
+        _frame_cache.clear()
+        _frame_cache_version = version
+    df = _frame_cache.get(key)
+    if df is not None:
+        _frame_cache.move_to_end(key)
+        return df
+    df = loader()
+    _frame_cache[key] = df
+    if len(_frame_cache) > _FRAME_CACHE_MAX:
+        _frame_cache.popitem(last=False)
+    return df
+
+
+def _hand_out(df: pd.DataFrame) -> pd.DataFrame:
+    """Callers get their own frame so edits never leak back into the cache."""
+    return df.copy(deep=not _copy_on_write())
+
+
+def _project(df: pd.DataFrame, columns: Optional[Sequence[str]]) -> pd.DataFrame:
+    if columns is None:
+        return df
+    return df.reindex(columns=list(columns), fill_value="")
+
+
+def _load_month(month: str) -> pd.DataFrame:
+    rows = fetch_tool_entries(month)
+    if rows:
+        # ts is derived from Date/Time on save; frames don't carry it.
+        df = pd.DataFrame(rows).drop(columns=["ts"], errors="ignore").rename(columns=_DB_TO_FRAME_COLUMNS)
+    else:
+        df = pd.DataFrame(columns=ENTRY_COLUMNS)
+    return ensure_df_schema(df)
+
+
+def _month_frame(month: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    # Closed months come from their columnar snapshot, reading only the requested
+    # columns; only the open month is loaded from SQLite.
+    if month < datetime.now().strftime("%Y-%m"):
+        cols = tuple(columns) if columns is not None else None
+        return _cached_frame(
+            ("month", month, cols),
+            lambda: snapshots.read_month(month, _load_month, cols),
+        )
+    full = _cached_frame(("month", month, None), lambda: _load_month(month))
+    if columns is None:
+        return full
+    cols = tuple(columns)
+    return _cached_frame(("month", month, cols), lambda: _project(full, cols))
+
+
+def _months_between(start: str, end: str) -> List[str]:
+    start_dt = datetime.strptime(start, "%Y-%m")
+    end_dt = datetime.strptime(end, "%Y-%m")
+    if start_dt > end_dt:
+        start_dt, end_dt = end_dt, start_dt
+    months = []
+    year, month = start_dt.year, start_dt.month
+    while (year, month) <= (end_dt.year, end_dt.month):
+        months.append(f"{year:04d}-{month:02d}")
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
+
+def get_df(
+    filename: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> Tuple[pd.DataFrame, str]:
     """
     Load a month of entries from SQLite into DataFrame.
     Returns (df, month_key).
+    Pass columns to get only that projection (missing columns come back blank).
     """
     month = _normalize_month(filename)
-    rows = fetch_tool_entries(month)
-    if rows:
-        df = pd.DataFrame(rows)
-        df = df.rename(columns={
-            "id": "ID",
-            "date": "Date",
-            "time": "Time",
-            "shift": "Shift",
-            "line": "Line",
-            "cell": "Cell",
-            "machine": "Machine",
-            "part_number": "Part_Number",
-            "tool_num": "Tool_Num",
-            "reason": "Reason",
-            "downtime_mins": "Downtime_Mins",
-            "production_qty": "Production_Qty",
-            "cost": "Cost",
-            "tool_life": "Tool_Life",
-            "tool_changer": "Tool_Changer",
-            "defects_present": "Defects_Present",
-            "defect_qty": "Defect_Qty",
-            "sort_done": "Sort_Done",
-            "defect_reason": "Defect_Reason",
-            "quality_verified": "Quality_Verified",
-            "quality_user": "Quality_User",
-            "quality_time": "Quality_Time",
-            "leader_sign": "Leader_Sign",
-            "leader_user": "Leader_User",
-            "leader_time": "Leader_Time",
-            "serial_numbers": "Serial_Numbers",
-            "andon_flag": "Andon_Flag",
-            "customer_risk": "Customer_Risk",
-            "qc_status": "QC_Status",
-            "ncr_id": "NCR_ID",
-            "ncr_status": "NCR_Status",
-            "ncr_close_date": "NCR_Close_Date",
-            "action_status": "Action_Status",
-            "action_due_date": "Action_Due_Date",
-            "gage_used": "Gage_Used",
-            "copq_est": "COPQ_Est",
-        })
-    else:
-        df = pd.DataFrame(columns=ENTRY_COLUMNS)
-    df = ensure_df_schema(df)
-    return df, month
+    return _hand_out(_month_frame(month, columns)), month
+
+
+def get_df_range(
+    start_month: str,
+    end_month: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Load every month from start_month to end_month (YYYY-MM, inclusive).
+    Rows come back newest first, same as a single month.
+    """
+    end = _normalize_month(end_month)
+    months = _months_between(start_month, end)
+    cols = tuple(columns) if columns is not None else None
+
+    def _load() -> pd.DataFrame:
+        frames = [_month_frame(m, cols) for m in reversed(months)]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return _project(pd.DataFrame(columns=ENTRY_COLUMNS), cols)
+        return pd.concat(frames, ignore_index=True)
+
+    return _hand_out(_cached_frame(("range", months[0], months[-1], cols), _load))
 
 
 def save_df(df: pd.DataFrame, filename: str) -> None:
@@ -165,7 +291,9 @@ def save_df(df: pd.DataFrame, filename: str) -> None:
     Save DataFrame rows back to SQLite.
     filename is treated as month key (YYYY-MM).
     """
-    df = ensure_df_schema(df)
+    from .copq import apply_copq
+
+    df = apply_copq(ensure_df_schema(df))
     for _, row in df.iterrows():
         upsert_tool_entry(row.to_dict())
 
@@ -199,12 +327,59 @@ def safe_float(val: Any, default: float = 0.0) -> float:
 # -----------------------------
 # ID helper
 # -----------------------------
+# IDs are time + station + counter (ULID-style): they sort by creation time, the
+# station code keeps PCs apart and the counter keeps one station unique within a
+# millisecond. The station code is 40 bits of a hash, so two stations share one with
+# odds of about n^2 / 2^41 (under one in a million for a thousand PCs); even then
+# their IDs only clash on the same millisecond and counter, and the insert-only
+# submit path refuses the duplicate rather than overwriting.
+_ID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32
+_id_lock = threading.Lock()
+_id_last_ms = 0
+_id_counter = 0
+_station_code: Optional[str] = None
+
+
+def _base32(value: int, width: int) -> str:
+    out = []
+    for _ in range(width):
+        out.append(_ID_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(out))
+
+
+def station_code() -> str:
+    """
+    Eight-character code for this PC, from TOOLLIFE_STATION_ID if set,
+    else derived from the hostname.
+    """
+    global _station_code
+    if _station_code is None:
+        station = os.environ.get("TOOLLIFE_STATION_ID", "").strip() or socket.gethostname()
+        digest = hashlib.sha1(station.encode("utf-8")).digest()
+        _station_code = _base32(int.from_bytes(digest[:5], "big"), 8)
+    return _station_code
+
+
 def next_id(df: Optional[pd.DataFrame] = None) -> str:
     """
-    Generates a reasonably unique ID for a new row.
-    Format: YYYYMMDD-HHMMSS-XXXX
+    Generates a unique, time-ordered ID for a new row.
+    Format: YYYYMMDD-HHMMSSmmm-SSSSSSSS-CCCC (SSSSSSSS = station, CCCC = per-ms counter).
+    df is accepted for older callers and ignored.
     """
-    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-    count = len(df) if df is not None else 0
-    suffix = str(count % 10000).zfill(4)
-    return f"{ts}-{suffix}"
+    global _id_last_ms, _id_counter
+    with _id_lock:
+        now_ms = int(datetime.now().timestamp() * 1000)
+        if now_ms > _id_last_ms:
+            _id_last_ms = now_ms
+            _id_counter = 0
+        else:
+            # Same millisecond (or the clock stepped back): stay on the last
+            # timestamp and count up so IDs never repeat or go backwards.
+            _id_counter += 1
+            if _id_counter >= 32 ** 4:
+                _id_last_ms += 1
+                _id_counter = 0
+        ms, counter = _id_last_ms, _id_counter
+    ts = datetime.fromtimestamp(ms / 1000)
+    return f"{ts.strftime('%Y%m%d-%H%M%S')}{ms % 1000:03d}-{station_code()}-{_base32(counter, 4)}"
@@ -0,0 +1,74 @@
+# app/tool_costs.py
+"""
+Historical tool change costs for entry frames.
+
+tool_cost_history keeps each price a tool's change cost had with the time it took
+effect (see db._ensure_tool_cost_history). attach_tool_cost() prices a whole frame
+of entries against it with one merge_asof instead of a lookup per row.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .dates import ISO_DATETIME
+from .db import list_tool_cost_history
+
+_EPOCH = pd.Timestamp("1970-01-01")
+
+
+def cost_history_frame() -> pd.DataFrame:
+    """tool_cost_history as a frame: Tool_Num, Change_Cost, Valid_From (epoch seconds)."""
+    rows = list_tool_cost_history()
+    frame = pd.DataFrame(rows, columns=["tool_num", "change_cost", "valid_from", "valid_to"])
+    return pd.DataFrame({
+        "Tool_Num": frame["tool_num"].astype(str),
+        "Change_Cost": frame["change_cost"].astype(float),
+        "Valid_From": frame["valid_from"].astype("int64"),
+    })
+
+
+def entry_stamps(df: pd.DataFrame) -> pd.Series:
+    """Vectorized dates.entry_ts over the Date/Time columns: epoch seconds, NaN where unreadable."""
+    times = df["Time"].fillna("").astype(str).replace("", "00:00:00") if "Time" in df else "00:00:00"
+    stamps = pd.to_datetime(df["Date"].fillna("").astype(str) + " " + times, format=ISO_DATETIME, errors="coerce")
+    return (stamps - _EPOCH) / pd.Timedelta(seconds=1)
+
+
+def attach_tool_cost(
+    df: pd.DataFrame,
+    history: Optional[pd.DataFrame] = None,
+    column: str = "Tool_Cost",
+) -> pd.DataFrame:
+    """
+    Returns df with `column` set to each row's tool change cost in effect at its
+    Date/Time, the same price db.tool_cost_at gives. Rows before a tool's first
+    price get that first price; rows without a tool, a known tool or a readable
+    date get 0. Pass history (cost_history_frame()) to price several frames.
+    """
+    if history is None:
+        history = cost_history_frame()
+    out = df.copy()
+    if out.empty:
+        out[column] = pd.Series(dtype=float)
+        return out
+
+    left = pd.DataFrame({
+        "Tool_Num": out["Tool_Num"].fillna("").astype(str).to_numpy(),
+        "_ts": entry_stamps(out).to_numpy(),
+        "_row": np.arange(len(out)),
+    })
+    left = left[left["_ts"].notna() & (left["Tool_Num"] != "")].sort_values("_ts", kind="stable")
+    prices = history.assign(_ts=history["Valid_From"].astype(float)).sort_values("_ts", kind="stable")
+    prices = prices[["Tool_Num", "_ts", "Change_Cost"]]
+
+    cost = np.zeros(len(out))
+    if not left.empty and not prices.empty:
+        matched = pd.merge_asof(left, prices, on="_ts", by="Tool_Num", direction="backward")
+        first = prices.drop_duplicates("Tool_Num").set_index("Tool_Num")["Change_Cost"]
+        filled = matched["Change_Cost"].fillna(matched["Tool_Num"].map(first)).fillna(0.0)
+        cost[matched["_row"].to_numpy()] = filled.to_numpy()
+    out[column] = cost
+    return out
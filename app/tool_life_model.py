@@ -0,0 +1,209 @@
+# app/tool_life_model.py
+"""
+Tool-life predictions per (tool_num, machine, part_number).
+
+Every tool change records the life the removed tool got (Tool_Life, in parts). For
+each tool on each machine/part the recent lives are fitted: a two-parameter Weibull
+once there are MIN_WEIBULL_SAMPLES of them, robust percentiles before that. The tool
+installed by the latest change has used up the parts reported on that machine/part
+since (shift production rows), which gives its expected remaining life; the recent
+production rate, or failing that the usual gap between changes, turns that into a
+predicted change time.
+
+refresh_tool_life_model() refits only the keys touched since its watermark in
+tool_entry_changes (plus keys whose old rows were edited or deleted), and stores the
+results in tool_life_model, so screens only read that table.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .db import (
+    fetch_tool_entries_by_ids,
+    get_meta,
+    get_tool_life_model,
+    list_changed_tool_entries,
+    list_stale_tool_life_keys,
+    list_tool_change_history,
+    list_tool_life_keys,
+    production_since,
+    replace_tool_life_model,
+)
+
+MODEL_SEQ_KEY = "tool_life_model_seq"
+MODEL_BATCH_SIZE = 5000
+HISTORY_LIMIT = 200
+MIN_WEIBULL_SAMPLES = 8
+
+Key = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class LifeFit:
+    method: str  # "weibull" or "empirical"
+    samples: int
+    mean: float
+    p10: float
+    p50: float
+    p90: float
+    shape: Optional[float] = None
+    scale: Optional[float] = None
+    lives: Tuple[float, ...] = ()
+
+    def median_remaining(self, used: float) -> float:
+        """Median further life of a tool that has already made `used` parts."""
+        used = max(float(used), 0.0)
+        if self.method == "weibull":
+            # Median of the Weibull conditioned on surviving to `used`.
+            k, lam = self.shape, self.scale
+            return lam * ((used / lam) ** k + math.log(2.0)) ** (1.0 / k) - used
+        survivors = [life for life in self.lives if life > used]
+        if not survivors:
+            return 0.0
+        return float(np.median(survivors)) - used
+
+
+def fit_weibull(lives: Iterable[float], iterations: int = 50) -> Optional[Tuple[float, float]]:
+    """
+    (shape, scale) maximum-likelihood estimate, or None when the data can't support
+    one (too few distinct values, or Newton's method doesn't settle).
+    """
+    x = np.asarray([v for v in lives if v > 0], dtype="float64")
+    if len(x) < 2 or np.ptp(x) == 0:
+        return None
+    # Scaling to max 1 keeps x**k finite; the shape doesn't depend on it.
+    top = x.max()
+    lx = np.log(x / top)
+    mean_lx = lx.mean()
+    k = 1.2 / max(lx.std(), 1e-6)
+    for _ in range(iterations):
+        xk = np.exp(k * lx)
+        s0, s1, s2 = xk.sum(), (xk * lx).sum(), (xk * lx * lx).sum()
+        f = s1 / s0 - 1.0 / k - mean_lx
+        fp = (s2 * s0 - s1 * s1) / (s0 * s0) + 1.0 / (k * k)
+        step = f / fp
+        k_next = k - step
+        if k_next <= 0:
+            k_next = k / 2.0
+        if abs(k_next - k) < 1e-9 * k:
+            k = k_next
+            break
+        k = k_next
+    else:
+        return None
+    if not np.isfinite(k) or k <= 0:
+        return None
+    scale = top * float(np.mean(np.exp(k * lx))) ** (1.0 / k)
+    return float(k), float(scale)
+
+
+def fit_lives(lives: Iterable[float]) -> Optional[LifeFit]:
+    """Weibull fit where there is data enough, percentiles otherwise; None without lives."""
+    x = np.asarray([float(v) for v in lives if v and v > 0], dtype="float64")
+    if not len(x):
+        return None
+    weibull = fit_weibull(x) if len(x) >= MIN_WEIBULL_SAMPLES else None
+    if weibull:
+        k, lam = weibull
+
+        def q(p: float) -> float:
+            return lam * (-math.log(1.0 - p)) ** (1.0 / k)
+
+        return LifeFit("weibull", len(x), lam * math.gamma(1.0 + 1.0 / k), q(0.1), q(0.5), q(0.9), k, lam)
+
+    p10, p50, p90 = np.percentile(x, [10, 50, 90])
+    # 10% trimmed mean: one mistyped life shouldn't drag the expectation around.
+    trim = int(len(x) * 0.1)
+    trimmed = np.sort(x)[trim:len(x) - trim] if trim else x
+    return LifeFit(
+        "empirical", len(x), float(trimmed.mean()), float(p10), float(p50), float(p90),
+        lives=tuple(float(v) for v in x),
+    )
+
+
+def predict_key(key: Key, limit: int = HISTORY_LIMIT) -> Optional[Dict[str, Any]]:
+    """The tool_life_model row for one key, or None when it has no changes left."""
+    tool_num, machine, part_number = key
+    history = list_tool_change_history(tool_num, machine, part_number, limit)
+    if not history:
+        return None
+    installed = history[0]
+    fit = fit_lives(h["tool_life"] for h in history)
+    produced, last_report_ts = production_since(machine, part_number, installed["ts"])
+
+    row: Dict[str, Any] = {
+        "tool_num": tool_num,
+        "machine": machine,
+        "part_number": part_number,
+        "method": fit.method if fit else "",
+        "samples": fit.samples if fit else 0,
+        "mean_life": fit.mean if fit else None,
+        "p10_life": fit.p10 if fit else None,
+        "p50_life": fit.p50 if fit else None,
+        "p90_life": fit.p90 if fit else None,
+        "weibull_shape": fit.shape if fit else None,
+        "weibull_scale": fit.scale if fit else None,
+        "installed_entry_id": installed["id"],
+        "installed_ts": installed["ts"],
+        "produced_since": produced,
+        "expected_remaining": fit.median_remaining(produced) if fit else None,
+        "predicted_change_ts": None,
+    }
+    remaining = row["expected_remaining"]
+    if fit and produced > 0 and last_report_ts and last_report_ts > installed["ts"]:
+        rate = produced / (last_report_ts - installed["ts"])  # parts per second
+        row["predicted_change_ts"] = int(last_report_ts + remaining / rate)
+    elif len(history) >= 2:
+        gaps = np.diff([h["ts"] for h in reversed(history)])
+        row["predicted_change_ts"] = int(installed["ts"] + float(np.median(gaps)))
+    return row
+
+
+def _affected_keys(entry_ids: List[str]) -> Set[Key]:
+    keys: Set[Key] = set()
+    produced_on: Set[Tuple[str, str]] = set()
+    rows = fetch_tool_entries_by_ids(entry_ids, ["tool_num", "machine", "part_number", "production_qty"])
+    for r in rows:
+        tool_num, machine, part = str(r["tool_num"] or ""), str(r["machine"] or ""), str(r["part_number"] or "")
+        if tool_num:
+            keys.add((tool_num, machine, part))
+        elif float(r["production_qty"] or 0) > 0:
+            produced_on.add((machine, part))
+    for machine, part in produced_on:
+        keys.update((t, machine, part) for t in list_tool_life_keys(machine, part))
+    return keys
+
+
+def refresh_tool_life_model(batch_size: int = MODEL_BATCH_SIZE) -> int:
+    """Refits the keys touched since the last run; returns how many keys were refitted."""
+    after = int(get_meta(MODEL_SEQ_KEY) or 0)
+    keys: Set[Key] = set(list_stale_tool_life_keys())
+    while True:
+        changed = list_changed_tool_entries(after, batch_size)
+        if not changed:
+            break
+        after = changed[-1][1]
+        keys |= _affected_keys([entry_id for entry_id, _ in changed])
+    if not keys and str(after) == (get_meta(MODEL_SEQ_KEY) or "0"):
+        return 0
+    ordered = sorted(keys)
+    rows = [row for row in (predict_key(k) for k in ordered) if row]
+    replace_tool_life_model(rows, keys=ordered, meta={MODEL_SEQ_KEY: str(after)})
+    return len(ordered)
+
+
+def tool_life_prediction(tool_num: str, machine: str, part_number: str) -> Optional[Dict[str, Any]]:
+    """The stored prediction for a tool on a machine/part (None before its first change)."""
+    return get_tool_life_model(str(tool_num), str(machine), str(part_number))
+
+
+def format_ts(ts: Optional[int]) -> str:
+    """ts (wall-clock epoch seconds, see dates.entry_ts) as 'YYYY-MM-DD HH:MM'."""
+    if ts is None:
+        return ""
+    return datetime.fromtimestamp(int(ts), timezone.utc).strftime("%Y-%m-%d %H:%M")
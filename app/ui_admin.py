@@ -14,7 +14,7 @@ from .ui_error_handling import wrap_ui_action
 from .services.tool_life_service import (
     get_production_goal_value,
     list_lines_service,
-    list_tool_change_entries,
+    iter_tool_change_entries,
 )
 from .services.user_service import (
     create_user,
@@ -27,6 +27,21 @@ from .services.user_service import (
 )
 from backups.backup_manager import create_backup_now
 from .config import BACKUPS_DIR
+from .oee import load_oee_rules
+
+SHIFT_REPORT_COLUMNS = (
+    "id",
+    "date",
+    "time",
+    "line",
+    "cell",
+    "machine",
+    "part_number",
+    "shift",
+    "tool_changer",
+    "production_qty",
+    "downtime_mins",
+)
 
 
 class AdminUI(tk.Frame):
@@ -652,12 +667,6 @@ class AdminUI(tk.Frame):
         for i in self.shift_tree.get_children():
             self.shift_tree.delete(i)
 
-        entries = list_tool_change_entries()
-        shift_entries = [e for e in entries if str(e.get("reason", "")).strip() == "Shift Production"]
-
-        operators = sorted({e.get("tool_changer", "") for e in shift_entries if e.get("tool_changer")})
-        self.shift_operator_combo.configure(values=["All"] + operators)
-
         try:
             start = self._parse_date(self.shift_start_var.get())
             end = self._parse_date(self.shift_end_var.get())
@@ -669,20 +678,22 @@ class AdminUI(tk.Frame):
         shift_filter = self.shift_var.get()
         operator_filter = self.shift_operator_var.get()
 
+        # Stream only the shift reports, only the columns this table shows.
+        operators = set()
         filtered = []
-        for entry in shift_entries:
-            entry_date = entry.get("date", "")
-            entry_time = entry.get("time", "00:00:00")
+        for entry in iter_tool_change_entries(reason="Shift Production", columns=SHIFT_REPORT_COLUMNS):
+            if entry.tool_changer:
+                operators.add(entry.tool_changer)
             try:
-                entry_dt = datetime.strptime(f"{entry_date} {entry_time}", "%Y-%m-%d %H:%M:%S")
+                entry_dt = datetime.strptime(f"{entry.date} {entry.time}", "%Y-%m-%d %H:%M:%S")
             except ValueError:
                 entry_dt = None
 
-            if line_filter != "All" and entry.get("line") != line_filter:
+            if line_filter != "All" and entry.line != line_filter:
                 continue
-            if shift_filter != "All" and entry.get("shift") != shift_filter:
+            if shift_filter != "All" and entry.shift != shift_filter:
                 continue
-            if operator_filter != "All" and entry.get("tool_changer") != operator_filter:
+            if operator_filter != "All" and entry.tool_changer != operator_filter:
                 continue
             if start and entry_dt and entry_dt.date() < start.date():
                 continue
@@ -690,40 +701,45 @@ class AdminUI(tk.Frame):
                 continue
             filtered.append((entry, entry_dt))
 
+        self.shift_operator_combo.configure(values=["All"] + sorted(operators))
+
         sort_key = self.shift_sort_var.get()
         if sort_key == "Line":
-            filtered.sort(key=lambda x: (x[0].get("line", ""), x[1] or datetime.min))
+            filtered.sort(key=lambda x: (x[0].line, x[1] or datetime.min))
         elif sort_key == "Shift":
-            filtered.sort(key=lambda x: (x[0].get("shift", ""), x[1] or datetime.min))
+            filtered.sort(key=lambda x: (x[0].shift, x[1] or datetime.min))
         elif sort_key == "Operator":
-            filtered.sort(key=lambda x: (x[0].get("tool_changer", ""), x[1] or datetime.min))
+            filtered.sort(key=lambda x: (x[0].tool_changer, x[1] or datetime.min))
         else:
             filtered.sort(key=lambda x: x[1] or datetime.min, reverse=True)
 
         self.shift_report_cache = {}
+        oee_rules = load_oee_rules()
         for entry, entry_dt in filtered:
-            line = entry.get("line", "")
+            line = entry.line
             target = get_production_goal_value(
                 line=line,
-                cell=entry.get("cell", ""),
-                machine=entry.get("machine", ""),
-                part_number=entry.get("part_number", ""),
+                cell=entry.cell,
+                machine=entry.machine,
+                part_number=entry.part_number,
             )
-            production_qty = float(entry.get("production_qty", 0.0) or 0.0)
-            downtime = float(entry.get("downtime_mins", 0.0) or 0.0)
+            production_qty = float(entry.production_qty or 0.0)
+            downtime = float(entry.downtime_mins or 0.0)
 
             pct_goal = (production_qty / target * 100.0) if target > 0 else 0.0
-            shift_minutes = 480.0
-            adjusted_target = target * max(0.0, 1.0 - (downtime / shift_minutes)) if target > 0 else 0.0
+            shift_minutes = oee_rules.shift_minutes(entry.shift)
+            adjusted_target = (
+                target * max(0.0, 1.0 - (downtime / shift_minutes)) if target > 0 and shift_minutes > 0 else 0.0
+            )
             pct_goal_adj = (production_qty / adjusted_target * 100.0) if adjusted_target > 0 else 0.0
 
             row = (
-                entry.get("id", ""),
-                entry.get("date", ""),
-                entry.get("time", ""),
+                entry.id,
+                entry.date,
+                entry.time,
                 line,
-                entry.get("shift", ""),
-                entry.get("tool_changer", ""),
+                entry.shift,
+                entry.tool_changer,
                 f"{production_qty:.0f}",
                 f"{downtime:.1f}",
                 f"{target:.0f}",
@@ -731,8 +747,8 @@ class AdminUI(tk.Frame):
                 f"{pct_goal_adj:.1f}%",
             )
             self.shift_tree.insert("", "end", values=row)
-            self.shift_report_cache[str(entry.get("id", ""))] = {
-                "entry": entry,
+            self.shift_report_cache[str(entry.id)] = {
+                "entry": entry._asdict(),
                 "target": target,
                 "pct_goal": pct_goal,
                 "pct_goal_adj": pct_goal_adj,
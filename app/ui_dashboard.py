@@ -3,10 +3,11 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
 
-import pandas as pd
+import numpy as np
 
 from .ui_common import HeaderFrame
-from .storage import get_df, safe_int, safe_float
+from .storage import safe_int
+from .metrics_cube import cube_for_days, day_bounds
 
 
 class DashboardUI(tk.Frame):
@@ -84,7 +85,7 @@ class DashboardUI(tk.Frame):
 
     # -------------------------
     def _make_pareto_tree(self, parent, key_label: str):
-        cols = ("rank", "key", "entries", "defect_qty", "downtime_mins", "copq_est", "pct_defects")
+        cols = ("rank", "key", "entries", "defect_qty", "downtime_mins", "copq_est", "pct_defects", "cum_pct")
         tree = ttk.Treeview(parent, columns=cols, show="headings", height=18)
         for c in cols:
             tree.heading(c, text=c.upper())
@@ -145,111 +146,61 @@ class DashboardUI(tk.Frame):
         for t in (self.tree_defect, self.tree_machine, self.tree_tool, self.tree_part, self.tree_trend):
             self._clear_tree(t)
 
-        df, fname = get_df()
-        if df is None or df.empty:
-            self.status.config(text="No data.")
-            return
-
-        # Date filter
-        df = df.copy()
-        df["_dt"] = pd.to_datetime(df.get("Date", ""), errors="coerce")
-
         start, end = self._get_window()
-        sub = df[df["_dt"].notna() & (df["_dt"] >= pd.Timestamp(start)) & (df["_dt"] <= pd.Timestamp(end))].copy()
+        cube = cube_for_days(start.date(), end.date())
+        days = day_bounds(start, end)
+        totals = cube.totals(days=days)
 
-        if sub.empty:
+        if not totals["entries"]:
             self.status.config(text=f"No rows in window ({start.date()} → {end.date()}).")
             return
 
-        # Normalize numeric columns
-        sub["_defect_qty"] = sub.get("Defect_Qty", 0).apply(lambda x: safe_int(x, 0))
-        sub["_dtmins"] = sub.get("Downtime_Mins", 0).apply(lambda x: safe_float(x, 0.0))
-        sub["_copq"] = sub.get("COPQ_Est", 0).apply(lambda x: safe_float(x, 0.0)) if "COPQ_Est" in sub.columns else 0.0
-
-        # Useful flags
-        sub["_andon"] = sub.get("Andon_Flag", "").astype(str).str.lower().eq("yes") if "Andon_Flag" in sub.columns else False
-        sub["_highrisk"] = sub.get("Customer_Risk", "").isin(["High", "Critical"]) if "Customer_Risk" in sub.columns else False
-
         topn = self._topn()
 
         # Build paretos
-        self._fill_pareto(self.tree_defect, sub, key="Defect_Code", topn=topn, label="Defect")
-        self._fill_pareto(self.tree_machine, sub, key="Machine", topn=topn, label="Machine")
-        self._fill_pareto(self.tree_tool, sub, key="Tool_Num", topn=topn, label="Tool")
-        self._fill_pareto(self.tree_part, sub, key="Part_Number", topn=topn, label="Part")
+        self._fill_pareto(self.tree_defect, cube, days, key="defect_code", topn=topn, label="Defect")
+        self._fill_pareto(self.tree_machine, cube, days, key="machine", topn=topn, label="Machine")
+        self._fill_pareto(self.tree_tool, cube, days, key="tool_num", topn=topn, label="Tool")
+        self._fill_pareto(self.tree_part, cube, days, key="part_number", topn=topn, label="Part")
 
         # Trend by day
-        self._fill_trend(self.tree_trend, sub)
-
-        self.status.config(text=f"{len(sub)} rows from {fname} | Window: {start.date()} → {end.date()}")
-
-    def _fill_pareto(self, tree, df, key: str, topn: int, label: str):
-        if key not in df.columns:
-            return
-
-        # If you want defect pareto to focus only on defects, uncomment below:
-        # if key == "Defect_Code" and "Defects_Present" in df.columns:
-        #     df = df[df["Defects_Present"].astype(str).str.lower().eq("yes")].copy()
-
-        grp = df.groupby(key, dropna=False)
+        self._fill_trend(self.tree_trend, cube, days)
 
-        out = grp.agg(
-            entries=("ID", "count"),
-            defect_qty=("_defect_qty", "sum"),
-            downtime_mins=("_dtmins", "sum"),
-            copq_est=("_copq", "sum")
-        ).reset_index()
-
-        # Clean blanks
-        out[key] = out[key].astype(str)
-        out.loc[out[key].str.strip() == "", key] = "(blank)"
-
-        # Percent of defects share (based on defect_qty)
-        total_defects = float(out["defect_qty"].sum()) if len(out) else 0.0
-        if total_defects > 0:
-            out["pct_defects"] = (out["defect_qty"] / total_defects) * 100.0
-        else:
-            out["pct_defects"] = 0.0
+        self.status.config(text=f"{int(totals['entries'])} rows | Window: {start.date()} → {end.date()}")
 
+    def _fill_pareto(self, tree, cube, days, key: str, topn: int, label: str):
+        # If you want defect pareto to focus only on defects, pass defects_only=True below.
         # Sort primarily by defect_qty then downtime then entries
-        out = out.sort_values(["defect_qty", "downtime_mins", "entries"], ascending=False).head(topn).reset_index(drop=True)
-
-        for i, r in out.iterrows():
+        rows = cube.top_n(
+            [key], topn,
+            score={"defect_qty": 1.0},
+            then=("downtime_mins", "entries"),
+            days=days,
+        )
+
+        for r in rows:
             tree.insert("", "end", values=(
-                i + 1,
-                f"{label}: {r[key]}",
+                r["rank"],
+                f"{label}: {r[key] or '(blank)'}",
                 int(r["entries"]),
                 int(r["defect_qty"]),
-                float(r["downtime_mins"]),
-                float(r["copq_est"]),
-                float(r["pct_defects"])
+                r["downtime_mins"],
+                r["copq_est"],
+                r["pct"],
+                r["cum_pct"],
             ))
 
-    def _fill_trend(self, tree, df):
-        if df.empty:
-            return
-
-        df = df.copy()
-        df["_day"] = df["_dt"].dt.strftime("%Y-%m-%d")
+    def _fill_trend(self, tree, cube, days):
+        out = cube.rollup(["day"], days=days)
 
-        out = df.groupby("_day", dropna=False).agg(
-            entries=("ID", "count"),
-            defect_qty=("_defect_qty", "sum"),
-            downtime_mins=("_dtmins", "sum"),
-            copq_est=("_copq", "sum"),
-            andon_ct=("_andon", "sum"),
-            high_risk_ct=("_highrisk", "sum"),
-        ).reset_index()
-
-        out = out.sort_values("_day", ascending=False).head(60).reset_index(drop=True)
-
-        for _, r in out.iterrows():
+        # Newest first, last 60 days
+        for i in np.argsort(out["day"])[::-1][:60]:
             tree.insert("", "end", values=(
-                r["_day"],
-                int(r["entries"]),
-                int(r["defect_qty"]),
-                float(r["downtime_mins"]),
-                float(r["copq_est"]),
-                int(r["andon_ct"]),
-                int(r["high_risk_ct"]),
+                out["day"][i],
+                int(out["entries"][i]),
+                int(out["defect_qty"][i]),
+                float(out["downtime_mins"][i]),
+                float(out["copq_est"][i]),
+                int(out["andon"][i]),
+                int(out["high_risk"][i]),
             ))
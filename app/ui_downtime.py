@@ -0,0 +1,98 @@
+# app/ui_downtime.py
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import date, timedelta
+
+from .ui_common import HeaderFrame
+from .dates import canonical_date
+from .db import downtime_pareto, list_lines
+
+
+class DowntimeParetoUI(tk.Frame):
+    """
+    Downtime Pareto:
+    - Coded downtime from shift reports, largest first, with share and running share
+    - Ranked by code, machine, line, shift or day; optional line filter
+    - Summed in SQL over the indexed shift_downtime_entries, so months load at once
+    """
+    GROUPS = {"Code": "code", "Machine": "machine", "Line": "line", "Shift": "shift", "Day": "day"}
+
+    def __init__(self, parent, controller, show_header=True):
+        super().__init__(parent, bg=controller.colors["bg"])
+        self.controller = controller
+
+        if show_header:
+            HeaderFrame(self, controller).pack(fill="x")
+
+        top = tk.Frame(self, bg=controller.colors["bg"], padx=10, pady=10)
+        top.pack(fill="x")
+        style = {"bg": controller.colors["bg"], "fg": controller.colors["fg"]}
+
+        tk.Label(top, text="Downtime Pareto", font=("Arial", 16, "bold"), **style).pack(side="left")
+        tk.Button(top, text="Refresh", command=self.refresh).pack(side="right")
+
+        today = date.today()
+        self.end_var = tk.StringVar(value=today.isoformat())
+        self.start_var = tk.StringVar(value=(today - timedelta(days=90)).isoformat())
+
+        filters = tk.Frame(self, bg=controller.colors["bg"], padx=10)
+        filters.pack(fill="x")
+        tk.Label(filters, text="From:", **style).pack(side="left")
+        tk.Entry(filters, textvariable=self.start_var, width=12).pack(side="left", padx=(2, 10))
+        tk.Label(filters, text="To:", **style).pack(side="left")
+        tk.Entry(filters, textvariable=self.end_var, width=12).pack(side="left", padx=(2, 10))
+
+        tk.Label(filters, text="Line:", **style).pack(side="left")
+        self.line_cb = ttk.Combobox(filters, values=["All"] + list_lines(), state="readonly", width=12)
+        self.line_cb.set("All")
+        self.line_cb.pack(side="left", padx=(2, 10))
+
+        tk.Label(filters, text="By:", **style).pack(side="left")
+        self.group_cb = ttk.Combobox(filters, values=list(self.GROUPS), state="readonly", width=10)
+        self.group_cb.set("Code")
+        self.group_cb.pack(side="left", padx=(2, 10))
+        for cb in (self.line_cb, self.group_cb):
+            cb.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+
+        cols = ("rank", "group", "minutes", "occurrences", "events", "pct", "cum_pct")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        for c in cols:
+            self.tree.heading(c, text=c.upper())
+            self.tree.column(c, width=160 if c == "group" else 95)
+        self.tree.tag_configure("vital", background="#fff3cd")
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        self.status = tk.Label(self, text="", **style)
+        self.status.pack(anchor="w", padx=10, pady=(0, 10))
+
+        self.refresh()
+
+    def refresh(self):
+        start, end = canonical_date(self.start_var.get()), canonical_date(self.end_var.get())
+        if not start or not end:
+            messagebox.showerror("Invalid Date", "Use YYYY-MM-DD format for dates.")
+            return
+
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        by = self.GROUPS[self.group_cb.get()]
+        line = self.line_cb.get()
+        rows = downtime_pareto(start, end, by=by, line=None if line == "All" else line)
+
+        total = 0.0
+        for r in rows:
+            total += r["minutes"] or 0.0
+            # The groups that together make up the first 80% of downtime.
+            tags = ("vital",) if r["cum_pct"] - r["pct"] < 80 else ()
+            self.tree.insert("", "end", values=(
+                r["rank"],
+                r[by] or "(none)",
+                f"{r['minutes'] or 0:,.0f}",
+                r["occurrences"] or 0,
+                r["events"],
+                f"{r['pct']:.1f}%",
+                f"{r['cum_pct']:.1f}%",
+            ), tags=tags)
+
+        self.status.config(text=f"{len(rows)} row(s). {total:,.0f} downtime minutes. Top 80% is highlighted.")
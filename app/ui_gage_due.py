@@ -0,0 +1,91 @@
+# app/ui_gage_due.py
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime
+
+from .ui_common import HeaderFrame
+from .config import RISK_CONFIG_FILE
+from .gage_schedule import GageScheduler, due_soon_days, gage_statuses, gages_due, sync_gages
+from .storage import load_json
+
+# How often the open screen checks for a status crossing or an edited gages.json
+POLL_MS = 60_000
+
+
+class GageDueUI(tk.Frame):
+    """
+    Overdue and due-soon gages from the indexed next_due_date. While the screen is
+    open a GageScheduler says when a gage next crosses into Due Soon or Overdue,
+    so the list is only re-read on the day something moved (or gages.json changed).
+    """
+
+    def __init__(self, parent, controller, show_header=True):
+        super().__init__(parent, bg=controller.colors["bg"])
+        self.controller = controller
+        self._scheduler = None
+        self._after_id = None
+
+        if show_header:
+            HeaderFrame(self, controller).pack(fill="x")
+
+        top = tk.Frame(self, bg=controller.colors["bg"], padx=10, pady=10)
+        top.pack(fill="x")
+
+        tk.Label(top, text="Calibration Due", bg=controller.colors["bg"],
+                 fg=controller.colors["fg"], font=("Arial", 16, "bold")).pack(side="left")
+        tk.Button(top, text="Refresh", command=self.refresh).pack(side="right")
+
+        self.status = tk.Label(self, text="", bg=controller.colors["bg"], fg=controller.colors["fg"], anchor="w")
+        self.status.pack(fill="x", padx=10)
+
+        cols = ("gage_id", "name", "line", "criticality", "next_due_date", "status", "days_until_due")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        for c in cols:
+            self.tree.heading(c, text=c.upper())
+            self.tree.column(c, width=140 if c != "name" else 240)
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        self.refresh()
+        self._after_id = self.after(POLL_MS, self._poll)
+        self.bind("<Destroy>", self._on_destroy, add="+")
+
+    def refresh(self, crossed=None):
+        risk_cfg = load_json(RISK_CONFIG_FILE, {}) or {}
+        today = datetime.now().date()
+        due = gages_due(today, risk_cfg)
+        self._scheduler = GageScheduler.from_gages(
+            list(gage_statuses(today, risk_cfg).values()), today, due_soon_days(risk_cfg)
+        )
+
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        for g in due:
+            self.tree.insert("", "end", values=(
+                g.get("gage_id", ""),
+                g.get("name", ""),
+                g.get("line", ""),
+                g.get("criticality", ""),
+                g.get("next_due_date", ""),
+                g.get("status", ""),
+                g.get("days_until_due", ""),
+            ))
+
+        upcoming = self._scheduler.next_event_date()
+        text = f"{len(due)} gage(s) overdue or due soon."
+        if crossed:
+            text += " Changed today: " + ", ".join(f"{e['gage_id']} → {e['status']}" for e in crossed) + "."
+        if upcoming:
+            text += f" Next status change: {upcoming.isoformat()}."
+        self.status.configure(text=text)
+
+    def _poll(self):
+        self._after_id = None
+        crossed = self._scheduler.poll(datetime.now().date()) if self._scheduler else []
+        if crossed or sync_gages():
+            self.refresh(crossed)
+        self._after_id = self.after(POLL_MS, self._poll)
+
+    def _on_destroy(self, event):
+        if event.widget is self and self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
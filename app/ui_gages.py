@@ -3,6 +3,7 @@ import tkinter as tk
 from tkinter import ttk
 
 from .ui_common import HeaderFrame
+from .ui_gage_due import GageDueUI
 from .ui_gage_verification import GageVerificationUI
 from .ui_gage_questions_editor import GageQuestionsEditorUI
 
@@ -12,6 +13,7 @@ class GagesUI(tk.Frame):
     Combined Gages screen:
     - Gage Verification
     - Gage Verification Questions (Admin/Super)
+    - Calibration Due
     """
 
     def __init__(self, parent, controller, show_header=True):
@@ -26,9 +28,12 @@ class GagesUI(tk.Frame):
 
         tab_verify = tk.Frame(nb, bg=controller.colors["bg"])
         tab_questions = tk.Frame(nb, bg=controller.colors["bg"])
+        tab_due = tk.Frame(nb, bg=controller.colors["bg"])
 
         nb.add(tab_verify, text="Gage Verification")
         nb.add(tab_questions, text="Verification Questions")
+        nb.add(tab_due, text="Calibration Due")
 
         GageVerificationUI(tab_verify, controller, show_header=False).pack(fill="both", expand=True)
         GageQuestionsEditorUI(tab_questions, controller, show_header=False).pack(fill="both", expand=True)
+        GageDueUI(tab_due, controller, show_header=False).pack(fill="both", expand=True)
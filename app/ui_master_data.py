@@ -7,6 +7,7 @@ from .storage import safe_float, safe_int
 from .services.master_data_service import (
     add_line_service,
     add_machine_to_line_service,
+    adjust_tool_stock_service,
     deactivate_downtime_code_service,
     deactivate_part_service,
     deactivate_tool_service,
@@ -27,6 +28,7 @@ from .services.master_data_service import (
     list_tools_for_line_service,
     list_tools_simple_service,
     replace_tool_inserts_service,
+    reprice_tool_changes_service,
     set_scrap_cost_service,
     set_tool_lines_service,
     set_tool_parts_service,
@@ -142,6 +144,8 @@ class MasterDataUI(tk.Frame):
 
         self.tool_del_btn = tk.Button(filter_frame, text="Deactivate Selected", command=self.delete_selected_tool)
         self.tool_del_btn.pack(side="right")
+        self.tool_reprice_btn = tk.Button(filter_frame, text="Reprice Tool Changes", command=self.reprice_tool_changes)
+        self.tool_reprice_btn.pack(side="right", padx=8)
 
         cols = ("tool", "name", "unit_cost", "stock_qty", "lines", "parts")
         self.tool_tree = ttk.Treeview(parent, columns=cols, show="headings", height=14)
@@ -166,6 +170,7 @@ class MasterDataUI(tk.Frame):
             return
         self.tool_add_btn.configure(state="disabled")
         self.tool_del_btn.configure(state="disabled")
+        self.tool_reprice_btn.configure(state="disabled")
 
     def refresh_tools(self):
         for i in self.tool_tree.get_children():
@@ -287,10 +292,19 @@ class MasterDataUI(tk.Frame):
                     tool_num=tnum,
                     name=tool_name_var.get().strip(),
                     unit_cost=safe_float(tool_cost_var.get(), 0.0),
-                    stock_qty=safe_int(tool_stock_var.get(), 0),
                     inserts_per_tool=1,
                     actor_user={"username": self.controller.user, "role": self.controller.role},
                 )
+                # Log the edit as a movement so stock taken since the editor opened isn't overwritten.
+                loaded = safe_int(tool_data.get("stock_qty", 0), 0)
+                counted = safe_int(tool_stock_var.get(), 0)
+                if counted != loaded:
+                    adjust_tool_stock_service(
+                        tnum,
+                        counted - loaded,
+                        note=f"Edited {loaded} -> {counted}",
+                        actor_user={"username": self.controller.user, "role": self.controller.role},
+                    )
                 set_tool_lines_service(
                     tnum,
                     [ln for ln, var in line_vars.items() if var.get()],
@@ -332,6 +346,21 @@ class MasterDataUI(tk.Frame):
             self.refresh_tools()
 
         self._run_service_action(_deactivate)
+
+    def reprice_tool_changes(self):
+        if not messagebox.askyesno(
+            "Confirm",
+            "Re-price every saved tool change at the change cost in effect when it was made?\n"
+            "This overwrites the cost stored on those entries.",
+        ):
+            return
+        def _reprice():
+            changed = reprice_tool_changes_service(
+                actor_user={"username": self.controller.user, "role": self.controller.role},
+            )
+            messagebox.showinfo("Repriced", f"{changed} tool change(s) re-priced.")
+
+        self._run_service_action(_reprice)
 
     def save_tools(self):
         messagebox.showinfo("Saved", "Tool pricing saved.")
@@ -1,11 +1,10 @@
 # app/ui_notifications.py
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox
+from datetime import datetime
 
 from .ui_common import HeaderFrame
-from .storage import get_df, load_json
-from .config import GAGES_FILE, RISK_CONFIG_FILE
-from .quality_engine import generate_notifications
+from .alert_store import acknowledge, load_alerts
 
 
 class NotificationsUI(tk.Frame):
@@ -23,6 +22,7 @@ class NotificationsUI(tk.Frame):
                  fg=controller.colors["fg"], font=("Arial", 16, "bold")).pack(side="left")
 
         tk.Button(top, text="Refresh", command=self.refresh).pack(side="right")
+        tk.Button(top, text="Acknowledge", command=self.acknowledge_selected).pack(side="right", padx=(0, 8))
 
         filt = tk.Frame(self, bg=controller.colors["bg"], padx=10, pady=0)
         filt.pack(fill="x")
@@ -33,7 +33,20 @@ class NotificationsUI(tk.Frame):
         self.min_sev.pack(side="left", padx=8)
         self.min_sev.bind("<<ComboboxSelected>>", lambda e: self.refresh())
 
-        cols = ("severity", "type", "title", "details", "related")
+        self.show_acked = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            filt,
+            text="Show acknowledged",
+            variable=self.show_acked,
+            bg=controller.colors["bg"],
+            fg=controller.colors["fg"],
+            activebackground=controller.colors["bg"],
+            activeforeground=controller.colors["fg"],
+            selectcolor=controller.colors["bg"],
+            command=self.refresh
+        ).pack(side="left", padx=18)
+
+        cols = ("severity", "type", "title", "details", "related", "first_seen", "ack_by")
         self.tree = ttk.Treeview(self, columns=cols, show="headings")
         for c in cols:
             self.tree.heading(c, text=c.upper())
@@ -46,25 +59,30 @@ class NotificationsUI(tk.Frame):
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-        df, fname = get_df()  # current month
-        gages = load_json(GAGES_FILE, {"gages": []})
-        risk_cfg = load_json(RISK_CONFIG_FILE, {})
+        # Current month's entry alerts plus gage alerts, from the persisted store
+        alerts = load_alerts(
+            month=datetime.now().strftime("%Y-%m"),
+            min_severity=self.min_sev.get() or "High",
+            include_acknowledged=bool(self.show_acked.get()),
+        )
 
-        alerts = generate_notifications(df, gages, risk_cfg)
-
-        # filter + sort
-        rank = {"Low": 0, "Medium": 1, "High": 2, "Critical": 3}
-        min_needed = rank.get(self.min_sev.get(), 2)
-
-        filtered = [a for a in alerts if rank.get(a.get("severity","Low"), 0) >= min_needed]
-        filtered.sort(key=lambda a: rank.get(a.get("severity","Low"), 0), reverse=True)
-
-        for a in filtered:
-            rel = a.get("related", {})
-            self.tree.insert("", "end", values=(
+        for a in alerts:
+            self.tree.insert("", "end", iid=str(a["id"]), values=(
                 a.get("severity",""),
                 a.get("type",""),
                 a.get("title",""),
                 a.get("details",""),
-                str(rel)
+                a.get("related_key",""),
+                a.get("first_seen",""),
+                a.get("ack_by","")
             ))
+
+    def acknowledge_selected(self):
+        selected = self.tree.selection()
+        if not selected:
+            messagebox.showwarning("Select", "Select one or more alerts first.")
+            return
+        user = getattr(self.controller, "user", "") or ""
+        for iid in selected:
+            acknowledge(int(iid), user)
+        self.refresh()
@@ -6,7 +6,7 @@ from tkinter import ttk, messagebox
 from datetime import datetime
 
 from .ui_common import HeaderFrame
-from .storage import safe_int, safe_float
+from .storage import next_id, safe_int, safe_float
 from .services.tool_entry_service import (
     create_shift_report,
     list_cells,
@@ -295,7 +295,7 @@ class OperatorUI(tk.Frame):
                 return
 
         now = datetime.now()
-        entry_id = f"SP-{now.strftime('%Y%m%d-%H%M%S')}"
+        entry_id = f"SP-{next_id()}"
         new_row = {
             "ID": entry_id,
             "Date": now.strftime("%Y-%m-%d"),
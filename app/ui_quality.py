@@ -3,7 +3,12 @@ from tkinter import ttk, messagebox
 from datetime import datetime
 
 from .ui_common import HeaderFrame, FilePicker, DataTable
-from .storage import get_df, save_df, safe_int
+from .config import RISK_CONFIG_FILE
+from .db import list_repeat_flags
+from .health_engine import overdue_actions
+from .quality_engine import SEVERITY_LEVELS, RiskScorer
+from .repeat_tracker import sync_repeat_flags
+from .storage import get_df, load_json, save_df, safe_int
 from .ui_action_center import ActionCenterUI
 from .ui_audit import AuditTrailUI
 from .screen_registry import get_screen_class
@@ -54,17 +59,37 @@ class QualityUI(tk.Frame):
         tk.Button(top, text="Verify Selected", command=self.verify_selected).pack(side="left", padx=10)
         tk.Button(top, text="Edit Defect Fields", command=self.edit_defects).pack(side="left", padx=10)
 
-        cols = ["ID","Date","Line","Machine","Tool_Num","Defects_Present","Defect_Qty","Sort_Done","Defect_Reason","Quality_Verified","Leader_Sign"]
+        cols = ["ID","Severity","Date","Line","Machine","Tool_Num","Defects_Present","Defect_Qty","Sort_Done","Defect_Reason","Quality_Verified","Leader_Sign","Risk_Reasons"]
         self.table = DataTable(tab_main, cols)
         self.table.pack(fill="both", expand=True, padx=10, pady=10)
 
         self.load_pending(self.picker.get())
 
     def load_pending(self, filename):
-        df, _ = get_df(filename)
+        df, month = get_df(filename)
         pending = df[df["Quality_Verified"].fillna("Pending").astype(str).str.lower().eq("pending")]
         self._filename = filename
-        self.table.load(pending)
+        # Entries edited since they were scored (here or elsewhere) get their repeat score updated first
+        sync_repeat_flags()
+        self.table.load(self._with_severity(pending, month))
+
+    @staticmethod
+    def _with_severity(pending, month):
+        # Most severe first, scored with the current risk_config.json and stored repeat scores
+        if pending.empty:
+            return pending.assign(Severity="", Risk_Reasons="")
+        scorer = RiskScorer.from_config(load_json(RISK_CONFIG_FILE, {}) or {})
+        repeat = {r["id"]: r["repeat_score"] for r in list_repeat_flags(since=f"{month}-01", flagged_only=False)}
+        risk = scorer.score_frame(
+            pending,
+            repeat_score=pending["ID"].astype(str).map(repeat).fillna(0),
+            # Past due and still open, as the health check sees it, or already marked Overdue
+            is_overdue_action=overdue_actions(pending, datetime.now().date())
+            | pending["Action_Status"].astype(str).str.strip().str.lower().eq("overdue"),
+        )
+        out = pending.assign(Severity=risk["Severity"], Risk_Reasons=risk["Reasons"])
+        out["_rank"] = out["Severity"].map({s: i for i, s in enumerate(SEVERITY_LEVELS)})
+        return out.sort_values("_rank", ascending=False, kind="stable").drop(columns="_rank")
 
     def verify_selected(self):
         sel_id = self.table.selected_id()
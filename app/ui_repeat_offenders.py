@@ -6,8 +6,11 @@ from datetime import datetime, timedelta
 import pandas as pd
 
 from .ui_common import HeaderFrame
-from .storage import get_df, load_json, safe_int, safe_float
+from .storage import load_json, safe_int
+from .metrics_cube import cube_for_days, day_number
 from .config import REPEAT_RULES_FILE, DATA_DIR
+from .db import list_repeat_flags
+from .repeat_tracker import sync_repeat_flags
 
 
 class RepeatOffendersUI(tk.Frame):
@@ -18,6 +21,7 @@ class RepeatOffendersUI(tk.Frame):
       1) Part + Defect repeats
       2) Machine repeats
       3) Tool COPQ repeats (if COPQ present)
+      4) Entries flagged Watch/Repeat when they were saved (stored, not recomputed)
     """
     def __init__(self, parent, controller, show_header=True):
         super().__init__(parent, bg=controller.colors["bg"])
@@ -64,14 +68,17 @@ class RepeatOffendersUI(tk.Frame):
         self.tab_part = tk.Frame(nb)
         self.tab_mach = tk.Frame(nb)
         self.tab_tool = tk.Frame(nb)
+        self.tab_flags = tk.Frame(nb)
 
         nb.add(self.tab_part, text="Part + Defect")
         nb.add(self.tab_mach, text="Machine")
         nb.add(self.tab_tool, text="Tool COPQ")
+        nb.add(self.tab_flags, text="Flagged Entries")
 
         self.tree_part = self._make_tree(self.tab_part, ("rank", "part", "defect", "count", "defect_qty", "downtime_mins", "copq_est"))
         self.tree_mach = self._make_tree(self.tab_mach, ("rank", "machine", "count", "defect_qty", "downtime_mins", "copq_est"))
         self.tree_tool = self._make_tree(self.tab_tool, ("rank", "tool", "count", "defect_qty", "downtime_mins", "copq_est"))
+        self.tree_flags = self._make_tree(self.tab_flags, ("date", "entry_id", "part", "machine", "tool", "flag", "score", "reason"))
 
         # Cache
         self._out_part = None
@@ -104,129 +111,112 @@ class RepeatOffendersUI(tk.Frame):
         for i in tree.get_children():
             tree.delete(i)
 
-    def _date_filter(self, df):
-        window_days = safe_int(self.window_var.get(), safe_int(self.rules.get("window_days", 7), 7))
-        cutoff = datetime.now().date() - timedelta(days=window_days)
-
-        temp = df.copy()
-        temp["_dt"] = pd.to_datetime(temp.get("Date", ""), errors="coerce")
-        temp = temp[temp["_dt"].notna()]
-        temp = temp[temp["_dt"].dt.date >= cutoff]
-        return temp, window_days
+    def _offenders(self, cube, by, columns, weights, min_count, **where):
+        """Top 50 groups of the cube by weighted count/defects/downtime/COPQ, as a frame."""
+        rows = cube.top_n(
+            by, 50,
+            score=dict(zip(("entries", "defect_qty", "downtime_mins", "copq_est"), weights)),
+            min_entries=min_count,
+            **where,
+        )
+        out = pd.DataFrame([
+            {
+                **{col: r[dim] or "(blank)" for dim, col in zip(by, columns)},
+                "count": int(r["entries"]),
+                "defect_qty": int(r["defect_qty"]),
+                "downtime_mins": r["downtime_mins"],
+                "copq_est": r["copq_est"],
+            }
+            for r in rows
+        ], columns=[*columns, "count", "defect_qty", "downtime_mins", "copq_est"])
+        return out
 
     def refresh(self):
         self._clear_tree(self.tree_part)
         self._clear_tree(self.tree_mach)
         self._clear_tree(self.tree_tool)
+        self._clear_tree(self.tree_flags)
+        self._fill_flags()
 
-        df, _ = get_df()
-        if df is None or df.empty:
+        min_count = max(2, safe_int(self.min_count_var.get(), 2))
+        window_days = safe_int(self.window_var.get(), safe_int(self.rules.get("window_days", 7), 7))
+        cutoff = datetime.now().date() - timedelta(days=window_days)
+
+        cube = cube_for_days(cutoff)
+        days = (day_number(cutoff), None)
+        rows = int(cube.totals(days=days)["entries"])
+        if not rows:
             self.status.config(text="No data.")
             return
 
-        min_count = max(2, safe_int(self.min_count_var.get(), 2))
-
-        sub, window_days = self._date_filter(df)
-
-        # Normalize numeric fields
-        sub["_defect_qty"] = sub.get("Defect_Qty", 0).apply(lambda x: safe_int(x, 0))
-        sub["_dtmins"] = sub.get("Downtime_Mins", 0).apply(lambda x: safe_float(x, 0.0))
-        sub["_copq"] = sub.get("COPQ_Est", 0).apply(lambda x: safe_float(x, 0.0)) if "COPQ_Est" in sub.columns else 0.0
-
-        # Focus only defect-related rows for repeats
-        if "Defects_Present" in sub.columns:
-            def_mask = sub["Defects_Present"].astype(str).str.lower().eq("yes")
-            sub_def = sub[def_mask].copy()
-        else:
-            sub_def = sub.copy()
-
-        # 1) Part + Defect repeats
-        out_part = None
-        if "Part_Number" in sub_def.columns and "Defect_Code" in sub_def.columns:
-            grp = sub_def.groupby(["Part_Number", "Defect_Code"], dropna=False)
-            out_part = grp.agg(
-                count=("ID", "count"),
-                defect_qty=("_defect_qty", "sum"),
-                downtime_mins=("_dtmins", "sum"),
-                copq_est=("_copq", "sum")
-            ).reset_index()
-
-            out_part = out_part[out_part["count"] >= min_count]
-            out_part["Part_Number"] = out_part["Part_Number"].astype(str).replace({"": "(blank)"})
-            out_part["Defect_Code"] = out_part["Defect_Code"].astype(str).replace({"": "(blank)"})
-
-            # Score: emphasize repeats + defects + copq
-            out_part["_score"] = out_part["count"] * 5 + out_part["defect_qty"] * 2 + out_part["downtime_mins"] * 0.5 + out_part["copq_est"] * 0.01
-            out_part = out_part.sort_values("_score", ascending=False).head(50).reset_index(drop=True)
-
-            for i, r in out_part.iterrows():
-                self.tree_part.insert("", "end", values=(
-                    i + 1,
-                    r["Part_Number"],
-                    r["Defect_Code"],
-                    int(r["count"]),
-                    int(r["defect_qty"]),
-                    float(r["downtime_mins"]),
-                    float(r["copq_est"])
-                ))
-
-        # 2) Machine repeats
-        out_mach = None
-        if "Machine" in sub_def.columns:
-            grp = sub_def.groupby(["Machine"], dropna=False)
-            out_mach = grp.agg(
-                count=("ID", "count"),
-                defect_qty=("_defect_qty", "sum"),
-                downtime_mins=("_dtmins", "sum"),
-                copq_est=("_copq", "sum")
-            ).reset_index()
-
-            out_mach = out_mach[out_mach["count"] >= min_count]
-            out_mach["Machine"] = out_mach["Machine"].astype(str).replace({"": "(blank)"})
-            out_mach["_score"] = out_mach["count"] * 4 + out_mach["defect_qty"] * 1.5 + out_mach["downtime_mins"] * 0.5 + out_mach["copq_est"] * 0.01
-            out_mach = out_mach.sort_values("_score", ascending=False).head(50).reset_index(drop=True)
-
-            for i, r in out_mach.iterrows():
-                self.tree_mach.insert("", "end", values=(
-                    i + 1,
-                    r["Machine"],
-                    int(r["count"]),
-                    int(r["defect_qty"]),
-                    float(r["downtime_mins"]),
-                    float(r["copq_est"])
-                ))
-
-        # 3) Tool COPQ repeats (only meaningful if tool numbers exist)
-        out_tool = None
-        if "Tool_Num" in sub.columns:
-            grp = sub.groupby(["Tool_Num"], dropna=False)
-            out_tool = grp.agg(
-                count=("ID", "count"),
-                defect_qty=("_defect_qty", "sum"),
-                downtime_mins=("_dtmins", "sum"),
-                copq_est=("_copq", "sum")
-            ).reset_index()
-
-            out_tool = out_tool[out_tool["count"] >= min_count]
-            out_tool["Tool_Num"] = out_tool["Tool_Num"].astype(str).replace({"": "(blank)"})
-            out_tool["_score"] = out_tool["count"] * 3 + out_tool["defect_qty"] * 1.0 + out_tool["downtime_mins"] * 0.4 + out_tool["copq_est"] * 0.02
-            out_tool = out_tool.sort_values("_score", ascending=False).head(50).reset_index(drop=True)
-
-            for i, r in out_tool.iterrows():
-                self.tree_tool.insert("", "end", values=(
-                    i + 1,
-                    r["Tool_Num"],
-                    int(r["count"]),
-                    int(r["defect_qty"]),
-                    float(r["downtime_mins"]),
-                    float(r["copq_est"])
-                ))
+        # 1) Part + Defect repeats, defect rows only
+        # Score: emphasize repeats + defects + copq
+        out_part = self._offenders(
+            cube, ["part_number", "defect_code"], ["Part_Number", "Defect_Code"], (5, 2, 0.5, 0.01), min_count,
+            days=days, defects_only=True,
+        )
+        for i, r in out_part.iterrows():
+            self.tree_part.insert("", "end", values=(
+                i + 1,
+                r["Part_Number"],
+                r["Defect_Code"],
+                int(r["count"]),
+                int(r["defect_qty"]),
+                float(r["downtime_mins"]),
+                float(r["copq_est"])
+            ))
+
+        # 2) Machine repeats, defect rows only
+        out_mach = self._offenders(
+            cube, ["machine"], ["Machine"], (4, 1.5, 0.5, 0.01), min_count,
+            days=days, defects_only=True,
+        )
+        for i, r in out_mach.iterrows():
+            self.tree_mach.insert("", "end", values=(
+                i + 1,
+                r["Machine"],
+                int(r["count"]),
+                int(r["defect_qty"]),
+                float(r["downtime_mins"]),
+                float(r["copq_est"])
+            ))
+
+        # 3) Tool COPQ repeats, every row
+        out_tool = self._offenders(
+            cube, ["tool_num"], ["Tool_Num"], (3, 1.0, 0.4, 0.02), min_count,
+            days=days,
+        )
+        for i, r in out_tool.iterrows():
+            self.tree_tool.insert("", "end", values=(
+                i + 1,
+                r["Tool_Num"],
+                int(r["count"]),
+                int(r["defect_qty"]),
+                float(r["downtime_mins"]),
+                float(r["copq_est"])
+            ))
 
         self._out_part = out_part
         self._out_mach = out_mach
         self._out_tool = out_tool
 
-        self.status.config(text=f"Window={window_days}d  MinCount={min_count}  Rows={len(sub)}")
+        self.status.config(text=f"Window={window_days}d  MinCount={min_count}  Rows={rows}")
+
+    def _fill_flags(self):
+        window_days = safe_int(self.window_var.get(), safe_int(self.rules.get("window_days", 7), 7))
+        since = (datetime.now().date() - timedelta(days=window_days)).strftime("%Y-%m-%d")
+        sync_repeat_flags()
+        for r in list_repeat_flags(since=since):
+            self.tree_flags.insert("", "end", values=(
+                r["date"],
+                r["id"],
+                r["part_number"],
+                r["machine"],
+                r["tool_num"],
+                r["repeat_flag"],
+                int(r["repeat_score"]),
+                r["repeat_reason"]
+            ))
 
     def export(self):
         if self._out_part is None and self._out_mach is None and self._out_tool is None:
@@ -152,6 +152,26 @@ class SuperUI(tk.Frame):
             "Repeat Offenders screen missing",
             "Expected: app/ui_repeat_offenders.py → class RepeatOffendersUI",
         )
+        ToolLifeBoardUI = _safe_view(
+            lambda: __import__("app.ui_tool_life_board", fromlist=["ToolLifeBoardUI"]).ToolLifeBoardUI,
+            "Tool Life Board screen missing",
+            "Expected: app/ui_tool_life_board.py → class ToolLifeBoardUI",
+        )
+        OeeUI = _safe_view(
+            lambda: __import__("app.ui_oee", fromlist=["OeeUI"]).OeeUI,
+            "OEE Trends screen missing",
+            "Expected: app/ui_oee.py → class OeeUI",
+        )
+        ToolCostUI = _safe_view(
+            lambda: __import__("app.ui_tool_cost", fromlist=["ToolCostUI"]).ToolCostUI,
+            "Tool Costs screen missing",
+            "Expected: app/ui_tool_cost.py → class ToolCostUI",
+        )
+        DowntimeParetoUI = _safe_view(
+            lambda: __import__("app.ui_downtime", fromlist=["DowntimeParetoUI"]).DowntimeParetoUI,
+            "Downtime Pareto screen missing",
+            "Expected: app/ui_downtime.py → class DowntimeParetoUI",
+        )
         TopUI = _safe_view(
             lambda: __import__("app.ui_top", fromlist=["TopUI"]).TopUI,
             "Top/Super Tools screen missing",
@@ -176,6 +196,10 @@ class SuperUI(tk.Frame):
             ("Health Check", HealthCheckUI),
             ("Shift Handoff", ShiftHandoffUI),
             ("Repeat Offenders", RepeatOffendersUI),
+            ("Tool Life Board", ToolLifeBoardUI),
+            ("OEE Trends", OeeUI),
+            ("Tool Costs", ToolCostUI),
+            ("Downtime Pareto", DowntimeParetoUI),
 
             ("Top level", TopUI),
             ("Master Data", MasterDataUI),
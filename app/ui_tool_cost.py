@@ -0,0 +1,105 @@
+# app/ui_tool_cost.py
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import date, timedelta
+
+from .ui_common import HeaderFrame
+from .dates import canonical_date
+from .db import list_lines, tool_cost_totals
+
+
+class ToolCostUI(tk.Frame):
+    """
+    Tool Costs:
+    - Tool-change cost, changes and parts produced per month or day
+    - Split by line or by line and part; cost per piece where parts were reported
+    - Reads the tool_cost_rollup table, so no insert math runs per entry
+    """
+    PERIODS = {"Month": "month", "Day": "day"}
+    GROUPS = {"Line": ("line",), "Part": ("line", "part_number")}
+
+    def __init__(self, parent, controller, show_header=True):
+        super().__init__(parent, bg=controller.colors["bg"])
+        self.controller = controller
+
+        if show_header:
+            HeaderFrame(self, controller).pack(fill="x")
+
+        top = tk.Frame(self, bg=controller.colors["bg"], padx=10, pady=10)
+        top.pack(fill="x")
+        style = {"bg": controller.colors["bg"], "fg": controller.colors["fg"]}
+
+        tk.Label(top, text="Tool Costs", font=("Arial", 16, "bold"), **style).pack(side="left")
+        tk.Button(top, text="Refresh", command=self.refresh).pack(side="right")
+
+        today = date.today()
+        self.end_var = tk.StringVar(value=today.isoformat())
+        self.start_var = tk.StringVar(value=(today.replace(day=1) - timedelta(days=365)).replace(day=1).isoformat())
+
+        filters = tk.Frame(self, bg=controller.colors["bg"], padx=10)
+        filters.pack(fill="x")
+        tk.Label(filters, text="From:", **style).pack(side="left")
+        tk.Entry(filters, textvariable=self.start_var, width=12).pack(side="left", padx=(2, 10))
+        tk.Label(filters, text="To:", **style).pack(side="left")
+        tk.Entry(filters, textvariable=self.end_var, width=12).pack(side="left", padx=(2, 10))
+
+        tk.Label(filters, text="Line:", **style).pack(side="left")
+        self.line_cb = ttk.Combobox(filters, values=["All"] + list_lines(), state="readonly", width=12)
+        self.line_cb.set("All")
+        self.line_cb.pack(side="left", padx=(2, 10))
+
+        tk.Label(filters, text="Period:", **style).pack(side="left")
+        self.period_cb = ttk.Combobox(filters, values=list(self.PERIODS), state="readonly", width=8)
+        self.period_cb.set("Month")
+        self.period_cb.pack(side="left", padx=(2, 10))
+
+        tk.Label(filters, text="By:", **style).pack(side="left")
+        self.group_cb = ttk.Combobox(filters, values=list(self.GROUPS), state="readonly", width=10)
+        self.group_cb.set("Line")
+        self.group_cb.pack(side="left", padx=(2, 10))
+        for cb in (self.line_cb, self.period_cb, self.group_cb):
+            cb.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+
+        cols = ("period", "line", "part", "tool_changes", "tool_cost", "produced", "cost_per_piece")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        for c in cols:
+            self.tree.heading(c, text=c.upper())
+            self.tree.column(c, width=120 if c in ("period", "line", "part") else 110)
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        self.status = tk.Label(self, text="", **style)
+        self.status.pack(anchor="w", padx=10, pady=(0, 10))
+
+        self.refresh()
+
+    def refresh(self):
+        start, end = canonical_date(self.start_var.get()), canonical_date(self.end_var.get())
+        if not start or not end:
+            messagebox.showerror("Invalid Date", "Use YYYY-MM-DD format for dates.")
+            return
+
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        line = self.line_cb.get()
+        rows = tool_cost_totals(
+            start, end,
+            period=self.PERIODS[self.period_cb.get()],
+            by=self.GROUPS[self.group_cb.get()],
+            line=None if line == "All" else line,
+        )
+
+        total_cost = 0.0
+        for r in rows:
+            total_cost += r["tool_cost"] or 0.0
+            self.tree.insert("", "end", values=(
+                r["period"],
+                r["line"],
+                r.get("part_number", ""),
+                r["tool_changes"],
+                f"${r['tool_cost'] or 0:,.2f}",
+                f"{r['produced'] or 0:,.0f}",
+                "" if r["cost_per_piece"] is None else f"${r['cost_per_piece']:,.4f}",
+            ))
+
+        self.status.config(text=f"{len(rows)} row(s). Total tool cost ${total_cost:,.2f}.")
@@ -0,0 +1,83 @@
+# app/ui_tool_life_board.py
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime
+
+from .ui_common import HeaderFrame
+from .dates import entry_ts
+from .db import list_tool_life_model
+from .tool_life_model import format_ts
+
+
+class ToolLifeBoardUI(tk.Frame):
+    """
+    Tool Life Board:
+    - One row per installed tool (tool / machine / part), next predicted change first
+    - Rows past their predicted change are highlighted
+    - Reads the precomputed tool_life_model table; nothing is fitted here
+    """
+    def __init__(self, parent, controller, show_header=True):
+        super().__init__(parent, bg=controller.colors["bg"])
+        self.controller = controller
+
+        if show_header:
+            HeaderFrame(self, controller).pack(fill="x")
+
+        top = tk.Frame(self, bg=controller.colors["bg"], padx=10, pady=10)
+        top.pack(fill="x")
+
+        tk.Label(top, text="Tool Life Board", bg=controller.colors["bg"],
+                 fg=controller.colors["fg"], font=("Arial", 16, "bold")).pack(side="left")
+        tk.Button(top, text="Refresh", command=self.refresh).pack(side="right")
+
+        tk.Label(top, text="Machine:", bg=controller.colors["bg"], fg=controller.colors["fg"]).pack(side="right", padx=(0, 4))
+        self.machine_cb = ttk.Combobox(top, values=[""], state="readonly", width=18)
+        self.machine_cb.pack(side="right", padx=(0, 12))
+        self.machine_cb.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+
+        cols = ("next_change", "machine", "part", "tool", "remaining", "produced", "p10", "p50", "p90", "method", "samples")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        for c in cols:
+            self.tree.heading(c, text=c.upper())
+            self.tree.column(c, width=150 if c == "next_change" else 95)
+        self.tree.tag_configure("due", background="#f8d7da")
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        self.status = tk.Label(self, text="", bg=controller.colors["bg"], fg=controller.colors["fg"])
+        self.status.pack(anchor="w", padx=10, pady=(0, 10))
+
+        self.refresh()
+
+    def refresh(self):
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        rows = list_tool_life_model(self.machine_cb.get() or None)
+        if not self.machine_cb.get():
+            self.machine_cb["values"] = [""] + sorted({r["machine"] for r in rows})
+
+        now = datetime.now()
+        now_ts = entry_ts(now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"))
+
+        def num(value):
+            return "" if value is None else f"{value:,.0f}"
+
+        for r in rows:
+            remaining = r["expected_remaining"]
+            due = r["predicted_change_ts"] is not None and r["predicted_change_ts"] <= now_ts
+            tags = ("due",) if due else ()
+            self.tree.insert("", "end", values=(
+                format_ts(r["predicted_change_ts"]),
+                r["machine"],
+                r["part_number"],
+                r["tool_num"],
+                num(remaining),
+                num(r["produced_since"]),
+                num(r["p10_life"]),
+                num(r["p50_life"]),
+                num(r["p90_life"]),
+                r["method"],
+                r["samples"],
+            ), tags=tags)
+
+        self.status.config(text=f"{len(rows)} installed tool(s).")
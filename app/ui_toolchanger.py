@@ -15,6 +15,8 @@ from .services.tool_life_service import (
     list_machines,
     list_tools,
 )
+from .db import get_tool_forecast
+from .tool_life_model import format_ts, tool_life_prediction
 from .ui_error_handling import wrap_ui_action
 
 class ToolChangerUI(tk.Frame):
@@ -84,6 +86,8 @@ class ToolChangerUI(tk.Frame):
         tk.Label(body, text="Part #:", **style).grid(row=4, column=0, sticky="e", pady=5)
         self.part_cb = ttk.Combobox(body, values=[], width=20)  # allow typing
         self.part_cb.grid(row=4, column=1, sticky="w")
+        self.part_cb.bind("<<ComboboxSelected>>", self.update_life_prediction)
+        self.part_cb.bind("<FocusOut>", self.update_life_prediction)
 
         # Tool
         tk.Label(body, text="Tool #:", **style).grid(row=5, column=0, sticky="e", pady=5)
@@ -105,6 +109,8 @@ class ToolChangerUI(tk.Frame):
         self.life_entry = tk.Entry(body, width=10)
         self.life_entry.insert(0, "0")
         self.life_entry.grid(row=7, column=1, sticky="w")
+        self.life_lbl = tk.Label(body, text="", fg="blue", bg=controller.colors["bg"], font=("Arial", 10))
+        self.life_lbl.grid(row=7, column=2, sticky="w", padx=10)
 
         # Downtime
         tk.Label(body, text="Downtime (min):", **style).grid(row=8, column=0, sticky="e", pady=5)
@@ -193,9 +199,27 @@ class ToolChangerUI(tk.Frame):
             return
         info = get_tool_info(tool)
         if info:
-            self.stock_lbl.config(text=f"Stock: {info.get('stock_qty', 'N/A')}")
+            text = f"Stock: {info.get('stock_qty', 'N/A')}"
+            fc = get_tool_forecast(tool)
+            if fc and fc["rate_per_day"] > 0 and fc["status"] in ("Out", "Reorder"):
+                text += f" (low: reorder at {fc['reorder_point']}, runs out ~{fc['stockout_date']})"
+            self.stock_lbl.config(text=text, fg="red" if fc and fc["status"] in ("Out", "Reorder") else "blue")
         else:
-            self.stock_lbl.config(text="Stock: N/A")
+            self.stock_lbl.config(text="Stock: N/A", fg="blue")
+        self.update_life_prediction()
+
+    def update_life_prediction(self, event=None):
+        tool, machine = self.tool_cb.get(), self.mach_cb.get()
+        pred = tool_life_prediction(tool, machine, self.part_cb.get().strip()) if tool and machine else None
+        if not pred or pred["p50_life"] is None:
+            self.life_lbl.config(text="")
+            return
+        text = f"Typical life {pred['p50_life']:,.0f} (p10 {pred['p10_life']:,.0f} / p90 {pred['p90_life']:,.0f})"
+        if pred["expected_remaining"] is not None:
+            text += f" · installed tool ~{pred['expected_remaining']:,.0f} left"
+        if pred["predicted_change_ts"] is not None:
+            text += f", change ~{format_ts(pred['predicted_change_ts'])}"
+        self.life_lbl.config(text=text)
 
     def toggle_defect(self):
         if self.defect_var.get():
@@ -215,17 +239,13 @@ class ToolChangerUI(tk.Frame):
         tool_life = safe_float(self.life_entry.get(), 0.0)
 
         tool_num = self.tool_cb.get()
-        cost = 0.0
 
-        # Inventory decrement (if configured)
+        # Only a warning: the save itself takes one from stock in a single UPDATE, if any is left.
         info = get_tool_info(tool_num)
         stock = safe_int(info.get("stock_qty", 0) if info else 0, 0)
         if stock <= 0:
             if not messagebox.askyesno("Stock Warning", f"Tool {tool_num} is out of stock! Submit anyway?"):
                 return
-            new_stock_qty = None
-        else:
-            new_stock_qty = stock - 1
 
         now = datetime.now()
 
@@ -245,7 +265,6 @@ class ToolChangerUI(tk.Frame):
             "Tool_Num": str(self.tool_cb.get()),
             "Reason": self.reason_cb.get(),
             "Downtime_Mins": downtime,
-            "Cost": float(cost),
             "Tool_Life": float(tool_life),
             "Tool_Changer": self.controller.user,
             "Defects_Present": defects,
@@ -264,7 +283,6 @@ class ToolChangerUI(tk.Frame):
         cost = create_tool_change_entry(
             new_row,
             tool_num=tool_num,
-            new_stock_qty=new_stock_qty,
             actor_user={"username": self.controller.user, "role": self.controller.role},
         )
 
@@ -1,10 +1,19 @@
 import tkinter as tk
-from tkinter import messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog
 import pandas as pd
 
 from .ui_common import HeaderFrame, FilePicker, DataTable
 from .storage import get_df, save_df, safe_int, safe_float
-from .db import list_tools_simple, upsert_tool_inventory, get_tool
+from .db import (
+    get_tool,
+    list_stock_movements,
+    list_tool_forecasts,
+    list_tools_simple,
+    record_stock_movement,
+    upsert_tool_inventory,
+)
+from .tool_life_model import format_ts
+from .inventory_forecast import refresh_inventory_forecast
 from .audit import log_audit
 
 class TopUI(tk.Frame):
@@ -110,6 +119,11 @@ class TopUI(tk.Frame):
 
         tk.Label(f, text="Tool Inventory & Cost Configuration", font=("Arial", 14, "bold")).pack(pady=10)
 
+        tk.Label(
+            f,
+            text="Tool | Stock | $ | Use/day | Runs out | Reorder at | Suggested order",
+            font=("Arial", 9, "italic"),
+        ).pack(anchor="w")
         self.tool_list = tk.Listbox(f, height=15)
         self.tool_list.pack(fill="x", pady=10)
         self.tool_list.bind("<<ListboxSelect>>", self.load_tool_details)
@@ -136,6 +150,13 @@ class TopUI(tk.Frame):
         self.save_tool_btn = tk.Button(editor, text="Save Changes", command=self.save_tool_details, bg="green", fg="white")
         self.save_tool_btn.grid(row=4, column=0, columnspan=2, pady=10)
 
+        self.receive_btn = tk.Button(editor, text="Receive Stock", command=self.receive_stock)
+        self.receive_btn.grid(row=5, column=0, pady=(0, 10))
+        tk.Button(editor, text="Stock History", command=self.show_stock_history).grid(row=5, column=1, pady=(0, 10))
+        self._loaded_stock = 0
+        if self.readonly:
+            self.receive_btn.configure(state="disabled")
+
         self.add_tool_btn = tk.Button(f, text="Add New Tool", command=self.add_new_tool)
         self.add_tool_btn.pack()
 
@@ -143,13 +164,25 @@ class TopUI(tk.Frame):
 
     def refresh_tool_list(self):
         self.tool_list.delete(0, "end")
-        self._tools = list_tools_simple()
-        for tool in self._tools:
-            t = tool.get("tool_num", "")
-            self.tool_list.insert(
-                "end",
-                f"{t} | Stock: {tool.get('stock_qty', 0)} | ${tool.get('unit_cost', 0)}"
-            )
+        # Stock and cost come from the tools table (kept by the stock ledger); the
+        # projections precomputed in tool_stock_forecast are joined on where a tool has one.
+        forecasts = {f["tool_num"]: f for f in list_tool_forecasts()}
+        self._tools = []
+        for row in list_tools_simple():
+            t = row["tool_num"]
+            tool = {**forecasts.get(t, {}), **row}
+            self._tools.append(tool)
+            line = f"{t} | Stock: {tool.get('stock_qty', 0)} | ${tool.get('unit_cost', 0)}"
+            if tool.get("rate_per_day"):
+                line += (
+                    f" | {tool['rate_per_day']:.2f}/day | out ~{tool.get('stockout_date') or '-'}"
+                    f" | reorder at {tool.get('reorder_point', 0)}"
+                )
+                if tool.get("suggested_order_qty"):
+                    line += f" | ORDER {tool['suggested_order_qty']}"
+            self.tool_list.insert("end", line)
+            if tool.get("status") in ("Out", "Reorder") and tool.get("rate_per_day"):
+                self.tool_list.itemconfig("end", foreground="#c62828")
 
     def load_tool_details(self, event=None):
         sel = self.tool_list.curselection()
@@ -166,6 +199,7 @@ class TopUI(tk.Frame):
 
         self.t_cost.delete(0, "end"); self.t_cost.insert(0, d.get("unit_cost", 0))
         self.t_stock.delete(0, "end"); self.t_stock.insert(0, d.get("stock_qty", 0))
+        self._loaded_stock = safe_int(d.get("stock_qty", 0), 0)
         self.t_inserts.delete(0, "end"); self.t_inserts.insert(0, d.get("inserts_per_tool", 1))
 
     def save_tool_details(self):
@@ -176,9 +210,18 @@ class TopUI(tk.Frame):
             tool_num=name,
             name="",
             unit_cost=safe_float(self.t_cost.get(), 0.0),
-            stock_qty=safe_int(self.t_stock.get(), 0),
             inserts_per_tool=safe_int(self.t_inserts.get(), 1),
+            updated_by=self.controller.user,
         )
+        # Stock moves by the edit, not to it, so changes logged since loading survive.
+        counted = safe_int(self.t_stock.get(), 0)
+        if counted != self._loaded_stock:
+            record_stock_movement(
+                name, "adjustment", counted - self._loaded_stock,
+                username=self.controller.user, note=f"Edited {self._loaded_stock} -> {counted}",
+            )
+            self._loaded_stock = counted
+        refresh_inventory_forecast([name])
         messagebox.showinfo("Saved", f"Updated {name}")
         log_audit(self.controller.user, f"Updated tool {name} inventory")
         self.refresh_tool_list()
@@ -186,6 +229,39 @@ class TopUI(tk.Frame):
             self.save_tool_btn.configure(state="disabled")
             self.add_tool_btn.configure(state="disabled")
 
+    def receive_stock(self):
+        name = self.t_name.get()
+        if not name:
+            return
+        qty = simpledialog.askinteger("Receive Stock", f"Quantity of {name} received:", minvalue=1)
+        if not qty:
+            return
+        balance = record_stock_movement(name, "receipt", qty, username=self.controller.user)
+        refresh_inventory_forecast([name])
+        log_audit(self.controller.user, f"Received {qty} of tool {name}")
+        if balance is not None:
+            self.t_stock.delete(0, "end"); self.t_stock.insert(0, balance)
+            self._loaded_stock = balance
+        self.refresh_tool_list()
+
+    def show_stock_history(self):
+        name = self.t_name.get()
+        if not name:
+            return
+        top = tk.Toplevel(self)
+        top.title(f"Stock History - {name}")
+        cols = ("when", "kind", "qty", "balance", "user", "entry", "note")
+        tree = ttk.Treeview(top, columns=cols, show="headings", height=18)
+        for c in cols:
+            tree.heading(c, text=c.upper())
+            tree.column(c, width=140 if c in ("when", "note") else 80)
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+        for m in list_stock_movements(name):
+            tree.insert("", "end", values=(
+                format_ts(m["ts"]), m["kind"], f"{m['qty']:+d}", m["balance_after"],
+                m["username"], m["entry_id"], m["note"],
+            ))
+
     def add_new_tool(self):
         name = simpledialog.askstring("New Tool", "Enter Tool Name (e.g., Tool 55):")
         if name:
@@ -193,7 +269,8 @@ class TopUI(tk.Frame):
                 tool_num=name,
                 name="",
                 unit_cost=0.0,
-                stock_qty=0,
                 inserts_per_tool=1,
+                created_by=self.controller.user,
             )
+            refresh_inventory_forecast([name])
             self.refresh_tool_list()
@@ -7,8 +7,12 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+from app import snapshots
 from app.config import BACKUPS_DIR, DATA_DIR, DB_PATH
+from app.metrics_cube import clear_cube_cache
+from app.repeat_tracker import reset_repeat_tracker
 from app.services.common import Actor, audit, require_permission
+from app.storage import invalidate_df_cache
 
 PERMISSION_KEY = "manage_backups"
 
@@ -67,6 +71,11 @@ def restore_backup(backup_file: str, actor_user: Actor | dict | None = None) ->
         return None
     try:
         shutil.copy2(backup_path, DB_PATH)
+        # Snapshots, cached frames, cubes and repeat counts came from the database just replaced.
+        snapshots.clear_cache()
+        invalidate_df_cache()
+        clear_cube_cache()
+        reset_repeat_tracker()
         audit(
             "backup.restore",
             actor.username,
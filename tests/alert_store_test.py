@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+import pytest
+
+from app import alert_store, db, gage_schedule
+from app.config import GAGES_FILE, RISK_CONFIG_FILE
+
+MONTH = datetime.now().strftime("%Y-%m")
+
+
+def _entry(i: int, **overrides: Any) -> Dict[str, Any]:
+    row = {
+        "ID": f"E{i:04d}", "Date": datetime.now().strftime("%Y-%m-%d"), "Line": "L1", "Machine": "M1",
+        "Tool_Num": "T1", "Part_Number": "P1", "Andon_Flag": "No", "Customer_Risk": "", "COPQ_Est": 0.0,
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def store(temp_db, monkeypatch):
+    config = {
+        RISK_CONFIG_FILE: {"rules": {"copq_thresholds": {"high": 100, "critical": 500}}},
+        GAGES_FILE: {"gages": []},
+    }
+    monkeypatch.setattr(alert_store, "load_json", lambda path, default: config.get(path, default))
+    monkeypatch.setattr(gage_schedule, "load_json", lambda path, default: config.get(path, default))
+    monkeypatch.setattr(gage_schedule, "_synced_stat", None)
+    return config
+
+
+def _active() -> Dict[str, Dict[str, Any]]:
+    return {a["alert_key"]: a for a in db.list_alerts()}
+
+
+def test_alerts_are_generated_once_and_keep_acknowledgements(store):
+    db.insert_tool_entry(_entry(1, Andon_Flag="Yes"))
+    db.insert_tool_entry(_entry(2, COPQ_Est=150.0))
+    db.insert_tool_entry(_entry(3))
+
+    assert alert_store.refresh_alerts() == 3
+    assert {k: a["severity"] for k, a in _active().items()} == {
+        "Andon:entry_id=E0001": "Critical",
+        "COPQ:entry_id=E0002": "High",
+    }
+    assert alert_store.refresh_alerts() == 0
+
+    copq = _active()["COPQ:entry_id=E0002"]
+    assert alert_store.acknowledge(copq["id"], "super")
+
+    # Same severity: the acknowledgement and first_seen survive a re-evaluation.
+    db.update_tool_entry(_entry(2, COPQ_Est=160.0))
+    assert alert_store.refresh_alerts() == 1
+    again = _active()["COPQ:entry_id=E0002"]
+    assert (again["id"], again["ack_by"], again["first_seen"]) == (copq["id"], "super", copq["first_seen"])
+    assert db.list_alerts(include_acknowledged=False)[0]["alert_key"] == "Andon:entry_id=E0001"
+
+    # Escalation needs a fresh acknowledgement.
+    db.update_tool_entry(_entry(2, COPQ_Est=900.0))
+    alert_store.refresh_alerts()
+    assert _active()["COPQ:entry_id=E0002"]["severity"] == "Critical"
+    assert _active()["COPQ:entry_id=E0002"]["ack_by"] == ""
+
+    # Fixed entries retire their alert; deleted entries take theirs along.
+    db.update_tool_entry(_entry(1))
+    with db.connect() as conn:
+        conn.execute("DELETE FROM tool_entries WHERE id='E0002'")
+    alert_store.refresh_alerts()
+    assert _active() == {}
+
+
+def test_rule_changes_reevaluate_every_entry(store):
+    db.insert_tool_entry(_entry(1, COPQ_Est=150.0))
+    alert_store.refresh_alerts()
+    assert list(_active()) == ["COPQ:entry_id=E0001"]
+
+    store[RISK_CONFIG_FILE] = {"rules": {"copq_thresholds": {"high": 200, "critical": 500}}}
+    assert alert_store.refresh_alerts() == 1
+    assert _active() == {}
+
+
+def test_gage_alerts_and_month_filter(store):
+    last_cal = (datetime.now() - timedelta(days=40)).strftime("%Y-%m-%d")
+    store[GAGES_FILE] = {"gages": [
+        {"gage_id": "G1", "name": "Bore", "criticality": "High",
+         "last_calibration_date": last_cal, "calibration_frequency_days": 30},
+    ]}
+    db.insert_tool_entry(_entry(1, Date="2020-01-05", Andon_Flag="Yes"))
+
+    alerts = alert_store.load_alerts(month=MONTH, min_severity="Medium")
+
+    assert [(a["type"], a["related_key"]) for a in alerts] == [("Calibration", "gage_id=G1")]
+    assert sorted(a["entry_month"] for a in db.list_alerts(month="2020-01")) == ["", "2020-01"]
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.coercion import to_date_series, to_flag_series, to_float_series, to_int_series
+from app.quality_engine import _parse_date
+from app.storage import safe_float, safe_int
+
+
+ROWS = 100_000
+
+
+def _column(rng: np.random.Generator) -> pd.DataFrame:
+    qty = rng.integers(0, 50, ROWS).astype(str).astype(object)
+    qty[rng.random(ROWS) < 0.1] = ""
+    mins = np.round(rng.random(ROWS) * 90, 1).astype(str).astype(object)
+    mins[rng.random(ROWS) < 0.05] = "n/a"
+    days = pd.date_range("2024-01-01", periods=365).strftime("%Y-%m-%d").to_numpy()
+    return pd.DataFrame({
+        "Defect_Qty": qty,
+        "Downtime_Mins": mins,
+        "Defects_Present": rng.choice(["Yes", "No", "", "yes "], ROWS),
+        "Date": rng.choice(days, ROWS),
+    })
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    df = _column(np.random.default_rng(0))
+    cases = [
+        ("int", lambda: df["Defect_Qty"].apply(lambda x: safe_int(x, 0)),
+         lambda: to_int_series(df["Defect_Qty"], 0)),
+        ("float", lambda: df["Downtime_Mins"].apply(lambda x: safe_float(x, 0.0)),
+         lambda: to_float_series(df["Downtime_Mins"], 0.0)),
+        ("flag", lambda: df["Defects_Present"].apply(lambda x: str(x or "").strip().lower() == "yes"),
+         lambda: to_flag_series(df["Defects_Present"])),
+        ("date", lambda: df["Date"].apply(_parse_date),
+         lambda: to_date_series(df["Date"])),
+    ]
+    print(f"{ROWS:,} rows")
+    for name, scalar, vectorized in cases:
+        t_scalar = _time(scalar)
+        t_vec = _time(vectorized)
+        print(f"{name:>6}: apply {t_scalar * 1000:8.1f} ms   vectorized {t_vec * 1000:7.1f} ms   x{t_scalar / t_vec:5.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
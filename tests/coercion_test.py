@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.coercion import parse_date, to_date_series, to_flag_series, to_float_series, to_int_series
+from app.quality_engine import _parse_date
+from app.storage import safe_float, safe_int
+
+
+MIXED = [
+    "1", " 2 ", "3.7", "-3.7", "", "  ", None, np.nan, pd.NA, "abc", "1e3", "1_000",
+    "1,000", "0x10", "+4", "nan", "inf", "-inf", True, False, 5, 5.5, -0.0, "١٢",
+]
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def test_to_int_series_matches_safe_int():
+    s = pd.Series(MIXED, dtype=object)
+    assert to_int_series(s, 7).tolist() == [safe_int(v, 7) for v in MIXED]
+
+
+def test_to_float_series_matches_safe_float():
+    s = pd.Series(MIXED, dtype=object)
+    got = to_float_series(s, 7.0).tolist()
+    want = [safe_float(v, 7.0) for v in MIXED]
+    assert all(_same(a, b) for a, b in zip(got, want)), (got, want)
+
+
+def test_numeric_dtypes_match_scalar():
+    floats = pd.Series([1.9, -1.9, np.nan, np.inf, 0.0])
+    assert to_int_series(floats, 3).tolist() == [safe_int(v, 3) for v in floats]
+    assert to_float_series(floats, 3.0).tolist() == [safe_float(v, 3.0) for v in floats]
+    ints = pd.Series([1, 2, 3])
+    assert to_int_series(ints).tolist() == [1, 2, 3]
+    flags = pd.Series([True, False])
+    assert to_int_series(flags, 9).tolist() == [safe_int(v, 9) for v in flags]
+
+
+def test_string_dtype_column():
+    s = pd.Series(["4", "", "x", "2.5"], dtype="string")
+    assert to_int_series(s).tolist() == [safe_int(v) for v in s]
+    assert to_float_series(s).tolist() == [safe_float(v) for v in s]
+
+
+def test_index_is_preserved():
+    s = pd.Series(["1", "2"], index=[10, 20])
+    assert list(to_int_series(s).index) == [10, 20]
+    assert list(to_flag_series(s).index) == [10, 20]
+
+
+def test_to_flag_series_matches_scalar_check():
+    values = ["Yes", " yes ", "YES", "No", "", None, np.nan, 0, "yes please"]
+    want = [str(v or "").strip().lower() == "yes" for v in values]
+    assert to_flag_series(pd.Series(values, dtype=object)).tolist() == want
+
+
+def test_to_date_series_matches_parse_date():
+    values = [
+        "2024-01-05", "2024/03/04", "1/2/2024", "2024-01-05 10:11:12", "2024-1-5",
+        " 2024-02-29 ", "2023-02-29", "05/01/24", "garbage", "", None, "2024-01-05",
+    ]
+    got = to_date_series(pd.Series(values, dtype=object))
+    for value, ts in zip(values, got):
+        want = _parse_date(value)
+        if want is None:
+            assert pd.isna(ts), value
+        else:
+            assert ts.to_pydatetime() == want, value
+
+
+def test_parse_date_order_does_not_depend_on_last_format():
+    assert parse_date("1/2/2024").month == 1
+    assert parse_date("2024/01/02").day == 2
+    assert parse_date("2024-01-02 03:04:05").hour == 3
+    assert parse_date("2024-01-02").hour == 0
+
+
+def test_empty_inputs():
+    empty = pd.Series([], dtype=object)
+    assert to_int_series(empty).empty
+    assert to_float_series(empty).empty
+    assert to_flag_series(empty).empty
+    assert to_date_series(empty).empty
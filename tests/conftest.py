@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+import pytest
+
+from app import db, snapshots
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """A fresh database under tmp_path, with month snapshots cached next to it."""
+    path = tmp_path / "toollife.db"
+    monkeypatch.setattr(db, "DB_PATH", str(path))
+    monkeypatch.setattr(snapshots, "CACHE_DIR", str(tmp_path / "cache"))
+    db.init_db()
+    return path
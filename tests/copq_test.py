@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import copq, db
+from app.copq import backfill_copq, copq_for_entry, load_cost_inputs
+from app.quality_engine import compute_copq_for_row, compute_copq_frame
+
+COSTS = {
+    "downtime_cost_per_min": {"L1": 12.5, "L2": "8"},
+    "scrap_cost_default": 3.0,
+    "scrap_cost_by_part": {"P1": 20.0, "P2": "bad"},
+}
+SCRAP = {"P2": 7.5, "P3": 0.0}
+
+
+def test_frame_matches_the_row_function():
+    rng = np.random.default_rng(4)
+    n = 3000
+    df = pd.DataFrame({
+        "Line": rng.choice(["L1", " L2 ", "L3", "", None], n),
+        "Part_Number": rng.choice(["P1", "P2", "P3", "P4 ", "", np.nan], n),
+        "Downtime_Mins": rng.choice(["12.5", "", "x", None, 3, 0.25], n),
+        "Defect_Qty": rng.choice(["4", "", "2.0", None, 7, "n/a"], n),
+    })
+    for scrap in (None, SCRAP):
+        frame = compute_copq_frame(df, COSTS, scrap)
+        rows = [compute_copq_for_row(r, COSTS, scrap) for r in df.to_dict("records")]
+        np.testing.assert_allclose(frame.to_numpy(), np.array(rows))
+    assert list(compute_copq_frame(df[["Line"]], COSTS)["COPQ_Est"].unique()) == [0.0]
+
+
+@pytest.fixture
+def copq_db(temp_db, tmp_path, monkeypatch):
+    cost_file = tmp_path / "cost_config.json"
+    cost_file.write_text(json.dumps(COSTS))
+    monkeypatch.setattr(copq, "COST_CONFIG_FILE", str(cost_file))
+    monkeypatch.setattr(copq, "_cost_inputs", None)
+    return cost_file
+
+
+def _stored() -> dict:
+    with db.connect() as conn:
+        return {r["id"]: r["copq_est"] for r in conn.execute("SELECT id, copq_est FROM tool_entries")}
+
+
+def test_backfill_recomputes_history_once_per_cost_change(copq_db):
+    for i, (line, part, mins, qty, typed) in enumerate([
+        ("L1", "P1", 10, 2, 0.0), ("L2", "P2", 5, 1, 999.0), ("L1", "P9", 0, 4, 12.0),
+    ]):
+        db.insert_tool_entry({"ID": f"E{i}", "Date": "2024-06-05", "Time": "08:00:00", "Line": line,
+                              "Part_Number": part, "Downtime_Mins": mins, "Defect_Qty": qty, "COPQ_Est": typed})
+
+    # Every stored value is replaced, including a typed-in one (E1's 999); E2 was already right.
+    assert backfill_copq(chunk_size=2) == 2
+    assert _stored() == {"E0": 165.0, "E1": 43.0, "E2": 12.0}
+    assert backfill_copq() == 0
+
+    db.set_scrap_cost("P9", 5.0)
+    assert backfill_copq(part_number="P1") == 0
+    assert backfill_copq(part_number="P9") == 1
+    copq_db.write_text(json.dumps({**COSTS, "downtime_cost_per_min": {"L1": 1.0}}))
+    assert backfill_copq() == 2
+    assert _stored() == {"E0": 50.0, "E1": 3.0, "E2": 20.0}
+
+
+def test_cost_inputs_are_cached_until_they_change(copq_db, monkeypatch):
+    reads = []
+    real = copq.load_json
+    monkeypatch.setattr(copq, "load_json", lambda *a: reads.append(a) or real(*a))
+    entry = {"Line": "L1", "Part_Number": "P5", "Downtime_Mins": 2, "Defect_Qty": 1}
+    assert copq_for_entry(entry) == 28.0
+    assert copq_for_entry(entry) == 28.0
+    assert len(reads) == 1
+
+    db.set_scrap_cost("P5", 10.0)
+    assert copq_for_entry(entry) == 35.0
+    copq_db.write_text(json.dumps({**COSTS, "downtime_cost_per_min": {"L1": 2.0}, "pad": "x"}))
+    assert copq_for_entry(entry) == 14.0
+    assert load_cost_inputs()[1] == {"P5": 10.0}
+    assert len(reads) == 3
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import calendar
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from app import db
+from app.dates import canonical_date, canonical_datetime, canonical_time, entry_ts, parse_iso_dates
+from app.storage import get_df, save_df
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("2024-06-05", "2024-06-05"),
+    ("2024/06/05", "2024-06-05"),
+    ("6/5/2024", "2024-06-05"),
+    ("06/05/24", "2024-06-05"),
+    ("2024-06-05 00:00:00", "2024-06-05"),
+    ("2024-06-05T13:45:00", "2024-06-05"),
+    (" ", ""),
+    (None, ""),
+    (float("nan"), ""),
+    ("June 5th", None),
+])
+def test_canonical_date(raw, expected):
+    assert canonical_date(raw) == expected
+
+
+def test_canonical_time_and_datetime():
+    assert canonical_time("7:05") == "07:05:00"
+    assert canonical_time("07:05:09.250000") == "07:05:09"
+    assert canonical_time("1:30 pm") == "13:30:00"
+    assert canonical_time("2024-06-05 13:30:00") == "13:30:00"
+    assert canonical_time("later") is None
+    assert canonical_datetime("6/5/2024 13:30") == "2024-06-05 13:30:00"
+    assert canonical_datetime("2024-06-05") == "2024-06-05 00:00:00"
+
+
+def test_entry_ts_reads_wall_clock_as_utc():
+    assert entry_ts("2024-06-05", "13:30:00") == calendar.timegm((2024, 6, 5, 13, 30, 0))
+    assert entry_ts("2024-06-05") == calendar.timegm((2024, 6, 5, 0, 0, 0))
+    assert entry_ts("") is None
+
+
+def test_parse_iso_dates_is_fixed_format():
+    got = parse_iso_dates(pd.Series(["2024-06-05", "", None, "6/5/2024"]))
+    assert got.iloc[0] == pd.Timestamp("2024-06-05")
+    assert got.iloc[1:].isna().all()
+    assert pd.isna(parse_iso_dates(""))
+
+
+def test_saves_store_canonical_text_and_reject_unreadable_dates(temp_db):
+    db.insert_tool_entry({"ID": "E1", "Date": "6/5/2024", "Time": "7:05", "Action_Due_Date": "2024/06/12",
+                          "Quality_Time": "see notes"})
+    row = db.fetch_tool_entry("E1")
+    assert (row["date"], row["time"], row["action_due_date"], row["quality_time"]) == (
+        "2024-06-05", "07:05:00", "2024-06-12", "see notes",
+    )
+    assert row["ts"] == calendar.timegm((2024, 6, 5, 7, 5, 0))
+
+    with pytest.raises(ValueError, match="Date"):
+        db.insert_tool_entry({"ID": "E2", "Date": "yesterday", "Time": "07:00"})
+
+
+def test_migration_rewrites_legacy_rows_once(temp_db):
+    legacy = [
+        ("L1", "06/05/2024", "7:05 AM", "6/7/2024 08:00"),
+        ("L2", "2024-06-06 00:00:00", "13:30", ""),
+        ("L3", "sometime", "07:00:00", ""),
+    ]
+    with db.connect() as conn:
+        conn.executemany(
+            "INSERT INTO tool_entries(id, date, time, quality_time) VALUES(?, ?, ?, ?)", legacy
+        )
+        conn.execute("DELETE FROM meta WHERE key='entry_datetimes_migrated'")
+    db.init_db()
+
+    rows = {r["id"]: r for r in db.fetch_tool_entries()}
+    assert (rows["L1"]["date"], rows["L1"]["time"], rows["L1"]["quality_time"]) == (
+        "2024-06-05", "07:05:00", "2024-06-07 08:00:00",
+    )
+    assert (rows["L2"]["date"], rows["L2"]["time"]) == ("2024-06-06", "13:30:00")
+    assert rows["L2"]["ts"] == calendar.timegm(datetime(2024, 6, 6, 13, 30).timetuple())
+    # Unreadable values wait for a person; ts stays empty.
+    assert (rows["L3"]["date"], rows["L3"]["ts"]) == ("sometime", None)
+    assert db.get_meta("entry_datetimes_migrated") == "1"
+
+
+def test_save_df_keeps_a_migrated_row_with_an_unreadable_time(temp_db):
+    with db.connect() as conn:
+        conn.executemany("INSERT INTO tool_entries(id, date, time, machine) VALUES(?, ?, ?, ?)", [
+            ("L1", "06/05/2024", "see shift log", "M1"),
+            ("L2", "06/06/2024", "7:05 AM", "M1"),
+        ])
+        conn.execute("DELETE FROM meta WHERE key='entry_datetimes_migrated'")
+    db.init_db()
+
+    df, month = get_df("2024-06")
+    df.loc[df["ID"] == "L1", "Machine"] = "M2"
+    save_df(df, month)
+
+    rows = {r["id"]: r for r in db.fetch_tool_entries()}
+    assert (rows["L1"]["date"], rows["L1"]["time"], rows["L1"]["machine"], rows["L1"]["ts"]) == (
+        "2024-06-05", "see shift log", "M2", None,
+    )
+    assert rows["L2"]["ts"] == calendar.timegm((2024, 6, 6, 7, 5, 0))
+    # A person can still fix the time in place; new entries must be readable.
+    assert db.update_tool_entry({"ID": "L1", "Date": "2024-06-05", "Time": "09:00"})
+    assert db.fetch_tool_entry("L1")["ts"] == calendar.timegm((2024, 6, 5, 9, 0, 0))
+    with pytest.raises(ValueError, match="Time"):
+        db.insert_tool_entry({"ID": "L3", "Date": "2024-06-05", "Time": "see shift log"})
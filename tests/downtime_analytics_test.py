@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import db
+
+
+def _seed(n: int, seed: int) -> pd.DataFrame:
+    """n shift reports with 0-3 coded downtime rows each; returns the downtime rows joined to their report."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        report = {
+            "ID": f"R{i}", "Date": f"2024-{rng.integers(4, 7):02d}-{rng.integers(1, 29):02d}", "Time": "15:00:00",
+            "Shift": str(rng.choice(["1st", "2nd"])), "Line": str(rng.choice(["L1", "L2"])),
+            "Machine": str(rng.choice(["M1", "M2", "M3"])), "Reason": "Shift Production", "Production_Qty": 100,
+        }
+        downtime = [
+            {"code": str(rng.choice(["JAM", "SETUP", "WAIT", ""])), "minutes": float(rng.integers(0, 60)),
+             "occurrences": int(rng.integers(1, 4)), "comments": ""}
+            for _ in range(rng.integers(0, 4))
+        ]
+        db.insert_tool_entry_with_downtime(report, downtime)
+        rows += [{**d, "id": report["ID"], "day": report["Date"], "shift": report["Shift"], "line": report["Line"],
+                  "machine": report["Machine"]} for d in downtime]
+    return pd.DataFrame(rows)
+
+
+def test_totals_match_pandas_groupby(temp_db):
+    frame = _seed(300, 4)
+    got = pd.DataFrame(db.downtime_totals("2024-05-01", "2024-05-31", by=("code", "machine", "shift", "day")))
+    sub = frame[(frame["day"] >= "2024-05-01") & (frame["day"] <= "2024-05-31")]
+    want = sub.groupby(["code", "machine", "shift", "day"]).agg(
+        minutes=("minutes", "sum"), occurrences=("occurrences", "sum"), events=("id", "size"), reports=("id", "nunique"),
+    ).reset_index()
+    pd.testing.assert_frame_equal(got, want, check_dtype=False)
+
+    (one,) = db.downtime_totals("2024-04-01", "2024-06-30", by=(), line="L2", code="JAM")
+    jam = frame[(frame["line"] == "L2") & (frame["code"] == "JAM")]
+    assert (one["minutes"], one["events"], one["reports"]) == (jam["minutes"].sum(), len(jam), jam["id"].nunique())
+    with pytest.raises(ValueError):
+        db.downtime_totals("2024-04-01", "2024-06-30", by=("tool_num",))
+
+
+def test_pareto_ranks_and_shares(temp_db):
+    frame = _seed(200, 8)
+    rows = db.downtime_pareto("2024-04-01", "2024-06-30", by="machine", line="L1")
+    want = frame[frame["line"] == "L1"].groupby("machine")["minutes"].sum().sort_values(ascending=False)
+    assert [r["machine"] for r in rows] == list(want.index)
+    assert [r["rank"] for r in rows] == list(range(1, len(want) + 1))
+    assert [r["minutes"] for r in rows] == list(want)
+    assert rows[0]["pct"] == pytest.approx(want.iloc[0] / want.sum() * 100)
+    assert rows[-1]["cum_pct"] == pytest.approx(100.0)
+
+    top = db.downtime_pareto("2024-04-01", "2024-06-30", by="code", limit=2)
+    assert len(top) == 2
+    everything = db.downtime_pareto("2024-04-01", "2024-06-30", by="code")
+    assert top == everything[:2]
+    assert db.downtime_pareto("2030-01-01", "2030-12-31") == []
+
+
+def test_queries_use_the_indexes(temp_db):
+    _seed(20, 1)
+    with db.connect() as conn:
+        plan = " ".join(r["detail"] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT SUM(sd.downtime_minutes) FROM tool_entries te "
+            "JOIN shift_downtime_entries sd ON sd.tool_entry_id = te.id "
+            "WHERE te.date BETWEEN '2024-05-01' AND '2024-05-31' AND sd.downtime_code = 'JAM'"
+        ))
+    assert "SCAN" not in plan
+    db.replace_shift_downtime_entries("R0", [{"code": "JAM", "minutes": 5, "occurrences": 1}])
+    assert db.downtime_totals("2000-01-01", "2100-01-01", by=(), code="JAM")[0]["events"] >= 1
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from app import db, storage
+from app.storage import next_id, station_code
+
+
+class _FrozenClock(datetime):
+    """datetime whose now() is set by the test; fromtimestamp stays real."""
+    current = datetime(2024, 6, 5, 8, 0, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(storage, "datetime", _FrozenClock)
+    monkeypatch.setattr(storage, "_id_last_ms", 0)
+    monkeypatch.setattr(storage, "_id_counter", 0)
+    return _FrozenClock
+
+
+def test_ids_are_unique_and_sort_in_creation_order_across_threads():
+    batches: list = []
+    lock = threading.Lock()
+
+    def make():
+        made = [next_id() for _ in range(2000)]
+        with lock:
+            batches.append(made)
+
+    threads = [threading.Thread(target=make) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ids = [i for made in batches for i in made]
+    assert len(set(ids)) == 8000
+    assert all(made == sorted(made) for made in batches)
+    assert next_id() > max(ids)
+
+
+def test_same_millisecond_and_clock_steps_back_keep_counting(clock):
+    clock.current = datetime(2024, 6, 5, 8, 0, 0, 123000)
+    first = [next_id() for _ in range(3)]
+    assert first == sorted(first)
+    assert [i.rsplit("-", 1)[1] for i in first] == ["0000", "0001", "0002"]
+    assert first[0].startswith("20240605-080000123-")
+
+    clock.current = datetime(2024, 6, 5, 7, 59, 59)
+    behind = next_id()
+    assert behind > first[-1] and behind.startswith("20240605-080000123-")
+
+    clock.current = datetime(2024, 6, 5, 8, 0, 1)
+    assert next_id().startswith("20240605-080001000-")
+
+
+def test_station_code(monkeypatch):
+    codes = set()
+    for station in ("PRESS-01", "PRESS-02", "QC-LAB", "TOOLROOM"):
+        monkeypatch.setenv("TOOLLIFE_STATION_ID", station)
+        monkeypatch.setattr(storage, "_station_code", None)
+        code = station_code()
+        assert len(code) == 8 and code == station_code()
+        codes.add(code)
+    assert len(codes) == 4
+    assert next_id().split("-")[2] == code
+
+
+def test_insert_refuses_a_taken_id(temp_db):
+    entry = {"ID": next_id(), "Date": "2024-06-05", "Time": "08:00:00", "Machine": "M1", "Reason": "Worn"}
+    db.insert_tool_entry(entry)
+    with pytest.raises(ValueError, match="already exists"):
+        db.insert_tool_entry({**entry, "Machine": "M2"})
+    assert db.fetch_tool_entry(entry["ID"])["machine"] == "M1"
+    assert db.update_tool_entry({**entry, "Machine": "M3"})
+    assert not db.update_tool_entry({**entry, "ID": "missing"})
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app import db
+
+
+@pytest.fixture
+def stream_db(temp_db):
+    rng = np.random.default_rng(3)
+    for i in range(120):
+        db.insert_tool_entry({
+            "ID": f"E{i:03d}",
+            "Date": f"2024-{rng.integers(5, 8):02d}-{rng.integers(1, 29):02d}",
+            "Time": f"{rng.integers(0, 24):02d}:{rng.integers(0, 60):02d}:00",
+            "Line": str(rng.choice(["L1", "L2"])),
+            "Machine": f"M{rng.integers(1, 4)}",
+            "Reason": str(rng.choice(["Worn", "Broken", " Shift Production "])),
+            "Downtime_Mins": float(rng.integers(0, 30)),
+        })
+
+
+def test_stream_matches_the_list_in_order(stream_db):
+    listed = db.fetch_tool_entries("2024-06")
+    streamed = list(db.iter_tool_entries("2024-06", batch_size=7))
+    assert [r._asdict() for r in streamed] == listed
+    assert [r.id for r in db.iter_tool_entries(batch_size=1)] == [r["id"] for r in db.fetch_tool_entries()]
+
+
+def test_filters_and_projection(stream_db):
+    everything = db.fetch_tool_entries()
+    rows = list(db.iter_tool_entries(reason="Shift Production", since="2024-06-15", columns=("id", "line", "date")))
+    assert rows and rows[0]._fields == ("id", "line", "date")
+    want = [(r["id"], r["line"], r["date"]) for r in everything
+            if r["reason"].strip() == "Shift Production" and r["date"] >= "2024-06-15"]
+    assert [tuple(r) for r in rows] == want
+    with pytest.raises(ValueError):
+        next(db.iter_tool_entries(columns=("id", "not_a_column")))
+
+
+def test_fetch_one_entry(stream_db):
+    first = db.fetch_tool_entries()[0]
+    assert db.fetch_tool_entry(first["id"]) == first
+    assert db.fetch_tool_entry("missing") is None
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import db, ewma
+from app.ewma import EwmaSettings, evaluate_points, refresh_ewma
+
+SETTINGS = EwmaSettings(alpha=0.2, k_sigma=3.0, warmup_points=5, min_sigma={"downtime": 0.5})
+
+
+def _points(values, metric="downtime", machine="M1", line="L1", tool="T1"):
+    return [
+        {"metric": metric, "id": f"{machine}-{i:04d}", "ts": i, "machine": machine, "line": line, "tool_num": tool,
+         "value": v}
+        for i, v in enumerate(values)
+    ]
+
+
+def test_running_figures_match_pandas_ewm():
+    rng = np.random.default_rng(2)
+    values = list(np.round(rng.gamma(2.0, 5.0, 200), 1))
+    (state, *_) = evaluate_points(_points(values, line="", tool=""), {}, SETTINGS)
+
+    series = pd.Series(values)
+    assert state["points"] == 200
+    assert state["mean"] == pytest.approx(series.ewm(alpha=0.2, adjust=False).mean().iloc[-1])
+    assert state["var"] == pytest.approx(series.ewm(alpha=0.2, adjust=False).var(bias=True).iloc[-1])
+
+
+def test_flags_high_side_after_warmup_and_carries_state():
+    values = [10, 11, 9, 10, 12, 10, 11, 60, 10, 0]
+    whole = {s["scope"]: s for s in evaluate_points(_points(values), {}, SETTINGS)}
+    assert set(whole) == {"machine", "line", "tool"}
+    assert whole["machine"]["anomaly_entry_id"] == "M1-0007"
+    assert whole["machine"]["anomaly_z"] > 3
+    # A drop to zero is not an anomaly; neither is a spike inside the warmup.
+    early = evaluate_points(_points([10, 80, 10, 10]), {}, SETTINGS)
+    assert all(s["anomaly_ts"] is None for s in early)
+
+    states = {}
+    for lo, hi in ((0, 3), (3, 8), (8, 10)):
+        rows = evaluate_points(_points(values)[lo:hi], states, SETTINGS)
+        states = {(s["metric"], s["scope"], s["key"]): s for s in rows}
+    carried = states[("downtime", "machine", "M1")]
+    for f in ("points", "mean", "var", "last_z", "anomaly_entry_id", "anomaly_value", "anomaly_mean"):
+        assert carried[f] == pytest.approx(whole["machine"][f])
+
+
+@pytest.fixture
+def ewma_db(temp_db, monkeypatch):
+    monkeypatch.setattr(ewma, "load_json", lambda path, default: {
+        "alpha": 0.2, "k_sigma": 3.0, "warmup_points": 5, "min_sigma": {"downtime": 1.0, "defects": 1.0},
+        "metrics": ["downtime"], "scopes": ["machine", "tool"], "alert_days": 30,
+    })
+
+
+def _change(i: int, minutes: float, day: int = 1, machine: str = "M1") -> dict:
+    return {"ID": f"C{machine}-{i}", "Date": f"2024-06-{day:02d}", "Time": f"08:{i:02d}:00", "Machine": machine,
+            "Line": "L1", "Tool_Num": "T1", "Reason": "Worn", "Downtime_Mins": minutes}
+
+
+def test_refresh_appends_replays_and_alerts(ewma_db, monkeypatch):
+    now = datetime(2024, 6, 20)
+    for i, minutes in enumerate([10, 12, 9, 11, 10, 10]):
+        db.insert_tool_entry(_change(i, minutes))
+    assert refresh_ewma(now=now) == 2
+    assert refresh_ewma(now=now) == 0
+    keys = {(s["scope"], s["key"]) for s in db.list_ewma_state()}
+    assert keys == {("machine", "M1"), ("tool", "T1")}
+
+    # A spike is scored from the stored state alone.
+    replayed = []
+    real = ewma.ewma_points
+    monkeypatch.setattr(ewma, "ewma_points", lambda **kw: replayed.append(kw) or real(**kw))
+    db.insert_tool_entry(_change(6, 90, day=2))
+    assert refresh_ewma(now=now) == 2
+    assert replayed == [{"entry_ids": ["CM1-6"]}]
+    alerts = [a for a in db.list_alerts() if a["type"] == "EWMA"]
+    assert len(alerts) == 2 and {a["severity"] for a in alerts} == {"High"}
+
+    # Deleting the spike replays both series from history and clears the alerts.
+    with db.connect() as conn:
+        conn.execute("DELETE FROM tool_entries WHERE id='CM1-6'")
+    refresh_ewma(now=now)
+    assert replayed[-1] == {"keys": [("downtime", "machine", "M1"), ("downtime", "tool", "T1")]}
+    state = db.list_ewma_state(keys=[("downtime", "machine", "M1")])[0]
+    assert (state["points"], state["anomaly_ts"]) == (6, None)
+    assert not [a for a in db.list_alerts() if a["type"] == "EWMA"]
+
+
+def test_only_edits_to_tracked_columns_mark_series_stale(ewma_db):
+    for i, minutes in enumerate([10, 12, 9, 11, 10, 10]):
+        db.insert_tool_entry(_change(i, minutes))
+    refresh_ewma(now=datetime(2024, 6, 20))
+
+    def stale():
+        return {s["stale"] for s in db.list_ewma_state()}
+
+    db.update_tool_entry({**_change(1, 12), "Leader_Sign": "Yes"})
+    assert stale() == {0}
+    db.update_tool_entry(_change(1, 40))
+    assert stale() == {1}
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from app import db, gage_schedule
+from app.gage_schedule import GageScheduler, gage_status, gages_due, sync_gages
+from app.quality_engine import gage_due_status
+
+TODAY = date(2024, 6, 15)
+RISK = {"rules": {"gage_calibration_escalation": {"due_soon_days": 14}}}
+
+
+def _gage(gid: str, last: str, freq: int = 30, **extra):
+    return {"gage_id": gid, "name": gid, "criticality": "High",
+            "last_calibration_date": last, "calibration_frequency_days": freq, **extra}
+
+
+@pytest.fixture
+def gage_db(temp_db, monkeypatch):
+    monkeypatch.setattr(gage_schedule, "_synced_stat", None)
+
+
+def test_sync_recomputes_only_changed_gages(gage_db, monkeypatch):
+    store = {"gages": [_gage("G1", "2024-05-01"), _gage("G2", "2024-06-01", 90), _gage("G3", "")]}
+    assert sync_gages(store)
+    assert {g["gage_id"]: g["next_due_date"] for g in db.list_gages()} == {
+        "G1": "2024-05-31", "G2": "2024-08-30", "G3": "",
+    }
+    assert not sync_gages(store)
+
+    calls = []
+    real = gage_schedule._next_due
+    monkeypatch.setattr(gage_schedule, "_next_due", lambda *a: calls.append(a) or real(*a))
+    store = {"gages": [_gage("G1", "2024-06-10"), _gage("G2", "2024-06-01", 90, notes="moved")]}
+    assert sync_gages(store)
+    assert calls == [("2024-06-10", 30)]
+    assert {g["gage_id"]: g["next_due_date"] for g in db.list_gages()} == {"G1": "2024-07-10", "G2": "2024-08-30"}
+
+
+def test_due_query_matches_gage_due_status(gage_db, monkeypatch):
+    gages = [
+        _gage("LATE", "2024-05-01"),
+        _gage("SOON", "2024-05-20"),
+        _gage("EDGE", "2024-05-30"),
+        _gage("OK", "2024-06-10"),
+        _gage("NONE", ""),
+    ]
+    sync_gages({"gages": gages})
+    monkeypatch.setattr(gage_schedule, "sync_gages", lambda *a, **k: False)
+
+    due = gages_due(TODAY, RISK)
+
+    assert [(g["gage_id"], g["status"], g["days_until_due"]) for g in due] == [
+        ("LATE", "Overdue", -15), ("SOON", "Due Soon", 4), ("EDGE", "Due Soon", 14),
+    ]
+    for g in db.list_gages():
+        legacy = gage_due_status(next(x for x in gages if x["gage_id"] == g["gage_id"]), RISK)
+        assert gage_status(g["next_due_date"], date.today(), 14)[0] == legacy["status"]
+
+
+def test_scheduler_fires_on_the_crossing_days():
+    gages = [
+        {"gage_id": "A", "next_due_date": "2024-07-09"},
+        {"gage_id": "B", "next_due_date": "2024-06-20"},
+        {"gage_id": "C", "next_due_date": "2024-06-01"},
+        {"gage_id": "D", "next_due_date": ""},
+    ]
+    scheduler = GageScheduler.from_gages(gages, TODAY, 14)
+
+    assert scheduler.next_event_date() == date(2024, 6, 21)
+    assert scheduler.poll(date(2024, 6, 20)) == []
+    events = scheduler.poll(date(2024, 7, 10))
+    assert [(e["gage_id"], e["status"], e["on"]) for e in events] == [
+        ("B", "Overdue", date(2024, 6, 21)),
+        ("A", "Due Soon", date(2024, 6, 25)),
+        ("A", "Overdue", date(2024, 7, 10)),
+    ]
+    assert scheduler.next_event_date() is None
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from app import db
+from app.coercion import parse_date
+from app.health_engine import HealthContext, evaluate_frame, overdue_actions, run_health_checks
+from app.quality_engine import health_check
+from app.storage import safe_int
+
+TODAY = date(2024, 6, 15)
+GAGES = {
+    "G-OVER": {"status": "Overdue", "next_due": "2024-06-01", "criticality": "High"},
+    "G-LOW": {"status": "Overdue", "next_due": "2024-06-02", "criticality": "Low"},
+    "G-SOON": {"status": "Due Soon", "next_due": "2024-06-20", "criticality": "Medium"},
+    "G-OK": {"status": "OK", "next_due": "2024-09-01", "criticality": "Medium"},
+}
+
+
+def legacy_run_checks(df: pd.DataFrame, gage_status: Dict[str, Dict[str, str]], today: date) -> List[Dict[str, Any]]:
+    """Row-by-row HealthCheckUI.run_checks the engine replaced, kept as the reference."""
+    issues: List[Dict[str, Any]] = []
+
+    def add(sev, entry_id, cat, issue, suggestion):
+        issues.append({"severity": sev, "entry_id": entry_id, "category": cat, "issue": issue, "suggestion": suggestion})
+
+    for _, r in df.iterrows():
+        entry_id = str(r.get("ID", "") or "")
+        for col in ["Line", "Machine", "Tool_Num", "Reason", "Part_Number"]:
+            if not str(r.get(col, "") or "").strip():
+                add("High", entry_id, "Missing Field", f"Missing required field: {col}", f"Fill {col} before saving/closing.")
+
+        defects_present = str(r.get("Defects_Present", "") or "").strip().lower()
+        defect_code = str(r.get("Defect_Code", "") or "").strip()
+        defect_qty = safe_int(r.get("Defect_Qty", 0), 0)
+        if defects_present == "yes" and defect_qty <= 0:
+            add("High", entry_id, "Defects Logic", "Defects_Present=Yes but Defect_Qty is 0/blank",
+                "Enter a valid defect quantity (or set Defects_Present=No).")
+        if defects_present == "no" and defect_qty > 0:
+            add("Medium", entry_id, "Defects Logic", "Defects_Present=No but Defect_Qty > 0",
+                "Set Defects_Present=Yes or set Defect_Qty to 0.")
+        if defects_present == "yes" and not defect_code:
+            add("High", entry_id, "Defect Classification", "Defects present but Defect_Code is blank",
+                "Select a Defect_Code for Pareto and NCR tracking.")
+
+        qc_status = str(r.get("QC_Status", "") or "").strip()
+        q_user = str(r.get("Quality_User", "") or "").strip()
+        q_time = str(r.get("Quality_Time", "") or "").strip()
+        if qc_status in ("Verified", "Closed") and (not q_user or not q_time):
+            add("Medium", entry_id, "QC Workflow", f"QC_Status={qc_status} but missing Quality_User/Quality_Time",
+                "Set Quality_User and Quality_Time when verifying.")
+
+        ncr_id = str(r.get("NCR_ID", "") or "").strip()
+        ncr_status = str(r.get("NCR_Status", "") or "").strip()
+        ncr_close = str(r.get("NCR_Close_Date", "") or "").strip()
+        if ncr_id and ncr_status == "Closed" and not ncr_close:
+            add("High", entry_id, "NCR", "NCR_Status=Closed but NCR_Close_Date is blank",
+                "Enter NCR_Close_Date or reopen the NCR.")
+
+        action_status = str(r.get("Action_Status", "") or "").strip()
+        due_str = str(r.get("Action_Due_Date", "") or "").strip()
+        if action_status in ("Open", "Overdue") and due_str:
+            due_dt = parse_date(due_str)
+            if due_dt and due_dt.date() < today:
+                add("High", entry_id, "Actions", f"Action is overdue (due {due_dt.strftime('%Y-%m-%d')})",
+                    "Complete the action or update the due date/owner.")
+
+        g_used = str(r.get("Gage_Used", "") or "").strip()
+        if g_used:
+            gs = gage_status.get(g_used)
+            if gs:
+                crit = gs["criticality"]
+                if gs["status"] == "Overdue":
+                    add("Critical" if crit in ("High", "Critical") else "High", entry_id, "Gage Calibration",
+                        f"Gage {g_used} is Overdue (criticality={crit}, due {gs['next_due']})",
+                        "Stop using this gage until calibrated (or correct last calibration date).")
+                elif gs["status"] == "Due Soon":
+                    add("Medium", entry_id, "Gage Calibration",
+                        f"Gage {g_used} is Due Soon (criticality={crit}, due {gs['next_due']})",
+                        "Plan calibration before due date to avoid escalation.")
+            else:
+                add("Medium", entry_id, "Gage Calibration", f"Gage_Used={g_used} not found in gages.json",
+                    "Add gage in Gages & Calibration Manager or correct the gage ID.")
+    return issues
+
+
+def _entry(i: int, **overrides: Any) -> Dict[str, Any]:
+    row = {
+        "ID": f"E{i:04d}", "Date": "2024-06-10", "Time": "08:00:00", "Line": "L1", "Machine": "M1",
+        "Tool_Num": "T1", "Reason": "Worn", "Part_Number": "P1", "Defects_Present": "No", "Defect_Qty": "0",
+        "Defect_Code": "",
+        "QC_Status": "", "Quality_User": "", "Quality_Time": "", "NCR_ID": "", "NCR_Status": "",
+        "NCR_Close_Date": "", "Action_Status": "", "Action_Due_Date": "", "Gage_Used": "",
+    }
+    row.update(overrides)
+    return row
+
+
+def _messy_frame() -> pd.DataFrame:
+    variants = [
+        {},
+        {"Line": "", "Part_Number": ""},
+        {"Machine": "   ", "Reason": " "},
+        {"Defects_Present": "Yes", "Defect_Qty": ""},
+        {"Defects_Present": " yes ", "Defect_Qty": "3", "Defect_Code": "BURR"},
+        {"Defects_Present": "NO", "Defect_Qty": "2.7"},
+        {"QC_Status": "Verified", "Quality_User": "qa"},
+        {"QC_Status": "Closed", "Quality_User": "qa", "Quality_Time": "09:00"},
+        {"NCR_ID": "N-1", "NCR_Status": "Closed"},
+        {"Action_Status": "Open", "Action_Due_Date": "2024-06-14"},
+        {"Action_Status": "Overdue", "Action_Due_Date": "06/15/2024"},
+        {"Action_Status": "Open", "Action_Due_Date": "2024-06-01 17:30:00"},
+        {"Action_Status": "Closed", "Action_Due_Date": "2024-01-01"},
+        {"Action_Status": "Open", "Action_Due_Date": "not a date"},
+        {"Gage_Used": "G-OVER"},
+        {"Gage_Used": "G-LOW"},
+        {"Gage_Used": " G-SOON "},
+        {"Gage_Used": "G-OK"},
+        {"Gage_Used": "G-MISSING"},
+    ]
+    return pd.DataFrame([_entry(i, **v) for i, v in enumerate(variants * 3)])
+
+
+def test_evaluate_frame_matches_legacy_checks():
+    df = _messy_frame()
+    ctx = HealthContext(today=TODAY, gage_status=GAGES)
+
+    expected = legacy_run_checks(df, GAGES, TODAY)
+    got = evaluate_frame(df, ctx)[["severity", "entry_id", "category", "issue", "suggestion"]].to_dict("records")
+
+    assert got == expected
+
+
+def test_evaluate_frame_treats_missing_values_as_blank():
+    # The row loop read NaN as the text "nan"; the engine counts it as a missing field.
+    df = pd.DataFrame([_entry(1, Part_Number=None, Reason=float("nan"))])
+    found = evaluate_frame(df, HealthContext(today=TODAY, gage_status={}))
+    assert found["detail"].tolist() == ["Reason", "Part_Number"]
+
+
+def legacy_health_check(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """quality_engine.health_check's original row loop, kept as the reference."""
+    issues: List[Dict[str, Any]] = []
+    for _, r in df.iterrows():
+        entry_id = str(r.get("ID", ""))
+        for col in ("Line", "Machine", "Tool_Num", "Reason"):
+            if not str(r.get(col, "") or "").strip():
+                issues.append({"severity": "High", "entry_id": entry_id, "issue": f"Missing {col}"})
+        defects = str(r.get("Defects_Present", "") or "").strip().lower()
+        qty = safe_int(r.get("Defect_Qty", 0), 0)
+        if defects == "yes" and qty <= 0:
+            issues.append({"severity": "High", "entry_id": entry_id, "issue": "Defects=Yes but Defect_Qty<=0"})
+        if defects == "no" and qty > 0:
+            issues.append({"severity": "Medium", "entry_id": entry_id, "issue": "Defects=No but Defect_Qty>0"})
+    return issues
+
+
+def test_health_check_keeps_its_original_checks_and_texts():
+    df = _messy_frame()
+    assert health_check(df) == legacy_health_check(df)
+    partial = df.drop(columns=["Defect_Qty", "Reason"])
+    assert health_check(partial) == legacy_health_check(partial)
+    assert health_check(pd.DataFrame()) == []
+    # As in the engine, a missing value is a missing field (the loop read NaN as "nan").
+    nan_row = pd.DataFrame([_entry(1, Tool_Num=None, Reason=float("nan"))])
+    assert [i["issue"] for i in health_check(nan_row)] == ["Missing Tool_Num", "Missing Reason"]
+
+
+def test_overdue_actions_are_open_and_past_due():
+    df = pd.DataFrame({
+        "Action_Status": ["Open", "Open", "Overdue", "Closed", "Open", "Open"],
+        "Action_Due_Date": ["2024-06-09", "2024-06-10", "2024-06-01 17:00:00", "2024-06-01", "", "soon"],
+    })
+    assert overdue_actions(df, date(2024, 6, 10)).tolist() == [True, False, True, False, False, False]
+    assert not overdue_actions(df.drop(columns=["Action_Due_Date"]), date(2024, 6, 10)).any()
+
+
+def test_evaluate_frame_empty():
+    assert evaluate_frame(pd.DataFrame(), HealthContext(today=TODAY, gage_status={})).empty
+
+
+def _stored() -> Dict[tuple, str]:
+    return {(i["entry_id"], i["rule"], i["detail"]): i["severity"] for i in db.list_health_issues()}
+
+
+def test_run_health_checks_only_rechecks_changed_entries(temp_db):
+    ctx = HealthContext(today=TODAY, gage_status=GAGES)
+    db.insert_tool_entry(_entry(1, Line=""))
+    db.insert_tool_entry(_entry(2, Gage_Used="G-OVER"))
+    db.insert_tool_entry(_entry(3))
+
+    assert run_health_checks(ctx=ctx) == 3
+    assert _stored() == {
+        ("E0001", "missing_field", "Line"): "High",
+        ("E0002", "gage_calibration", "overdue"): "Critical",
+    }
+    assert run_health_checks(ctx=ctx) == 0
+
+    db.update_tool_entry(_entry(1))
+    db.update_tool_entry(_entry(3, Defects_Present="No", Defect_Qty="4"))
+    assert run_health_checks(ctx=ctx) == 2
+    assert _stored() == {
+        ("E0002", "gage_calibration", "overdue"): "Critical",
+        ("E0003", "defects_qty", "no_with_qty"): "Medium",
+    }
+
+    with db.connect() as conn:
+        conn.execute("DELETE FROM tool_entries WHERE id='E0003'")
+    assert run_health_checks(ctx=ctx) == 0
+    assert list(_stored()) == [("E0002", "gage_calibration", "overdue")]
+
+
+def test_run_health_checks_reruns_time_rules_when_context_moves(temp_db):
+    db.insert_tool_entry(_entry(1, Action_Status="Open", Action_Due_Date="2024-06-20"))
+    db.insert_tool_entry(_entry(2, Gage_Used="G-SOON"))
+
+    run_health_checks(ctx=HealthContext(today=TODAY, gage_status=GAGES))
+    assert _stored() == {("E0002", "gage_calibration", "due_soon"): "Medium"}
+
+    later = dict(GAGES, **{"G-SOON": {"status": "Overdue", "next_due": "2024-06-20", "criticality": "Medium"}})
+    assert run_health_checks(ctx=HealthContext(today=date(2024, 6, 25), gage_status=later)) == 0
+    assert _stored() == {
+        ("E0001", "action_overdue", ""): "High",
+        ("E0002", "gage_calibration", "overdue"): "High",
+    }
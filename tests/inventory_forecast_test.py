@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+
+from app import db, inventory_forecast
+from app.inventory_forecast import InventoryRules, forecast_tool, refresh_inventory_forecast
+from app.services import master_data_service
+from app.services.common import Actor
+
+TODAY = date(2024, 6, 28)
+CONFIG = {"window_days": 28, "default_lead_time_days": 7, "safety_days": 7, "review_days": 14,
+          "lead_time_days_by_tool": {"T2": 21}}
+
+
+@pytest.fixture
+def inv_db(temp_db, monkeypatch):
+    monkeypatch.setattr(inventory_forecast, "load_json", lambda path, default: CONFIG)
+
+
+def _changes(tool: str, days_ago: list, line: str = "L1") -> None:
+    for ago in days_ago:
+        db.insert_tool_entry({
+            "ID": f"{tool}-{line}-{ago}", "Date": (TODAY - timedelta(days=ago)).isoformat(), "Time": "08:00:00",
+            "Line": line, "Machine": "M1", "Tool_Num": tool, "Reason": "Worn",
+        })
+
+
+def test_consumption_sql_rolls_windows_per_tool(inv_db):
+    # 4 changes in the busiest week (days 3-6 ago, two lines), 2 older ones, 1 out of window.
+    _changes("T1", [3, 4, 20, 25])
+    _changes("T1", [5, 6], line="L2")
+    _changes("T1", [40])
+
+    rows = db.tool_consumption_by_line((TODAY - timedelta(days=27)).isoformat(), TODAY.isoformat())
+
+    assert [(r["line"], r["window_changes"], r["peak_week_changes"]) for r in rows] == [("L1", 4, 4), ("L2", 2, 4)]
+    assert rows[0]["last_change_date"] == (TODAY - timedelta(days=3)).isoformat()
+
+
+def test_forecast_math():
+    rules = InventoryRules.from_config(CONFIG)
+    rows = [{"window_changes": 14, "peak_week_changes": 7}]
+
+    f = forecast_tool({"tool_num": "T1", "stock_qty": 10}, rows, rules, TODAY)
+
+    # 0.5/day average, 1/day peak week: 7 lead days at peak + 7 safety days at average.
+    assert (f["rate_per_day"], f["peak_rate_per_day"]) == (0.5, 1.0)
+    assert (f["reorder_point"], f["order_up_to"]) == (11, 18)
+    assert (f["status"], f["suggested_order_qty"], f["stockout_date"]) == ("Reorder", 8, "2024-07-18")
+    assert forecast_tool({"tool_num": "T9", "stock_qty": 3}, [], rules, TODAY)["status"] == "No Usage"
+    assert rules.lead_time_days("T2") == 21
+
+
+def test_refresh_is_incremental_and_raises_alerts(inv_db, monkeypatch):
+    db.upsert_tool_inventory("T1", stock_qty=20)
+    db.upsert_tool_inventory("T2", stock_qty=2)
+    db.upsert_tool_inventory("T3", stock_qty=0)
+    _changes("T1", [1, 2])
+    _changes("T2", [1, 8, 15, 22])
+
+    assert refresh_inventory_forecast(today=TODAY) == 3
+    by_tool = {f["tool_num"]: f for f in db.list_tool_forecasts()}
+    assert {t: f["status"] for t, f in by_tool.items()} == {"T1": "OK", "T2": "Reorder", "T3": "Out"}
+    assert by_tool["T2"]["lines"][0]["window_changes"] == 4
+    # Unused T3 doesn't alert; T2 runs out inside its 21-day lead time.
+    assert {a["related_key"]: a["severity"] for a in db.list_alerts()} == {"tool_num=T2": "High"}
+
+    db.update_tool_stock("T1", 0)
+    calls = []
+    real = db.tool_consumption_by_line
+    monkeypatch.setattr(inventory_forecast, "tool_consumption_by_line", lambda *a: calls.append(a[2]) or real(*a))
+    assert refresh_inventory_forecast(["T1"], today=TODAY) == 1
+    assert calls == [["T1"]]
+    assert db.get_tool_forecast("T1")["status"] == "Out"
+    assert db.get_tool_forecast("T2")["status"] == "Reorder"
+    assert {a["related_key"]: a["severity"] for a in db.list_alerts()} == {
+        "tool_num=T1": "Critical", "tool_num=T2": "High",
+    }
+
+    # A new day recomputes everything.
+    assert refresh_inventory_forecast(["T1"], today=TODAY + timedelta(days=1)) == 3
+
+
+def test_stock_adjustments_refresh_the_forecast(inv_db, monkeypatch):
+    monkeypatch.setattr(master_data_service, "audit", lambda *a, **k: None)
+    db.upsert_tool_inventory("T1", stock_qty=20)
+    refresh_inventory_forecast()
+    assert db.get_tool_forecast("T1")["stock_qty"] == 20
+
+    assert master_data_service.adjust_tool_stock_service("T1", -20, actor_user=Actor("lead", "Admin")) == 0
+    assert db.get_tool_forecast("T1")["stock_qty"] == 0
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import db, metrics_cube
+from app.metrics_cube import MetricsCube, day_bounds, day_number
+
+
+def _frame(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "ID": [f"E{i}" for i in range(n)],
+        "Date": [f"2024-{m:02d}-{d:02d}" for m, d in zip(rng.integers(5, 7, n), rng.integers(1, 29, n))],
+        "Machine": rng.choice(["M1", "M2", "M3", ""], n),
+        "Part_Number": rng.choice(["P1", "P2", "P3"], n),
+        "Tool_Num": rng.choice(["1", "2", "3", "4", "5"], n),
+        "Defect_Code": rng.choice(["", "BURR", "SIZE"], n),
+        "Defects_Present": rng.choice(["Yes", "No"], n),
+        "Defect_Qty": rng.integers(0, 6, n).astype(str),
+        "Downtime_Mins": rng.integers(0, 30, n).astype(str),
+        "COPQ_Est": (rng.integers(0, 4000, n) / 4).astype(str),
+        "Andon_Flag": rng.choice(["Yes", "No"], n),
+        "Customer_Risk": rng.choice(["Low", "High", "Critical"], n),
+        "Action_Status": rng.choice(["Open", "Closed", "Overdue"], n),
+    })
+
+
+def _legacy_rollup(df: pd.DataFrame, by, first: str, defects_only: bool = False) -> pd.DataFrame:
+    """The per-screen groupby the cube replaced, kept as the reference."""
+    sub = df[pd.to_datetime(df["Date"]) >= pd.Timestamp(first)]
+    if defects_only:
+        sub = sub[sub["Defects_Present"] == "Yes"]
+    sub = sub.assign(
+        _qty=sub["Defect_Qty"].astype(int),
+        _dt=sub["Downtime_Mins"].astype(float),
+        _copq=sub["COPQ_Est"].astype(float),
+    )
+    return sub.groupby(by).agg(
+        entries=("ID", "count"), defect_qty=("_qty", "sum"), downtime_mins=("_dt", "sum"), copq_est=("_copq", "sum")
+    )
+
+
+@pytest.mark.parametrize("by,defects_only", [(["machine"], False), (["machine"], True), (["part_number", "defect_code"], True)])
+def test_rollups_match_groupby(by, defects_only):
+    df = _frame(3000, 7)
+    cube = MetricsCube.from_frame(df)
+    got = cube.rollup(by, days=(day_number(date(2024, 5, 20)), None), defects_only=defects_only)
+    cols = {"machine": "Machine", "part_number": "Part_Number", "defect_code": "Defect_Code"}
+    want = _legacy_rollup(df, [cols[d] for d in by], "2024-05-20", defects_only)
+
+    frame = pd.DataFrame(got).set_index(by).sort_index()
+    assert len(frame) == len(want)
+    for m in ("entries", "defect_qty", "downtime_mins", "copq_est"):
+        np.testing.assert_allclose(frame[m].to_numpy(), want[m].to_numpy())
+
+
+def test_top_n_ranks_scores_and_shares():
+    df = _frame(2000, 3)
+    cube = MetricsCube.from_frame(df)
+    everything = cube.rollup(["tool_num"])
+    rows = cube.top_n(["tool_num"], 3, score={"defect_qty": 1.0}, then=("downtime_mins",))
+
+    assert [r["rank"] for r in rows] == [1, 2, 3]
+    assert [r["defect_qty"] for r in rows] == sorted(everything["defect_qty"], reverse=True)[:3]
+    total = everything["defect_qty"].sum()
+    assert rows[0]["pct"] == pytest.approx(rows[0]["defect_qty"] / total * 100)
+    assert rows[2]["cum_pct"] == pytest.approx(sum(r["defect_qty"] for r in rows) / total * 100)
+    assert cube.top_n(["tool_num"], 3, score={"entries": 1.0}, min_entries=10_000) == []
+
+    # A mask gives the same rows as the running-total path.
+    days = (day_number(date(2024, 6, 3)), day_number(date(2024, 6, 9)))
+    fast = cube.top_n(["machine"], 4, score={"entries": 1.0}, days=days, defects_only=True)
+    slow = cube.top_n(["machine"], 4, score={"entries": 1.0}, mask=cube.mask(days=days, defects_only=True))
+    assert [(r["machine"], r["entries"]) for r in fast] == [(r["machine"], r["entries"]) for r in slow]
+
+
+def test_unfilled_defect_code_gives_no_blank_group():
+    df = _frame(300, 5)
+    for frame in (df.drop(columns=["Defect_Code"]), df.assign(Defect_Code=" ")):
+        cube = MetricsCube.from_frame(frame)
+        assert cube.blank_dimensions == {"defect_code"}
+        assert cube.top_n(["defect_code"], 10, score={"defect_qty": 1.0}) == []
+        assert cube.top_n(["part_number", "defect_code"], 10, score={"entries": 1.0}, defects_only=True) == []
+        assert len(cube.top_n(["machine"], 10, score={"defect_qty": 1.0})) == 4
+
+    # Blank codes among real ones still group, as the Pareto always showed them.
+    cube = MetricsCube.from_frame(df)
+    assert not cube.blank_dimensions
+    assert sorted(r["defect_code"] for r in cube.top_n(["defect_code"], 10, score={"entries": 1.0})) == ["", "BURR", "SIZE"]
+
+
+def test_totals_and_day_labels():
+    df = _frame(500, 1)
+    cube = MetricsCube.from_frame(df)
+    totals = cube.totals()
+    assert totals["entries"] == 500
+    assert totals["andon"] == (df["Andon_Flag"] == "Yes").sum()
+    assert totals["open_actions"] == df["Action_Status"].isin(["Open", "Overdue"]).sum()
+
+    june_first = cube.rollup(["day"], days=(day_number(date(2024, 6, 1)), day_number(date(2024, 6, 1))))
+    assert list(june_first["day"]) == ["2024-06-01"]
+    assert june_first["entries"][0] == (df["Date"] == "2024-06-01").sum()
+    assert cube.totals(days=(day_number(date(2030, 1, 1)), None))["entries"] == 0
+
+
+def test_day_bounds_match_a_date_only_filter():
+    assert day_bounds(datetime(2024, 6, 3), datetime(2024, 6, 5, 14, 30)) == (
+        day_number(date(2024, 6, 3)), day_number(date(2024, 6, 5))
+    )
+    # A start after midnight leaves that day's (midnight-dated) rows out.
+    assert day_bounds(datetime(2024, 6, 3, 9), datetime(2024, 6, 4, 9))[0] == day_number(date(2024, 6, 4))
+
+
+def test_cache_follows_entries_version(monkeypatch):
+    loads, version = [], [1]
+    monkeypatch.setattr(metrics_cube, "_cube_cache", metrics_cube.OrderedDict())
+    monkeypatch.setattr(metrics_cube, "tool_entries_version", lambda: version[0])
+    monkeypatch.setattr(metrics_cube, "get_df_range", lambda s, e, columns=None: loads.append((s, e)) or _frame(10, 0))
+
+    first = metrics_cube.cube_for_days(date(2024, 5, 30), date(2024, 6, 2))
+    assert metrics_cube.get_metrics_cube("2024-05", "2024-06") is first
+    assert loads == [("2024-05", "2024-06")]
+    version[0] = 2
+    assert metrics_cube.get_metrics_cube("2024-05", "2024-06") is not first
+    assert len(loads) == 2
+
+
+def test_cache_follows_the_database(temp_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_cube, "_cube_cache", metrics_cube.OrderedDict())
+    monkeypatch.setattr(metrics_cube, "_cube_cache_version", None)
+    entry = {"ID": "E1", "Date": "2024-06-03", "Time": "08:00:00", "Tool_Num": "T1", "Reason": "Worn"}
+
+    db.insert_tool_entry({**entry, "Machine": "FROM_A"})
+    version = db.tool_entries_version()
+    cube = metrics_cube.get_metrics_cube("2024-06", "2024-06")
+    assert list(cube.labels["machine"]) == ["FROM_A"]
+
+    # A second database at the same entries version is not served the first one's cube.
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "other.db"))
+    db.init_db()
+    db.insert_tool_entry({**entry, "Machine": "FROM_B"})
+    assert db.tool_entries_version() == version
+    cube = metrics_cube.get_metrics_cube("2024-06", "2024-06")
+    assert list(cube.labels["machine"]) == ["FROM_B"]
+
+    metrics_cube.clear_cube_cache()
+    assert not metrics_cube._cube_cache
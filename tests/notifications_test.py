@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.coercion import to_float_series
+from app.quality_engine import entry_alerts, generate_notifications
+from app.storage import safe_float
+
+RULES = {"copq_thresholds": {"high": 500, "critical": 1500}}
+
+
+def legacy_entry_alerts(df: pd.DataFrame, rules: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The row-by-row builder entry_alerts replaced, kept as the reference."""
+    alerts: List[Dict[str, Any]] = []
+    copq_values = to_float_series(df["COPQ_Est"], 0.0) if "COPQ_Est" in df.columns else pd.Series(0.0, index=df.index)
+    thr = rules.get("copq_thresholds", {}) or {}
+    for (_, r), copq in zip(df.iterrows(), copq_values):
+        sev = str(r.get("Customer_Risk", "") or "").strip()
+        andon = str(r.get("Andon_Flag", "") or "").strip().lower()
+        if andon == "yes":
+            alerts.append({
+                "severity": "Critical", "type": "Andon", "title": "Andon event",
+                "details": f"{r.get('Line','')} {r.get('Machine','')} Tool {r.get('Tool_Num','')} Part {r.get('Part_Number','')}",
+                "related": {"entry_id": str(r.get("ID", ""))},
+            })
+            continue
+        if sev in ("High", "Critical"):
+            alerts.append({
+                "severity": sev, "type": "Risk", "title": f"{sev} customer risk entry",
+                "details": f"{r.get('Line','')} {r.get('Machine','')} Part {r.get('Part_Number','')} Defect {r.get('Defect_Code','')}",
+                "related": {"entry_id": str(r.get("ID", ""))},
+            })
+        if copq >= safe_float(thr.get("critical", 1e18), 1e18):
+            alerts.append({
+                "severity": "Critical", "type": "COPQ", "title": "Critical COPQ event",
+                "details": f"Entry {r.get('ID','')} COPQ ${copq:,.2f}", "related": {"entry_id": str(r.get("ID", ""))},
+            })
+        elif copq >= safe_float(thr.get("high", 1e18), 1e18):
+            alerts.append({
+                "severity": "High", "type": "COPQ", "title": "High COPQ event",
+                "details": f"Entry {r.get('ID','')} COPQ ${copq:,.2f}", "related": {"entry_id": str(r.get("ID", ""))},
+            })
+    return alerts
+
+
+def _frame(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    copq = np.round(rng.random(n) * 2000, 2).astype(object)
+    copq[rng.random(n) < 0.05] = ""
+    copq[rng.random(n) < 0.02] = None
+    return pd.DataFrame({
+        "ID": [f"E{i}" for i in range(n)],
+        "Line": rng.choice(["L1", "L2", None], n),
+        "Machine": rng.choice(["M1", np.nan], n),
+        "Tool_Num": "T1",
+        "Part_Number": rng.choice(["P1", "P2"], n),
+        "Defect_Code": rng.choice(["", "BURR"], n),
+        "Andon_Flag": rng.choice(["Yes", "No", " yes", ""], n, p=[0.05, 0.8, 0.05, 0.1]),
+        "Customer_Risk": rng.choice(["", "High", "Critical", " High", None, "Low"], n),
+        "COPQ_Est": copq,
+    })
+
+
+@pytest.mark.parametrize("drop", [None, "Andon_Flag", "Customer_Risk", "COPQ_Est", "Defect_Code"])
+def test_entry_alerts_match_the_row_loop(drop):
+    df = _frame(2000, 7)
+    if drop:
+        df = df.drop(columns=[drop])
+    assert entry_alerts(df, RULES) == legacy_entry_alerts(df, RULES)
+
+
+def test_notifications_keep_entry_alerts_before_gages():
+    df = _frame(200, 1)
+    gages = {"gages": [{"gage_id": "G1", "name": "Mic", "last_calibration_date": "2000-01-01",
+                        "calibration_frequency_days": 30, "criticality": "High"}]}
+    alerts = generate_notifications(df, gages, {"rules": RULES})
+    assert alerts[:-1] == legacy_entry_alerts(df, RULES)
+    assert alerts[-1]["type"] == "Calibration" and alerts[-1]["related"] == {"gage_id": "G1"}
+    assert generate_notifications(df.iloc[0:0], {}, {"rules": RULES}) == []
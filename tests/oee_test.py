@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from app import db, oee
+from app.oee import OeeRules, compute_oee, oee_trend, refresh_oee_rollup
+
+CONFIG = {"shift_minutes": 480, "shift_minutes_by_shift": {"3rd": 400}}
+
+
+def _report(i: str, date: str, qty: float, downtime: float = 0.0, **overrides) -> dict:
+    row = {"ID": f"SP-{i}", "Date": date, "Time": "14:00:00", "Shift": "1st", "Line": "L1", "Cell": "C1",
+           "Machine": "M1", "Part_Number": "P1", "Tool_Num": "", "Reason": "Shift Production",
+           "Production_Qty": qty, "Downtime_Mins": downtime}
+    row.update(overrides)
+    return row
+
+
+def test_components_per_group():
+    rows = [
+        # 48 min down of 480; 400 parts at a 480/shift goal = 400 ideal min of 432 run; 20 scrap.
+        {"date": "2024-06-03", "shift": "1st", "line": "L1", "cell": "C1", "machine": "M1", "part_number": "P1",
+         "reason": "Shift Production", "production_qty": 400, "defect_qty": 0, "downtime": 48},
+        {"date": "2024-06-03", "shift": "1st", "line": "L1", "cell": "C1", "machine": "M1", "part_number": "P1",
+         "reason": "Worn", "production_qty": 0, "defect_qty": 20, "downtime": 0},
+        # A tool change alone doesn't make a group.
+        {"date": "2024-06-03", "shift": "2nd", "line": "L1", "cell": "C1", "machine": "M1", "part_number": "P1",
+         "reason": "Worn", "production_qty": 0, "defect_qty": 0, "downtime": 10},
+        # No goal for L2: availability and quality, but no performance or OEE.
+        {"date": "2024-06-03", "shift": "3rd", "line": "L2", "cell": "", "machine": "M9", "part_number": "P9",
+         "reason": "Shift Production", "production_qty": 100, "defect_qty": 0, "downtime": 100},
+    ]
+    goals = [{"line": "L1", "cell": "", "machine": "", "part_number": "", "target": 480}]
+
+    out = compute_oee(rows, goals, OeeRules.from_config(CONFIG)).set_index(["shift", "line"])
+
+    l1 = out.loc[("1st", "L1")]
+    assert l1["availability"] == pytest.approx(0.9)
+    assert l1["performance"] == pytest.approx(400 / 432)
+    assert l1["quality"] == pytest.approx(0.95)
+    assert l1["oee"] == pytest.approx(0.9 * 400 / 432 * 0.95)
+    assert ("2nd", "L1") not in out.index
+    l2 = out.loc[("3rd", "L2")]
+    assert (l2["planned_minutes"], l2["availability"]) == (400, 0.75)
+    assert pd.isna(l2["performance"]) and pd.isna(l2["oee"])
+
+
+@pytest.fixture
+def oee_db(temp_db, monkeypatch):
+    monkeypatch.setattr(oee, "load_json", lambda path, default: CONFIG)
+    db.upsert_production_goal("L1", 480)
+
+
+def test_refresh_rolls_up_touched_dates_and_trends(oee_db, monkeypatch):
+    db.insert_tool_entry_with_downtime(_report("1", "2024-05-06", 480), [])
+    db.insert_tool_entry_with_downtime(
+        _report("2", "2024-06-03", 360, 999),
+        [{"code": "MECH", "minutes": 120, "occurrences": 1, "comments": ""}],
+    )
+    assert refresh_oee_rollup() == 2
+    june = db.list_oee_rollup("2024-06-01", "2024-06-30")
+    # The downtime breakdown wins over the report's own total.
+    assert (june[0]["downtime_minutes"], june[0]["availability"], june[0]["oee"]) == (120.0, 0.75, 0.75)
+    assert refresh_oee_rollup() == 0
+
+    seen = []
+    real = oee.oee_source_rows
+    monkeypatch.setattr(oee, "oee_source_rows", lambda dates=None: seen.append(dates) or real(dates))
+    db.insert_tool_entry(_report("3", "2024-06-04", 240, Shift="2nd"))
+    assert refresh_oee_rollup() == 1
+    assert seen == [["2024-06-04"]]
+
+    trend = {r["period"]: r for r in oee_trend("2024-01-01", "2024-12-31")}
+    assert trend["2024-05"]["oee"] == pytest.approx(1.0)
+    # June: 360 + 240 parts in 840 run of 960 planned minutes, all at goal pace.
+    assert trend["2024-06"]["availability"] == pytest.approx(840 / 960)
+    assert trend["2024-06"]["performance"] == pytest.approx(600 / 840)
+
+    # Deleting a report clears its group; a goal change recomputes every date.
+    with db.connect() as conn:
+        conn.execute("DELETE FROM tool_entries WHERE id='SP-3'")
+    assert refresh_oee_rollup() == 1
+    assert len(db.list_oee_rollup("2024-06-01", "2024-06-30")) == 1
+    db.upsert_production_goal("L1", 960)
+    seen.clear()
+    refresh_oee_rollup()
+    assert seen == [None]
+    assert db.list_oee_rollup("2024-05-01", "2024-05-31")[0]["performance"] == pytest.approx(0.5)
+
+
+def test_only_edits_to_rolled_up_columns_mark_groups_stale(oee_db):
+    db.insert_tool_entry(_report("1", "2024-05-06", 480))
+    refresh_oee_rollup()
+
+    db.update_tool_entry({**_report("1", "2024-05-06", 480), "Leader_Sign": "Yes"})
+    assert db.list_stale_oee_keys() == []
+    db.update_tool_entry(_report("1", "2024-05-06", 400))
+    assert db.list_stale_oee_keys() == [("2024-05-06", "1st", "L1", "M1")]
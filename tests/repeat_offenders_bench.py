@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import sys
+import time
+
+from repeat_offenders_test import RULES, _frame, legacy_detect_repeat_offenders
+
+from app.quality_engine import detect_repeat_offenders
+
+
+ROWS = 20_000
+
+
+def main() -> int:
+    df = _frame(ROWS, 0)
+
+    start = time.perf_counter()
+    detect_repeat_offenders(df, RULES)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy_detect_repeat_offenders(df, RULES)
+    row_loop = time.perf_counter() - start
+
+    print(f"{ROWS:,} rows: row loop {row_loop:.2f} s, vectorized {vectorized * 1000:.1f} ms (x{row_loop / vectorized:.0f})")
+    return 0 if vectorized < 1.0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
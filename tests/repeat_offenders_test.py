@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import quality_engine
+from app.quality_engine import detect_repeat_offenders
+from app.storage import safe_int
+
+
+def _now() -> datetime:
+    return quality_engine._now()
+
+
+def legacy_detect_repeat_offenders(df: pd.DataFrame, repeat_rules: Dict[str, Any]) -> pd.DataFrame:
+    """Row-by-row implementation this module replaced, kept as the reference."""
+    if df.empty:
+        return df
+
+    window_days = safe_int(repeat_rules.get("window_days", 7), 7)
+    part_thr = safe_int(repeat_rules.get("part_defect_repeat_threshold", 3), 3)
+    mach_thr = safe_int(repeat_rules.get("machine_defect_repeat_threshold", 5), 5)
+
+    weights = repeat_rules.get("weights", {}) or {}
+    w_part = safe_int(weights.get("part_defect_repeat", 40), 40)
+    w_mach = safe_int(weights.get("machine_repeat", 25), 25)
+
+    score_bands = repeat_rules.get("score_bands", {}) or {}
+    watch_min = safe_int(score_bands.get("watch_min", 40), 40)
+    repeat_min = safe_int(score_bands.get("repeat_min", 80), 80)
+
+    # Build a date column
+    temp = df.copy()
+    if "Date" in temp.columns:
+        temp["_dt"] = pd.to_datetime(temp["Date"], errors="coerce")
+    else:
+        temp["_dt"] = pd.NaT
+
+    cutoff = pd.Timestamp(_now().date() - timedelta(days=window_days))
+    recent = temp[temp["_dt"].notna() & (temp["_dt"] >= cutoff)].copy()
+
+    # Base fields if missing
+    for col in ("Repeat_Flag", "Repeat_Score", "Repeat_Reason"):
+        if col not in temp.columns:
+            temp[col] = ""
+
+    # Count repeats by (Part_Number, Defect_Code) where defects present
+    recent_def = recent[recent.get("Defects_Present", "").astype(str).str.lower().eq("yes")].copy()
+    if not recent_def.empty:
+        part_counts = recent_def.groupby(["Part_Number", "Defect_Code"]).size().reset_index(name="cnt")
+    else:
+        part_counts = pd.DataFrame(columns=["Part_Number", "Defect_Code", "cnt"])
+
+    # Count repeats by Machine (defects)
+    if not recent_def.empty:
+        mach_counts = recent_def.groupby(["Machine"]).size().reset_index(name="cnt")
+    else:
+        mach_counts = pd.DataFrame(columns=["Machine", "cnt"])
+
+    # Apply scoring row-by-row
+    reasons_out = []
+    scores_out = []
+    flags_out = []
+
+    for _, r in temp.iterrows():
+        score = 0
+        reasons = []
+
+        part = str(r.get("Part_Number", "") or "")
+        dcode = str(r.get("Defect_Code", "") or "")
+        mach = str(r.get("Machine", "") or "")
+        defects_yes = str(r.get("Defects_Present", "") or "").lower() == "yes"
+
+        if defects_yes and part and dcode:
+            match = part_counts[(part_counts["Part_Number"] == part) & (part_counts["Defect_Code"] == dcode)]
+            if not match.empty:
+                cnt = int(match.iloc[0]["cnt"])
+                if cnt >= part_thr:
+                    score += w_part
+                    reasons.append(f"Part+Defect repeats ({cnt} in {window_days}d)")
+
+        if defects_yes and mach:
+            mm = mach_counts[mach_counts["Machine"] == mach]
+            if not mm.empty:
+                cntm = int(mm.iloc[0]["cnt"])
+                if cntm >= mach_thr:
+                    score += w_mach
+                    reasons.append(f"Machine repeat defects ({cntm} in {window_days}d)")
+
+        if score >= repeat_min:
+            flag = "Repeat"
+        elif score >= watch_min:
+            flag = "Watch"
+        else:
+            flag = "None"
+
+        scores_out.append(score)
+        flags_out.append(flag)
+        reasons_out.append("; ".join(reasons))
+
+    temp["Repeat_Score"] = scores_out
+    temp["Repeat_Flag"] = flags_out
+    temp["Repeat_Reason"] = reasons_out
+
+    temp.drop(columns=["_dt"], inplace=True, errors="ignore")
+    return temp
+
+
+RULES = {
+    "window_days": 7,
+    "part_defect_repeat_threshold": 3,
+    "machine_defect_repeat_threshold": 5,
+    "weights": {"part_defect_repeat": 40, "machine_repeat": 25},
+    "score_bands": {"watch_min": 40, "repeat_min": 80},
+}
+
+
+def _frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    today = datetime.now().date()
+    dates = [(today - timedelta(days=int(d))).strftime("%Y-%m-%d") for d in rng.integers(0, 20, rows)]
+    dates = np.array(dates, dtype=object)
+    dates[rng.random(rows) < 0.05] = "not a date"
+    return pd.DataFrame({
+        "ID": [f"E{i}" for i in range(rows)],
+        "Date": dates,
+        "Machine": rng.choice(["M1", "M2", "M3", ""], rows),
+        "Part_Number": rng.choice(["P1", "P2", "P3", "P4", ""], rows),
+        "Defect_Code": rng.choice(["D1", "D2", ""], rows),
+        "Defects_Present": rng.choice(["Yes", "No", "yes", ""], rows),
+    })
+
+
+def _assert_same(df: pd.DataFrame, rules: Dict[str, Any]) -> None:
+    want = legacy_detect_repeat_offenders(df, rules)
+    got = detect_repeat_offenders(df, rules)
+    assert list(got.columns) == list(want.columns)
+    assert got["Repeat_Score"].tolist() == want["Repeat_Score"].tolist()
+    assert got["Repeat_Flag"].tolist() == want["Repeat_Flag"].tolist()
+    assert got["Repeat_Reason"].tolist() == want["Repeat_Reason"].tolist()
+    pd.testing.assert_frame_equal(got[list(df.columns)], want[list(df.columns)])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_row_loop(seed):
+    _assert_same(_frame(400, seed), RULES)
+
+
+def test_matches_row_loop_with_other_rules():
+    rules = {
+        "window_days": 14,
+        "part_defect_repeat_threshold": 1,
+        "machine_defect_repeat_threshold": 2,
+        "weights": {"part_defect_repeat": 50, "machine_repeat": 30},
+        "score_bands": {"watch_min": 30, "repeat_min": 80},
+    }
+    _assert_same(_frame(300, 11), rules)
+
+
+def test_missing_and_existing_repeat_columns():
+    df = _frame(50, 3)
+    df.loc[df.index[:5], "Part_Number"] = None
+    df.loc[df.index[5:10], "Machine"] = np.nan
+    _assert_same(df, RULES)
+    df["Repeat_Flag"] = "old"
+    _assert_same(df, RULES)
+
+
+def test_index_is_kept():
+    df = _frame(60, 4)
+    df.index = df.index * 3 + 7
+    _assert_same(df, RULES)
+
+
+def test_empty_frame_is_returned_unchanged():
+    df = pd.DataFrame(columns=["Date", "Machine"])
+    assert detect_repeat_offenders(df, RULES) is df
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from app import db, repeat_tracker
+from app.quality_engine import RepeatRules, detect_repeat_offenders
+from app.repeat_tracker import RepeatTracker
+from backups import backup_manager
+
+RULES = {
+    "window_days": 7,
+    "part_defect_repeat_threshold": 3,
+    "machine_defect_repeat_threshold": 4,
+    "weights": {"part_defect_repeat": 40, "machine_repeat": 25},
+    "score_bands": {"watch_min": 25, "repeat_min": 60},
+}
+
+
+def _entry(i: int, days_ago: int, **overrides: Any) -> Dict[str, Any]:
+    row = {
+        "ID": f"E{i:04d}",
+        "Date": (datetime.now().date() - timedelta(days=days_ago)).strftime("%Y-%m-%d"),
+        "Part_Number": "P1",
+        "Defect_Code": "BURR",
+        "Machine": "M1",
+        "Tool_Num": "T1",
+        "Defects_Present": "Yes",
+    }
+    row.update(overrides)
+    return row
+
+
+def test_add_matches_batch_detector_as_entries_arrive():
+    rng = np.random.default_rng(7)
+    entries = [
+        _entry(
+            i,
+            int(rng.integers(0, 12)),
+            Part_Number=str(rng.choice(["P1", "P2", ""])),
+            Defect_Code=str(rng.choice(["BURR", "SCRATCH", ""])),
+            Machine=str(rng.choice(["M1", "M2", ""])),
+            Defects_Present=str(rng.choice(["Yes", "yes", "No"])),
+        )
+        for i in range(120)
+    ]
+    tracker = RepeatTracker(RepeatRules.from_config(RULES))
+    for i, entry in enumerate(entries):
+        got = tracker.add(entry)
+        expected = detect_repeat_offenders(pd.DataFrame(entries[: i + 1]), RULES).iloc[i]
+        assert got == {
+            "Repeat_Flag": expected["Repeat_Flag"],
+            "Repeat_Score": int(expected["Repeat_Score"]),
+            "Repeat_Reason": expected["Repeat_Reason"],
+        }
+
+
+def test_buckets_expire_and_ids_count_once():
+    rules = RepeatRules.from_config(RULES)
+    tracker = RepeatTracker(rules, today=date(2024, 6, 15))
+    tracker.seed([
+        {"ID": "A", "Date": "2024-06-08", "Machine": "M1", "Tool_Num": "T1", "Defects_Present": "Yes"},
+        {"ID": "B", "Date": "2024-06-09", "Machine": "M1", "Tool_Num": "T1", "Defects_Present": "Yes"},
+        {"ID": "C", "Date": "2024-06-15", "Machine": "M1", "Tool_Num": "T1", "Defects_Present": "No"},
+        {"ID": "D", "Date": "2024-06-01", "Machine": "M1", "Tool_Num": "T1", "Defects_Present": "Yes"},
+    ])
+    assert tracker.count("machine", "M1") == 2
+    assert tracker.count("tool", "T1") == 3
+
+    tracker.add({"ID": "B", "Date": "2024-06-09", "Machine": "M1", "Tool_Num": "T1", "Defects_Present": "Yes"})
+    assert tracker.count("machine", "M1") == 2
+
+    tracker._today = date(2024, 6, 16)
+    assert tracker.count("machine", "M1") == 1
+    assert tracker.count("tool", "T1") == 2
+    tracker.add({"ID": "A", "Date": "2024-06-10", "Machine": "M1", "Tool_Num": "T1", "Defects_Present": "Yes"})
+    assert tracker.count("machine", "M1") == 2
+
+
+def test_record_entry_seeds_from_db_and_stores_flag(temp_db, monkeypatch):
+    monkeypatch.setattr(repeat_tracker, "load_json", lambda path, default: RULES)
+    monkeypatch.setattr(repeat_tracker, "_tracker", None)
+    for i in range(3):
+        db.insert_tool_entry(_entry(i, i))
+    entry = _entry(3, 0)
+    db.insert_tool_entry(entry)
+
+    result = repeat_tracker.record_entry(entry)
+
+    assert result["Repeat_Flag"] == "Watch"
+    assert result["Repeat_Reason"] == "Machine repeat defects (4 in 7d)"
+    stored = db.list_repeat_flags()
+    assert [(r["id"], r["repeat_flag"], r["repeat_score"]) for r in stored] == [("E0003", "Watch", 25)]
+
+
+def test_an_edited_entry_replaces_its_earlier_count():
+    tracker = RepeatTracker(RepeatRules.from_config(RULES), today=date(2024, 6, 15))
+    entry = {"ID": "A", "Date": "2024-06-14", "Machine": "M1", "Tool_Num": "T1", "Defects_Present": "Yes"}
+    tracker.add(entry)
+    tracker.add({**entry, "ID": "B"})
+    assert tracker.count("machine", "M1") == 2
+
+    tracker.add({**entry, "Defects_Present": "No"})
+    assert (tracker.count("machine", "M1"), tracker.count("tool", "T1")) == (1, 2)
+    tracker.add({**entry, "Date": "2024-06-01"})
+    assert (tracker.count("machine", "M1"), tracker.count("tool", "T1")) == (1, 1)
+    tracker.add({**entry, "Machine": "M2"})
+    assert (tracker.count("machine", "M1"), tracker.count("machine", "M2")) == (1, 1)
+
+
+def test_edits_saved_elsewhere_are_rescored(temp_db, monkeypatch):
+    monkeypatch.setattr(repeat_tracker, "load_json", lambda path, default: RULES)
+    monkeypatch.setattr(repeat_tracker, "_tracker", None)
+    entries = [_entry(i, 0) for i in range(4)]
+    for entry in entries:
+        db.insert_tool_entry(entry)
+        repeat_tracker.record_entry(entry)
+    assert repeat_tracker.sync_repeat_flags() == 0
+
+    def flag(entry_id):
+        return {r["id"]: r["repeat_flag"] for r in db.list_repeat_flags(flagged_only=False)}[entry_id]
+
+    assert flag("E0003") == "Repeat"
+    assert db.update_tool_entry({**entries[3], "Defects_Present": "No"})
+    assert repeat_tracker.sync_repeat_flags() == 1
+    assert flag("E0003") == "None"
+    assert repeat_tracker.get_repeat_tracker().count("machine", "M1") == 3
+
+
+def test_restoring_a_backup_rebuilds_the_tracker(temp_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(repeat_tracker, "load_json", lambda path, default: RULES)
+    monkeypatch.setattr(repeat_tracker, "_tracker", None)
+    monkeypatch.setattr(backup_manager, "DB_PATH", str(temp_db))
+    monkeypatch.setattr(backup_manager, "BACKUPS_DIR", str(tmp_path / "backups"))
+    monkeypatch.setattr(backup_manager, "audit", lambda *a, **k: None)
+    admin = {"username": "admin", "role": "Admin"}
+    entries = [_entry(i, 0) for i in range(4)]
+    for entry in entries[:2]:
+        db.insert_tool_entry(entry)
+        repeat_tracker.record_entry(entry)
+    backup = backup_manager.create_backup_now(admin)
+    for entry in entries[2:]:
+        db.insert_tool_entry(entry)
+        repeat_tracker.record_entry(entry)
+    assert repeat_tracker.get_repeat_tracker().count("machine", "M1") == 4
+
+    assert backup_manager.restore_backup(str(backup), admin) == backup
+    assert repeat_tracker.get_repeat_tracker().count("machine", "M1") == 2
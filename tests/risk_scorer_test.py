@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.quality_engine import RiskScorer, assign_risk_severity
+
+
+RISK_CONFIG = json.loads((Path(__file__).resolve().parent.parent / "data" / "risk_config.json").read_text())
+
+
+def _frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    copq = np.round(rng.random(rows) * 2000, 2).astype(object)
+    copq[rng.random(rows) < 0.05] = ""
+    dq = rng.integers(0, 40, rows).astype(str).astype(object)
+    dq[rng.random(rows) < 0.05] = None
+    return pd.DataFrame({
+        "ID": [f"E{i}" for i in range(rows)],
+        "Andon_Flag": rng.choice(["Yes", "No", "", " yes "], rows),
+        "Customer_Risk": rng.choice(["", "Low", "Med", "High", "Critical", "Unknown", " High "], rows),
+        "COPQ_Est": copq,
+        "Defect_Qty": dq,
+        "Repeat_Score": rng.integers(0, 130, rows),
+    })
+
+
+def _scalar(df, cfg, repeat, action, ncr, gage):
+    out = []
+    for i, (_, row) in enumerate(df.iterrows()):
+        sev, reasons = assign_risk_severity(
+            row.to_dict(), cfg,
+            repeat_score=int(repeat[i]),
+            is_overdue_action=bool(action[i]),
+            is_overdue_ncr=bool(ncr[i]),
+            gage_overdue_severity=gage[i],
+        )
+        out.append((sev, "; ".join(reasons)))
+    return out
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_score_frame_matches_assign_risk_severity(seed):
+    df = _frame(500, seed)
+    rng = np.random.default_rng(seed + 100)
+    action = pd.Series(rng.random(len(df)) < 0.1, index=df.index)
+    ncr = pd.Series(rng.random(len(df)) < 0.1, index=df.index)
+    gage = pd.Series(rng.choice([None, "Low", "Medium", "High", "Critical", "bogus"], len(df)), index=df.index)
+
+    got = RiskScorer.from_config(RISK_CONFIG).score_frame(
+        df, is_overdue_action=action, is_overdue_ncr=ncr, gage_overdue_severity=gage
+    )
+    want = _scalar(df, RISK_CONFIG, df["Repeat_Score"].tolist(), action.tolist(), ncr.tolist(), gage.tolist())
+    assert list(zip(got["Severity"], got["Reasons"])) == want
+
+
+def test_defaults_and_sparse_config():
+    cfg = {"rules": {"andon_always_critical": False, "copq_thresholds": {"high": "500"}}}
+    df = _frame(200, 7).drop(columns=["Repeat_Score"])
+    got = RiskScorer.from_config(cfg).score_frame(df)
+    n = len(df)
+    want = _scalar(df, cfg, [0] * n, [False] * n, [False] * n, [None] * n)
+    assert list(zip(got["Severity"], got["Reasons"])) == want
+
+
+def test_empty_config_and_frame():
+    scorer = RiskScorer.from_config({})
+    out = scorer.score_frame(pd.DataFrame(columns=["Andon_Flag"]))
+    assert list(out.columns) == ["Severity", "Reasons"]
+    assert out.empty
+
+
+def test_index_is_kept():
+    df = _frame(20, 1)
+    df.index = df.index + 100
+    out = RiskScorer.from_config(RISK_CONFIG).score_frame(df, is_overdue_action=True)
+    assert list(out.index) == list(df.index)
+    assert out["Reasons"].str.contains("Overdue action item").all()
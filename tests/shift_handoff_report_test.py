@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from app import db
+from app.metrics_cube import MetricsCube
+from app.reports import shift_handoff
+from app.reports.shift_handoff import build_report, generate_reports, write_workbook
+from app.storage import safe_int
+
+START, END = datetime(2024, 6, 3), datetime(2024, 6, 5, 23, 59, 59)
+SCRAP = {"P1": 4.0, "P2": 10.0}
+
+
+def _frame(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "ID": [f"E{i}" for i in range(n)],
+        "Date": [f"2024-06-{d:02d}" for d in rng.integers(1, 8, n)],
+        "Time": "08:00:00",
+        "Line": rng.choice(["L1", "L2"], n),
+        "Machine": rng.choice(["M1", "M2", ""], n),
+        "Part_Number": rng.choice(["P1", "P2", "P3"], n),
+        "Tool_Num": rng.choice(["1", "2"], n),
+        "Reason": "Worn",
+        "Defect_Code": rng.choice(["", "BURR", "SIZE"], n),
+        "Defects_Present": rng.choice(["Yes", "No"], n),
+        "Defect_Qty": rng.integers(0, 6, n).astype(str),
+        "Downtime_Mins": rng.integers(0, 30, n).astype(str),
+        "COPQ_Est": (rng.integers(0, 4000, n) / 4).astype(str),
+        "Andon_Flag": rng.choice(["Yes", "No"], n),
+        "Customer_Risk": rng.choice(["Low", "High", "Critical"], n),
+        "Action_Status": rng.choice(["Open", "Closed", "Overdue"], n),
+    })
+
+
+def _legacy_offenders(df: pd.DataFrame) -> pd.DataFrame:
+    """The per-group loop the screen used before the cube, kept as the reference."""
+    rows = []
+    for col, label in (("Machine", "Machine"), ("Part_Number", "Part"), ("Defect_Code", "Defect")):
+        for key, g in df.groupby(col):
+            qty = g["Defect_Qty"].apply(safe_int).sum()
+            dt = g["Downtime_Mins"].astype(float).sum()
+            copq = g["COPQ_Est"].astype(float).sum()
+            rows.append({"key": f"{label}: {key or '(blank)'}", "count": len(g), "defect_qty": qty,
+                         "_score": len(g) + 2.0 * qty + 0.5 * dt + 0.01 * copq})
+    return pd.DataFrame(rows).sort_values("_score", ascending=False, kind="stable").head(25).reset_index(drop=True)
+
+
+def test_report_matches_the_legacy_loops():
+    df = _frame(1500, 11)
+    report = build_report(MetricsCube.from_frame(df), START, END, scrap_costs=SCRAP)
+    in_range = df[(df["Date"] >= "2024-06-03") & (df["Date"] <= "2024-06-05")]
+
+    assert report.totals["entries"] == len(in_range)
+    assert report.totals["defect_qty"] == in_range["Defect_Qty"].astype(int).sum()
+    want = _legacy_offenders(in_range)
+    assert list(report.offenders["rank"]) == list(range(1, len(want) + 1))
+    assert sorted(report.offenders["key"]) == sorted(want["key"])
+    np.testing.assert_allclose(sorted(report.offenders["_score"]), sorted(want["_score"]))
+
+    scrap = in_range["Part_Number"].map(SCRAP).fillna(0) * in_range["Defect_Qty"].astype(int)
+    assert report.scrap_total == pytest.approx(scrap.sum())
+    by_day = scrap.groupby(in_range["Date"]).sum()
+    assert list(report.scrap["bucket"]) == list(by_day.index)
+    np.testing.assert_allclose(report.scrap["scrap_cost"], by_day.to_numpy())
+    assert report.scrap_label == "Date"
+    assert "Total scrap cost" in "\n".join(report.summary_lines())
+
+
+def test_workbook_is_streamed_with_every_sheet(tmp_path):
+    df = _frame(300, 2)
+    report = build_report(MetricsCube.from_frame(df), START, END, line="L1", scrap_costs=SCRAP)
+    path = write_workbook(report, str(tmp_path / "out" / "handoff.xlsx"), df)
+
+    wb = load_workbook(path, read_only=True)
+    assert wb.sheetnames == ["Summary", "Top_Offenders", "Scrap_Cost", "Filtered_Entries"]
+    offenders = list(wb["Top_Offenders"].values)
+    assert list(offenders[0]) == shift_handoff.OFFENDER_COLUMNS
+    assert len(offenders) == len(report.offenders) + 1
+    assert list(wb["Scrap_Cost"].values)[0] == ("Date", "scrap_cost")
+    assert len(list(wb["Filtered_Entries"].values)) == len(df) + 1
+    assert ("Line: L1",) in list(wb["Summary"].values)
+
+
+@pytest.fixture
+def report_db(temp_db):
+    for row in _frame(200, 5).to_dict("records"):
+        db.insert_tool_entry(row)
+
+
+def test_no_blank_defect_offenders_from_the_database(report_db, tmp_path):
+    # tool_entries has no Defect_Code, so the Defect group has nothing to rank.
+    (path,) = generate_reports(START, END, lines=["L1"], out_dir=str(tmp_path), workers=1)
+    keys = [r[2] for r in list(load_workbook(path, read_only=True)["Top_Offenders"].values)[1:]]
+    assert keys and not [k for k in keys if k.startswith("Defect:")]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_one_workbook_per_line(report_db, tmp_path, workers):
+    out = tmp_path / f"reports{workers}"
+    paths = generate_reports(START, END, out_dir=str(out), workers=workers)
+    assert [p.rsplit("/", 1)[-1] for p in paths] == [
+        "shift_handoff_L1_2024_06_03_2024_06_05.xlsx",
+        "shift_handoff_L2_2024_06_03_2024_06_05.xlsx",
+    ]
+    for path, line in zip(paths, ("L1", "L2")):
+        entries = list(load_workbook(path, read_only=True)["Filtered_Entries"].values)
+        column = entries[0].index("Line")
+        assert entries[1:] and {r[column] for r in entries[1:]} == {line}
+
+
+def test_command_line(report_db, tmp_path, capsys):
+    out = tmp_path / "cli"
+    assert shift_handoff.main(["--start", "2024-06-03", "--end", "2024-06-05", "--line", "L2", "--out", str(out)]) == 0
+    (printed,) = capsys.readouterr().out.split()
+    assert printed.endswith("shift_handoff_L2_2024_06_03_2024_06_05.xlsx")
+    assert shift_handoff.main(["--start", "2030-01-01", "--out", str(out)]) == 1
+    with pytest.raises(SystemExit):
+        shift_handoff.main(["--start", "2024-06-05", "--end", "2024-06-03"])
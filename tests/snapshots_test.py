@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import shutil
+
+import pandas as pd
+import pytest
+
+from app import db, snapshots
+from app.storage import _load_month
+
+MONTH = "2024-06"
+
+
+@pytest.fixture
+def cache_dir(temp_db, tmp_path):
+    return tmp_path / "cache"
+
+
+def _use(monkeypatch, path, machine=None):
+    monkeypatch.setattr(db, "DB_PATH", str(path))
+    db.init_db()
+    if machine:
+        for i in range(3):
+            db.insert_tool_entry({"ID": f"E{i}", "Date": f"{MONTH}-0{i + 1}", "Time": "08:00:00",
+                                  "Machine": machine, "Reason": "Worn", "Downtime_Mins": i})
+
+
+def _machines() -> list:
+    return list(snapshots.read_month(MONTH, _load_month, ["ID", "Machine"]).sort_values("ID")["Machine"])
+
+
+def test_databases_sharing_a_cache_never_see_each_other(cache_dir, tmp_path, monkeypatch):
+    _use(monkeypatch, tmp_path / "a.db", "FROM_A")
+    assert _machines() == ["FROM_A"] * 3
+    _use(monkeypatch, tmp_path / "b.db", "FROM_B")
+    assert _machines() == ["FROM_B"] * 3
+    assert len(list(cache_dir.iterdir())) == 2
+
+    # A copy at a new path is its own database too.
+    shutil.copy(tmp_path / "a.db", tmp_path / "c.db")
+    _use(monkeypatch, tmp_path / "c.db")
+    assert _machines() == ["FROM_A"] * 3
+
+
+def test_edits_and_restored_files_rebuild_the_snapshot(cache_dir, tmp_path, monkeypatch):
+    path = tmp_path / "toollife.db"
+    _use(monkeypatch, path, "M1")
+    shutil.copy(path, tmp_path / "backup.db")
+    assert _machines() == ["M1"] * 3
+
+    with db.connect() as conn:
+        conn.execute("UPDATE tool_entries SET machine='M2' WHERE id='E1'")
+    assert _machines() == ["M1", "M2", "M1"]
+    version = db.list_entry_month_versions()[MONTH]
+
+    # Same file, same database_id and the same month version: only the rows differ.
+    shutil.copy(tmp_path / "backup.db", path)
+    with db.connect() as conn:
+        conn.execute("UPDATE tool_entry_months SET version = ?", (version,))
+    assert _machines() == ["M1"] * 3
+
+    snapshots.clear_cache()
+    assert not cache_dir.exists()
+
+
+def test_snapshot_frame_keeps_the_loaded_types(cache_dir, tmp_path, monkeypatch):
+    _use(monkeypatch, tmp_path / "toollife.db", "M1")
+    built = _load_month(MONTH)
+    snapshots.read_month(MONTH, _load_month)
+    calls = []
+    cached = snapshots.read_month(MONTH, lambda m: calls.append(m) or _load_month(m))
+    assert not calls
+    pd.testing.assert_frame_equal(cached, built.reset_index(drop=True))
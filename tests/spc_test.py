@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app import db, spc
+from app.spc import SpcRules, evaluate_points, refresh_spc
+
+RULES = SpcRules(baseline_points=10, min_points=5, watch={"tool_life": "both", "downtime": "high"})
+
+
+def _points(values, series="tool_life", tool="T1", machine="M1", t0=0):
+    return [
+        {"series": series, "tool_num": tool, "machine": machine, "id": f"{tool}{machine}-{i:04d}", "ts": t0 + i,
+         "value": v}
+        for i, v in enumerate(values)
+    ]
+
+
+def _legacy_violations(values, rules):
+    """Point-by-point I-MR with Western Electric rules, kept as the reference."""
+    hits, zones = [], []
+    for i, x in enumerate(values):
+        base = values[:min(i + 1, rules.baseline_points)]
+        center = sum(base) / len(base)
+        mrs = [abs(base[j] - base[j - 1]) for j in range(1, len(base))]
+        sigma = (sum(mrs) / len(mrs)) / spc.D2 if mrs else 0.0
+        if i + 1 < rules.min_points or sigma <= 0:
+            zones.append(0)
+            hits.append(set())
+            continue
+        z = (x - center) / sigma
+        zones.append(int(np.sign(z)) * (min(int(abs(z)), 3) + 1))
+        found = set()
+        for side in (1, -1):
+            if side == 1 and not rules.watches("tool_life")[0] or side == -1 and not rules.watches("tool_life")[1]:
+                continue
+            beyond = lambda level, w: [s * side >= level for s in zones[max(0, i - w + 1):]]
+            if zones[-1] * side >= 4:
+                found.add(1)
+            if zones[-1] * side >= 3 and sum(beyond(3, 3)) >= 2:
+                found.add(2)
+            if zones[-1] * side >= 2 and sum(beyond(2, 5)) >= 4:
+                found.add(3)
+            if len(zones) >= 8 and all(s * side > 0 for s in zones[-8:]):
+                found.add(4)
+        hits.append(found & set(rules.rules))
+    return hits
+
+
+def test_matches_point_by_point_reference_across_many_series():
+    rng = np.random.default_rng(5)
+    points, expected = [], {}
+    for s in range(40):
+        values = list(np.round(rng.normal(100, 10, 30), 1))
+        values[rng.integers(12, 30)] += 60  # a spike somewhere after the baseline
+        points += _points(values, tool=f"T{s}")
+        hits = _legacy_violations(values, RULES)
+        last = max((i for i, h in enumerate(hits) if h), default=None)
+        expected[f"T{s}"] = (sorted(hits[-1]), last, sorted(hits[last]) if last is not None else [])
+
+    rows = {r["tool_num"]: r for r in evaluate_points(points, {}, RULES)}
+    assert len(rows) == 40
+    for tool, (last_rules, last_hit, hit_rules) in expected.items():
+        row = rows[tool]
+        assert row["points"] == 30
+        assert row["last_rules"] == ",".join(map(str, last_rules))
+        assert row["violation_entry_id"] == (f"{tool}M1-{last_hit:04d}" if last_hit is not None else "")
+        assert row["violation_rules"] == ",".join(map(str, hit_rules))
+
+
+def test_incremental_state_equals_one_pass():
+    rng = np.random.default_rng(9)
+    values = list(np.round(rng.normal(50, 5, 40), 2))
+    values[30] = 5.0
+    whole = evaluate_points(_points(values), {}, RULES)[0]
+
+    state = None
+    for lo, hi in ((0, 7), (7, 12), (12, 31), (31, 40)):
+        batch = _points(values)[lo:hi]
+        state = evaluate_points(batch, {("tool_life", "T1", "M1"): state} if state else {}, RULES)[0]
+
+    for f in ("points", "center", "sigma", "ucl", "lcl", "tail", "last_rules", "violation_entry_id", "violation_rules"):
+        assert state[f] == pytest.approx(whole[f]) if isinstance(whole[f], float) else state[f] == whole[f]
+    assert whole["violation_entry_id"] == "T1M1-0030"
+    assert "1" in whole["violation_rules"].split(",")
+    # Limits froze on the first 10 values.
+    assert whole["center"] == pytest.approx(np.mean(values[:10]))
+
+
+def test_watched_side_only():
+    values = [100, 102, 98, 101, 99, 100, 103, 97, 100, 101, 400]
+    rows = evaluate_points(_points(values, series="downtime", tool=""), {}, RULES)
+    assert rows[0]["last_rules"] == "1"
+    rows = evaluate_points(_points(values[:-1] + [0], series="downtime", tool=""), {}, RULES)
+    assert rows[0]["last_rules"] == "" and rows[0]["violation_ts"] is None
+
+
+@pytest.fixture
+def spc_db(temp_db, monkeypatch):
+    monkeypatch.setattr(spc, "load_json", lambda path, default: {
+        "baseline_points": 10, "min_points": 5, "rules": [1, 2, 3, 4], "watch": {"tool_life": "low"},
+        "alert_days": 30,
+    })
+
+
+def _change(i: int, life: float, day: int = 1, tool: str = "T1") -> dict:
+    return {"ID": f"C{tool}-{i}", "Date": f"2024-06-{day:02d}", "Time": f"08:{i:02d}:00", "Machine": "M1",
+            "Tool_Num": tool, "Reason": "Worn", "Tool_Life": life}
+
+
+def test_refresh_appends_replays_and_alerts(spc_db, monkeypatch):
+    now = datetime(2024, 6, 20)
+    lives = [500, 510, 495, 505, 500, 498, 502, 507, 493, 500]
+    for i, life in enumerate(lives):
+        db.insert_tool_entry(_change(i, life))
+    assert refresh_spc(now=now) == 1
+    assert refresh_spc(now=now) == 0
+    state = db.list_spc_state(series="tool_life")[0]
+    assert (state["points"], state["center"]) == (10, pytest.approx(np.mean(lives)))
+
+    # A short-lived tool is appended from state alone and raises an alert.
+    replayed = []
+    real = spc.spc_points
+    monkeypatch.setattr(spc, "spc_points", lambda **kw: replayed.append(kw) or real(**kw))
+    db.insert_tool_entry(_change(10, 150, day=2))
+    assert refresh_spc(now=now) == 1
+    assert replayed == [{"entry_ids": ["CT1-10"]}]
+    alerts = [a for a in db.list_alerts() if a["type"] == "SPC"]
+    assert len(alerts) == 1 and alerts[0]["severity"] == "High"
+
+    # A backdated change, or a deleted one, replays the series from history.
+    replayed.clear()
+    db.insert_tool_entry(_change(11, 501, day=1))
+    assert refresh_spc(now=now) == 1
+    assert replayed[-1] == {"keys": [("tool_life", "T1", "M1")]}
+    with db.connect() as conn:
+        conn.execute("DELETE FROM tool_entries WHERE id='CT1-10'")
+    refresh_spc(now=now)
+    state = db.list_spc_state(series="tool_life")[0]
+    assert (state["points"], state["violation_ts"]) == (11, None)
+    assert not [a for a in db.list_alerts() if a["type"] == "SPC"]
+
+
+def test_only_edits_to_charted_columns_mark_series_stale(spc_db):
+    for i in range(6):
+        db.insert_tool_entry(_change(i, 500 + i))
+    refresh_spc(now=datetime(2024, 6, 20))
+    version = db.tool_entries_version()
+
+    def stale():
+        return [s["stale"] for s in db.list_spc_state(series="tool_life")]
+
+    # Re-saving a row as it is writes nothing; a sign-off fires no stale trigger.
+    db.upsert_tool_entry(_change(0, 500))
+    assert db.tool_entries_version() == version
+    db.update_tool_entry({**_change(1, 501), "Quality_User": "qa"})
+    assert db.tool_entries_version() == version + 1 and stale() == [0]
+
+    db.update_tool_entry(_change(2, 450))
+    assert stale() == [1]
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+
+import pytest
+
+from app import db
+
+
+def _entry(i: int) -> dict:
+    return {"ID": f"E{i}", "Date": "2024-06-01", "Time": "08:00:00", "Machine": "M1", "Tool_Num": "T1",
+            "Reason": "Worn"}
+
+
+def test_changes_take_stock_atomically_and_stop_at_zero(temp_db):
+    db.upsert_tool_inventory("T1", stock_qty=5)
+    errors = []
+
+    def change(i):
+        try:
+            db.apply_tool_change(_entry(i), tool_num="T1", updated_by=f"op{i}")
+        except sqlite3.OperationalError as exc:  # pragma: no cover - busy timeout on a slow box
+            errors.append(exc)
+
+    threads = [threading.Thread(target=change, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert db.get_tool("T1")["stock_qty"] == 0
+    moves = db.list_stock_movements("T1")
+    # Opening count, then one change per tool actually taken; the rest found none left.
+    assert [m["kind"] for m in moves].count("change") == 5
+    assert moves[-1]["kind"] == "adjustment" and moves[-1]["qty"] == 5
+    assert sorted(m["balance_after"] for m in moves if m["kind"] == "change") == [0, 1, 2, 3, 4]
+    assert all(m["entry_id"].startswith("E") for m in moves if m["kind"] == "change")
+    assert len(db.fetch_tool_entries()) == 8
+
+
+def test_upsert_only_touches_stock_when_given(temp_db):
+    db.upsert_tool_inventory("T1", stock_qty=4)
+    db.record_stock_movement("T1", "receipt", 6, username="rcv")
+    db.upsert_tool_inventory("T1", unit_cost=12.5)
+    assert db.get_tool("T1")["stock_qty"] == 10
+
+    db.update_tool_stock("T1", 7, updated_by="counter")
+    latest = db.list_stock_movements("T1", limit=1)[0]
+    assert (latest["kind"], latest["qty"], latest["balance_after"], latest["username"]) == ("adjustment", -3, 7, "counter")
+    db.update_tool_stock("T1", 7)
+    assert len(db.list_stock_movements("T1")) == 3
+    assert db.record_stock_movement("NOPE", "receipt", 1) is None
+    with pytest.raises(ValueError):
+        db.record_stock_movement("T1", "theft", -1)
+
+
+def test_point_in_time_balances_use_snapshots(temp_db, monkeypatch):
+    monkeypatch.setattr(db, "STOCK_SNAPSHOT_INTERVAL", 3)
+    clock = iter(range(1000, 2000, 10))
+    monkeypatch.setattr(db, "_now_ts", lambda: next(clock))
+    db.upsert_tool_inventory("T1", stock_qty=2)  # ts 1000
+    db.upsert_tool_inventory("T2", stock_qty=1)  # ts 1010
+    for _ in range(6):  # ts 1020..1070: +1 each
+        db.record_stock_movement("T1", "receipt", 1)
+
+    with db.connect() as conn:
+        snaps = [r["movement_id"] for r in conn.execute("SELECT movement_id FROM stock_snapshots WHERE tool_num='T1'")]
+    assert len(snaps) == 2
+
+    assert db.stock_balance_at("T1", 999) == 0
+    assert db.stock_balance_at("T1", 1000) == 2
+    assert db.stock_balance_at("T1", 1045) == 5
+    assert db.stock_balance_at("T1", 5000) == db.get_tool("T1")["stock_qty"] == 8
+    assert db.stock_balances_at(1035) == {"T1": 4, "T2": 1}
+
+
+def test_stock_that_predates_the_ledger_is_opened_once(temp_db):
+    with db.connect() as conn:
+        conn.execute("INSERT INTO tools(tool_num, stock_qty) VALUES('OLD', 9)")
+        conn.execute("DELETE FROM meta WHERE key='stock_ledger_seeded'")
+    db.init_db()
+    db.init_db()
+    moves = db.list_stock_movements("OLD")
+    assert [(m["kind"], m["qty"], m["balance_after"], m["note"]) for m in moves] == [
+        ("adjustment", 9, 9, "Opening balance"),
+    ]
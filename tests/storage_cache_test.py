@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from app import db, storage
+
+MONTH = datetime.now().strftime("%Y-%m")
+
+
+@pytest.fixture
+def loads(temp_db, monkeypatch):
+    storage.invalidate_df_cache()
+    calls = []
+    real = storage._load_month
+    monkeypatch.setattr(storage, "_load_month", lambda month: calls.append(month) or real(month))
+    return calls
+
+
+def _entry(entry_id: str, machine: str = "M1") -> dict:
+    return {"ID": entry_id, "Date": f"{MONTH}-01", "Time": "08:00:00", "Machine": machine, "Reason": "Worn"}
+
+
+def test_repeat_loads_hit_the_cache_until_a_write(loads):
+    db.insert_tool_entry(_entry("E1"))
+    assert len(storage.get_df(MONTH)[0]) == 1
+    storage.get_df(MONTH)
+    storage.get_df(MONTH, columns=["ID", "Machine"])
+    assert loads == [MONTH]
+
+    db.insert_tool_entry(_entry("E2"))
+    assert sorted(storage.get_df(MONTH)[0]["ID"]) == ["E1", "E2"]
+    assert loads == [MONTH, MONTH]
+
+    # A write from another connection, as from another station, counts too.
+    conn = sqlite3.connect(db.DB_PATH)
+    with conn:
+        conn.execute("UPDATE tool_entries SET machine='M9' WHERE id='E1'")
+    conn.close()
+    df, _ = storage.get_df(MONTH)
+    assert df.set_index("ID").loc["E1", "Machine"] == "M9"
+    assert len(loads) == 3
+
+
+def test_another_database_is_never_served_from_the_cache(loads, tmp_path, monkeypatch):
+    db.insert_tool_entry(_entry("E1", "FROM_A"))
+    assert list(storage.get_df(MONTH)[0]["Machine"]) == ["FROM_A"]
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "other.db"))
+    db.init_db()
+    db.insert_tool_entry(_entry("E1", "FROM_B"))
+    assert list(storage.get_df(MONTH)[0]["Machine"]) == ["FROM_B"]
+
+
+def test_handouts_are_isolated_from_the_cache(loads):
+    db.insert_tool_entry(_entry("E1"))
+    first, _ = storage.get_df(MONTH)
+    first.loc[0, "Machine"] = "EDITED"
+    first["Extra"] = 1
+    first.drop(index=0, inplace=True)
+
+    again, _ = storage.get_df(MONTH)
+    assert list(again["Machine"]) == ["M1"]
+    assert "Extra" not in again.columns
+    ranged = storage.get_df_range(MONTH, MONTH)
+    ranged.iloc[0, ranged.columns.get_loc("Machine")] = "EDITED"
+    pd.testing.assert_frame_equal(storage.get_df_range(MONTH, MONTH), again)
+    assert loads == [MONTH]
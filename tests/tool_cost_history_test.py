@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import db
+from app.dates import entry_ts
+from app.tool_costs import attach_tool_cost, cost_history_frame
+
+JAN, MAR, JUN = entry_ts("2024-01-01"), entry_ts("2024-03-01"), entry_ts("2024-06-01")
+
+
+def _history(tool: str):
+    return [(r["change_cost"], r["valid_from"], r["valid_to"]) for r in db.list_tool_cost_history([tool])]
+
+
+def _backdate(tool: str, *bounds: int) -> None:
+    """Moves a tool's price rows to the given start times, as if set on those days."""
+    with db.connect() as conn:
+        ids = [r["id"] for r in conn.execute(
+            "SELECT h.id FROM tool_cost_history h JOIN tools t ON t.id = h.tool_id WHERE t.tool_num=? ORDER BY h.id",
+            (tool,),
+        )]
+        for i, (row_id, start) in enumerate(zip(ids, bounds)):
+            end = bounds[i + 1] if i + 1 < len(bounds) else None
+            conn.execute("UPDATE tool_cost_history SET valid_from=?, valid_to=? WHERE id=?", (start, end, row_id))
+
+
+def _early_in_a_second() -> None:
+    """Same-second behavior depends on the clock; start well before the next tick."""
+    while time.time() % 1 > 0.2:
+        time.sleep(0.05)
+
+
+def _change(i: str, tool: str, date: str) -> dict:
+    return {"ID": i, "Date": date, "Time": "08:00:00", "Line": "L1", "Machine": "M1", "Tool_Num": tool,
+            "Reason": "Worn"}
+
+
+def test_price_changes_open_and_close_rows(temp_db):
+    db.upsert_tool_inventory("T1", unit_cost=10.0)
+    assert [c for c, _, to in _history("T1")] == [10.0] and _history("T1")[0][2] is None
+    _backdate("T1", JAN)
+
+    # Changes within one save (or one second) leave only the final price.
+    _early_in_a_second()
+    db.replace_tool_inserts("T1", [{"insert_count": 2, "price_per_insert": 6.0, "sides_per_insert": 2, "tool_life": 1}])
+    db.replace_tool_inserts("T1", [{"insert_count": 2, "price_per_insert": 6.0, "sides_per_insert": 2, "tool_life": 1}])
+    history = _history("T1")
+    assert [c for c, _, _ in history] == [10.0, 6.0]
+    assert history[0][1:] == (JAN, history[1][1]) and history[1][2] is None
+
+    # Going back to the price just closed reopens it.
+    db.replace_tool_inserts("T1", [])
+    assert _history("T1") == [(10.0, JAN, None)]
+
+
+def test_lookups_use_the_price_in_effect(temp_db):
+    db.upsert_tool_inventory("T1", unit_cost=10.0)
+    db.upsert_tool_inventory("T1", unit_cost=12.0)
+    _backdate("T1", JAN)
+    with db.connect() as conn:
+        tool_id = conn.execute("SELECT id FROM tools WHERE tool_num='T1'").fetchone()["id"]
+        conn.execute("UPDATE tool_cost_history SET valid_to=? WHERE tool_id=?", (MAR, tool_id))
+        conn.execute(
+            "INSERT INTO tool_cost_history(tool_id, change_cost, valid_from) VALUES(?, 15.0, ?)", (tool_id, MAR)
+        )
+    assert db.tool_cost_at("T1", entry_ts("2023-06-01")) == 12.0  # before the first price
+    assert db.tool_cost_at("T1", JAN) == 12.0
+    assert db.tool_cost_at("T1", MAR - 1) == 12.0
+    assert db.tool_cost_at("T1", MAR) == 15.0
+    assert db.tool_cost_at("missing", MAR) == 0.0
+
+    # A backdated change is priced at its own date.
+    cost, _ = db.apply_tool_change(_change("C1", "T1", "2024-02-10"), tool_num="T1", consume_stock=False)
+    assert cost == 12.0
+
+
+def test_reprice_and_frame_match_point_lookups(temp_db):
+    rng = np.random.default_rng(3)
+    tools = [f"T{i}" for i in range(6)]
+    for tool in tools:
+        db.upsert_tool_inventory(tool, unit_cost=5.0)
+    with db.connect() as conn:
+        conn.execute("DELETE FROM tool_cost_history")
+        for tool_id, tool in enumerate(tools, start=1):
+            starts = sorted(rng.choice(np.arange(JAN, JUN, 86400), 3, replace=False).tolist())
+            for start, price in zip(starts, rng.integers(1, 50, 3).tolist()):
+                conn.execute(
+                    "INSERT INTO tool_cost_history(tool_id, change_cost, valid_from) VALUES(?,?,?)",
+                    (tool_id, float(price), int(start)),
+                )
+
+    days = pd.date_range("2023-12-01", "2024-07-31").strftime("%Y-%m-%d")
+    frame = pd.DataFrame({
+        "ID": [f"E{i}" for i in range(400)],
+        "Date": rng.choice(days, 400),
+        "Time": rng.choice(["00:00:00", "07:30:00", "23:59:59"], 400),
+        "Tool_Num": rng.choice(tools + ["", "unknown"], 400),
+    })
+    frame.loc[5, "Date"] = ""
+    for row in frame.itertuples():
+        db.insert_tool_entry({"ID": row.ID, "Date": row.Date or "2024-01-01", "Time": row.Time, "Machine": "M1",
+                              "Tool_Num": row.Tool_Num, "Reason": "Worn"})
+
+    priced = attach_tool_cost(frame, cost_history_frame())
+    assert list(priced["ID"]) == list(frame["ID"])
+    for row in priced.itertuples():
+        ts = entry_ts(row.Date, row.Time) if row.Date else None
+        want = db.tool_cost_at(row.Tool_Num, ts) if row.Tool_Num and ts is not None else 0.0
+        assert row.Tool_Cost == want, row
+
+    # One pass over saved entries stores the same prices.
+    assert db.reprice_tool_changes() > 0
+    assert db.reprice_tool_changes() == 0
+    stored = {e["id"]: e["cost"] for e in (db.fetch_tool_entry(i) for i in frame["ID"])}
+    for row in priced.itertuples():
+        if row.Tool_Num and row.Date:
+            assert stored[row.ID] == row.Tool_Cost
+    total = sum(r["tool_cost"] for r in db.tool_cost_totals("2023-01-01", "2024-12-31"))
+    assert total == pytest.approx(sum(c for i, c in stored.items() if frame.set_index("ID").at[i, "Tool_Num"]))
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import pytest
+
+from app import db
+from app.services import master_data_service
+from app.services.common import Actor
+
+
+def _change(i: str, tool: str, date: str = "2024-06-03", line: str = "L1", part: str = "P1") -> dict:
+    return {"ID": i, "Date": date, "Time": "08:00:00", "Line": line, "Machine": "M1", "Part_Number": part,
+            "Tool_Num": tool, "Reason": "Worn"}
+
+
+def _report(i: str, qty: float, date: str = "2024-06-03", line: str = "L1", part: str = "P1") -> dict:
+    return {"ID": i, "Date": date, "Time": "15:00:00", "Line": line, "Machine": "M1", "Part_Number": part,
+            "Reason": "Shift Production", "Production_Qty": qty}
+
+
+def _change_cost(tool: str) -> float:
+    with db.connect() as conn:
+        return conn.execute("SELECT change_cost FROM tools WHERE tool_num=?", (tool,)).fetchone()["change_cost"]
+
+
+def test_change_cost_follows_inserts_and_unit_cost(temp_db):
+    db.upsert_tool_inventory("T1", unit_cost=40.0)
+    assert _change_cost("T1") == 40.0
+
+    db.replace_tool_inserts("T1", [
+        {"insert_count": 2, "price_per_insert": 12.0, "sides_per_insert": 4, "tool_life": 3},
+        {"insert_count": 1, "price_per_insert": 9.0, "sides_per_insert": 2, "tool_life": 0},  # life not set
+    ])
+    assert _change_cost("T1") == pytest.approx(2 * 12.0 / 3 / 4)
+    db.upsert_tool_inventory("T1", unit_cost=55.0)
+    assert _change_cost("T1") == pytest.approx(2.0)
+    db.replace_tool_inserts("T1", [])
+    assert _change_cost("T1") == 55.0
+
+
+def test_changes_store_cost_and_rollups_track_edits(temp_db):
+    db.upsert_tool_inventory("T1", unit_cost=10.0, stock_qty=5)
+    db.upsert_tool_inventory("T2", unit_cost=4.0)
+
+    assert db.apply_tool_change({**_change("C1", "T1"), "Cost": 0.0}, tool_num="T1") == (10.0, 4)
+    assert db.apply_tool_change(_change("C2", "T2"), tool_num="T2", consume_stock=False) == (4.0, None)
+    db.apply_tool_change(_change("C3", "T1", line="L2", part="P9"), tool_num="T1")
+    db.insert_tool_entry(_report("R1", 700))
+    assert db.fetch_tool_entry("C1")["cost"] == 10.0
+
+    by_part = db.tool_cost_totals("2024-06-01", "2024-06-30", by=("line", "part_number"))
+    assert [(r["line"], r["part_number"], r["tool_changes"], r["tool_cost"], r["produced"]) for r in by_part] == [
+        ("L1", "P1", 2, 14.0, 700.0),
+        ("L2", "P9", 1, 10.0, 0.0),
+    ]
+    assert by_part[0]["cost_per_piece"] == pytest.approx(14.0 / 700)
+    assert by_part[1]["cost_per_piece"] is None
+
+    # Edits and deletes move the rollup with them.
+    db.update_tool_entry({**_change("C2", "T2", date="2024-07-01"), "Cost": 6.0})
+    with db.connect() as conn:
+        conn.execute("DELETE FROM tool_entries WHERE id='C3'")
+    by_line = {(r["period"], r["line"]): r for r in db.tool_cost_totals("2024-01-01", "2024-12-31")}
+    assert set(by_line) == {("2024-06", "L1"), ("2024-07", "L1")}
+    assert (by_line[("2024-06", "L1")]["tool_cost"], by_line[("2024-07", "L1")]["tool_cost"]) == (10.0, 6.0)
+    with pytest.raises(ValueError):
+        db.tool_cost_totals("2024-01-01", "2024-12-31", period="week")
+
+
+def test_init_leaves_saved_costs_alone_and_builds_rollup(temp_db, monkeypatch):
+    db.upsert_tool_inventory("T1", unit_cost=8.0)
+    db.insert_tool_entry(_change("OLD1", "T1"))
+    db.insert_tool_entry({**_change("OLD2", "T1"), "Cost": 3.0})
+    with db.connect() as conn:
+        conn.execute("UPDATE tool_entries SET cost = 0 WHERE id = 'OLD1'")
+        conn.execute("DELETE FROM meta WHERE key='tool_change_costs_seeded'")
+        conn.execute("DROP TABLE tool_cost_rollup")
+        for event in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER trg_tool_cost_rollup_{event}")
+
+    db.init_db()
+    assert db.fetch_tool_entry("OLD1")["cost"] == 0.0
+    assert db.fetch_tool_entry("OLD2")["cost"] == 3.0
+    (row,) = db.tool_cost_totals("2024-06-01", "2024-06-30")
+    assert (row["tool_changes"], row["tool_cost"]) == (2, 3.0)
+
+    # Re-pricing is an explicit, audited action.
+    audited = []
+    monkeypatch.setattr(master_data_service, "audit", lambda action, user, details=None, **kw: audited.append(details))
+    assert master_data_service.reprice_tool_changes_service(actor_user=Actor("lead", "Admin")) == 2
+    assert [db.fetch_tool_entry(i)["cost"] for i in ("OLD1", "OLD2")] == [8.0, 8.0]
+    assert audited == [{"start": None, "end": None, "changed": 2}]
+    (row,) = db.tool_cost_totals("2024-06-01", "2024-06-30")
+    assert row["tool_cost"] == 16.0
+
+
+def test_zero_sides_per_insert_counts_as_one(temp_db):
+    db.upsert_tool_inventory("T1", unit_cost=40.0)
+    db.replace_tool_inserts("T1", [{"insert_count": 2, "price_per_insert": 12.0, "sides_per_insert": 4, "tool_life": 3}])
+    with db.connect() as conn:
+        conn.execute("UPDATE tool_inserts SET sides_per_insert = 0")
+    assert _change_cost("T1") == pytest.approx(2 * 12.0 / 3)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import calendar
+from typing import Any, Dict
+
+import numpy as np
+import pytest
+
+from app import db, tool_life_model
+from app.tool_life_model import fit_lives, fit_weibull, refresh_tool_life_model
+
+
+def test_weibull_fit_recovers_parameters():
+    rng = np.random.default_rng(3)
+    lives = 1200.0 * rng.weibull(2.5, size=400)
+
+    shape, scale = fit_weibull(lives)
+
+    assert shape == pytest.approx(2.5, rel=0.1)
+    assert scale == pytest.approx(1200.0, rel=0.05)
+    fit = fit_lives(lives)
+    assert fit.method == "weibull"
+    assert fit.p10 < fit.p50 < fit.p90
+    # A used tool has less left than a new one, but more than median minus used.
+    assert fit.p50 - 400 < fit.median_remaining(400) < fit.median_remaining(0) == pytest.approx(fit.p50)
+
+
+def test_few_or_identical_lives_use_percentiles():
+    assert fit_weibull([500, 500, 500]) is None
+    fit = fit_lives([0, 400, 500, 600])
+    assert (fit.method, fit.samples, fit.p50) == ("empirical", 3, 500.0)
+    assert fit.median_remaining(450) == pytest.approx(100.0)
+    assert fit.median_remaining(700) == 0.0
+    assert fit_lives([0, 0]) is None
+
+
+def _change(i: int, day: int, life: float, **overrides: Any) -> Dict[str, Any]:
+    row = {"ID": f"C{i}", "Date": f"2024-06-{day:02d}", "Time": "06:00:00", "Machine": "M1",
+           "Part_Number": "P1", "Tool_Num": "T1", "Reason": "Worn", "Tool_Life": life}
+    row.update(overrides)
+    return row
+
+
+def _production(i: int, day: int, qty: float) -> Dict[str, Any]:
+    return {"ID": f"SP-{i}", "Date": f"2024-06-{day:02d}", "Time": "18:00:00", "Machine": "M1",
+            "Part_Number": "P1", "Tool_Num": "", "Reason": "Shift Production", "Production_Qty": qty}
+
+
+def test_refresh_predicts_from_production_and_refits_only_touched_keys(temp_db, monkeypatch):
+    for i, (day, life) in enumerate([(1, 400), (3, 500), (5, 600)]):
+        db.insert_tool_entry(_change(i, day, life))
+    db.insert_tool_entry(_change(9, 5, 900, Tool_Num="T2", Machine="M2"))
+
+    assert refresh_tool_life_model() == 2
+    row = db.get_tool_life_model("T1", "M1", "P1")
+    assert (row["method"], row["samples"], row["p50_life"], row["installed_entry_id"]) == ("empirical", 3, 500.0, "C2")
+    # No production yet: the usual two-day gap between changes.
+    assert row["predicted_change_ts"] == calendar.timegm((2024, 6, 7, 6, 0, 0))
+    assert refresh_tool_life_model() == 0
+
+    # 200 parts in the 12h after the install leave a median 300 more, at 200 per 12h.
+    db.insert_tool_entry(_production(1, 5, 200))
+    refitted = []
+    real = tool_life_model.predict_key
+    monkeypatch.setattr(tool_life_model, "predict_key", lambda k: refitted.append(k) or real(k))
+    assert refresh_tool_life_model() == 1
+    assert refitted == [("T1", "M1", "P1")]
+    row = db.get_tool_life_model("T1", "M1", "P1")
+    assert (row["produced_since"], row["expected_remaining"]) == (200.0, 300.0)
+    assert row["predicted_change_ts"] == calendar.timegm((2024, 6, 6, 12, 0, 0))
+
+    # Deleting the latest change falls back to the one before it.
+    with db.connect() as conn:
+        conn.execute("DELETE FROM tool_entries WHERE id='C2'")
+    assert refresh_tool_life_model() == 1
+    assert db.get_tool_life_model("T1", "M1", "P1")["installed_entry_id"] == "C1"
+
+    with db.connect() as conn:
+        conn.execute("DELETE FROM tool_entries WHERE tool_num='T2'")
+    refresh_tool_life_model()
+    assert [r["tool_num"] for r in db.list_tool_life_model()] == ["T1"]
+
+
+def test_only_edits_to_modelled_columns_mark_keys_stale(temp_db):
+    for i, (day, life) in enumerate([(1, 400), (3, 500), (5, 600)]):
+        db.insert_tool_entry(_change(i, day, life))
+    refresh_tool_life_model()
+
+    db.update_tool_entry({**_change(1, 3, 500), "Quality_User": "qa"})
+    assert db.list_stale_tool_life_keys() == []
+    db.update_tool_entry(_change(1, 3, 550))
+    assert db.list_stale_tool_life_keys() == [("T1", "M1", "P1")]
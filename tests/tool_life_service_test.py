@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import pytest
+
+from app import db, repeat_tracker
+from app.services import common, tool_life_service
+from app.services.common import Actor
+
+ACTOR = Actor("lead", "Admin")
+
+
+@pytest.fixture
+def service_db(temp_db, monkeypatch):
+    monkeypatch.setattr(repeat_tracker, "_tracker", None)
+    monkeypatch.setattr(tool_life_service, "audit", lambda *a, **k: None)
+    logged = []
+    monkeypatch.setattr(common, "log_with_user", lambda logger, level, message, user="": logged.append(message))
+    return logged
+
+
+def _report() -> dict:
+    return {"ID": "SP-1", "Date": "2024-06-05", "Time": "14:00:00", "Shift": "1st", "Line": "L1", "Machine": "M1",
+            "Part_Number": "P1", "Tool_Num": "-", "Reason": "Shift Production", "Production_Qty": 100}
+
+
+def test_a_failing_refresh_does_not_fail_the_saved_entry(service_db, monkeypatch):
+    ran = []
+
+    def broken():
+        raise RuntimeError("rollup unavailable")
+
+    monkeypatch.setattr(tool_life_service, "refresh_oee_rollup", broken)
+    monkeypatch.setattr(tool_life_service, "refresh_ewma", lambda: ran.append("ewma"))
+
+    tool_life_service.create_shift_report(_report(), [], actor_user=ACTOR)
+
+    assert db.fetch_tool_entry("SP-1") is not None
+    assert ran == ["ewma"]
+    assert len(service_db) == 1 and "OEE rollup refresh after saving entry SP-1 failed" in service_db[0]
+    assert "rollup unavailable" in service_db[0]
+    assert [r["id"] for r in db.list_repeat_flags(flagged_only=False)] == ["SP-1"]
+
+
+def test_an_edit_runs_the_same_refreshes_as_a_new_entry(service_db, monkeypatch):
+    entry = {"ID": "E1", "Date": "2024-06-05", "Time": "08:00:00", "Line": "L1", "Machine": "M1",
+             "Tool_Num": "T1", "Reason": "Worn", "Tool_Life": 500}
+    db.insert_tool_entry(entry)
+    ran = []
+    for name in ("refresh_tool_life_model", "refresh_oee_rollup", "refresh_spc", "refresh_ewma"):
+        monkeypatch.setattr(tool_life_service, name, lambda name=name: ran.append(name))
+    monkeypatch.setattr(tool_life_service, "refresh_inventory_forecast", lambda tools: ran.append(tools))
+
+    tool_life_service.update_tool_change_entry({**entry, "Tool_Num": "T2"}, actor_user=ACTOR)
+
+    assert ran == ["refresh_tool_life_model", ["T1", "T2"], "refresh_oee_rollup", "refresh_spc", "refresh_ewma"]
+    assert service_db == []